@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+#
+# Example of the read and write throughput of the
+# HDF5 chunk layouts and compression filters.
+#
+# Last revision: 17/10/2026
+from __future__ import print_function, division
+
+import os, time, numpy as np, h5py
+import pyLOM
+
+
+## Parameters
+OUTFILE = 'layout.h5'
+NX, NT  = 400, 500     # Points per direction and number of snapshots
+NREAD   = 20           # Number of snapshots and points read
+LAYOUTS = [(None,None),('snapshot',None),('point',None),
+		   ('snapshot','shuffle+gzip'),('snapshot','lzf'),
+		   ('snapshot','truncate:16+shuffle+gzip'),('point','truncate:16+shuffle+gzip')]
+
+
+## Create a smooth synthetic dataset on a 2D structured mesh
+x, y  = np.meshgrid(np.linspace(0,1,NX),np.linspace(0,1,NX),indexing='ij')
+xyz   = np.ascontiguousarray(np.vstack([x.ravel(),y.ravel()]).T)
+ii,jj = np.meshgrid(np.arange(NX-1),np.arange(NX-1),indexing='ij')
+p0    = (ii*NX + jj).ravel()
+conec = np.ascontiguousarray(np.vstack([p0,p0+NX,p0+NX+1,p0+1]).T,np.int32)
+ncells= conec.shape[0]
+mesh  = pyLOM.Mesh('STRUCT2D',xyz,conec,np.full((ncells,),3,np.int32),np.arange(ncells,dtype=np.int32),np.arange(NX*NX,dtype=np.int32))
+ptable= pyLOM.PartitionTable.new(1,ncells,NX*NX)
+t     = np.linspace(0,10,NT)
+X     = np.sin(2*np.pi*(x.ravel()[:,None] - 0.1*t[None,:]))*np.cos(2*np.pi*y.ravel()[:,None])
+d     = pyLOM.Dataset(ptable=ptable,mesh=mesh,time=t,VELX={'point':True,'ndim':1,'value':X})
+MB    = X.nbytes/1024/1024
+
+
+## Benchmark
+pyLOM.pprint(0,'%-12s %-26s %10s %10s %10s %10s %10s'%('chunks','compression','size [MB]','write MB/s','snap MB/s','point MB/s','error'))
+for chunks, compression in LAYOUTS:
+	# Write the whole dataset
+	tstart = time.time()
+	d.save(OUTFILE,mpio=False,chunks=chunks,compression=compression)
+	twrite = time.time() - tstart
+	size   = os.path.getsize(OUTFILE)/1024/1024
+	# Read some snapshots (columns) and the time series of some points (rows)
+	with h5py.File(OUTFILE,'r') as f:
+		dset   = f['VARIABLES']['VELX']['value']
+		tstart = time.time()
+		for it in np.linspace(0,NT-1,NREAD).astype(int): dset[:,it]
+		tsnap  = time.time() - tstart
+		tstart = time.time()
+		for ip in np.linspace(0,NX*NX-1,NREAD).astype(int): dset[ip,:]
+		tpoint = time.time() - tstart
+		error  = np.abs(dset[:,:] - X).max()
+	pyLOM.pprint(0,'%-12s %-26s %10.2f %10.1f %10.1f %10.1f %10.1e'%(chunks,compression,size,MB/twrite,
+		NREAD*X.shape[0]*X.itemsize/1024/1024/tsnap,NREAD*X.shape[1]*X.itemsize/1024/1024/tpoint,error))
+
+
+## Clean up
+os.remove(OUTFILE)
+pyLOM.cr_info()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+#
+# Example of the reduction trees of the parallel
+# TSQR factorization and of the node shared memory
+# TSQR, run with mpirun.
+#
+# Last revision: 17/10/2026
+from __future__ import print_function, division
+
+import time, numpy as np
+import pyLOM
+
+
+## Parameters
+M, N   = 20000, 64   # Rows per processor and number of columns
+NREP   = 10          # Repetitions of each factorization
+TREES  = ['binary','flat','butterfly','node','cholqr2']
+
+
+## Random tall and skinny matrix scattered on the processors
+comm  = pyLOM.utils.mpi_comm()[0]
+rng   = np.random.default_rng(pyLOM.utils.MPI_RANK)
+A     = rng.standard_normal((M,N))
+
+
+## Benchmark
+pyLOM.pprint(0,'%-10s %10s %12s %12s'%('tree','time [s]','orthogonality','residual'))
+for tree in TREES:
+	comm.Barrier()
+	tstart = time.time()
+	for irep in range(NREP): Q, R = pyLOM.math.tsqr(A,comm=comm,tree=tree)
+	ttree  = pyLOM.utils.mpi_reduce(time.time() - tstart,op='max',all=True)/NREP
+	# Accuracy of the factorization
+	orth   = np.abs(pyLOM.utils.mpi_reduce(Q.T @ Q,op='sum',all=True) - np.eye(N)).max()
+	res    = pyLOM.utils.mpi_reduce(np.abs(pyLOM.math.matmul(Q,R) - A).max(),op='max',all=True)
+	pyLOM.pprint(0,'%-10s %10.4f %12.2e %12.2e'%(tree,ttree,orth,res))
+
+
+## Snapshot matrix in node shared memory, only the node leaders communicate
+As = pyLOM.utils.NodeArray(A.shape,A.dtype,comm)
+As.local[:,:] = A
+As.barrier()
+comm.Barrier()
+tstart = time.time()
+for irep in range(NREP):
+	Qs, Rs = pyLOM.math.tsqr_shared(As)
+	if irep < NREP-1: Qs.free(); Rs.free()
+ttree  = pyLOM.utils.mpi_reduce(time.time() - tstart,op='max',all=True)/NREP
+orth   = np.abs(pyLOM.utils.mpi_reduce(Qs.local.T @ Qs.local,op='sum',all=True) - np.eye(N)).max()
+res    = pyLOM.utils.mpi_reduce(np.abs(pyLOM.math.matmul(Qs.local,Rs.node) - A).max(),op='max',all=True)
+pyLOM.pprint(0,'%-10s %10.4f %12.2e %12.2e'%('shared',ttree,orth,res))
+Qs.free(); Rs.free(); As.free()
+
+
+pyLOM.cr_info()
@@ -3,6 +3,8 @@
 # Run DMD testsuite
 cd Testsuite
 rm -rf *.tar.gz
+python tsuite_DMD_synthetic.py || exit 1
+mpirun -np 4 python tsuite_DMD_synthetic.py || exit 1
 python tsuite_DMD_cylinder.py
 tar czf cylinderDMD_serial.tar.gz cylinderDMD/
 rm -rf cylinderDMD
@@ -3,6 +3,8 @@
 # Run POD testsuite
 cd Testsuite
 rm -rf *.tar.gz
+python tsuite_POD_synthetic.py || exit 1
+mpirun -np 4 python tsuite_POD_synthetic.py || exit 1
 python tsuite_POD_cylinder.py
 tar czf cylinderPOD_serial.tar.gz cylinderPOD/
 rm -rf cylinderPOD
@@ -3,6 +3,8 @@
 # Run SPOD testsuite
 cd Testsuite
 rm -rf *.tar.gz
+python tsuite_SPOD_synthetic.py || exit 1
+mpirun -np 4 python tsuite_SPOD_synthetic.py || exit 1
 python tsuite_SPOD_cylinder.py
 tar czf cylinderSPOD_serial.tar.gz cylinderSPOD/
 rm -rf cylinderSPOD
@@ -0,0 +1,10 @@
+#!/bin/bash
+#
+# Run dataset testsuite
+cd Testsuite
+python tsuite_dset_probes.py || exit 1
+mpirun -np 4 python tsuite_dset_probes.py || exit 1
+rm -f PROBES.h5
+python tsuite_dset_synthetic.py || exit 1
+mpirun -np 4 python tsuite_dset_synthetic.py || exit 1
+cd -
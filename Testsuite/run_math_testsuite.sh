@@ -0,0 +1,13 @@
+#!/bin/bash
+#
+# Run math testsuite
+cd Testsuite
+python tsuite_math_svd.py || exit 1
+mpirun -np 4 python tsuite_math_svd.py || exit 1
+# A processor with fewer rows than columns must abort the TSQR instead of hanging
+timeout 300 mpirun -np 4 python tsuite_math_svd.py short
+rc=$?
+if [ $rc -eq 0 ] || [ $rc -eq 124 ]; then exit 1; fi
+python tsuite_utils_parall.py || exit 1
+mpirun -np 4 python tsuite_utils_parall.py || exit 1
+cd -
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+#
+# PYLOM Testsuite
+# DMD variants on synthetic damped oscillations, checked against
+# the analytical eigenvalues and the single variant runs
+#
+# Last revision: 17/10/2026
+from __future__ import print_function, division
+
+import numpy as np
+
+import pyLOM
+from tsuite_common import check
+
+
+## Parameters
+M, NT    = 3000, 120
+DT       = 0.05
+OMEGA    = np.array([1.,2.7,5.3])
+SIGMA    = np.array([0.,-0.1,-0.25])
+VARIANTS = ['exact','projected','tls','fb']
+
+
+def sort_eigs(muReal,muImag):
+	'''
+	Eigenvalues sorted by their argument.
+	'''
+	mu = muReal + 1j*muImag
+	return mu[np.argsort(np.angle(mu))]
+
+
+## Damped oscillations with random spatial structures, partitioned by rows
+rng    = np.random.default_rng(5)
+time   = DT*np.arange(NT)
+istart, iend = pyLOM.utils.worksplit(0,M,pyLOM.utils.MPI_RANK,pyLOM.utils.MPI_SIZE)
+A, B   = rng.standard_normal((M,len(OMEGA))), rng.standard_normal((M,len(OMEGA)))
+X      = sum([(A[:,k][:,None]*np.cos(OMEGA[k]*time) + B[:,k][:,None]*np.sin(OMEGA[k]*time))*np.exp(SIGMA[k]*time) for k in range(len(OMEGA))])
+X      = np.ascontiguousarray(X[istart:iend])
+lam    = np.concatenate((SIGMA + 1j*OMEGA,SIGMA - 1j*OMEGA))
+mu0    = np.exp(lam*DT)
+mu0    = mu0[np.argsort(np.angle(mu0))]
+
+
+## Baseline against the analytical eigenvalues
+muReal0, muImag0, Phi0, b0 = pyLOM.DMD.run(X,1e-6,remove_mean=False)
+mu = sort_eigs(muReal0,muImag0)
+check('exact number of modes',abs(mu.shape[0]-mu0.shape[0]),0)
+check('exact eigenvalues',np.max(np.abs(mu-mu0)),1e-8)
+# Reconstruction of the first snapshot from the modes and amplitudes
+check('exact first snapshot',np.max(np.abs(Phi0 @ b0 - X[:,0]))/np.max(np.abs(X)),1e-6)
+
+
+## Every variant against the analytical eigenvalues
+single = {}
+for variant in VARIANTS:
+	single[variant] = pyLOM.DMD.run(X,1e-6,remove_mean=False,variant=variant)
+	muReal, muImag, Phi, b = single[variant]
+	mu = sort_eigs(muReal,muImag)
+	check('%s number of modes' % variant,abs(mu.shape[0]-mu0.shape[0]),0)
+	check('%s eigenvalues' % variant,np.max(np.abs(mu-mu0)),1e-8)
+	check('%s first snapshot' % variant,np.max(np.abs(Phi @ b - X[:,0]))/np.max(np.abs(X)),1e-6)
+
+
+## All the variants on a single QR factorization
+multi = pyLOM.DMD.run(X,1e-6,remove_mean=False,variant=VARIANTS)
+for variant, out in zip(VARIANTS,multi):
+	check('%s multi vs single' % variant,max([np.max(np.abs(o-s)) for o, s in zip(out,single[variant])]),1e-12)
+
+
+## Single precision snapshots, the modes are complex64
+muReal, muImag, Phi, b = pyLOM.DMD.run(X,1e-4,remove_mean=False,dtype=np.float32)
+mu = sort_eigs(muReal,muImag)
+check('float32 modes dtype',int(not Phi.dtype == np.complex64),0)
+check('float32 number of modes',abs(mu.shape[0]-mu0.shape[0]),0)
+check('float32 eigenvalues',np.max(np.abs(mu-mu0)),1e-4)
+check('float32 first snapshot',np.max(np.abs(Phi @ b - X[:,0]))/np.max(np.abs(X)),1e-4)
+check('float32 reconstruction',np.max(np.abs(pyLOM.DMD.reconstruction_jovanovic(Phi,muReal,muImag,np.arange(NT,dtype=np.double),b)-X))/np.max(np.abs(X)),1e-4)
+
+
+## Mean removed in place, X is left centered and the mean returned
+out = pyLOM.DMD.run(X,1e-6)
+Xc  = X.copy()
+out_inplace = pyLOM.DMD.run(Xc,1e-6,overwrite_input=True)
+check('overwrite_input outputs',max([np.max(np.abs(o-s)) for o, s in zip(out,out_inplace[:4])]),1e-12)
+check('overwrite_input mean',np.max(np.abs(out_inplace[4]-np.mean(X,axis=1))),1e-12)
+check('overwrite_input X centered',np.max(np.abs(Xc-X+np.mean(X,axis=1)[:,np.newaxis])),1e-12)
+
+
+pyLOM.cr_info()
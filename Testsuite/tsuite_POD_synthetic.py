@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+#
+# PYLOM Testsuite
+# POD engines on a synthetic dataset, checked against
+# the TSQR POD of the dataset in memory
+#
+# Last revision: 17/10/2026
+from __future__ import print_function, division
+
+import os, numpy as np, h5py
+from mpi4py import MPI
+
+import pyLOM
+from tsuite_common import check
+
+
+## Parameters
+OUTFILE = './PODSYNTH.h5'
+PODFILE = './PODSYNTH_MODES.h5'
+HAS_MPIO = pyLOM.utils.MPI_SIZE == 1 or h5py.get_config().mpi
+NX, NY  = 61, 31
+NT      = 90
+RANK    = 8
+DIMSX   = 0., 6.
+DIMSY   = 0., 3.
+
+
+def reconstruct(U,S,V):
+	'''
+	Reconstruction with the leading RANK modes.
+	'''
+	return pyLOM.POD.reconstruct(np.ascontiguousarray(U[:,:RANK]),np.ascontiguousarray(S[:RANK]),np.ascontiguousarray(V[:RANK,:]))
+
+
+## Build a synthetic dataset of travelling waves and store it from the first processor
+mesh   = pyLOM.Mesh.new_struct2D(NX,NY,None,None,DIMSX,DIMSY)
+ptable = pyLOM.PartitionTable.new(1,mesh.ncells,mesh.npoints,comm=MPI.COMM_SELF)
+time   = 0.05*np.arange(NT)
+x, y   = mesh.xyz[:,0][:,None], mesh.xyz[:,1][:,None]
+U      = 1. + sum([np.sin((k+1)*(x-time[None,:]) + k*y)*np.exp(-0.3*k) for k in range(RANK//2)])
+d = pyLOM.Dataset(ptable=ptable,mesh=mesh,time=time,
+	VELOX={'point':True,'ndim':1,'value':U},
+)
+if pyLOM.utils.is_rank_or_serial(0): d.save(OUTFILE,mpio=False)
+pyLOM.utils.mpi_barrier()
+
+
+## Baseline, TSQR POD of the dataset in memory
+d = pyLOM.Dataset.load(OUTFILE,mpio=False)
+X = d.X('VELOX')
+U0, S0, V0 = pyLOM.POD.run(X)
+R0 = reconstruct(U0,S0,V0)
+Xm = X - np.mean(X,axis=1)[:,np.newaxis]
+check('tsqr reconstruction',np.max(np.abs(R0-Xm))/np.max(np.abs(Xm)),1e-10)
+
+
+## Modes stored chunked by modes and compressed
+if HAS_MPIO:
+	pyLOM.POD.save(PODFILE,U0,S0,V0,d.partition_table,chunks='mode',compression='shuffle+gzip')
+	U, S, V = pyLOM.POD.load(PODFILE,nmod=U0.shape[1],ptable=d.partition_table)
+	check('save chunks=mode',max(np.max(np.abs(U-U0)),np.max(np.abs(S-S0)),np.max(np.abs(V-V0))),0)
+	pyLOM.utils.mpi_barrier()
+	if pyLOM.utils.is_rank_or_serial(0): os.remove(PODFILE)
+else:
+	pyLOM.pprint(0,'h5py without MPI support, the parallel save is not tested')
+
+
+## Method of snapshots
+U, S, V = pyLOM.POD.run(X,method='gram')
+check('gram S',np.max(np.abs(S[:RANK]-S0[:RANK]))/S0[0],1e-8)
+check('gram reconstruction',np.max(np.abs(reconstruct(U,S,V)-R0))/np.max(np.abs(Xm)),1e-8)
+
+
+## Randomized POD
+U, S, V = pyLOM.POD.run(X,method='randomized',r=RANK,q=2,seed=3)
+check('randomized S',np.max(np.abs(S-S0[:RANK]))/S0[0],1e-8)
+check('randomized reconstruction',np.max(np.abs(reconstruct(U,S,V)-R0))/np.max(np.abs(Xm)),1e-8)
+
+
+## Reduction trees of the TSQR
+for tree in pyLOM.math.TSQR_TREES:
+	U, S, V = pyLOM.POD.run(X,tree=tree)
+	check('tree=%s S' % tree,np.max(np.abs(S[:RANK]-S0[:RANK]))/S0[0],1e-8)
+	check('tree=%s reconstruction' % tree,np.max(np.abs(reconstruct(U,S,V)-R0))/np.max(np.abs(Xm)),1e-8)
+
+
+## Snapshot matrix in node shared memory
+Xs = d.X('VELOX',shared=True)
+for Xi in [X,Xs]:
+	name = 'shared %s' % ('NodeArray' if Xi is Xs else 'array')
+	U, S, V = pyLOM.POD.run(Xi,shared=True)
+	check(name + ' S',np.max(np.abs(S[:RANK]-S0[:RANK]))/S0[0],1e-8)
+	check(name + ' reconstruction',np.max(np.abs(reconstruct(U,S,V)-R0))/np.max(np.abs(Xm)),1e-8)
+Xs.free()
+
+
+## Single precision POD
+U, S, V = pyLOM.POD.run(X,dtype=np.float32)
+check('float32 dtype',int(not U.dtype == S.dtype == V.dtype == np.float32),0)
+check('float32 S',np.max(np.abs(S[:RANK]-S0[:RANK]))/S0[0],1e-5)
+check('float32 reconstruction',np.max(np.abs(reconstruct(U,S,V)-R0))/np.max(np.abs(Xm)),1e-4)
+
+
+## Mean removed in place, X is left centered and the mean returned
+Xc = X.copy()
+U, S, V, X_mean = pyLOM.POD.run(Xc,overwrite_input=True)
+check('overwrite_input S',np.max(np.abs(S-S0))/S0[0],1e-12)
+check('overwrite_input mean',np.max(np.abs(X_mean-np.mean(X,axis=1))),1e-12)
+check('overwrite_input X centered',np.max(np.abs(Xc-Xm)),1e-12)
+# Buffers that do not own their data are overwritten as well
+Xc = X.ravel().copy().reshape(X.shape)
+U, S, V, X_mean = pyLOM.POD.run(Xc,overwrite_input=True)
+check('overwrite_input reshaped X centered',np.max(np.abs(Xc-Xm)),1e-12)
+# Views of the dataset are copied instead
+Xc = X.copy()
+U, S, V, X_mean = pyLOM.POD.run(X,overwrite_input=True)
+check('overwrite_input dataset view',np.max(np.abs(X-Xc)),0)
+check('overwrite_input dataset view S',np.max(np.abs(S-S0))/S0[0],1e-12)
+
+
+## Incremental POD by batches of snapshots
+ipod = pyLOM.POD.IncrementalPOD(r=2*RANK)
+for i0 in range(0,NT,13): ipod.update(X[:,i0:i0+13])
+U, S, V = ipod.finalize(RANK)
+check('incremental S',np.max(np.abs(S-S0[:RANK]))/S0[0],1e-8)
+check('incremental mean',np.max(np.abs(ipod.mean-np.mean(X,axis=1))),1e-12)
+check('incremental reconstruction',np.max(np.abs(reconstruct(U,S,V)-R0))/np.max(np.abs(Xm)),1e-8)
+
+
+## Out-of-core POD from the file
+for method in ['incremental','gram']:
+	U, S, V, _ = pyLOM.POD.run_from_file(OUTFILE,['VELOX'],block_size=17,method=method,r=2*RANK,mpio=False)
+	check('run_from_file %s S' % method,np.max(np.abs(S[:RANK]-S0[:RANK]))/S0[0],1e-8)
+	check('run_from_file %s reconstruction' % method,np.max(np.abs(reconstruct(U,S,V)-R0))/np.max(np.abs(Xm)),1e-8)
+# The TSQR fallback of the method of snapshots
+U, S, V, _ = pyLOM.POD.run_from_file(OUTFILE,['VELOX'],block_size=17,method='gram',r=2*RANK,cond_max=1.,mpio=False)
+check('run_from_file gram tsqr S',np.max(np.abs(S[:RANK]-S0[:RANK]))/S0[0],1e-8)
+check('run_from_file gram tsqr reconstruction',np.max(np.abs(reconstruct(U,S,V)-R0))/np.max(np.abs(Xm)),1e-8)
+
+
+if pyLOM.utils.is_rank_or_serial(0): os.remove(OUTFILE)
+pyLOM.cr_info()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+#
+# PYLOM Testsuite
+# SPOD on synthetic random walks, checked against the
+# TSQR SPOD of the whole matrix in double precision.
+# The Fourier coefficients are only spilled to a file in
+# parallel when h5py has been built with MPI support.
+#
+# Last revision: 17/10/2026
+from __future__ import print_function, division
+
+import os, numpy as np, h5py
+
+import pyLOM
+from pyLOM.SPOD.scheduler import FrequencyScheduler
+from pyLOM.SPOD.store     import FourierStore
+from tsuite_common import check
+
+
+## Parameters
+M, NT    = 120, 512
+NDFT     = 64
+DT       = 0.1
+SPILL    = './SPODSPILL.h5'
+HAS_MPIO = pyLOM.utils.MPI_SIZE == 1 or h5py.get_config().mpi
+
+
+def check_modes(name,res,res0,tol=1e-10):
+	'''
+	Compare the energy spectra and the leading mode of the frequencies
+	where it is well separated, the modes are only defined up to a phase.
+	'''
+	check(name + ' L',np.max(np.abs(res.L-res0.L))/np.max(res0.L),tol)
+	check(name + ' f',np.max(np.abs(res.f-res0.f)),0)
+	err = 0.
+	for ifreq in np.where(res0.L[:,0] > 1.1*res0.L[:,1])[0]:
+		c   = pyLOM.utils.mpi_reduce(np.vdot(res0.modes(ifreq,0),res.modes(ifreq,0)),op='sum',all=True)
+		err = max(err,abs(1.-abs(c)))
+	check(name + ' leading modes',err,100*tol)
+
+
+## Random walks partitioned by rows
+rng    = np.random.default_rng(11)
+time   = DT*np.arange(NT)
+istart, iend = pyLOM.utils.worksplit(0,M,pyLOM.utils.MPI_RANK,pyLOM.utils.MPI_SIZE)
+X      = np.ascontiguousarray(rng.standard_normal((M,NT)).cumsum(axis=1)[istart:iend])
+
+
+## Baseline
+res0 = pyLOM.SPOD.run(X,time,nDFT=NDFT)
+check('result X_mean',np.max(np.abs(res0.X_mean-np.mean(X,axis=1))),1e-12)
+# Unpacks as L, P, f with P the real part of the modes, P(M*nBlks,nf), built on every access
+L, P, f = res0
+check('result L sorted',np.max(np.abs(L-res0.L)) + int(np.any(np.diff(L[:,0]) > 0)),0)
+check('result P layout',np.max(np.abs(P[:X.shape[0],0]-np.real(res0.modes(0,0)))),0)
+check('result P rebuilt',int(res0.P is P),0)
+
+
+## Groups of processors and SVD methods of the frequencies
+for ngroups in range(1,pyLOM.utils.MPI_SIZE+1):
+	for method in ['tsqr','eigen']:
+		res = pyLOM.SPOD.run(X,time,nDFT=NDFT,ngroups=ngroups,method=method)
+		check_modes('run ngroups=%d method=%s' % (ngroups,method),res,res0)
+
+
+## Scheduler round trip of the Fourier coefficients
+nf, nBlks = 9, 5
+Q = rng.standard_normal((X.shape[0],nf,nBlks)) + 1j*rng.standard_normal((X.shape[0],nf,nBlks))
+for ngroups in range(1,pyLOM.utils.MPI_SIZE+1):
+	sched  = FrequencyScheduler(X.shape[0],nf,ngroups)
+	f0, f1 = sched.frequencies
+	Qg     = sched.scatter(Q)
+	check('scheduler ngroups=%d scatter' % ngroups,abs(Qg.shape[1]-(f1-f0)),0)
+	check('scheduler ngroups=%d gather' % ngroups,np.max(np.abs(sched.gather(Qg)-Q)),0)
+	sched.free()
+
+
+## Fourier coefficients spilled to a file, where the modes overwrite them
+if HAS_MPIO:
+	store = FourierStore(SPILL,X.shape[0],nf,nBlks,nbuff=2)
+	for iblk in range(nBlks): store.write(iblk,Q[:,:,iblk])
+	check('store read',max([np.max(np.abs(store.read(ifreq)-Q[:,ifreq,:])) for ifreq in range(nf)]),0)
+	store.close()
+	check('store removed',int(os.path.exists(SPILL)),0)
+	for ngroups in range(1,pyLOM.utils.MPI_SIZE+1):
+		for method in ['tsqr','eigen']:
+			res = pyLOM.SPOD.run(X,time,nDFT=NDFT,ngroups=ngroups,method=method,spill_file=SPILL)
+			check_modes('run spilled ngroups=%d method=%s' % (ngroups,method),res,res0)
+			check('run spilled file backed',int(not 'storage = %s' % SPILL in str(res)),0)
+			res.close()
+			pyLOM.utils.mpi_barrier()
+			if pyLOM.utils.is_rank_or_serial(0): os.remove(SPILL)
+else:
+	pyLOM.pprint(0,'h5py without MPI support, the spilled store is not tested')
+
+
+## Streaming SPOD by batches of snapshots, exact when all the
+## blocks are kept and the mean is known beforehand
+stream = pyLOM.SPOD.StreamingSPOD(DT,NDFT,r=res0.L.shape[1],X_mean=res0.X_mean)
+for i0 in range(0,NT,37): stream.update(X[:,i0:i0+37])
+L, P, f = stream.finalize()
+order   = np.argsort(f)
+check('streaming blocks',abs(stream.nblocks-res0.L.shape[1]),0)
+check('streaming f',np.max(np.abs(f[order]-np.sort(res0.f))),1e-12)
+check('streaming L',np.max(np.abs(L[order,:]-res0.L[np.argsort(res0.f),:]))/np.max(res0.L),1e-10)
+stream = pyLOM.SPOD.StreamingSPOD(DT,NDFT,r=4)
+for i0 in range(0,NT,37): stream.update(X[:,i0:i0+37])
+check('streaming running mean',np.max(np.abs(stream.mean-res0.X_mean)),1e-12)
+
+
+## Single precision snapshots
+res = pyLOM.SPOD.run(X,time,nDFT=NDFT,dtype=np.float32)
+check_modes('float32',res,res0,1e-5)
+
+
+## Mean removed in place, X is left centered and the mean kept in the result
+Xc  = X.copy()
+res = pyLOM.SPOD.run(Xc,time,nDFT=NDFT,overwrite_input=True)
+check_modes('overwrite_input',res,res0)
+check('overwrite_input mean',np.max(np.abs(res.X_mean-res0.X_mean)),0)
+check('overwrite_input X centered',np.max(np.abs(Xc-X+res0.X_mean[:,np.newaxis])),1e-12)
+
+
+pyLOM.cr_info()
@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+#
+# PYLOM Testsuite
+# Helpers shared by the synthetic testsuite cases
+#
+# Last revision: 17/10/2026
+from __future__ import print_function, division
+
+import pyLOM
+
+
+def check(name,err,tol):
+	'''
+	Print the maximum error of a case over the processors
+	and abort when it is above the tolerance.
+	'''
+	err = pyLOM.utils.mpi_reduce(float(err),op='max',all=True)
+	pyLOM.pprint(0,'%-32s error = %e' % (name,err))
+	if not err <= tol: pyLOM.utils.raiseError('%s failed with error %e!' % (name,err))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+#
+# PYLOM Testsuite
+# Probes of a lazy dataset, checked against the
+# dataset in memory and the bytes read from the file
+#
+# Last revision: 17/10/2026
+from __future__ import print_function, division
+
+import sys, numpy as np
+from mpi4py import MPI
+
+import pyLOM
+
+
+## Parameters
+OUTFILE = './PROBES.h5'
+NX, NY  = 41, 21
+NT      = 60
+DIMSX   = 0., 4.
+DIMSY   = 0., 2.
+PROBES  = np.array([[0.52,0.31,0.],[3.9,1.95,0.],[2.01,0.99,0.],[0.52,0.32,0.],[1.,1.,0.]],np.double)
+
+
+## Build a synthetic dataset and store it from the first processor
+mesh   = pyLOM.Mesh.new_struct2D(NX,NY,None,None,DIMSX,DIMSY)
+ptable = pyLOM.PartitionTable.new(1,mesh.ncells,mesh.npoints,comm=MPI.COMM_SELF)
+time   = 0.1*np.arange(NT)
+xyz    = mesh.xyz
+VELOC  = np.zeros((2*mesh.npoints,NT),np.double)
+VELOC[0::2,:] = np.sin(xyz[:,0][:,None] - time[None,:])
+VELOC[1::2,:] = np.cos(xyz[:,1][:,None] + 2*time[None,:])
+PRESS  = xyz[:,0][:,None]*xyz[:,1][:,None]*np.cos(time[None,:])
+d = pyLOM.Dataset(ptable=ptable,mesh=mesh,time=time,
+	VELOC={'point':True,'ndim':2,'value':VELOC},
+	PRESS={'point':True,'ndim':1,'value':PRESS},
+)
+if pyLOM.utils.is_rank_or_serial(0): d.save(OUTFILE,mpio=False)
+pyLOM.utils.mpi_barrier()
+
+
+## Count the bytes read by the lazy variables
+io_h5lazy = sys.modules['pyLOM.inp_out.io_h5lazy']
+h5_read_columns = io_h5lazy.h5_read_columns
+nbytes = [0]
+def h5_read_columns_count(dset,rows,cols):
+	out = h5_read_columns(dset,rows,cols)
+	nbytes[0] += out.nbytes
+	return out
+io_h5lazy.h5_read_columns = h5_read_columns_count
+
+
+## Probes of the lazy dataset and of the dataset in memory
+de = pyLOM.Dataset.load(OUTFILE,mpio=False)
+with pyLOM.Dataset.load(OUTFILE,mpio=False,lazy=True) as dl:
+	for time_slice in [np.s_[:],np.s_[5:40:3],[1,7,2,50]]:
+		ninst  = len(time[time_slice])
+		nbytes[0] = 0
+		pe = de.probes(PROBES,time_slice=time_slice)
+		pl = dl.probes(PROBES,time_slice=time_slice)
+		# Only the rows of the probes are read, at most 3 doubles per probe and instant
+		nread = pyLOM.utils.mpi_reduce(nbytes[0],op='sum',all=True)
+		for var in ['VELOC','PRESS']:
+			pyLOM.pprint(0,var,time_slice,'max error = %e'%np.max(np.abs(pe[var]-pl[var])))
+			if not np.array_equal(pe[var],pl[var]): pyLOM.utils.raiseError('Lazy probes differ for %s!'%var)
+		pyLOM.pprint(0,'bytes read = %d'%nread)
+		if nread > 3*PROBES.shape[0]*ninst*8 or nread == 0: pyLOM.utils.raiseError('Lazy probes read %d bytes!'%nread)
+		# Row subsets are not cached
+		if len(dl['VELOC'].cache) > 0: pyLOM.utils.raiseError('Lazy probes were cached!')
+
+pyLOM.cr_info()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+#
+# PYLOM Testsuite
+# Synthetic datasets checked against the
+# analytical fields they are built from
+#
+# Last revision: 17/10/2026
+from __future__ import print_function, division
+
+import os, numpy as np, h5py
+from mpi4py import MPI
+
+import pyLOM
+from pyLOM.dataset      import shares_dataset_memory
+from pyLOM.inp_out.io_h5 import h5_chunks
+from tsuite_common import check
+
+
+## Parameters
+OUTFILE = './DSETSYNTH.h5'
+CHKFILE = './DSETSYNTH_CHUNKS.h5'
+APPFILE = './DSETSYNTH_APPEND.h5'
+NX, NY  = 41, 21
+NT      = 57
+BATCHES = [0,10,13,40,NT]
+DIMSX   = 0., 4.
+DIMSY   = 0., 2.
+
+
+def fields(xyz,time):
+	'''
+	Analytical fields on the points xyz.
+	'''
+	x, y  = xyz[:,0][:,None], xyz[:,1][:,None]
+	VELOC = np.zeros((2*xyz.shape[0],time.shape[0]),np.double)
+	VELOC[0::2,:] = np.sin(x - time[None,:])
+	VELOC[1::2,:] = np.cos(y + 2*time[None,:])
+	PRESS = x*y*np.cos(time[None,:])
+	return {'VELOC':{'point':True,'ndim':2,'value':VELOC},'PRESS':{'point':True,'ndim':1,'value':PRESS}}
+
+def check_fields(name,d,time_slice=np.s_[:],tol=1e-14):
+	'''
+	Compare the variables of a dataset with the analytical fields.
+	'''
+	ref = fields(d.mesh.xyz,time[time_slice])
+	check(name,max([np.max(np.abs(np.asarray(d[var])[:,time_slice]-ref[var]['value']),initial=0.) for var in ref]),tol)
+
+
+## Build a synthetic dataset and store it from the first processor,
+## at once and by batches of instants with an appender
+mesh   = pyLOM.Mesh.new_struct2D(NX,NY,None,None,DIMSX,DIMSY)
+ptable = pyLOM.PartitionTable.new(1,mesh.ncells,mesh.npoints,comm=MPI.COMM_SELF)
+time   = 0.1*np.arange(NT)
+if pyLOM.utils.is_rank_or_serial(0):
+	pyLOM.Dataset(ptable=ptable,mesh=mesh,time=time,**fields(mesh.xyz,time)).save(OUTFILE,mpio=False)
+	if os.path.exists(APPFILE): os.remove(APPFILE)
+	with pyLOM.io.H5Appender(APPFILE,mesh,ptable,mpio=False,compression='shuffle+gzip') as appender:
+		for i0, i1 in zip(BATCHES[:-1],BATCHES[1:]):
+			appender.append(time[i0:i1],fields(mesh.xyz,time[i0:i1]))
+pyLOM.utils.mpi_barrier()
+
+
+## Datasets in memory
+d = pyLOM.Dataset.load(OUTFILE,mpio=False)
+a = pyLOM.Dataset.load(APPFILE,mpio=False)
+check_fields('load',d)
+check_fields('load appended',a)
+check('appended time',np.max(np.abs(a.time-time)),0)
+
+
+## Snapshot matrix as a view, in a given buffer and by blocks
+ref = np.zeros((3*d.mesh.npoints,NT),np.double)
+ref[0::3,:], ref[1::3,:], ref[2::3,:] = np.asarray(d['VELOC'])[0::2,:], np.asarray(d['VELOC'])[1::2,:], np.asarray(d['PRESS'])
+X   = d.X('PRESS',time_slice=np.s_[2:50:3])
+check('X single variable view',int(not (np.shares_memory(X,d['PRESS']) and shares_dataset_memory(X))),0)
+out = np.empty(ref.shape,np.double)
+X   = d.X('VELOC','PRESS',out=out)
+check('X out',int(not X is out) + np.max(np.abs(X-ref),initial=0.),0)
+for axis in [0,1]:
+	for time_slice in [np.s_[:],np.s_[::-4],[3,1,40]]:
+		Xb = np.concatenate(list(d.X_blocks('VELOC','PRESS',time_slice=time_slice,block_size=7,axis=axis)),axis=axis)
+		check('X_blocks axis=%d %s' % (axis,str(time_slice)),np.max(np.abs(Xb-ref[:,time_slice]),initial=0.),0)
+
+
+## Chunk layouts and compression filters
+for chunks, compression, tol in [('snapshot',None,1e-14),('point','shuffle+gzip',1e-14),((7,3),'lzf',1e-14),('snapshot','truncate:20+shuffle+gzip:6',1e-5)]:
+	name = 'chunks=%s compression=%s' % (str(chunks),str(compression))
+	if pyLOM.utils.is_rank_or_serial(0):
+		pyLOM.Dataset(ptable=ptable,mesh=mesh,time=time,**fields(mesh.xyz,time)).save(CHKFILE,mpio=False,chunks=chunks,compression=compression)
+	pyLOM.utils.mpi_barrier()
+	with h5py.File(CHKFILE,'r') as f:
+		dset  = f['VARIABLES']['PRESS']['value']
+		shape = h5_chunks(dset.shape,dset.dtype,chunks)
+		check('%s layout' % name,int(not dset.chunks == tuple(min(c,n) for c,n in zip(shape,dset.shape))),0)
+	c = pyLOM.Dataset.load(CHKFILE,mpio=False)
+	check_fields(name,c,tol=tol)
+	c.close()
+	pyLOM.utils.mpi_barrier()
+	if pyLOM.utils.is_rank_or_serial(0): os.remove(CHKFILE)
+
+
+## Lazy datasets against the datasets in memory
+for fname in [OUTFILE,APPFILE]:
+	with pyLOM.Dataset.load(fname,mpio=False,lazy=True,cache_size=8*NT*NX*NY) as l:
+		for time_slice in [np.s_[:],np.s_[3:40:2],np.s_[::-5],[1,7,2,50]]:
+			check('lazy %s %s' % (os.path.basename(fname),str(time_slice)),np.max(np.abs(l.X('VELOC','PRESS',time_slice=time_slice)-d.X('VELOC','PRESS',time_slice=time_slice)),initial=0.),0)
+		check('lazy %s cache bounded' % os.path.basename(fname),int(l['VELOC'].cache.nbytes > l['VELOC'].cache.max_bytes),0)
+
+
+## Snapshot matrix in node shared memory
+X = d.X('VELOC','PRESS',shared=True)
+check('shared X',np.max(np.abs(np.asarray(X)-d.X('VELOC','PRESS')),initial=0.),0)
+X.free()
+
+
+## Redistribution in memory, to uneven partitions and back
+ncells = pyLOM.utils.mpi_reduce(d.mesh.ncells,op='sum',all=True)
+w      = np.arange(1,pyLOM.utils.MPI_SIZE+1)
+cells  = (ncells*w)//np.sum(w)
+cells[-1] += ncells - np.sum(cells)
+uneven = pyLOM.PartitionTable(pyLOM.utils.MPI_SIZE,np.arange(1,pyLOM.utils.MPI_SIZE+1,dtype=np.int32),cells.astype(np.int32),np.ones((pyLOM.utils.MPI_SIZE,),np.int32))
+d.redistribute(uneven)
+check('redistribute uneven cells',abs(d.mesh.ncells-cells[pyLOM.utils.MPI_RANK]),0)
+check_fields('redistribute uneven',d)
+d.redistribute(pyLOM.PartitionTable.new(pyLOM.utils.MPI_SIZE,ncells,1))
+check_fields('redistribute even',d)
+
+
+d.close(); a.close()
+pyLOM.utils.mpi_barrier()
+if pyLOM.utils.is_rank_or_serial(0): os.remove(OUTFILE); os.remove(APPFILE)
+pyLOM.cr_info()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+#
+# PYLOM Testsuite
+# Distributed SVD engines on a synthetic low rank
+# matrix, checked against the TSQR SVD
+#
+# With the short argument one processor holds fewer rows
+# than columns and the run must abort instead of hanging.
+#
+# Last revision: 17/10/2026
+from __future__ import print_function, division
+
+import sys, numpy as np
+
+import pyLOM
+from tsuite_common import check
+
+
+## Parameters
+M, N  = 2000, 40
+RANK  = 12
+SEED  = 17
+
+
+## Low rank synthetic matrix partitioned by rows
+rng    = np.random.default_rng(SEED)
+A      = rng.standard_normal((M,RANK)) @ np.diag(np.logspace(0,-4,RANK)) @ rng.standard_normal((RANK,N)) + 1e-8*rng.standard_normal((M,N))
+istart, iend = pyLOM.utils.worksplit(0,M,pyLOM.utils.MPI_RANK,pyLOM.utils.MPI_SIZE)
+if len(sys.argv) > 1 and sys.argv[1] == 'short':
+	istart, iend = (istart, iend) if pyLOM.utils.MPI_RANK > 0 else (0, N//2)
+	pyLOM.math.tsqr(np.ascontiguousarray(A[istart:iend]))
+	pyLOM.utils.raiseError('TSQR did not detect the short block!')
+Ai     = np.ascontiguousarray(A[istart:iend])
+U0, S0, V0 = pyLOM.math.tsqr_svd(Ai)
+
+
+## Reduction trees against the binary tree
+for dtype, tol in [(np.double,1e-10),(np.float32,1e-3),(np.complex128,1e-10)]:
+	Ad = (Ai + 1j*Ai[:,::-1] if np.dtype(dtype).kind == 'c' else Ai).astype(dtype)
+	Q0, R0 = pyLOM.math.tsqr(Ad)
+	for tree in pyLOM.math.TSQR_TREES:
+		Q, R = pyLOM.math.tsqr(Ad,tree=tree)
+		G    = pyLOM.utils.mpi_reduce(np.conj(Q.T) @ Q,op='sum',all=True)
+		check('tsqr %s %s Q^H Q' % (tree,np.dtype(dtype).name),np.max(np.abs(G-np.eye(N))),100*tol)
+		check('tsqr %s %s QR' % (tree,np.dtype(dtype).name),np.max(np.abs(Q @ R - Ad))/np.max(np.abs(A)),tol)
+		check('tsqr %s %s |R|' % (tree,np.dtype(dtype).name),np.max(np.abs(np.abs(R)-np.abs(R0)))/np.max(np.abs(R0)),tol)
+for tree in pyLOM.math.TSQR_TREES:
+	U, S, V = pyLOM.math.tsqr_svd(Ai,tree=tree)
+	check('tsqr_svd %s S' % tree,np.max(np.abs(S-S0))/S0[0],1e-12)
+
+
+## Single precision TSQR SVD
+U, S, V = pyLOM.math.tsqr_svd(Ai.astype(np.float32))
+check('float32 dtype',int(not U.dtype == S.dtype == V.dtype == np.float32),0)
+check('float32 S',np.max(np.abs(S[:RANK]-S0[:RANK]))/S0[0],1e-5)
+
+
+## Method of snapshots
+U, S, V = pyLOM.math.tsqr_svd(Ai,method='gram')
+check('gram S',np.max(np.abs(S[:RANK]-S0[:RANK]))/S0[0],1e-10)
+check('gram USV',np.max(np.abs(U @ np.diag(S) @ V - Ai))/S0[0],1e-8)
+
+
+## Randomized SVD
+U, S, V = pyLOM.math.randomized_svd(Ai,RANK,10,2,SEED)
+check('randomized S',np.max(np.abs(S-S0[:RANK]))/S0[0],1e-8)
+G = pyLOM.utils.mpi_reduce(U.T @ U,op='sum',all=True)
+check('randomized U^T U',np.max(np.abs(G-np.eye(RANK))),1e-10)
+
+
+pyLOM.cr_info()
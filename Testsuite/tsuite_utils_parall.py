@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+#
+# PYLOM Testsuite
+# Parallel helpers on the processors and on
+# sub-communicators, checked against their serial result
+#
+# Last revision: 17/10/2026
+from __future__ import print_function, division
+
+import numpy as np
+from mpi4py import MPI
+
+import pyLOM
+from tsuite_common import check
+
+
+## Parameters
+RANK, SIZE = pyLOM.utils.MPI_RANK, pyLOM.utils.MPI_SIZE
+NSUM       = SIZE*(SIZE+1)//2
+NROWS      = 23
+
+
+## Reductions on buffers, the type of the input is kept
+out = pyLOM.utils.mpi_reduce(np.full((3,2),RANK+1.),op='sum',all=True)
+check('reduce array',np.max(np.abs(out-NSUM)),0)
+out = pyLOM.utils.mpi_reduce(RANK+1,op='max',all=True)
+check('reduce python int',abs(out-SIZE) + int(not isinstance(out,int)),0)
+out = pyLOM.utils.mpi_reduce(np.float32(RANK+1),op='sum',all=True)
+check('reduce numpy scalar',abs(out-NSUM) + int(not isinstance(out,np.float32)),0)
+# Different types among the processors are only reduced with check
+out = pyLOM.utils.mpi_reduce(np.float32(RANK+1) if RANK == 0 else np.double(RANK+1),op='sum',all=True,check=True)
+check('reduce checked types',abs(out-NSUM),0)
+
+
+## Arrays split among the processors of sub-communicators, every row is received once
+comm   = MPI.COMM_WORLD.Split(RANK % 2,RANK)
+A      = np.arange(3*NROWS,dtype=np.double).reshape((NROWS,3))
+for name, B in [('buffers',A),('pickle',A.astype(object))]:
+	Bi = pyLOM.utils.mpi_scatter(B if comm.Get_rank() == 0 else None,do_split=True,comm=comm)
+	Ag = np.concatenate(comm.allgather(np.asarray(Bi,np.double)),axis=0)
+	check('scatter subcomm %s' % name,np.max(np.abs(Ag-A)) if Ag.shape == A.shape else 1.,0)
+comm.Free()
+
+
+pyLOM.cr_info()
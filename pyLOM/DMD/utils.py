@@ -30,18 +30,21 @@ def extract_modes(Phi,ivar,npoints,real=True,modes=[],reshape=True):
 
 
 @cr('DMD.save')
-def save(fname,muReal,muImag,Phi,bJov,ptable,nvars=1,pointData=True,mode='w'):
+def save(fname,muReal,muImag,Phi,bJov,ptable,nvars=1,pointData=True,mode='w',chunks=None,compression=None):
 	'''
 	Store DMD variables in serial or parallel
 	according to the partition used to compute the DMD.
+	The chunk layout of Phi (e.g., 'mode') and its compression
+	filters are described in h5_chunks and h5_filters.
 	'''
-	io.h5_save_DMD(fname,muReal,muImag,Phi,bJov,ptable,nvars=nvars,pointData=pointData,mode=mode)
+	io.h5_save_DMD(fname,muReal,muImag,Phi,bJov,ptable,nvars=nvars,pointData=pointData,mode=mode,chunks=chunks,compression=compression)
 
 
 @cr('DMD.load')
-def load(fname,vars=['Phi','mu','bJov','delta','omega'],nmod=-1,ptable=None):
+def load(fname,vars=['Phi','mu','bJov','delta','omega'],nmod=-1,ptable=None,comm=None):
 	'''
 	Load DMD variables in serial or parallel
-	according to the partition used to compute the DMD.
+	according to the partition used to compute the DMD,
+	or among the processors of comm when it is not given.
 	'''
-	return io.h5_load_DMD(fname,vars,nmod,ptable)
+	return io.h5_load_DMD(fname,vars,nmod,ptable,comm)
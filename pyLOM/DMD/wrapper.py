@@ -8,10 +8,11 @@
 from __future__ import print_function
 
 import numpy as np
-from ..vmmath       import vector_norm, vecmat, matmul, temporal_mean, subtract_mean, tsqr_svd, transpose, eigen, cholesky, diag, polar, vandermonde, conj, inv, flip, matmulp, vandermondeTime
+from ..vmmath       import vector_norm, vecmat, matmul, temporal_mean, subtract_mean, tsqr, svd, transpose, eigen, cholesky, diag, polar, vandermonde, conj, inv, flip, matmulp, vandermondeTime
 from ..POD          import truncate
 from ..utils.cr     import cr, cr_start, cr_stop
-from ..utils.errors import raiseError
+from ..utils.errors import raiseError, raiseWarning
+from ..dataset      import shares_dataset_memory
 from ..utils.parall import mpi_gather, mpi_reduce, pprint
 
 
@@ -44,35 +45,28 @@ def _order_modes(muReal, muImag, Phi, bJov):
 	return muReal, muImag, Phi, bJov
 
 
-@cr('DMD.run')
-def run(X, r, remove_mean = True):
+def _run_variant(Q, R, r, variant):
 	'''
-	DMD analysis of snapshot matrix X
-	Inputs:
-		- X[ndims*nmesh,n_temp_snapshots]: data matrix
-		- remove_mean:                     whether or not to remove the mean flow
-
-	Returns:
-		- Phi:      DMD Modes
-		- muReal:   Real part of the eigenvalues
-		- muImag:   Imaginary part of the eigenvalues
-		- b:        Amplitude of the DMD modes
-		- X_DMD:    Reconstructed flow
+	Run a DMD variant on the factorization of the snapshots, Y = Q x R
 	'''
-	#Remove temporal mean or not, depending on the user choice
-	if remove_mean:
-		cr_start('DMD.temporal_mean',0)
-		#Compute temporal mean
-		X_mean = temporal_mean(X)
-		#Subtract temporal mean
-		Y = subtract_mean(X, X_mean)
-		cr_stop('DMD.temporal_mean',0)
-	else:
-		Y = X.copy()
-
-	#Compute SVD
+	R1   = R[:,:-1].astype(np.double)
+	R2   = R[:,1:].astype(np.double)
+
+	#Total least squares: project R1 and R2 onto the leading right
+	#singular vectors of [R1; R2]
+	if variant == 'tls':
+		cr_start('DMD.tls',0)
+		Uz, Sz, VTz = svd(np.concatenate((R1,R2),axis=0))
+		Uz, Sz, VTz = truncate(Uz, Sz, VTz, r)
+		Pz = matmul(transpose(VTz), VTz)
+		R1 = matmul(R1, Pz)
+		R2 = matmul(R2, Pz)
+		r  = Sz.shape[0]
+		cr_stop('DMD.tls',0)
+
+	#Compute SVD of the reduced first snapshots, Y1 = (Q x U) x S x VT
 	cr_start('DMD.SVD',0)
-	U, S, VT = tsqr_svd(Y[:, :-1])
+	U, S, VT = svd(R1)
 	cr_stop('DMD.SVD',0)
 	# Truncate according to residual
 	cr_start('DMD.truncate', 0)
@@ -81,26 +75,44 @@ def run(X, r, remove_mean = True):
 
 	#Project A (Jacobian of the snapshots) into POD basis
 	cr_start('DMD.linear_mapping',0)
-	aux1   = matmulp(transpose(U), Y[:, 1:])
+	aux1   = matmul(transpose(U), R2)
 	aux2   = transpose(vecmat(1./S, VT))
-	Atilde = matmul(aux1, aux2)
+	Atilde = matmul(aux1, aux2) # the reduced operator is always double
 	cr_stop('DMD.linear_mapping',0)
 
+	#Forward-backward: A = (Af x Ab^-1)^(1/2) where the backward operator
+	#maps the projected Y2 onto the projected Y1 = S x VT
+	if variant == 'fb':
+		cr_start('DMD.forward_backward',0)
+		Ab     = transpose(np.linalg.lstsq(transpose(aux1), transpose(vecmat(S, VT)), rcond=None)[0])
+		Atilde = transpose(np.linalg.solve(transpose(Ab), transpose(Atilde)))
+		cr_stop('DMD.forward_backward',0)
+
 	#Eigendecomposition of Atilde: Eigenvectors given as complex matrix
 	cr_start('DMD.modes',0)
 	muReal, muImag, w = eigen(Atilde)
-
-	#Mode computation
-	Phi =  matmul(matmul(matmul(Y[:, 1:], transpose(VT)), diag(1/S)), w)/(muReal + muImag*1J)
+	if variant == 'fb':
+		# Principal square root of the eigenvalues, the eigenvectors are shared
+		mu     = np.sqrt(muReal + muImag*1J)
+		muReal = np.ascontiguousarray(mu.real)
+		muImag = np.ascontiguousarray(mu.imag)
+
+	#Mode computation, Phi = Q x Wq where Wq is either the exact
+	#R2 x (V x S^-1 x W) x diag(mu)^-1 or the projected U x W. The complex
+	#reduced matrix is seen as a real one with interleaved real and imaginary
+	#parts so that Q is never promoted to complex
+	Wq  = matmul(R2, matmul(aux2, w)/(muReal + muImag*1J)) if variant in ('exact','tls') else matmul(U, w)
+	Wq  = np.ascontiguousarray(Wq, dtype=np.complex64 if Q.dtype == np.float32 else np.complex128)
+	Phi = matmul(Q, Wq.view(Q.dtype)).view(Wq.dtype)
 	cr_stop('DMD.modes',0)
 
 	#Amplitudes according to: Jovanovic et. al. 2014 DOI: 10.1063
 	cr_start('DMD.amplitudes',0)
-	Vand = vandermonde(muReal, muImag, muReal.shape[0], Y.shape[1]-1)
+	Vand = vandermonde(muReal, muImag, muReal.shape[0], R.shape[1]-1)
 	P    = matmul(transpose(conj(w)), w)*conj(matmul(Vand, transpose(conj(Vand))))
 	Pl   = cholesky(P)
 	G    = matmul(diag(S), VT)
-	q    = conj(diag(matmul(matmul(Vand, transpose(conj(G))), w)))
+	q    = conj(np.sum(matmul(Vand, transpose(conj(G)))*transpose(w), axis=1))
 	bJov = matmul(inv(transpose(conj(Pl))), matmul(inv(Pl), q)) #Amplitudes according to Jovanovic 2014
 	cr_stop('DMD.amplitudes',0)
 
@@ -111,6 +123,69 @@ def run(X, r, remove_mean = True):
 
 	return muReal, muImag, Phi, bJov
 
+@cr('DMD.run')
+def run(X, r, remove_mean = True, overwrite_input = False, dtype = np.double, variant = 'exact', comm = None):
+	'''
+	DMD analysis of snapshot matrix X
+	Inputs:
+		- X[ndims*nmesh,n_temp_snapshots]: data matrix
+		- remove_mean:                     whether or not to remove the mean flow
+		- overwrite_input:                 use X as work buffer to remove the mean, X is left centered on exit and the
+		                                   mean is returned last, views of Dataset variables are copied instead
+		- dtype:                           working precision of the snapshots, np.double (default) or np.float32
+		- variant:                         DMD algorithm, exact (default), projected, tls (total least squares) or fb (forward-backward),
+		                                   or a list of them to run on a single QR factorization of the snapshots
+		- comm:                            communicator of the processors that hold X (default MPI.COMM_WORLD)
+
+	Returns:
+		- Phi:      DMD Modes, in single precision (complex64) when dtype is np.float32
+		- muReal:   Real part of the eigenvalues
+		- muImag:   Imaginary part of the eigenvalues
+		- b:        Amplitude of the DMD modes
+		- X_DMD:    Reconstructed flow
+		- X_mean:   temporal mean removed from X, only with overwrite_input
+
+	A list of variants returns a list with the outputs of each variant.
+	'''
+	if not np.dtype(dtype) in (np.float32,np.double): raiseError('Data type <%s> not supported!'%np.dtype(dtype).name)
+	variants = [variant] if isinstance(variant,str) else list(variant)
+	for ivar in variants:
+		if not ivar in ('exact','projected','tls','fb'): raiseError('Variant <%s> not implemented!'%ivar)
+	# X is only copied if it does not have the working precision
+	X = np.ascontiguousarray(X,dtype=dtype)
+	inplace = overwrite_input
+	# Views of the variables of a Dataset are copied instead of overwritten
+	if overwrite_input and shares_dataset_memory(X):
+		raiseWarning('DMD.run - X is a view of a Dataset variable, it is copied instead of overwritten!')
+		inplace = False
+	#Remove temporal mean or not, depending on the user choice
+	X_mean  = np.zeros((X.shape[0],),dtype=X.dtype)
+	if remove_mean:
+		cr_start('DMD.temporal_mean',0)
+		#Compute temporal mean
+		X_mean = temporal_mean(X)
+		#Subtract temporal mean
+		if inplace:
+			X -= X_mean[:,np.newaxis]
+		else:
+			Y = subtract_mean(X, X_mean)
+		cr_stop('DMD.temporal_mean',0)
+	elif not inplace:
+		Y = X.copy()
+	if inplace: Y = X
+
+	#Factorize all the snapshots once, Y = Q x R, so that Y1 = Q x R[:,:-1]
+	#and Y2 = Q x R[:,1:] and the snapshots never need to be split
+	cr_start('DMD.QR',0)
+	Q, R = tsqr(Y, comm=comm)
+	cr_stop('DMD.QR',0)
+
+	#Run every variant on the same factorization, X is left
+	#centered and its mean returned when it is overwritten
+	out = [_run_variant(Q, R, r, ivar) for ivar in variants]
+	if overwrite_input: out = [o + (X_mean,) for o in out]
+	return out[0] if isinstance(variant,str) else out
+
 @cr('DMD.frequency_damping')
 def frequency_damping(real, imag, dt):
 	'''
@@ -15,22 +15,25 @@ from mpi4py  import MPI
 
 from libc.stdlib   cimport malloc, free
 from libc.string   cimport memcpy, memset
-from libc.math     cimport sqrt, log, atan2
+from libc.math     cimport sqrt, log, atan2, cos, sin
 from libc.complex  cimport creal, cimag
 from mpi4py.libmpi cimport MPI_Comm
 from mpi4py        cimport MPI
 
 from ..utils.cr     import cr, cr_start, cr_stop
-from ..utils.errors import raiseError
+from ..utils.errors import raiseError, raiseWarning
+from ..dataset      import shares_dataset_memory
 
 cdef extern from "vector_matrix.h":
 	cdef void   c_transpose           "transpose"(double *A, double *B, const int m, const int n)
 	cdef double c_vector_norm         "vector_norm"(double *v, int start, int n)
+	cdef void   c_matmult             "matmult"(double *C, double *A, double *B, const int m, const int n, const int k, const char *TA, const char *TB)
 	cdef void   c_matmul              "matmul"(double *C, double *A, double *B, const int m, const int n, const int k)
-	cdef void   c_matmulp             "matmulp"(double *C, double *A, double *B, const int m, const int n, const int k)
+	cdef void   c_matmulp             "matmulp"(double *C, double *A, double *B, const int m, const int n, const int k, MPI_Comm comm)
 	cdef void   c_vecmat              "vecmat"(double *v, double *A, const int m, const int n)
 	# Double complex precision
 	cdef void   c_zmatmult            "zmatmult"(np.complex128_t *C, np.complex128_t *A, np.complex128_t *B, const int m, const int n, const int k, const char *TA, const char *TB)
+	cdef void   c_dzmatmul            "dzmatmul"(np.complex128_t *C, double *A, np.complex128_t *B, const int m, const int n, const int k)
 	cdef void   c_zvecmat             "zvecmat"(np.complex128_t *v, np.complex128_t *A, const int m, const int n)
 	cdef int    c_zinverse            "zinverse"(np.complex128_t *A, int N, char *UoL)
 	cdef int    c_cholesky            "cholesky"(np.complex128_t *A, int N)
@@ -38,100 +41,96 @@ cdef extern from "vector_matrix.h":
 	cdef void   c_vandermonde         "vandermonde"(np.complex128_t *Vand, double *real, double *imag, int m, int n)
 	cdef void   c_vandermonde_time    "vandermondeTime"(np.complex128_t *Vand, double *real, double *imag, int m, int n, double* t)
 	cdef void   c_zsort               "zsort"(np.complex128_t *v, int *index, int n)
+	# Single complex precision
+	cdef void   c_scmatmul            "scmatmul"(np.complex64_t *C, float *A, np.complex64_t *B, const int m, const int n, const int k)
 cdef extern from "averaging.h":
-	cdef void c_temporal_mean "temporal_mean"(double *out, double *X, const int m, const int n)
-	cdef void c_subtract_mean "subtract_mean"(double *out, double *X, double *X_mean, const int m, const int n)
+	cdef void c_temporal_mean  "temporal_mean"(double *out, double *X, const int m, const int n)
+	cdef void c_subtract_mean  "subtract_mean"(double *out, double *X, double *X_mean, const int m, const int n)
+	cdef void c_stemporal_mean "stemporal_mean"(float *out, float *X, const int m, const int n)
+	cdef void c_ssubtract_mean "ssubtract_mean"(float *out, float *X, float *X_mean, const int m, const int n)
 cdef extern from "svd.h":
-	cdef int c_tsqr_svd "tsqr_svd"(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, MPI_Comm comm)
-	cdef int c_svd      "svd"(double *U, double *S, double *VT, double *Y, const int m, const int n)
+	cdef int c_tsqr      "tsqr"(double *Qi, double *R, double *Ai, const int m, const int n, MPI_Comm comm)
+	cdef int c_stsqr     "stsqr"(float *Qi, float *R, float *Ai, const int m, const int n, MPI_Comm comm)
+	cdef int c_tsqr_svd  "tsqr_svd"(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, MPI_Comm comm)
+	cdef int c_svd       "svd"(double *U, double *S, double *VT, double *Y, const int m, const int n)
 cdef extern from "truncation.h":
-	cdef int  c_compute_truncation_residual "compute_truncation_residual"(double *S, double res, const int n)
-	cdef void c_compute_truncation          "compute_truncation"(double *Ur, double *Sr, double *VTr, double *U, double *S, double *VT, const int m, const int n, const int N)
+	cdef int  c_compute_truncation_residual  "compute_truncation_residual"(double *S, double res, const int n)
+	cdef void c_compute_truncation           "compute_truncation"(double *Ur, double *Sr, double *VTr, double *U, double *S, double *VT, const int m, const int n, const int N)
+
+
+## Fused type between single and double precision
+ctypedef fused float_double:
+	float
+	double
 
 ## DMD run method
-@cr('DMD.run')
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def run(double[:,:] X, double r, int remove_mean=True):
+cdef object _run_variant(float_double *Q, float_double *R, int m, int n, double r, str variant):
 	'''
-	Run DMD analysis of a matrix X.
-
-	Inputs:
-		- X[ndims*nmesh,n_temp_snapshots]: data matrix
-		- remove_mean:                     whether or not to remove the mean flow
-		- r:                               maximum truncation residual
-
-	Returns:
-		- Phi:      DMD Modes
-		- muReal:   Real part of the eigenvalues
-		- muImag:   Imaginary part of the eigenvalues
-		- b:        Amplitude of the DMD modes
-		- Variables needed to reconstruct flow
+	Run a DMD variant on the factorization of the snapshots, Y = Q x R.
+	Q and R are not modified.
 	'''
-	# Variables
-	cdef int m = X.shape[0], n = X.shape[1], mn = min(m,n-1), retval
-	cdef double *X_mean
-	cdef double *Y
-	cdef int iaux, icol, irow
-	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD
-	#Output arrays:
-	# Allocate memory
-	Y  = <double*>malloc(m*n*sizeof(double))
-
-	#Remove mean if required
-	if remove_mean:
-		cr_start('DMD.temporal_mean',0)
-		X_mean = <double*>malloc(m*sizeof(double))
-		# Compute temporal mean
-		c_temporal_mean(X_mean,&X[0,0],m,n)
-		# Compute substract temporal mean
-		c_subtract_mean(Y,&X[0,0],X_mean,m,n)
-		free(X_mean)
-		cr_stop('DMD.temporal_mean',0)
-	else:
-		memcpy(Y,&X[0,0],m*n*sizeof(double))
-
-	#Get the first N-1 snapshots: Y1 = Y[:,:-1]
-	cr_start('DMD.split_snapshots', 0)
-	cdef double *Y1
-	cdef double *Y2
-	Y1 = <double*>malloc(m*(n-1)*sizeof(double))
-	Y2 = <double*>malloc(m*(n-1)*sizeof(double))
-	for irow in range(m):
+	cdef int iaux, icol, irow, nr, retval
+	cdef bint exact_modes = variant in ('exact','tls')
+
+	#Reduced snapshots (always in double): R1 = R[:,:-1], R2 = R[:,1:]
+	cdef double *R1
+	cdef double *R2
+	R1 = <double*>malloc(n*(n-1)*sizeof(double))
+	R2 = <double*>malloc(n*(n-1)*sizeof(double))
+	for irow in range(n):
 		for icol in range(n-1):
-			Y1[irow*(n-1) + icol] = Y[irow*n + icol]
-			Y2[irow*(n-1) + icol] = Y[irow*n + icol + 1]
-	free(Y)
-	cr_stop('DMD.split_snapshots', 0)
+			R1[irow*(n-1) + icol] = R[irow*n + icol]
+			R2[irow*(n-1) + icol] = R[irow*n + icol + 1]
 
-	# Compute SVD
-	cr_start('DMD.SVD',0)
 	cdef double *U
 	cdef double *S
 	cdef double *V
-	U  = <double*>malloc(m*mn*sizeof(double))
-	S  = <double*>malloc(mn*sizeof(double))
-	V  = <double*>malloc((n-1)*mn*sizeof(double))
-	retval = c_tsqr_svd(U, S, V, Y1, m, mn, MPI_COMM.ob_mpi)
+	cdef double *Z
+	U = <double*>malloc(2*n*(n-1)*sizeof(double))
+	S = <double*>malloc((n-1)*sizeof(double))
+	V = <double*>malloc((n-1)*(n-1)*sizeof(double))
+	Z = <double*>malloc(2*n*(n-1)*sizeof(double))
+
+	#Total least squares: project R1 and R2 onto the leading right
+	#singular vectors of [R1; R2]
+	if variant == 'tls':
+		cr_start('DMD.tls',0)
+		memcpy(Z,R1,n*(n-1)*sizeof(double))
+		memcpy(Z+n*(n-1),R2,n*(n-1)*sizeof(double))
+		retval = c_svd(U,S,V,Z,2*n,n-1)
+		if not retval == 0: raiseError('Problems computing SVD!')
+		nr = int(r) if r > 1 else c_compute_truncation_residual(S,r,n-1)
+		# Projector P = Vr^T x Vr, Z is used as buffer
+		c_matmult(U,V,V,n-1,n-1,nr,'T','N')
+		c_matmul(Z,R1,U,n,n-1,n-1)
+		memcpy(R1,Z,n*(n-1)*sizeof(double))
+		c_matmul(Z,R2,U,n,n-1,n-1)
+		memcpy(R2,Z,n*(n-1)*sizeof(double))
+		cr_stop('DMD.tls',0)
+	free(Z)
+
+	# Compute SVD of the reduced first snapshots, Y1 = (Q x U) x S x V
+	cr_start('DMD.SVD',0)
+	retval = c_svd(U,S,V,R1,n,n-1)
 	cr_stop('DMD.SVD',0)
 	if not retval == 0: raiseError('Problems computing SVD!')
-	free(Y1)
+	free(R1)
 
 	#Truncate
 	cr_start('DMD.truncate',0)
-	cdef int nr
 	cdef double *Ur
 	cdef double *Sr
 	cdef double *Vr
-
-	nr = int(r) if r > 1 else c_compute_truncation_residual(S,r,n-1)
-	Ur = <double*>malloc(m*nr*sizeof(double))
+	if not variant == 'tls':
+		nr = int(r) if r > 1 else c_compute_truncation_residual(S,r,n-1)
+	Ur = <double*>malloc(n*nr*sizeof(double))
 	Sr = <double*>malloc(nr*sizeof(double))
-	Vr = <double*>malloc(nr*mn*sizeof(double))
-	c_compute_truncation(Ur,Sr,Vr,U,S,V,m,n-1,nr)
-	
+	Vr = <double*>malloc(nr*(n-1)*sizeof(double))
+	c_compute_truncation(Ur,Sr,Vr,U,S,V,n,n-1,nr)
 	free(U)
 	free(V)
 	free(S)
@@ -141,81 +140,102 @@ def run(double[:,:] X, double r, int remove_mean=True):
 	cr_start('DMD.linear_mapping',0)
 	cdef double *aux1
 	cdef double *aux2
-	cdef double *aux3
 	cdef double *Atilde
-	cdef double *Urt
 	aux1   = <double*>malloc(nr*(n-1)*sizeof(double))
 	aux2   = <double*>malloc(nr*(n-1)*sizeof(double))
-	aux3   = <double*>malloc(nr*sizeof(double))
 	Atilde = <double*>malloc(nr*nr*sizeof(double))
-	Urt    = <double*>malloc(nr*m*sizeof(double))
-	c_transpose(Ur, Urt, m, nr)
-	c_matmulp(aux1, Urt, Y2, nr, n-1, m)
+	c_matmult(aux1, Ur, R2, nr, n-1, n, 'T', 'N')
 	for icol in range(n-1):
 		for irow in range(nr):
 			aux2[icol*nr + irow] = Vr[irow*(n-1) + icol]/Sr[irow]
 	c_matmul(Atilde, aux1, aux2, nr, nr, n-1)
-	free(aux1)
-	free(aux3)
-	free(Urt)
 	cr_stop('DMD.linear_mapping',0)
 
+	#Forward-backward: A = (Af x Ab^-1)^(1/2) where the backward operator
+	#maps the projected Y2 onto the projected Y1 = S x V
+	cdef double[:,:] Afb
+	if variant == 'fb':
+		cr_start('DMD.forward_backward',0)
+		Yb  = np.asarray(<double[:nr,:n-1]>Vr)*np.asarray(<double[:nr]>Sr)[:,np.newaxis]
+		Ab  = np.linalg.lstsq(np.asarray(<double[:nr,:n-1]>aux1).T, Yb.T, rcond=None)[0].T
+		Afb = np.ascontiguousarray(np.linalg.solve(Ab.T, np.asarray(<double[:nr,:nr]>Atilde).T).T)
+		memcpy(Atilde,&Afb[0,0],nr*nr*sizeof(double))
+		cr_stop('DMD.forward_backward',0)
+	free(aux1)
+
 	#Compute eigenmodes
-	
 	cdef double *auxmuReal
 	cdef double *auxmuImag
+	cdef double mod, arg
 	cdef np.complex128_t *w
 	auxmuReal = <double*>malloc(nr*sizeof(double))
 	auxmuImag = <double*>malloc(nr*sizeof(double))
 	w         = <np.complex128_t*>malloc(nr*nr*sizeof(np.complex128_t))
 	cr_start('DMD.eigendecomposition',0)
 	retval = c_eigen(auxmuReal,auxmuImag,w,Atilde,nr,nr)
+	if variant == 'fb':
+		# Principal square root of the eigenvalues, the eigenvectors are shared
+		for icol in range(nr):
+			mod = sqrt(sqrt(auxmuReal[icol]*auxmuReal[icol] + auxmuImag[icol]*auxmuImag[icol]))
+			arg = 0.5*atan2(auxmuImag[icol],auxmuReal[icol])
+			auxmuReal[icol] = mod*cos(arg)
+			auxmuImag[icol] = mod*sin(arg)
 	cr_stop('DMD.eigendecomposition',0)
 	free(Atilde)
 
-	#Computation of DMD modes
+	#Computation of DMD modes, Phi = Q x Wq where Wq is either the exact
+	#R2 x (V x S^-1 x W) x diag(mu)^-1 or the projected U x W
 	cr_start('DMD.modes',0)
-	cdef np.complex128_t *auxPhi
-	cdef np.complex128_t *aux1C
-	cdef np.complex128_t *aux2C
-	auxPhi = <np.complex128_t*>malloc(m*nr*sizeof(np.complex128_t))
-	aux1C  = <np.complex128_t*>malloc(nr*sizeof(np.complex128_t))
-	aux2C  = <np.complex128_t*>malloc(nr*sizeof(np.complex128_t))
-	for iaux in range(m):
+	cdef np.complex128_t *W2
+	cdef np.complex128_t *Wq
+	cdef np.complex64_t  *Wqs
+	cdef np.complex128_t imu
+	# The modes are kept in the precision of the snapshots
+	cdef np.ndarray Phi = np.zeros((m,nr),order='C',dtype=np.complex64 if float_double is float else np.complex128)
+	Wq     = <np.complex128_t*>malloc(n*nr*sizeof(np.complex128_t))
+	if exact_modes:
+		# Reduced matrix W2 = V x S^-1 x W with its columns divided by the eigenvalues
+		W2 = <np.complex128_t*>malloc((n-1)*nr*sizeof(np.complex128_t))
+		c_dzmatmul(W2, aux2, w, n-1, nr, nr)
 		for icol in range(nr):
-			aux1C[icol] = 0 + 0*1j
+			imu = 1./(auxmuReal[icol] + auxmuImag[icol]*1j)
 			for irow in range(n-1):
-				aux1C[icol] += Y2[iaux*(n-1) + irow]*aux2[irow*nr + icol]
-		c_zmatmult(aux2C, aux1C, w, 1, nr, nr, 'N', 'N')
-		memcpy(&auxPhi[iaux*nr], aux2C, nr*sizeof(np.complex128_t))
+				W2[irow*nr + icol] *= imu
+		c_dzmatmul(Wq, R2, W2, n, nr, n-1)
+		free(W2)
+	else:
+		c_dzmatmul(Wq, Ur, w, n, nr, nr)
 	free(aux2)
-	free(Y2)
-	cdef double a
-	cdef double b
-	cdef double c
-	cdef double d
-	cdef double div
-	for icol in range(nr):
-		c = auxmuReal[icol]
-		d = auxmuImag[icol]
-		div = c*c + d*d
-		for iaux in range(m):
-			a = creal(auxPhi[iaux*nr + icol])
-			b = cimag(auxPhi[iaux*nr + icol])
-			auxPhi[iaux*nr + icol] = (a*c + b*d)/div + (b*c - a*d)/div*1j
+	free(R2)
+	free(Ur)
+	# Project the orthonormal basis with a single GEMM
+	if float_double is float:
+		Wqs = <np.complex64_t*>malloc(n*nr*sizeof(np.complex64_t))
+		for icol in range(n*nr):
+			Wqs[icol] = Wq[icol]
+		c_scmatmul(<np.complex64_t*>np.PyArray_DATA(Phi), Q, Wqs, m, nr, n)
+		free(Wqs)
+	else:
+		c_dzmatmul(<np.complex128_t*>np.PyArray_DATA(Phi), Q, Wq, m, nr, n)
+	free(Wq)
 	cr_stop('DMD.modes',0)
 
 	#Amplitudes according to: Jovanovic et. al. 2014 DOI: 10.1063
 	cdef np.complex128_t *auxbJov
+	cdef np.complex128_t *aux1C
 	cdef np.complex128_t *aux3C
+	cdef np.complex128_t *aux4C
+	cdef np.complex128_t *Gc
 	cdef np.complex128_t *Vand
 	cdef np.complex128_t *P
 	cdef np.complex128_t *Pinv
 	cdef np.complex128_t *q
 
 	auxbJov = <np.complex128_t*>malloc(nr*sizeof(np.complex128_t))
+	aux1C   = <np.complex128_t*>malloc(nr*sizeof(np.complex128_t))
 	aux3C   = <np.complex128_t*>malloc(nr*nr*sizeof(np.complex128_t))
 	aux4C   = <np.complex128_t*>malloc(nr*nr*sizeof(np.complex128_t))
+	Gc      = <np.complex128_t*>malloc((nr*(n-1))*sizeof(np.complex128_t))
 	Vand    = <np.complex128_t*>malloc((nr*(n-1))*sizeof(np.complex128_t))
 	P       = <np.complex128_t*>malloc(nr*nr*sizeof(np.complex128_t))
 	Pinv    = <np.complex128_t*>malloc(nr*nr*sizeof(np.complex128_t))
@@ -235,13 +255,16 @@ def run(double[:,:] X, double r, int remove_mean=True):
 	retval = c_cholesky(P, nr)
 	if not retval == 0: raiseError('Problems computing Cholesky factorization!')
 
+	# q = diag(Vand x G^T x W) with G = S x V, the product is done with
+	# a single GEMM and only its diagonal is contracted with W
+	for irow in range(nr):
+		for icol in range(n-1):
+			Gc[irow*(n-1) + icol] = Sr[irow]*Vr[irow*(n-1) + icol]
+	c_zmatmult(aux3C, Vand, Gc, nr, nr, n-1, 'N', 'T')
 	for iaux in range(nr):
+		q[iaux] = 0.
 		for irow in range(nr):
-			aux1C[irow] = 0 + 0*1j
-			for icol in range(n-1):#casting Vr to a complex, at the same time, it is multipilied per S and Vand
-				aux1C[irow] += Sr[irow]*Vr[irow*(n-1) + icol]*(creal(Vand[iaux*(n-1) + icol])+cimag(Vand[iaux*(n-1) + icol])*1j)
-			aux2C[irow] = w[irow*nr + iaux]
-		c_zmatmult(&q[iaux], aux1C, aux2C, 1, 1, nr, 'N', 'N')
+			q[iaux] += aux3C[iaux*nr + irow]*w[irow*nr + iaux]
 
 	memcpy(Pinv, P, nr*nr*sizeof(np.complex128_t))
 	cdef int ii
@@ -264,13 +287,12 @@ def run(double[:,:] X, double r, int remove_mean=True):
 	cr_stop('DMD.amplitudes',0)
 
 	# Free allocated arrays before reordering
-	free(Ur)
 	free(Sr)
 	free(Vr)
 	free(aux1C)
-	free(aux2C)
 	free(aux3C)
 	free(aux4C)
+	free(Gc)
 	free(w)
 	free(Vand)
 	free(q)
@@ -282,8 +304,10 @@ def run(double[:,:] X, double r, int remove_mean=True):
 	auxOrd = <int*>malloc(nr*sizeof(int))
 	cdef np.ndarray[np.double_t,ndim=1] muReal   = np.zeros((nr),dtype=np.double)
 	cdef np.ndarray[np.double_t,ndim=1] muImag   = np.zeros((nr),dtype=np.double)
-	cdef np.ndarray[np.complex128_t,ndim=2] Phi  = np.zeros((m,nr),order='C',dtype=np.complex128)
 	cdef np.ndarray[np.complex128_t,ndim=1] bJov = np.zeros((nr,),dtype=np.complex128)
+	cdef size_t isize = Phi.itemsize
+	cdef char *Phir
+	cdef char *rowbuf
 
 	cr_start('DMD.qsort', 0)
 	c_zsort(auxbJov, auxOrd, nr)
@@ -293,15 +317,20 @@ def run(double[:,:] X, double r, int remove_mean=True):
 		muReal[nr-(auxOrd[ii]+1)] = auxmuReal[ii]
 		muImag[nr-(auxOrd[ii]+1)] = auxmuImag[ii]
 		bJov[nr-(auxOrd[ii]+1)]   = auxbJov[ii]
-		for jj in range(m):
-			Phi[jj,nr-(auxOrd[ii]+1)]  = auxPhi[jj*nr + ii]
+	# The columns of the modes are permuted in place, row by row
+	rowbuf = <char*>malloc(nr*isize)
+	for jj in range(m):
+		Phir = <char*>np.PyArray_DATA(Phi) + jj*nr*isize
+		for ii in range(nr):
+			memcpy(rowbuf + (nr-(auxOrd[ii]+1))*isize,Phir + ii*isize,isize)
+		memcpy(Phir,rowbuf,nr*isize)
+	free(rowbuf)
 	cr_stop('DMD.sort', 0)
 
 	#Free the variables that had to be ordered
 	free(auxmuReal)
 	free(auxmuImag)
 	free(auxbJov)
-	free(auxPhi)
 	free(auxOrd)
 
 	#Ensure that all conjugate modes are in the same order
@@ -318,9 +347,8 @@ def run(double[:,:] X, double r, int remove_mean=True):
 			muImag[ii+1] = -muImag[ii]
 			bJov[ii]     = creal(bJov[ii])   + cimag(bJov[ii+1])*1j
 			bJov[ii+1]   = creal(bJov[ii+1]) - cimag(bJov[ii])*1j
-			for jj in range(m):
-				Phi[jj,ii]   = creal(Phi[jj,ii])   + cimag(Phi[jj,ii+1])*1j
-				Phi[jj,ii+1] = creal(Phi[jj,ii+1]) - cimag(Phi[jj,ii+1])*1j
+			Phi.imag[:,ii]   =  Phi.imag[:,ii+1]
+			Phi.imag[:,ii+1] = -Phi.imag[:,ii+1]
 			p = 1
 			continue
 		if iimag > 0:
@@ -331,6 +359,107 @@ def run(double[:,:] X, double r, int remove_mean=True):
 	# Return
 	return muReal, muImag, Phi, bJov
 
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+def _run(float_double[:,:] X, double r, int remove_mean, int overwrite_input, list variants, MPI.Comm comm):
+	'''
+	Run DMD analysis of a matrix X in single or double precision.
+	The QR factorization of the snapshots and the modes are computed in
+	the precision of X while the reduced operator is always double.
+	The snapshots are factorized once for all the variants.
+	'''
+	# Variables
+	cdef int m = X.shape[0], n = X.shape[1], retval
+	cdef float_double *Y
+	cdef str variant
+	cdef list out = []
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
+	cdef float_double[:] X_mean = np.zeros((m,),dtype=np.float32 if float_double is float else np.double)
+	#Output arrays:
+	# Allocate memory, X is used as buffer when overwriting the input
+	Y  = &X[0,0] if overwrite_input else <float_double*>malloc(m*n*sizeof(float_double))
+
+	#Remove mean if required
+	if remove_mean:
+		cr_start('DMD.temporal_mean',0)
+		# Compute temporal mean and substract it
+		if float_double is float:
+			c_stemporal_mean(&X_mean[0],&X[0,0],m,n)
+			c_ssubtract_mean(Y,&X[0,0],&X_mean[0],m,n)
+		else:
+			c_temporal_mean(&X_mean[0],&X[0,0],m,n)
+			c_subtract_mean(Y,&X[0,0],&X_mean[0],m,n)
+		cr_stop('DMD.temporal_mean',0)
+	elif not overwrite_input:
+		memcpy(Y,&X[0,0],m*n*sizeof(float_double))
+
+	#Factorize all the snapshots once, Y = Q x R, so that Y1 = Q x R[:,:-1]
+	#and Y2 = Q x R[:,1:] and the snapshots never need to be split
+	cr_start('DMD.QR',0)
+	cdef float_double *Q
+	cdef float_double *R
+	Q = <float_double*>malloc(m*n*sizeof(float_double))
+	R = <float_double*>malloc(n*n*sizeof(float_double))
+	if float_double is float:
+		retval = c_stsqr(Q, R, Y, m, n, MPI_COMM.ob_mpi)
+	else:
+		retval = c_tsqr(Q, R, Y, m, n, MPI_COMM.ob_mpi)
+	cr_stop('DMD.QR',0)
+	if not retval == 0: raiseError('Problems computing QR!')
+	if not overwrite_input: free(Y)
+
+	#Run every variant on the same factorization
+	for variant in variants:
+		out.append(_run_variant(Q,R,m,n,r,variant))
+	free(Q)
+	free(R)
+	return out, np.asarray(X_mean)
+
+
+@cr('DMD.run')
+def run(X, double r, int remove_mean=True, int overwrite_input=False, object dtype=np.double, object variant='exact', MPI.Comm comm=None):
+	'''
+	Run DMD analysis of a matrix X.
+
+	Inputs:
+		- X[ndims*nmesh,n_temp_snapshots]: data matrix
+		- remove_mean:                     whether or not to remove the mean flow
+		- r:                               maximum truncation residual
+		- overwrite_input:                 use X as work buffer to remove the mean, X is left centered on exit and the
+		                                   mean is returned last, views of Dataset variables are copied instead
+		- dtype:                           working precision of the snapshots, np.double (default) or np.float32
+		- variant:                         DMD algorithm, exact (default), projected, tls (total least squares) or fb (forward-backward),
+		                                   or a list of them to run on a single QR factorization of the snapshots
+		- comm:                            communicator of the processors that hold X (default MPI.COMM_WORLD)
+
+	Returns:
+		- Phi:      DMD Modes, in single precision (complex64) when dtype is np.float32
+		- muReal:   Real part of the eigenvalues
+		- muImag:   Imaginary part of the eigenvalues
+		- b:        Amplitude of the DMD modes
+		- Variables needed to reconstruct flow
+		- X_mean:   temporal mean removed from X, only with overwrite_input
+
+	A list of variants returns a list with the outputs of each variant.
+	'''
+	if not np.dtype(dtype) in (np.float32,np.double): raiseError('Data type <%s> not supported!'%np.dtype(dtype).name)
+	variants = [variant] if isinstance(variant,str) else list(variant)
+	for ivar in variants:
+		if not ivar in ('exact','projected','tls','fb'): raiseError('Variant <%s> not implemented!'%ivar)
+	# X is only copied if it does not have the working precision
+	X = np.ascontiguousarray(X,dtype=dtype)
+	inplace = overwrite_input
+	# Views of the variables of a Dataset are copied instead of overwritten
+	if overwrite_input and shares_dataset_memory(X):
+		raiseWarning('DMD.run - X is a view of a Dataset variable, it is copied instead of overwritten!')
+		inplace = False
+	out, X_mean = _run(X,r,remove_mean,inplace,variants,comm)
+	# X is left centered and its mean returned when it is overwritten
+	if overwrite_input: out = [o + (X_mean,) for o in out]
+	return out[0] if isinstance(variant,str) else out
+
 
 ## DMD frequency damping
 @cr('DMD.frequency_damping')
@@ -362,11 +491,13 @@ def frequency_damping(double[:] real, double[:] imag, double dt):
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def reconstruction_jovanovic(np.complex128_t[:,:] Phi, double[:] muReal, double[:] muImag, double[:] t, np.complex128_t[:] bJov):
+def reconstruction_jovanovic(object Phi, double[:] muReal, double[:] muImag, double[:] t, np.complex128_t[:] bJov):
 	'''
-	Computation of the reconstructed flow from the DMD computations
+	Computation of the reconstructed flow from the DMD computations,
+	single precision modes are promoted to double
 	'''
-	cdef int m  = Phi.shape[0], n  = t.shape[0], nr = Phi.shape[1]
+	cdef np.complex128_t[:,:] Phid = np.ascontiguousarray(Phi,dtype=np.complex128)
+	cdef int m  = Phid.shape[0], n  = t.shape[0], nr = Phid.shape[1]
 	cdef np.complex128_t *Vand
 	cdef np.ndarray[np.complex128_t,ndim=2] Zdmd = np.zeros((m,n),order='C',dtype=np.complex128)
 
@@ -374,7 +505,7 @@ def reconstruction_jovanovic(np.complex128_t[:,:] Phi, double[:] muReal, double[
 
 	c_vandermonde_time(Vand, &muReal[0], &muImag[0], nr, n, &t[0])
 	c_zvecmat(&bJov[0], Vand, nr, n)
-	c_zmatmult(&Zdmd[0,0], &Phi[0,0], Vand, m, n, nr, 'N', 'N')
+	c_zmatmult(&Zdmd[0,0], &Phid[0,0], Vand, m, n, nr, 'N', 'N')
 	
 	free(Vand)
 
@@ -8,9 +8,10 @@
 
 __VERSION__ = '1.0.0'
 
-from .wrapper import run, truncate, reconstruct
-from .utils   import extract_modes, save, load
-from .plots   import plotResidual, plotMode, plotSnapshot
+from .wrapper     import run, truncate, reconstruct
+from .incremental import IncrementalPOD, run_from_file
+from .utils       import extract_modes, save, load
+from .plots       import plotResidual, plotMode, plotSnapshot
 
 
-del wrapper, plots
\ No newline at end of file
+del wrapper, incremental, plots
\ No newline at end of file
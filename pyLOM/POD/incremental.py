@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+#
+# pyLOM - Python Low Order Modeling.
+#
+# POD incremental (streaming) algorithm.
+#
+# Last rev: 17/10/2026
+from __future__ import print_function, division
+
+import numpy as np
+
+from ..             import inp_out as io
+from ..vmmath       import vector_norm, matmul, matmulp, transpose, qr, svd, tsqr, tsqr_svd
+from ..utils.parall import mpi_reduce
+from ..utils.cr     import cr
+from ..utils.errors import raiseError
+
+
+class IncrementalPOD(object):
+	'''
+	Incremental POD of a data matrix that is ingested by batches of
+	snapshots. It uses the rank-updating thin SVD from
+	M. Brand, ‘Fast low-rank modifications of the thin singular value
+	decomposition’, Linear Algebra Appl., vol. 415, no. 1, pp. 20–30, May 2006,
+
+	doi: 10.1016/j.laa.2005.07.021.
+
+	The orthogonalization of the new data is done with the TSQR algorithm
+	so that the method works on matrices partitioned by rows. The temporal
+	mean is updated on the fly and the shift of the mean on the already
+	ingested snapshots is applied as a rank-one modification, hence the
+	result is the POD of the whole (mean removed) data matrix up to the
+	truncation to the maximum rank.
+
+	Only the modes, the singular values and the right singular vectors are
+	kept, so the memory scales with O(m r) instead of O(m n).
+	'''
+	def __init__(self, r=50, remove_mean=True, comm=None):
+		'''
+		Class constructor
+
+		Inputs:
+			> r:           maximum number of modes to be kept.
+			> remove_mean: whether or not to remove the mean flow.
+			> comm:        communicator of the processors that hold the rows (default MPI.COMM_WORLD).
+		'''
+		if r <= 0: raiseError('The maximum rank r must be positive!')
+		self._r           = r
+		self._comm        = comm
+		self._remove_mean = remove_mean
+		self._nsnaps      = 0
+		self._mean        = None
+		self._U           = None
+		self._S           = None
+		self._V           = None # right singular vectors, stored as V(n,r)
+
+	def __len__(self):
+		return self._nsnaps
+
+	def __str__(self):
+		'''
+		String representation
+		'''
+		s  = 'IncrementalPOD of %d snapshots:\n' % len(self)
+		s += '  > rank = %d (max %d)\n' % (self.rank,self._r)
+		s += '  > remove mean = %s\n' % str(self._remove_mean)
+		return s
+
+	def _truncate(self,U,S,V):
+		'''
+		Keep the first r singular triplets, discarding those that
+		are zero within the machine precision
+		'''
+		tol = S.shape[0]*np.finfo(np.double).eps*S[0]
+		r   = max(min(self._r,np.count_nonzero(S > tol)),1)
+		self._U = np.ascontiguousarray(U[:,:r])
+		self._S = np.ascontiguousarray(S[:r])
+		self._V = np.ascontiguousarray(V[:,:r])
+
+	@cr('POD.incremental_update')
+	def update(self,X):
+		'''
+		Ingest a batch of snapshots.
+
+		Inputs:
+			- X[ndims*nmesh,n_batch_snapshots]: batch of the data matrix
+		'''
+		X = np.ascontiguousarray(X,dtype=np.double)
+		m, b = X.shape
+		n    = self._nsnaps
+		# Update the temporal mean
+		if self._remove_mean:
+			X_mean = np.mean(X,axis=1)
+			if n == 0: self._mean = np.zeros((m,),np.double)
+			dmean = b/(n+b)*(X_mean - self._mean)
+			self._mean += dmean
+			C = X - self._mean[:,np.newaxis]
+		else:
+			C = X.copy()
+		# First batch, run a TSQR SVD on it
+		if n == 0:
+			U,S,V = tsqr_svd(C,comm=self._comm)
+			self._truncate(U,S,transpose(V))
+			self._nsnaps = b
+			return
+		# The update is the rank modification A + C x D^T where
+		# the columns of C are the new (centered) snapshots and,
+		# when the mean is removed, the shift of the mean -dmean
+		# applied to all the previous snapshots (D[:n,0] = 1).
+		k = self._S.shape[0]
+		V = self._V
+		if self._remove_mean:
+			C  = np.ascontiguousarray(np.hstack([-dmean[:,np.newaxis],C]))
+			ones = np.ones((n,1),np.double)
+			vd   = matmul(transpose(V),ones)  # V^T x D (only the first column is nonzero)
+			rd   = ones - matmul(V,vd)        # orthogonal complement of the first column of D
+			rb   = vector_norm(rd[:,0])
+			rd   = rd/rb if rb > 0. else 0.*rd
+		nc = C.shape[1]
+		# Project C onto the modes and orthonormalize its complement, C = U x M + P x RA
+		# the projection is done twice to keep P orthogonal to U when C is (nearly)
+		# in the span of the modes
+		M  = matmulp(transpose(self._U),C,self._comm)
+		H  = C - matmul(self._U,M)
+		M2 = matmulp(transpose(self._U),H,self._comm)
+		H -= matmul(self._U,M2)
+		M += M2
+		P, RA = tsqr(H,comm=self._comm)
+		# Same for D, D = V x N + Q x RB, with Q and RB known analytically
+		N  = np.zeros((k,nc),np.double)
+		RB = np.eye(nc,dtype=np.double)
+		if self._remove_mean:
+			N[:,0]  = vd[:,0]
+			RB[0,0] = rb
+		# Small core matrix K = [S 0; 0 0] + [M; RA] x [N; RB]^T
+		K = np.zeros((k+nc,k+nc),np.double)
+		K[np.arange(k),np.arange(k)] = self._S
+		K += matmul(np.ascontiguousarray(np.vstack([M,RA])),transpose(np.ascontiguousarray(np.vstack([N,RB]))))
+		Uk,S,VkT = svd(K)
+		# Rotate the modes and the right singular vectors
+		U  = matmul(np.ascontiguousarray(np.hstack([self._U,P])),Uk)
+		Ve = np.zeros((n+b,k+nc),np.double)
+		Ve[:n,:k] = V
+		if self._remove_mean:
+			Ve[:n,k]   = rd[:,0]
+			Ve[n:,k+1:] = np.eye(b,dtype=np.double)
+		else:
+			Ve[n:,k:]   = np.eye(b,dtype=np.double)
+		self._truncate(U,S,matmul(Ve,transpose(VkT)))
+		self._nsnaps += b
+
+	@cr('POD.incremental_finalize')
+	def finalize(self,r=-1):
+		'''
+		Recover the POD of the ingested snapshots.
+
+		Inputs:
+			- r: number of modes to return (all the kept modes if <= 0)
+
+		Returns:
+			- U:  are the POD modes.
+			- S:  are the singular values.
+			- V:  are the right singular vectors.
+		'''
+		if self._nsnaps == 0: raiseError('No snapshots have been ingested!')
+		if r <= 0 or r > self.rank: r = self.rank
+		return self._U[:,:r].copy(), self._S[:r].copy(), transpose(np.ascontiguousarray(self._V[:,:r]))
+
+	@property
+	def rank(self):
+		return 0 if self._S is None else self._S.shape[0]
+	@property
+	def mean(self):
+		return self._mean
+	@property
+	def nsnaps(self):
+		return self._nsnaps
+
+
+def _gram_from_blocks(blocks,remove_mean):
+	'''
+	First pass of the method of snapshots on blocks of rows, accumulating
+	the local Gram matrix G = sum Xb^T x Xb of the (mean removed) blocks
+	'''
+	G, nrows = None, 0
+	for Xb in blocks:
+		if G is None: G = np.zeros((Xb.shape[1],Xb.shape[1]),np.double)
+		if Xb.shape[0] == 0: continue
+		if remove_mean: Xb -= np.mean(Xb,axis=1)[:,np.newaxis]
+		G     += matmul(transpose(Xb),Xb)
+		nrows += Xb.shape[0]
+	return G, nrows
+
+def _r_from_blocks(blocks,remove_mean,comm):
+	'''
+	Streamed TSQR on blocks of rows, the R factor of each processor is
+	updated with every block and then reduced across the processors
+	'''
+	R = None
+	for Xb in blocks:
+		if R is None: R = np.zeros((Xb.shape[1],Xb.shape[1]),np.double)
+		if Xb.shape[0] == 0: continue
+		if remove_mean: Xb -= np.mean(Xb,axis=1)[:,np.newaxis]
+		_, R = qr(np.ascontiguousarray(np.vstack([R,Xb])))
+	_, R = tsqr(np.ascontiguousarray(R),comm=comm)
+	return R
+
+@cr('POD.run_from_file')
+def run_from_file(fname,vars,time_slice=np.s_[:],block_size=100,remove_mean=True,method='incremental',r=50,cond_max=1e6,mpio=True,comm=None):
+	'''
+	Run POD analysis of a pyLOM HDF5 dataset without loading it in memory.
+	The snapshots are streamed by blocks and each processor only reads
+	its slab of rows.
+
+	Inputs:
+		- fname:       HDF5 dataset file
+		- vars:        list of variables to build the data matrix
+		- time_slice:  instants to be used, as a numpy slice (np.s_)
+		- block_size:  number of snapshots (points for 'gram') read at once
+		- remove_mean: whether or not to remove the mean flow
+		- method:      'incremental' (single pass, memory O(m r)) or
+		               'gram' (method of snapshots, exact, two passes over blocks
+		               of block_size points, memory O(n^2 + m r))
+		- r:           maximum number of modes to keep (all for 'gram' if <= 0)
+		- cond_max:    maximum condition number for the 'gram' method, above it
+		               S and V are recomputed with a streamed TSQR (one more pass)
+		- mpio:        use parallel HDF5
+		- comm:        communicator of the processors that read the file (default MPI.COMM_WORLD)
+
+	Returns:
+		- U:      are the POD modes.
+		- S:      are the singular values.
+		- V:      are the right singular vectors.
+		- ptable: partition table of the modes.
+	'''
+	if method.lower() == 'incremental':
+		if r <= 0: raiseError('A maximum rank r is needed for the incremental POD!')
+		ptable, blocks = io.h5_load_blocks(fname,vars,time_slice=time_slice,block_size=block_size,mpio=mpio,comm=comm)
+		ipod = IncrementalPOD(r=r,remove_mean=remove_mean,comm=comm)
+		for X in blocks: ipod.update(X)
+		U,S,V = ipod.finalize()
+		return U,S,V,ptable
+	if not method.lower() == 'gram': raiseError('Method <%s> not implemented!'%method)
+	# First pass by blocks of rows, the Gram matrix G = X^T x X (n,n)
+	# is accumulated over the blocks and reduced across the processors
+	ptable, blocks = io.h5_load_blocks(fname,vars,time_slice=time_slice,block_size=block_size,axis=0,mpio=mpio,comm=comm)
+	G, nrows = _gram_from_blocks(blocks,remove_mean)
+	G = mpi_reduce(G,op='sum',all=True,comm=comm)
+	# Eigendecomposition of the Gram matrix in descending order, G = V x S^2 x V^T
+	w, V = np.linalg.eigh(G)
+	w, V = w[::-1], V[:,::-1]
+	nr   = max(np.count_nonzero(w > w.shape[0]*np.finfo(np.double).eps*w[0]),1)
+	S    = np.sqrt(np.maximum(w[:nr],0.))
+	# Forming G squares the condition number of X, above cond_max
+	# S and V are recomputed from the streamed TSQR of X instead
+	if S[0] > cond_max*S[-1]:
+		ptable, blocks = io.h5_load_blocks(fname,vars,time_slice=time_slice,block_size=block_size,axis=0,mpio=mpio,comm=comm)
+		_,S,VT = svd(_r_from_blocks(blocks,remove_mean,comm))
+		nr   = max(np.count_nonzero(S > S.shape[0]*np.finfo(np.double).eps*S[0]),1)
+		S, V = S[:nr], transpose(VT)
+	if r > 0: nr = min(r,nr)
+	S, V = np.ascontiguousarray(S[:nr]), np.ascontiguousarray(V[:,:nr])
+	# Second pass by blocks of rows, recover the modes U = X x V x S^-1
+	ptable, blocks = io.h5_load_blocks(fname,vars,time_slice=time_slice,block_size=block_size,axis=0,mpio=mpio,comm=comm)
+	U, irow = np.zeros((nrows,nr),np.double), 0
+	for Xb in blocks:
+		if Xb.shape[0] == 0: continue
+		if remove_mean: Xb -= np.mean(Xb,axis=1)[:,np.newaxis]
+		U[irow:irow+Xb.shape[0],:] = matmul(Xb,V)/S[np.newaxis,:]
+		irow += Xb.shape[0]
+	return U, S, transpose(V), ptable
@@ -30,18 +30,21 @@ def extract_modes(U,ivar,npoints,modes=[],reshape=True):
 
 
 @cr('POD.save')
-def save(fname,U,S,V,ptable,nvars=1,pointData=True,mode='w'):
+def save(fname,U,S,V,ptable,nvars=1,pointData=True,mode='w',chunks=None,compression=None):
 	'''
 	Store POD variables in serial or parallel
 	according to the partition used to compute the POD.
+	The chunk layout of U (e.g., 'mode') and its compression
+	filters are described in h5_chunks and h5_filters.
 	'''
-	io.h5_save_POD(fname,U,S,V,ptable,nvars=nvars,pointData=pointData,mode=mode)
+	io.h5_save_POD(fname,U,S,V,ptable,nvars=nvars,pointData=pointData,mode=mode,chunks=chunks,compression=compression)
 
 
 @cr('POD.load')
-def load(fname,vars=['U','S','V'],nmod=-1,ptable=None):
+def load(fname,vars=['U','S','V'],nmod=-1,ptable=None,comm=None):
 	'''
 	Load POD variables in serial or parallel
-	according to the partition used to compute the POD.
+	according to the partition used to compute the POD,
+	or among the processors of comm when it is not given.
 	'''
-	return io.h5_load_POD(fname,vars,nmod,ptable)
+	return io.h5_load_POD(fname,vars,nmod,ptable,comm)
@@ -9,41 +9,109 @@ from __future__ import print_function
 
 import numpy as np
 
-from ..vmmath       import vector_norm, vecmat, matmul, temporal_mean, subtract_mean, tsqr_svd
+from ..vmmath       import vector_norm, vecmat, matmul, temporal_mean, subtract_mean, tsqr_svd, tsqr_svd_shared, randomized_svd
 from ..utils.cr     import cr, cr_start, cr_stop
-from ..utils.errors import raiseError
+from ..utils.errors import raiseError, raiseWarning
+from ..dataset      import shares_dataset_memory
+from ..utils.parall import NodeArray
 
 
 ## POD run method
+def _run_shared(X,remove_mean,tree,overwrite_input,dtype,comm):
+	'''
+	Run POD analysis of a matrix X with the snapshot matrix in node
+	shared memory, the SVD is done by the node leaders on the rows
+	of their whole node.
+	'''
+	# X is only copied if it is not a NodeArray of the working precision
+	if isinstance(X,NodeArray):
+		Y = X if overwrite_input and X.dtype == dtype else X.empty_like(dtype=dtype)
+	else:
+		Y = NodeArray(np.shape(X),dtype,comm)
+	if not Y is X: Y.local[:,:] = np.asarray(X)
+	X_mean = np.zeros((Y.shape[0],),dtype=dtype)
+	if remove_mean:
+		cr_start('POD.temporal_mean',0)
+		X_mean = temporal_mean(Y.local)
+		Y.local[:,:] -= X_mean[:,np.newaxis]
+		cr_stop('POD.temporal_mean',0)
+	Y.barrier()
+	# Compute SVD
+	cr_start('POD.SVD',0)
+	Us,Ss,Vs = tsqr_svd_shared(Y,tree)
+	U,S,V    = np.array(Us.local), np.array(Ss.node), np.array(Vs.node)
+	cr_stop('POD.SVD',0)
+	for A in (Us,Ss,Vs): A.free()
+	if not Y is X: Y.free()
+	# Return, X is left centered when it is overwritten
+	return (U,S,V,X_mean) if overwrite_input else (U,S,V)
+
 @cr('POD.run')
-def run(X,remove_mean=True):
+def run(X,remove_mean=True,method='tsqr',r=-1,p=10,q=1,seed=-1,cond_max=1e6,overwrite_input=False,dtype=np.double,comm=None,tree='binary',shared=False):
 	'''
 	Run POD analysis of a matrix X.
 
 	Inputs:
 		- X[ndims*nmesh,n_temp_snapshots]: data matrix
 		- remove_mean:                     whether or not to remove the mean flow
+		- method:                          SVD algorithm, 'tsqr' (full thin SVD), 'gram' (method of snapshots) or 'randomized'
+		- r:                               target rank for the randomized SVD
+		- p:                               oversampling for the randomized SVD (default 10)
+		- q:                               power iterations for the randomized SVD (default 1)
+		- seed:                            seed for the randomized SVD (< 0 for a random seed)
+		- cond_max:                        maximum condition number for the method of snapshots, TSQR is used above it (default 1e6)
+		- overwrite_input:                 use X as work buffer to remove the mean, X is left centered on exit and
+		                                   the mean is returned, views of Dataset variables are copied instead
+		- dtype:                           working precision, np.double (default) or np.float32
+		- comm:                            communicator of the processors that hold X (default MPI.COMM_WORLD)
+		- tree:                            reduction tree of the TSQR, 'binary' (default), 'flat', 'butterfly', 'node' or 'cholqr2'
+		- shared:                          keep the snapshot matrix in node shared memory (always for a NodeArray X), only with 'tsqr'
 
 	Returns:
-		- U:  are the POD modes.
-		- S:  are the singular values.
-		- V:  are the right singular vectors.
+		- U:      are the POD modes.
+		- S:      are the singular values.
+		- V:      are the right singular vectors.
+		- X_mean: temporal mean removed from X, only with overwrite_input.
 	'''
+	if not np.dtype(dtype) in (np.float32,np.double): raiseError('Data type <%s> not supported!'%np.dtype(dtype).name)
+	if shared or isinstance(X,NodeArray):
+		if not method.lower() == 'tsqr': raiseError('Method <%s> does not run on shared memory!'%method)
+		return _run_shared(X,remove_mean,tree,overwrite_input,np.dtype(dtype),comm)
+	# X is only copied if it does not have the working precision
+	X = np.ascontiguousarray(X,dtype=dtype)
+	inplace = overwrite_input
+	# Views of the variables of a Dataset are copied instead of overwritten
+	if overwrite_input and shares_dataset_memory(X):
+		raiseWarning('POD.run - X is a view of a Dataset variable, it is copied instead of overwritten!')
+		inplace = False
+	X_mean  = np.zeros((X.shape[0],),dtype=X.dtype)
 	if remove_mean:
 		cr_start('POD.temporal_mean',0)
 		# Compute temporal mean
 		X_mean = temporal_mean(X)
 		# Compute substract temporal mean
-		Y = subtract_mean(X,X_mean)
+		if inplace:
+			X -= X_mean[:,np.newaxis]
+		else:
+			Y = subtract_mean(X,X_mean)
 		cr_stop('POD.temporal_mean',0)
-	else:
+	elif not inplace:
 		Y = X.copy()
+	if inplace: Y = X
 	# Compute SVD
 	cr_start('POD.SVD',0)
-	U,S,V = tsqr_svd(Y)
+	if method.lower() == 'tsqr':
+		U,S,V = tsqr_svd(Y,comm=comm,tree=tree)
+	elif method.lower() == 'gram':
+		U,S,V = tsqr_svd(Y,method='gram',cond_max=cond_max,comm=comm)
+	elif method.lower() == 'randomized':
+		if r <= 0: raiseError('A target rank r is needed for the randomized SVD!')
+		U,S,V = randomized_svd(Y,r,p=p,q=q,seed=seed,comm=comm)
+	else:
+		raiseError('Method <%s> not implemented!'%method)
 	cr_stop('POD.SVD',0)
-	# Return
-	return U,S,V
+	# Return, X is left centered when it is overwritten
+	return (U,S,V,X_mean) if overwrite_input else (U,S,V)
 
 
 ## POD truncate method
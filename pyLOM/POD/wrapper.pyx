@@ -19,70 +19,177 @@ from mpi4py.libmpi cimport MPI_Comm
 from mpi4py        cimport MPI
 
 from ..utils.cr     import cr, cr_start, cr_stop
-from ..utils.errors import raiseError
+from ..utils.errors import raiseError, raiseWarning
+from ..dataset      import shares_dataset_memory
+from ..vmmath       import TSQR_TREES, temporal_mean, tsqr_svd_shared
+from ..utils.parall import NodeArray
 
 cdef extern from "vector_matrix.h":
+	# Double precision
 	cdef double c_vector_norm "vector_norm"(double *v, int start, int n)
 	cdef void   c_matmul      "matmul"(double *C, double *A, double *B, const int m, const int n, const int k)
 	cdef void   c_vecmat      "vecmat"(double *v, double *A, const int m, const int n)
+	# Single precision
+	cdef void   c_smatmul     "smatmul"(float *C, float *A, float *B, const int m, const int n, const int k)
+	cdef void   c_svecmat     "svecmat"(float *v, float *A, const int m, const int n)
 cdef extern from "averaging.h":
-	cdef void c_temporal_mean "temporal_mean"(double *out, double *X, const int m, const int n)
-	cdef void c_subtract_mean "subtract_mean"(double *out, double *X, double *X_mean, const int m, const int n)
+	cdef void c_temporal_mean  "temporal_mean"(double *out, double *X, const int m, const int n)
+	cdef void c_subtract_mean  "subtract_mean"(double *out, double *X, double *X_mean, const int m, const int n)
+	cdef void c_stemporal_mean "stemporal_mean"(float *out, float *X, const int m, const int n)
+	cdef void c_ssubtract_mean "ssubtract_mean"(float *out, float *X, float *X_mean, const int m, const int n)
 cdef extern from "svd.h":
-	cdef int c_tsqr_svd "tsqr_svd"(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, MPI_Comm comm)
+	# Double precision
+	cdef int c_tsqr_svd_tree   "tsqr_svd_tree"(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, const int tree, MPI_Comm comm)
+	cdef int c_gram_svd        "gram_svd"(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, const double cond_max, MPI_Comm comm)
+	cdef int c_randomized_svd  "randomized_svd"(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, const int r, const int p, const int q, int seed, MPI_Comm comm)
+	# Single precision
+	cdef int c_stsqr_svd_tree  "stsqr_svd_tree"(float *Ui, float *S, float *VT, float *Ai, const int m, const int n, const int tree, MPI_Comm comm)
+	cdef int c_sgram_svd       "sgram_svd"(float *Ui, float *S, float *VT, float *Ai, const int m, const int n, const float cond_max, MPI_Comm comm)
+	cdef int c_srandomized_svd "srandomized_svd"(float *Ui, float *S, float *VT, float *Ai, const int m, const int n, const int r, const int p, const int q, int seed, MPI_Comm comm)
 cdef extern from "truncation.h":
-	cdef int  c_compute_truncation_residual "compute_truncation_residual"(double *S, double res, const int n)
-	cdef void c_compute_truncation          "compute_truncation"(double *Ur, double *Sr, double *VTr, double *U, double *S, double *VT, const int m, const int n, const int N)
+	cdef int  c_compute_truncation_residual  "compute_truncation_residual"(double *S, double res, const int n)
+	cdef void c_compute_truncation           "compute_truncation"(double *Ur, double *Sr, double *VTr, double *U, double *S, double *VT, const int m, const int n, const int N)
+	cdef int  c_scompute_truncation_residual "scompute_truncation_residual"(float *S, float res, const int n)
+	cdef void c_scompute_truncation          "scompute_truncation"(float *Ur, float *Sr, float *VTr, float *U, float *S, float *VT, const int m, const int n, const int N)
+
+
+## Fused type between single and double precision
+ctypedef fused float_double:
+	float
+	double
 
 ## POD run method
-@cr('POD.run')
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def run(double[:,:] X,int remove_mean=True):
+def _run(float_double[:,:] X,int remove_mean,str method,int r,int p,int q,int seed,double cond_max,int overwrite_input,MPI.Comm comm,str tree):
 	'''
-	Run POD analysis of a matrix X.
-
-	Inputs:
-		- X[ndims*nmesh,n_temp_snapshots]: data matrix
-		- remove_mean:                     whether or not to remove the mean flow
-
-	Returns:
-		- U:  are the POD modes.
-		- S:  are the singular values.
-		- V:  are the right singular vectors.
+	Run POD analysis of a matrix X in single or double precision.
 	'''
 	# Variables
 	cdef int m = X.shape[0], n = X.shape[1], mn = min(m,n), retval
-	cdef double *X_mean
-	cdef double *Y
-	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD
+	cdef float_double *Y
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
+	cdef object dtype = np.float32 if float_double is float else np.double
+	cdef float_double[:] X_mean = np.zeros((m,),dtype=dtype)
+	cdef bint randomized = method.lower() == 'randomized', gram = method.lower() == 'gram'
+	if not randomized and not gram and not method.lower() == 'tsqr': raiseError('Method <%s> not implemented!'%method)
+	if not tree in TSQR_TREES: raiseError('TSQR tree <%s> not implemented!'%tree)
+	cdef int itree = TSQR_TREES[tree]
+	if randomized:
+		if r <= 0: raiseError('A target rank r is needed for the randomized SVD!')
+		# Only r modes are computed
+		mn = min(r,n)
 	# Output arrays
-	cdef np.ndarray[np.double_t,ndim=2] U = np.zeros((m,mn),dtype=np.double)
-	cdef np.ndarray[np.double_t,ndim=1] S = np.zeros((mn,) ,dtype=np.double)
-	cdef np.ndarray[np.double_t,ndim=2] V = np.zeros((n,mn),dtype=np.double)
-	# Allocate memory
-	Y = <double*>malloc(m*n*sizeof(double))
+	cdef float_double[:,:] U = np.zeros((m,mn),dtype=dtype)
+	cdef float_double[:]   S = np.zeros((mn,) ,dtype=dtype)
+	cdef float_double[:,:] V = np.zeros((mn,n),dtype=dtype)
+	# Allocate memory, X is used as buffer when overwriting the input
+	Y = &X[0,0] if overwrite_input else <float_double*>malloc(m*n*sizeof(float_double))
 	if remove_mean:
 		cr_start('POD.temporal_mean',0)
-		X_mean = <double*>malloc(m*sizeof(double))
-		# Compute temporal mean
-		c_temporal_mean(X_mean,&X[0,0],m,n)
-		# Compute substract temporal mean
-		c_subtract_mean(Y,&X[0,0],X_mean,m,n)
-		free(X_mean)
+		# Compute temporal mean and substract it
+		if float_double is float:
+			c_stemporal_mean(&X_mean[0],&X[0,0],m,n)
+			c_ssubtract_mean(Y,&X[0,0],&X_mean[0],m,n)
+		else:
+			c_temporal_mean(&X_mean[0],&X[0,0],m,n)
+			c_subtract_mean(Y,&X[0,0],&X_mean[0],m,n)
 		cr_stop('POD.temporal_mean',0)
-	else:
-		memcpy(Y,&X[0,0],m*n*sizeof(double))
+	elif not overwrite_input:
+		memcpy(Y,&X[0,0],m*n*sizeof(float_double))
 	# Compute SVD
 	cr_start('POD.SVD',0)
-	retval = c_tsqr_svd(&U[0,0],&S[0],&V[0,0],Y,m,n,MPI_COMM.ob_mpi)
+	if float_double is float:
+		if randomized:
+			retval = c_srandomized_svd(&U[0,0],&S[0],&V[0,0],Y,m,n,mn,p,q,seed,MPI_COMM.ob_mpi)
+		elif gram:
+			retval = c_sgram_svd(&U[0,0],&S[0],&V[0,0],Y,m,n,cond_max,MPI_COMM.ob_mpi)
+		else:
+			retval = c_stsqr_svd_tree(&U[0,0],&S[0],&V[0,0],Y,m,n,itree,MPI_COMM.ob_mpi)
+	else:
+		if randomized:
+			retval = c_randomized_svd(&U[0,0],&S[0],&V[0,0],Y,m,n,mn,p,q,seed,MPI_COMM.ob_mpi)
+		elif gram:
+			retval = c_gram_svd(&U[0,0],&S[0],&V[0,0],Y,m,n,cond_max,MPI_COMM.ob_mpi)
+		else:
+			retval = c_tsqr_svd_tree(&U[0,0],&S[0],&V[0,0],Y,m,n,itree,MPI_COMM.ob_mpi)
 	cr_stop('POD.SVD',0)
-	free(Y)
-	# Return
+	if not overwrite_input: free(Y)
+	# Return, X is left centered when it is overwritten
 	if not retval == 0: raiseError('Problems computing SVD!')
-	return U,S,V
+	return np.asarray(U),np.asarray(S),np.asarray(V),np.asarray(X_mean)
+
+def _run_shared(X,remove_mean,tree,overwrite_input,dtype,comm):
+	'''
+	Run POD analysis of a matrix X with the snapshot matrix in node
+	shared memory, the SVD is done by the node leaders on the rows
+	of their whole node.
+	'''
+	# X is only copied if it is not a NodeArray of the working precision
+	if isinstance(X,NodeArray):
+		Y = X if overwrite_input and X.dtype == dtype else X.empty_like(dtype=dtype)
+	else:
+		Y = NodeArray(np.shape(X),dtype,comm)
+	if not Y is X: Y.local[:,:] = np.asarray(X)
+	X_mean = np.zeros((Y.shape[0],),dtype=dtype)
+	if remove_mean:
+		cr_start('POD.temporal_mean',0)
+		X_mean = temporal_mean(Y.local)
+		Y.local[:,:] -= X_mean[:,np.newaxis]
+		cr_stop('POD.temporal_mean',0)
+	Y.barrier()
+	# Compute SVD
+	cr_start('POD.SVD',0)
+	Us,Ss,Vs = tsqr_svd_shared(Y,tree)
+	U,S,V    = np.array(Us.local), np.array(Ss.node), np.array(Vs.node)
+	cr_stop('POD.SVD',0)
+	for A in (Us,Ss,Vs): A.free()
+	if not Y is X: Y.free()
+	# Return, X is left centered when it is overwritten
+	return (U,S,V,X_mean) if overwrite_input else (U,S,V)
+
+@cr('POD.run')
+def run(X,int remove_mean=True,str method='tsqr',int r=-1,int p=10,int q=1,int seed=-1,double cond_max=1e6,int overwrite_input=False,object dtype=np.double,MPI.Comm comm=None,str tree='binary',int shared=False):
+	'''
+	Run POD analysis of a matrix X.
+
+	Inputs:
+		- X[ndims*nmesh,n_temp_snapshots]: data matrix
+		- remove_mean:                     whether or not to remove the mean flow
+		- method:                          SVD algorithm, 'tsqr' (full thin SVD), 'gram' (method of snapshots) or 'randomized'
+		- r:                               target rank for the randomized SVD
+		- p:                               oversampling for the randomized SVD (default 10)
+		- q:                               power iterations for the randomized SVD (default 1)
+		- seed:                            seed for the randomized SVD (< 0 for a random seed)
+		- cond_max:                        maximum condition number for the method of snapshots, TSQR is used above it (default 1e6)
+		- overwrite_input:                 use X as work buffer to remove the mean, X is left centered on exit and
+		                                   the mean is returned, views of Dataset variables are copied instead
+		- dtype:                           working precision, np.double (default) or np.float32
+		- comm:                            communicator of the processors that hold X (default MPI.COMM_WORLD)
+		- tree:                            reduction tree of the TSQR, 'binary' (default), 'flat', 'butterfly', 'node' or 'cholqr2'
+		- shared:                          keep the snapshot matrix in node shared memory (always for a NodeArray X), only with 'tsqr'
+
+	Returns:
+		- U:      are the POD modes.
+		- S:      are the singular values.
+		- V:      are the right singular vectors.
+		- X_mean: temporal mean removed from X, only with overwrite_input.
+	'''
+	if not np.dtype(dtype) in (np.float32,np.double): raiseError('Data type <%s> not supported!'%np.dtype(dtype).name)
+	if shared or isinstance(X,NodeArray):
+		if not method.lower() == 'tsqr': raiseError('Method <%s> does not run on shared memory!'%method)
+		return _run_shared(X,remove_mean,tree,overwrite_input,np.dtype(dtype),comm)
+	# X is only copied if it does not have the working precision
+	X = np.ascontiguousarray(X,dtype=dtype)
+	inplace = overwrite_input
+	# Views of the variables of a Dataset are copied instead of overwritten
+	if overwrite_input and shares_dataset_memory(X):
+		raiseWarning('POD.run - X is a view of a Dataset variable, it is copied instead of overwritten!')
+		inplace = False
+	U,S,V,X_mean = _run(X,remove_mean,method,r,p,q,seed,cond_max,inplace,comm,tree)
+	return (U,S,V,X_mean) if overwrite_input else (U,S,V)
 
 ## POD truncate method
 @cr('POD.truncate')
@@ -90,7 +197,7 @@ def run(double[:,:] X,int remove_mean=True):
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def truncate(double[:,:] U, double[:] S, double[:,:] V, double r=1e-8):
+def truncate(float_double[:,:] U, float_double[:] S, float_double[:,:] V, double r=1e-8):
 	'''
 	Truncate POD matrices (U,S,V) given a residual r.
 
@@ -106,16 +213,23 @@ def truncate(double[:,:] U, double[:] S, double[:,:] V, double r=1e-8):
 		- V(N,n)  are the right singular vectors (truncated at N).
 	'''
 	cdef int m = U.shape[0], n = S.shape[0], N
+	cdef object dtype = np.float32 if float_double is float else np.double
 	# Compute N using S
-	N  = c_compute_truncation_residual(&S[0],r,n)
+	if float_double is float:
+		N = c_scompute_truncation_residual(&S[0],r,n)
+	else:
+		N = c_compute_truncation_residual(&S[0],r,n)
 	# Allocate output arrays
-	cdef np.ndarray[np.double_t,ndim=2] Ur = np.zeros((m,N),dtype=np.double)
-	cdef np.ndarray[np.double_t,ndim=1] Sr = np.zeros((N,),dtype=np.double)
-	cdef np.ndarray[np.double_t,ndim=2] Vr = np.zeros((N,n),dtype=np.double)
+	cdef float_double[:,:] Ur = np.zeros((m,N),dtype=dtype)
+	cdef float_double[:]   Sr = np.zeros((N,),dtype=dtype)
+	cdef float_double[:,:] Vr = np.zeros((N,n),dtype=dtype)
 	# Truncate
-	c_compute_truncation(&Ur[0,0],&Sr[0],&Vr[0,0],&U[0,0],&S[0],&V[0,0],m,n,N)
+	if float_double is float:
+		c_scompute_truncation(&Ur[0,0],&Sr[0],&Vr[0,0],&U[0,0],&S[0],&V[0,0],m,n,N)
+	else:
+		c_compute_truncation(&Ur[0,0],&Sr[0],&Vr[0,0],&U[0,0],&S[0],&V[0,0],m,n,N)
 	# Return
-	return Ur, Sr, Vr
+	return np.asarray(Ur), np.asarray(Sr), np.asarray(Vr)
 
 ## POD reconstruct method
 @cr('POD.reconstruct')
@@ -123,7 +237,7 @@ def truncate(double[:,:] U, double[:] S, double[:,:] V, double r=1e-8):
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def reconstruct(double[:,:] U, double[:] S, double[:,:] V):
+def reconstruct(float_double[:,:] U, float_double[:] S, float_double[:,:] V):
 	'''
 	Reconstruct the flow given the POD decomposition matrices
 	that can be possibly truncated.
@@ -139,15 +253,21 @@ def reconstruct(double[:,:] U, double[:] S, double[:,:] V):
 		- X(m,n)  is the reconstructed flow.
 	'''
 	cdef int m = U.shape[0], N = S.shape[0], n = V.shape[1]
-	cdef np.ndarray[np.double_t,ndim=2] X = np.zeros((m,n),dtype=np.double)
-	cdef double *Vtmp
+	cdef float_double[:,:] X = np.zeros((m,n),dtype=np.float32 if float_double is float else np.double)
+	cdef float_double *Vtmp
 	# Copy V to Vtmp so V is not modified by the routine
-	Vtmp = <double*>malloc(N*n*sizeof(double))
-	memcpy(Vtmp,&V[0,0],N*n*sizeof(double))
-	# Scale V by S doing V' = diag(S) x V
-	c_vecmat(&S[0],Vtmp,N,n)
-	# Compute X = U x V'
-	c_matmul(&X[0,0],&U[0,0],Vtmp,m,n,N)
+	Vtmp = <float_double*>malloc(N*n*sizeof(float_double))
+	memcpy(Vtmp,&V[0,0],N*n*sizeof(float_double))
+	if float_double is float:
+		# Scale V by S doing V' = diag(S) x V
+		c_svecmat(&S[0],Vtmp,N,n)
+		# Compute X = U x V'
+		c_smatmul(&X[0,0],&U[0,0],Vtmp,m,n,N)
+	else:
+		# Scale V by S doing V' = diag(S) x V
+		c_vecmat(&S[0],Vtmp,N,n)
+		# Compute X = U x V'
+		c_matmul(&X[0,0],&U[0,0],Vtmp,m,n,N)
 	# Return
 	free(Vtmp)
-	return X
+	return np.asarray(X)
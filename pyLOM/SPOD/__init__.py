@@ -8,6 +8,8 @@
 
 __VERSION__ = '1.0.0'
 
-from .wrapper import run
-from .utils   import extract_modes, save, load
-from .plots import plotMode, plotSpectra
+from .wrapper   import run
+from .streaming import StreamingSPOD
+from .result    import SPODResult
+from .utils     import extract_modes, save, load, load_result
+from .plots     import plotMode, plotSpectra
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+#
+# pyLOM - Python Low Order Modeling.
+#
+# SPOD result container.
+#
+# Last rev: 17/10/2026
+from __future__ import print_function, division
+
+import numpy as np
+
+from ..             import inp_out as io
+from ..utils.cr     import cr
+from ..utils.errors import raiseError
+
+
+class SPODResult(object):
+	'''
+	Result of a SPOD analysis, holding the complex modes of each frequency.
+
+	The modes are stored per frequency, U(nf,M,nBlks), in the order the
+	frequencies were computed and the sort by the energy of the leading
+	mode is kept as a permutation index, so that sorting does not move
+	the modes. They can live in memory or in an HDF5 file, in which case
+	only the frequencies and blocks that are requested are loaded.
+
+	For compatibility, the result unpacks as L, P, f with L, P and f
+	sorted and P the real part of the modes arranged as P(M*nBlks,nf).
+	The temporal mean is available as X_mean.
+	'''
+	def __init__(self, L, U, f, X_mean=None, rows=None, file=None):
+		'''
+		Class constructor
+
+		Inputs:
+			> L(nf,nBlks):     modal energy spectra.
+			> U(nf,M,nBlks):   complex modes, an array or an HDF5 dataset.
+			> f(nf):           frequency vector.
+			> X_mean:          temporal mean.
+			> rows:            rows of U held by this processor (default all).
+			> file:            HDF5 file backing U, closed with the result.
+		'''
+		self._L      = np.asarray(L)
+		self._U      = U
+		self._f      = np.asarray(f)
+		self._X_mean = X_mean
+		self._rows   = (0,U.shape[1]) if rows is None else rows
+		self._file   = file
+		# Sort the frequencies by the energy of the leading mode
+		self._order  = np.argsort(self._L[:,0])[::-1]
+
+	def __len__(self):
+		return self._f.shape[0]
+
+	def __str__(self):
+		'''
+		String representation
+		'''
+		s  = 'SPODResult of %d frequencies and %d blocks:\n' % (len(self),self.nblocks)
+		s += '  > M = %d\n' % self.M
+		s += '  > storage = %s\n' % ('memory' if self._file is None else self._file.filename)
+		return s
+
+	def __iter__(self):
+		return iter((self.L, self.P, self.f))
+
+	def modes(self,ifreq,iblock=None):
+		'''
+		Complex modes of a frequency.
+
+		Inputs:
+			- ifreq:  frequency in the sorted order (0 is the most energetic).
+			- iblock: block of the mode (None will return all of them).
+
+		Returns:
+			- U(M,nBlks) or U(M,): complex modes of the frequency.
+		'''
+		i0, i1 = self._rows
+		return np.asarray(self._U[self._order[ifreq],i0:i1,:] if iblock is None else self._U[self._order[ifreq],i0:i1,iblock])
+
+	@cr('SPOD.extract_modes')
+	def extract_modes(self,ivar,npoints,iblock=1,modes=[],reshape=True,part='real'):
+		'''
+		Extract modes for a certain variable, only the
+		requested frequencies of the block are loaded.
+
+		Inputs:
+			- ivar:    variable (starting at 1).
+			- npoints: number of points of the mesh.
+			- iblock:  block of the modes (starting at 1).
+			- modes:   frequencies in the sorted order (starting at 1, empty will extract all).
+			- reshape: flatten the output.
+			- part:    real, imag, abs or complex.
+
+		Returns:
+			- out(npoints,nmodes): modes of the variable.
+		'''
+		if not part in ('real','imag','abs','complex'): raiseError('Part <%s> not implemented!'%part)
+		nvars = self.M//npoints
+		if len(modes) == 0: modes = np.arange(1,len(self)+1,dtype=np.int32)
+		out = np.zeros((npoints,len(modes)),np.complex128 if part == 'complex' else np.double)
+		for imode, m in enumerate(modes):
+			u = self.modes(m-1,iblock-1)[ivar-1:nvars*npoints:nvars]
+			out[:,imode] = u if part == 'complex' else getattr(np,part)(u)
+		return out.reshape((len(modes)*npoints,),order='C') if reshape else out
+
+	@cr('SPOD.save')
+	def save(self,fname,ptable,nvars=1,pointData=True,mode='w',compression=None):
+		'''
+		Store the result in serial or parallel
+		according to the partition used to compute the SPOD,
+		optionally compressed with the filters of h5_filters.
+		'''
+		i0, i1 = self._rows
+		io.h5_save_SPOD_result(fname,self._L,np.asarray(self._U[:,i0:i1,:]),self._f,ptable,nvars=nvars,pointData=pointData,mode=mode,compression=compression)
+
+	def close(self):
+		'''
+		Close the HDF5 file backing the modes.
+		'''
+		if self._file is not None: self._file.close()
+		self._file = None
+
+	@property
+	def L(self):
+		return self._L[self._order,:]
+	@property
+	def f(self):
+		return self._f[self._order]
+	@property
+	def P(self):
+		# Real part of the modes in the sorted order, built on every
+		# access so that the result does not hold a second copy
+		i0, i1 = self._rows
+		U = np.real(np.stack([self._U[ifreq,i0:i1,:] for ifreq in self._order],axis=0))
+		return np.ascontiguousarray(U.transpose(2,1,0).reshape((-1,len(self))))
+	@property
+	def order(self):
+		return self._order
+	@property
+	def X_mean(self):
+		return self._X_mean
+	@property
+	def M(self):
+		return self._rows[1] - self._rows[0]
+	@property
+	def nblocks(self):
+		return self._L.shape[1]
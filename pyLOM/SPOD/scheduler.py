@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+#
+# pyLOM - Python Low Order Modeling.
+#
+# SPOD scheduling of the frequencies among processors.
+#
+# Last rev: 17/10/2026
+from __future__ import print_function, division
+
+import numpy as np
+from mpi4py import MPI
+
+from .store         import FourierStore
+from ..vmmath       import tsqr_svd
+from ..utils.cr     import cr
+from ..utils.errors import raiseError
+from ..utils.parall import worksplit, mpi_comm
+
+
+class FrequencyScheduler(object):
+	'''
+	Schedules the SVD of the SPOD frequencies among groups of processors.
+
+	The processors are split in ngroups contiguous groups, each one with its
+	own sub-communicator, and the frequencies in as many contiguous slabs.
+	The Fourier coefficients of a slab are moved to the processors of its
+	group, each of them collecting the rows of consecutive processors, so
+	that every group solves its frequencies independently of the others.
+	The modes are moved back to the original partition of the rows.
+	'''
+	def __init__(self, M, nf, ngroups=1, comm=None):
+		'''
+		Class constructor
+
+		Inputs:
+			> M:       number of rows held by this processor.
+			> nf:      number of frequencies.
+			> ngroups: number of groups of processors.
+			> comm:    communicator of the processors that hold the rows (default MPI.COMM_WORLD).
+		'''
+		comm, rank, size = mpi_comm(comm)
+		if ngroups < 1 or ngroups > size: raiseError('The number of groups must be between 1 and the number of processors!')
+		self._world   = comm
+		self._ngroups = min(ngroups,nf)
+		self._M       = M
+		# Contiguous groups of processors and slabs of frequencies
+		self._granks  = [worksplit(0,size,g,self._ngroups) for g in range(self._ngroups)]
+		self._fslabs  = [worksplit(0,nf,g,self._ngroups) for g in range(self._ngroups)]
+		self._group   = [g for g, (r0,r1) in enumerate(self._granks) if r0 <= rank < r1][0]
+		self._comm    = comm.Split(self._group,rank) if self._ngroups > 1 else comm
+		# Rows of every processor and processor of each group that collects them, dest[w,g]
+		self._rows    = np.array(comm.allgather(M),dtype=np.int64)
+		self._dest    = np.array([[r0 + (w*(r1-r0))//size for (r0,r1) in self._granks] for w in range(size)],dtype=np.int64)
+		# Processors whose rows are collected by this one
+		self._srcs    = np.where(self._dest[:,self._group] == rank)[0]
+
+	def __str__(self):
+		'''
+		String representation
+		'''
+		s  = 'FrequencyScheduler of %d groups:\n' % self._ngroups
+		s += '  > group = %d (%d processors)\n' % (self._group,self._comm.Get_size())
+		s += '  > frequencies = [%d,%d)\n' % self.frequencies
+		return s
+
+	def _counts(self,nB):
+		'''
+		Number of elements sent to and received from every processor
+		when moving the slabs to the groups
+		'''
+		size, rank = self._world.Get_size(), self._world.Get_rank()
+		f0, f1  = self.frequencies
+		scounts = np.zeros((size,),np.int64)
+		rcounts = np.zeros((size,),np.int64)
+		for g, (g0,g1) in enumerate(self._fslabs):
+			scounts[self._dest[rank,g]] = self._M*(g1-g0)*nB
+		rcounts[self._srcs] = self._rows[self._srcs]*(f1-f0)*nB
+		return scounts, rcounts
+
+	@cr('SPOD.scatter_frequencies')
+	def scatter(self,Q):
+		'''
+		Move the Fourier coefficients to the group that solves each frequency.
+
+		Inputs:
+			- Q(M,nf,nBlks): Fourier coefficients of the rows of this processor.
+
+		Returns:
+			- Qg(Mg,nfg,nBlks): Fourier coefficients of the frequencies of the group
+			                    for the rows collected by this processor.
+		'''
+		if self._ngroups == 1: return Q
+		nB = Q.shape[2]
+		f0, f1  = self.frequencies
+		# The destinations grow with the group, so the slabs are packed in order
+		scounts, rcounts = self._counts(nB)
+		sendbuf = np.concatenate([Q[:,g0:g1,:].ravel() for (g0,g1) in self._fslabs])
+		recvbuf = np.empty((np.sum(rcounts),),Q.dtype)
+		self._world.Alltoallv([sendbuf,(scounts,np.cumsum(scounts)-scounts)],[recvbuf,(rcounts,np.cumsum(rcounts)-rcounts)])
+		return recvbuf.reshape((-1,f1-f0,nB))
+
+	@cr('SPOD.gather_frequencies')
+	def gather(self,Pg):
+		'''
+		Move the result of the group back to the processors that own the rows.
+
+		Inputs:
+			- Pg(Mg,nfg,nBlks): result of the frequencies of the group for the
+			                    rows collected by this processor.
+
+		Returns:
+			- P(M,nf,nBlks): result for the rows of this processor.
+		'''
+		if self._ngroups == 1: return Pg
+		nB = Pg.shape[2]
+		# Same exchange as the scatter with the counts reversed
+		rcounts, scounts = self._counts(nB)
+		sendbuf = np.ascontiguousarray(Pg).ravel()
+		recvbuf = np.empty((np.sum(rcounts),),Pg.dtype)
+		self._world.Alltoallv([sendbuf,(scounts,np.cumsum(scounts)-scounts)],[recvbuf,(rcounts,np.cumsum(rcounts)-rcounts)])
+		P, i0 = np.empty((self._M,self._fslabs[-1][1],nB),Pg.dtype), 0
+		for (g0,g1) in self._fslabs:
+			P[:,g0:g1,:] = recvbuf[i0:i0+self._M*(g1-g0)*nB].reshape((self._M,g1-g0,nB))
+			i0 += self._M*(g1-g0)*nB
+		return P
+
+	def allgather(self,Lg):
+		'''
+		Gather on every processor the per frequency result Lg(nfg,...) of all the groups.
+		'''
+		if self._ngroups == 1: return Lg
+		out = self._world.allgather(Lg if self._comm.Get_rank() == 0 else None)
+		return np.concatenate([out[r0] for (r0,r1) in self._granks],axis=0)
+
+	def free(self):
+		'''
+		Release the sub-communicator of the group.
+		'''
+		if not self._comm is self._world: self._comm.Free()
+		self._comm = None
+
+	@property
+	def comm(self):
+		return self._comm
+	@property
+	def group(self):
+		return self._group
+	@property
+	def frequencies(self):
+		return self._fslabs[self._group]
+	@property
+	def rows(self):
+		# Global rows collected by this processor, consecutive as its sources are
+		offs = np.concatenate(([0],np.cumsum(self._rows)))
+		return int(offs[self._srcs[0]]), int(offs[self._srcs[-1]+1])
+
+
+def _svd_slab(Qg,nBlks,comm,method):
+	'''
+	SVD of the Fourier coefficients Qg(Mg,nfg,nBlks) of a slab of frequencies
+	whose rows are distributed among the processors of comm.
+	'''
+	nfg = Qg.shape[1]
+	Lg  = np.zeros((nfg,nBlks),np.double)
+	if method == 'tsqr':
+		Pg = np.zeros(Qg.shape,Qg.dtype)
+		for ifreq in range(nfg):
+			U, S, _ = tsqr_svd(np.ascontiguousarray(Qg[:,ifreq,:])/np.sqrt(nBlks),comm=comm)
+			Pg[:,ifreq,:] = U
+			Lg[ifreq,:]   = S*S
+	elif method == 'eigen':
+		# Cross-spectral density matrices C = Q^H x Q / nBlks of all the frequencies
+		Qt = np.ascontiguousarray(np.swapaxes(Qg,0,1))
+		C  = np.matmul(np.conj(np.swapaxes(Qt,1,2)),Qt)/nBlks
+		comm.Allreduce(MPI.IN_PLACE,C,op=MPI.SUM)
+		# Eigendecomposition in descending order, L are the eigenvalues
+		w, V = np.linalg.eigh(C)
+		w, V = w[:,::-1], V[:,:,::-1]
+		tol  = nBlks*np.finfo(w.dtype).eps*w[:,:1]
+		Lg[:,:] = np.where(w > tol,w,0.)
+		# Modes U = Q x V x (nBlks L)^-1/2, null directions are set to zero
+		winv = np.where(w > tol,1./np.sqrt(nBlks*np.where(w > tol,w,1.)),0.)
+		Pg   = np.ascontiguousarray(np.swapaxes(np.matmul(Qt,V*winv[:,np.newaxis,:]),0,1))
+	else:
+		raiseError('Method <%s> not implemented!'%method)
+	return Lg, Pg
+
+
+@cr('SPOD.svd_frequencies')
+def svd_frequencies(Q,nBlks,ngroups=1,method='tsqr',comm=None):
+	'''
+	SVD of the Fourier coefficients of every frequency, with the frequencies
+	scheduled among ngroups groups of processors that work independently.
+
+	Inputs:
+		- Q(M,nf,nBlks): Fourier coefficients of the rows of this processor,
+		                 or the FourierStore where they have been spilled.
+		- nBlks:         number of blocks.
+		- ngroups:       number of groups of processors.
+		- method:        'tsqr' for the TSQR SVD of each frequency or 'eigen' for the
+		                 eigendecomposition of the nBlks x nBlks cross-spectral density
+		                 matrices, which are reduced at once for all the frequencies.
+		- comm:          communicator of the processors that hold Q (default MPI.COMM_WORLD).
+
+	Returns:
+		- L(nf,nBlks):   modal energy spectra.
+		- P(M,nf,nBlks): complex SPOD modes, or the HDF5 dataset U(nf,MG,nBlks) of
+		                 the FourierStore, where they overwrite the coefficients.
+	'''
+	if isinstance(Q,FourierStore):
+		# Every processor reads from the store the rows it collects, one frequency at a time,
+		# and writes back its modes so that they are never held in memory
+		sched  = FrequencyScheduler(Q.M,Q.nf,ngroups,comm)
+		(f0,f1), (i0,i1) = sched.frequencies, sched.rows
+		Lg = np.zeros((f1-f0,nBlks),np.double)
+		for ifreq in range(f0,f1):
+			Lf, Pf = _svd_slab(Q.read(ifreq,i0,i1)[:,np.newaxis,:],nBlks,sched.comm,method)
+			Lg[ifreq-f0,:] = Lf[0,:]
+			Q.write_modes(ifreq,Pf[:,0,:],i0,i1)
+		L, P = sched.allgather(Lg), Q.modes()
+	else:
+		sched  = FrequencyScheduler(Q.shape[0],Q.shape[1],ngroups,comm)
+		Lg, Pg = _svd_slab(sched.scatter(Q),nBlks,sched.comm,method)
+		L, P   = sched.allgather(Lg), sched.gather(Pg)
+	sched.free()
+	return L, P
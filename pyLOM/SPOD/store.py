@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+#
+# pyLOM - Python Low Order Modeling.
+#
+# SPOD out-of-core storage of the Fourier coefficients.
+#
+# Last rev: 17/10/2026
+from __future__ import print_function, division
+
+import os, numpy as np, h5py
+
+from ..utils.cr     import cr
+from ..utils.errors import raiseError
+from ..utils.parall import mpi_comm
+
+
+BUFF_BYTES  = 256*1024*1024 # Memory used to buffer the blocks before spilling them
+CHUNK_BYTES = 1024*1024     # Target size of the HDF5 chunks
+
+
+class FourierStore(object):
+	'''
+	Out-of-core storage of the Fourier coefficients of SPOD, so that
+	only one frequency at a time has to be held in memory for its SVD.
+
+	The coefficients are stored frequency major, Q(nf,M,nBlks), in an HDF5
+	dataset whose chunks span (1,Mc,nb). The FFT of the blocks is buffered
+	in memory nb blocks at a time, so that every write fills whole chunks,
+	and reading a frequency reads whole chunks that are contiguous in the
+	rows. The rows of every processor are consecutive in the file.
+
+	Once a frequency has been solved its coefficients are overwritten by
+	its modes, so that the file ends up holding the modes U(nf,M,nBlks)
+	without any extra memory or disk space.
+	'''
+	def __init__(self, fname, M, nf, nBlks, dtype=np.complex128, nbuff=0, keep=False, comm=None):
+		'''
+		Class constructor
+
+		Inputs:
+			> fname: name of the HDF5 file where the coefficients are spilled.
+			> M:     number of rows held by this processor.
+			> nf:    number of frequencies.
+			> nBlks: number of blocks.
+			> dtype: complex type of the coefficients.
+			> nbuff: number of blocks buffered before each write (0 will set it from the available buffer size).
+			> keep:  keep the file when the store is closed.
+			> comm:  communicator of the processors that hold the rows (default MPI.COMM_WORLD).
+		'''
+		comm, rank, size = mpi_comm(comm)
+		rows = np.array(comm.allgather(M),dtype=np.int64)
+		self._comm   = comm
+		self._fname  = fname
+		self._keep   = keep
+		self._M      = M
+		self._nf     = nf
+		self._nBlks  = nBlks
+		self._i0     = int(np.sum(rows[:rank]))
+		self._MG     = int(np.sum(rows))
+		itemsize     = np.dtype(dtype).itemsize
+		# Blocks buffered and chunk size, must be the same on every processor
+		nb = nbuff if nbuff > 0 else BUFF_BYTES//max(int(np.max(rows))*nf*itemsize,1)
+		self._nb     = int(min(max(nb,1),nBlks))
+		Mc           = int(min(max(CHUNK_BYTES//(self._nb*itemsize),1),self._MG))
+		self._buff   = np.zeros((nf,M,self._nb),dtype)
+		self._file   = h5py.File(fname,'w',driver='mpio',comm=comm) if not size == 1 else h5py.File(fname,'w')
+		self._dset   = self._file.create_dataset('Q',(nf,self._MG,nBlks),dtype=dtype,chunks=(1,Mc,self._nb))
+		self._iblk   = 0
+
+	def __str__(self):
+		'''
+		String representation
+		'''
+		s  = 'FourierStore of %d frequencies in <%s>:\n' % (self._nf,self._fname)
+		s += '  > shape = (%d,%d,%d)\n' % self.shape
+		s += '  > chunks = (%d,%d,%d)\n' % self._dset.chunks
+		return s
+
+	@cr('SPOD.store_write')
+	def write(self,iblk,qk):
+		'''
+		Store the Fourier coefficients of a block, the blocks
+		must be written in order.
+
+		Inputs:
+			- iblk:      block number.
+			- qk(M,nf):  Fourier coefficients of the rows of this processor.
+		'''
+		if not iblk == self._iblk: raiseError('Block %d written out of order, expected %d!'%(iblk,self._iblk))
+		ib = iblk % self._nb
+		self._buff[:,:,ib] = np.transpose(qk)
+		self._iblk += 1
+		# Spill whole chunks once the buffer is full or at the last block
+		if ib == self._nb-1 or self._iblk == self._nBlks:
+			if self._M > 0: self._dset[:,self._i0:self._i0+self._M,iblk-ib:iblk+1] = self._buff[:,:,:ib+1]
+
+	@cr('SPOD.store_read')
+	def read(self,ifreq,i0=None,i1=None):
+		'''
+		Load the Fourier coefficients of a frequency.
+
+		Inputs:
+			- ifreq:  frequency number.
+			- i0, i1: global rows to read (default the rows of this processor).
+
+		Returns:
+			- q(i1-i0,nBlks): Fourier coefficients of the frequency.
+		'''
+		if not self._iblk == self._nBlks: raiseError('Not all the blocks have been written!')
+		if i0 is None: i0, i1 = self._i0, self._i0 + self._M
+		return self._dset[ifreq,i0:i1,:]
+
+	@cr('SPOD.store_write_modes')
+	def write_modes(self,ifreq,u,i0=None,i1=None):
+		'''
+		Overwrite the Fourier coefficients of a solved frequency with its modes.
+
+		Inputs:
+			- ifreq:          frequency number.
+			- u(i1-i0,nBlks): modes of the frequency.
+			- i0, i1:         global rows to write (default the rows of this processor).
+		'''
+		if i0 is None: i0, i1 = self._i0, self._i0 + self._M
+		if i1 > i0: self._dset[ifreq,i0:i1,:] = u
+
+	def modes(self):
+		'''
+		Hand over the modes once every frequency has been solved. The
+		coefficients are renamed as U and the file is kept open, so the
+		store must not be closed afterwards.
+
+		Returns:
+			- U(nf,MG,nBlks): HDF5 dataset of the modes.
+		'''
+		self._buff = None
+		# Every processor must have written its modes before they are read
+		self._file.flush()
+		self._comm.Barrier()
+		self._file.move('Q','U')
+		self._dset = self._file['U']
+		return self._dset
+
+	def close(self):
+		'''
+		Close the store and remove its file unless it is kept.
+		'''
+		self._file.close()
+		self._buff = None
+		# Every processor must have closed the file before it is removed
+		self._comm.Barrier()
+		if not self._keep and self._comm.Get_rank() == 0: os.remove(self._fname)
+
+	@property
+	def fname(self):
+		return self._fname
+	@property
+	def shape(self):
+		return (self._nf,self._MG,self._nBlks)
+	@property
+	def M(self):
+		return self._M
+	@property
+	def rows(self):
+		return self._i0, self._i0 + self._M
+	@property
+	def file(self):
+		return self._file
+	@property
+	def nf(self):
+		return self._nf
+	@property
+	def nbuff(self):
+		return self._nb
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+#
+# pyLOM - Python Low Order Modeling.
+#
+# SPOD streaming algorithm.
+#
+# Last rev: 17/10/2026
+from __future__ import print_function, division
+
+import numpy as np
+
+from .wrapper       import _window
+from ..vmmath       import batched_fft
+from ..utils.cr     import cr
+from ..utils.errors import raiseError
+from ..utils.parall import mpi_reduce
+
+
+class StreamingSPOD(object):
+	'''
+	Streaming SPOD of a data matrix whose snapshots arrive over time, following
+	O. T. Schmidt and A. Towne, ‘An efficient streaming algorithm for spectral
+	proper orthogonal decomposition’, Comput. Phys. Commun., vol. 237,
+	pp. 98–109, Apr. 2019,
+
+	doi: 10.1016/j.cpc.2018.11.009.
+
+	The snapshots are accumulated until a Welch block of nDFT snapshots is
+	complete. The block is then windowed and transformed with a single batched
+	FFT, and the Fourier realization of each frequency is folded into the
+	low-rank basis of that frequency with a rank-one update of its thin SVD.
+	Only the last nDFT snapshots and the bases are kept, so the memory scales
+	with O(M nDFT + M nf r) instead of the O(M N + M nf nBlks) of SPOD.run.
+
+	When the mean is removed and it is not given, the running mean at the
+	time each block is completed is subtracted from that block, as in
+	Schmidt and Towne (2019). The method works on matrices partitioned by rows.
+	'''
+	def __init__(self, dt, nDFT, nolap=0, r=10, remove_mean=True, X_mean=None, comm=None):
+		'''
+		Class constructor
+
+		Inputs:
+			> dt:          timestep between adjacent snapshots.
+			> nDFT:        number of snapshots in each block.
+			> nolap:       number of overlap snapshots between blocks (0 will set default value: 50% nDFT).
+			> r:           maximum number of modes kept per frequency.
+			> remove_mean: whether or not to remove the mean flow.
+			> X_mean:      temporal mean, if known, otherwise the running mean is used.
+			> comm:        communicator of the processors that hold the rows (default MPI.COMM_WORLD).
+		'''
+		if nDFT <= 1:     raiseError('The number of snapshots per block must be greater than one!')
+		if r <= 0:        raiseError('The maximum rank r must be positive!')
+		if nolap == 0:    nolap = int(np.floor(nDFT/2))
+		if nolap >= nDFT: raiseError('The overlap must be smaller than the block!')
+		self._dt          = dt
+		self._nDFT        = nDFT
+		self._nolap       = nolap
+		self._r           = r
+		self._comm        = comm
+		self._remove_mean = remove_mean
+		self._fixed_mean  = X_mean is not None
+		self._mean        = None if X_mean is None else np.ascontiguousarray(X_mean,dtype=np.double)
+		# Window and scaling of the Fourier coefficients, all the
+		# frequencies but the first and the last one are doubled
+		self._window, winWeight = _window(nDFT)
+		self._nf          = nDFT//2 + 1
+		self._fact        = np.full((self._nf,),2.*winWeight/nDFT)
+		self._fact[[0,-1]] = winWeight/nDFT
+		self._nsnaps      = 0
+		self._nblocks     = 0
+		self._buffer      = None # last nDFT snapshots
+		self._nbuff       = 0    # number of snapshots in the buffer
+		self._U           = None # modes per frequency, stored as U(nf,M,k)
+		self._S           = None # singular values per frequency, stored as S(nf,k)
+
+	def __len__(self):
+		return self._nsnaps
+
+	def __str__(self):
+		'''
+		String representation
+		'''
+		s  = 'StreamingSPOD of %d snapshots in %d blocks:\n' % (len(self),self.nblocks)
+		s += '  > nDFT = %d, nolap = %d\n' % (self._nDFT,self._nolap)
+		s += '  > rank = %d (max %d)\n' % (self.rank,self._r)
+		s += '  > remove mean = %s\n' % str(self._remove_mean)
+		return s
+
+	def _fold(self,Y):
+		'''
+		Fold the Fourier realizations of a block into the bases of
+		each frequency, the right singular vectors are not needed
+		'''
+		if self._remove_mean: Y = Y - self._mean[:,np.newaxis]
+		q  = np.ascontiguousarray(np.transpose(batched_fft(np.ascontiguousarray(Y*self._window))*self._fact))
+		# Project q onto the modes and normalize its complement, q = U x c + h x p,
+		# the projection is done twice to keep h orthogonal to U when q is (nearly)
+		# in the span of the modes
+		UH = np.conj(np.swapaxes(self._U,1,2))
+		c  = np.zeros(self._S.shape,np.complex128)
+		for _ in range(2):
+			ci = mpi_reduce(np.matmul(UH,q[:,:,np.newaxis])[:,:,0],op='sum',all=True,comm=self._comm)
+			q -= np.matmul(self._U,ci[:,:,np.newaxis])[:,:,0]
+			c += ci
+		p  = np.sqrt(mpi_reduce(np.sum(np.real(q*np.conj(q)),axis=1),op='sum',all=True,comm=self._comm))
+		q /= np.where(p > 0.,p,1.)[:,np.newaxis]
+		# Small core matrices K = [S c; 0 p] and their SVD
+		nf, k = self._S.shape
+		K = np.zeros((nf,k+1,k+1),np.complex128)
+		K[:,np.arange(k),np.arange(k)] = self._S
+		K[:,:k,k] = c
+		K[:,k,k]  = p
+		Uk,S,_ = np.linalg.svd(K)
+		# Rotate the modes and keep the first r
+		kr = min(k+1,self._r)
+		self._U = np.matmul(np.concatenate((self._U,q[:,:,np.newaxis]),axis=2),Uk[:,:,:kr])
+		self._S = np.ascontiguousarray(S[:,:kr])
+		self._nblocks += 1
+
+	@cr('SPOD.streaming_update')
+	def update(self,X):
+		'''
+		Ingest a batch of snapshots, every block that
+		is completed is folded into the bases.
+
+		Inputs:
+			- X[ndims*nmesh,n_batch_snapshots]: batch of the data matrix
+		'''
+		X = np.ascontiguousarray(X,dtype=np.double)
+		if X.ndim == 1: X = X[:,np.newaxis]
+		m, b = X.shape
+		if self._buffer is None:
+			self._buffer = np.zeros((m,self._nDFT),np.double)
+			self._U      = np.zeros((self._nf,m,0),np.complex128)
+			self._S      = np.zeros((self._nf,0),np.double)
+			if self._remove_mean and not self._fixed_mean: self._mean = np.zeros((m,),np.double)
+		icol = 0
+		while icol < b:
+			# Fill the buffer up to the end of the block
+			nc = min(b-icol,self._nDFT-self._nbuff)
+			self._buffer[:,self._nbuff:self._nbuff+nc] = X[:,icol:icol+nc]
+			if self._remove_mean and not self._fixed_mean:
+				self._mean += (np.sum(X[:,icol:icol+nc],axis=1) - nc*self._mean)/(self._nsnaps+nc)
+			self._nbuff  += nc
+			self._nsnaps += nc
+			icol         += nc
+			if self._nbuff == self._nDFT:
+				self._fold(self._buffer)
+				# Keep the overlap for the next block
+				self._buffer[:,:self._nolap] = self._buffer[:,self._nDFT-self._nolap:]
+				self._nbuff = self._nolap
+
+	@cr('SPOD.streaming_finalize')
+	def finalize(self):
+		'''
+		Recover the SPOD of the blocks ingested so far,
+		it can be called at any moment of the stream.
+
+		Returns:
+			- L:  modal energy spectra.
+			- P:  SPOD modes, whose spatial dimensions are identical to those of X.
+			- f:  frequency vector.
+		'''
+		if self._nblocks == 0: raiseError('No complete block has been ingested!')
+		L = self._S*self._S/self._nblocks
+		P = np.ascontiguousarray(np.real(self._U).transpose(2,1,0).reshape((-1,self._nf)))
+		f = np.arange(self._nf)/self._dt/self._nDFT
+		# Sort the frequencies by the energy of the leading mode
+		order = np.argsort(L[:,0])[::-1]
+		return np.ascontiguousarray(L[order,:]), np.ascontiguousarray(P[:,order]), f[order]
+
+	@property
+	def rank(self):
+		return 0 if self._S is None else self._S.shape[1]
+	@property
+	def mean(self):
+		return self._mean
+	@property
+	def nsnaps(self):
+		return self._nsnaps
+	@property
+	def nblocks(self):
+		return self._nblocks
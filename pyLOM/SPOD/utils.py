@@ -10,6 +10,7 @@ from __future__ import print_function, division
 import numpy as np
 
 from ..         import inp_out as io
+from .result    import SPODResult
 from ..utils.cr import cr
 
 
@@ -33,18 +34,32 @@ def extract_modes(L,P,ivar,npoints,iblock=1,modes=[],reshape=True):
 
 
 @cr('SPOD.save')
-def save(fname,L,P,f,ptable,nvars=1,pointData=True,mode='w'):
+def save(fname,L,P,f,ptable,nvars=1,pointData=True,mode='w',chunks=None,compression=None):
 	'''
 	Store SPOD variables in serial or parallel
 	according to the partition used to compute the SPOD.
+	The chunk layout of P (e.g., 'mode') and its compression
+	filters are described in h5_chunks and h5_filters.
 	'''
-	io.h5_save_SPOD(fname,L,P,f,ptable,nvars=nvars,pointData=pointData,mode=mode)
+	io.h5_save_SPOD(fname,L,P,f,ptable,nvars=nvars,pointData=pointData,mode=mode,chunks=chunks,compression=compression)
 
 
 @cr('SPOD.load')
-def load(fname,vars=['L','P','f'],nmod=-1,ptable=None):
+def load(fname,vars=['L','P','f'],nmod=-1,ptable=None,comm=None):
 	'''
 	Load SPOD variables in serial or parallel
-	according to the partition used to compute the SPOD.
+	according to the partition used to compute the SPOD,
+	or among the processors of comm when it is not given.
+	'''
+	return io.h5_load_SPOD(fname,vars,nmod,ptable,comm)
+
+
+@cr('SPOD.load_result')
+def load_result(fname,ptable=None,comm=None):
+	'''
+	Load a SPOD result in serial or parallel according to the partition
+	used to compute the SPOD, or among the processors of comm when it is
+	not given. The modes are only read when requested.
 	'''
-	return io.h5_load_SPOD(fname,vars,nmod,ptable)
\ No newline at end of file
+	L, f, U, rows, file = io.h5_load_SPOD_result(fname,ptable,comm)
+	return SPODResult(L,U,f,rows=rows,file=file)
@@ -8,23 +8,36 @@
 from __future__ import print_function
 
 import numpy as np
-import scipy
 
-from ..vmmath       import temporal_mean, subtract_mean, tsqr_svd
+from .store         import FourierStore
+from .scheduler     import svd_frequencies
+from .result        import SPODResult
+from ..vmmath       import temporal_mean, subtract_mean, batched_fft
 from ..utils.cr     import cr, cr_start, cr_stop
-from ..utils.errors import raiseError
+from ..utils.errors import raiseError, raiseWarning
+from ..dataset      import shares_dataset_memory
 
 
 def _hammwin(N):
 	return np.transpose(0.54-0.46*np.cos(2*np.pi*np.arange(N)/(N-1)))
 
+def _window(nDFT):
+	'''
+	Hamming window of nDFT points and its gain correction
+	'''
+	window = _hammwin(nDFT)
+	return window, 1/np.mean(window)
+
 def _fft(Xf, winWeight, nDFT, nf):
-	return (winWeight/nDFT)*scipy.fft.fft(Xf)[:nf]
+	qk = batched_fft(Xf)
+	# Frequencies beyond the non negative ones are the conjugate of their mirror
+	if nf > qk.shape[1]: qk = np.concatenate((qk, np.conj(qk[:, nDFT-nf+1:nDFT-qk.shape[1]+1][:, ::-1])), axis=1)
+	return (winWeight/nDFT)*qk
 
 
 ## SPOD run method
 @cr('SPOD.run')
-def run(X, t, nDFT=0, nolap=0, remove_mean=True):
+def run(X, t, nDFT=0, nolap=0, remove_mean=True, overwrite_input=False, dtype=np.double, ngroups=1, method='tsqr', spill_file=None, comm=None):
 	'''
 	Run SPOD analysis of a matrix X.
 
@@ -34,66 +47,85 @@ def run(X, t, nDFT=0, nolap=0, remove_mean=True):
 		- npwin:             number of points in each window (0 will set default value: ~10% nt)
 		- nolap:             number of overlap points between windows (0 will set default value: 50% nwin)
 		- remove_mean:       whether or not to remove the mean flow
+		- overwrite_input:   use X as work buffer to remove the mean, X is left centered on exit (the mean is
+		                     in the X_mean of the result) and views of Dataset variables are copied instead
+		- dtype:             working precision, np.double (default) or np.float32
+		- ngroups:           number of groups of processors that solve the frequencies independently
+		- method:            SVD of each frequency, tsqr (default) or eigen (cross-spectral density matrix)
+		- spill_file:        HDF5 file where the Fourier coefficients are spilled to solve one frequency at a time and
+		                     then overwritten by the modes, which the result reads from it (None keeps them in memory)
+		- comm:              communicator of the processors that hold X (default MPI.COMM_WORLD)
 
 	Returns:
+		- SPODResult with the complex modes of each frequency, which unpacks as
 		- L:  modal energy spectra.
 		- P:  SPOD modes, whose spatial dimensions are identical to those of X.
 		- f:  frequency vector.
 	''' 
+	if not np.dtype(dtype) in (np.float32,np.double): raiseError('Data type <%s> not supported!'%np.dtype(dtype).name)
+	if not method in ('tsqr','eigen'): raiseError('Method <%s> not implemented!'%method)
+	# X is only copied if it does not have the working precision
+	X  = np.ascontiguousarray(X,dtype=dtype)
+	# Views of the variables of a Dataset are copied instead of overwritten
+	if overwrite_input and shares_dataset_memory(X):
+		raiseWarning('SPOD.run - X is a view of a Dataset variable, it is copied instead of overwritten!')
+		overwrite_input = False
 	M = X.shape[0]
 	N = X.shape[1]
 	dt = t[1] - t[0]
 	
 	if nDFT == 0:
 		nDFT = int(np.power(2,np.floor(np.log2(N/10))))
-	window = _hammwin(nDFT)
+	#Window and correction for FFT window gain
+	window, winWeight = _window(nDFT)
 	if nolap == 0:
 		nolap = int(np.floor(nDFT/2))
 	nBlks = int(np.floor((N-nolap)/(nDFT-nolap)))
-	#Correction for FFT window gain
-	winWeight = 1/np.mean(window)
 
 	#Remove temporal mean
+	X_mean = np.zeros((M,),dtype=X.dtype)
 	if remove_mean:
 		cr_start('SPOD.temporal_mean',0)
 		X_mean = temporal_mean(X)
-		Y      = subtract_mean(X, X_mean)
+		if overwrite_input:
+			X -= X_mean[:,np.newaxis]
+		else:
+			Y = subtract_mean(X, X_mean)
 		cr_stop('SPOD.temporal_mean',0)
-	else:
+	elif not overwrite_input:
 		Y = X.copy()
+	if overwrite_input: Y = X
 
 	#Set frequency axis
 	f  = np.arange(np.ceil(nDFT / 2) + 1) / dt / nDFT
 	nf = f.shape[0]
-	qk = np.zeros((M,nf),np.complex128)
-	Q  = np.zeros((M*nf,nBlks),np.complex128)
-	L  = np.zeros((nf,nBlks),np.double)
-	P  = np.zeros((M*nBlks,nf),np.double)
+	ctype = np.complex64 if X.dtype == np.float32 else np.complex128
+	Q  = np.zeros((M*nf,nBlks),ctype) if spill_file is None else FourierStore(spill_file,M,nf,nBlks,ctype,comm=comm)
 	cr_start('SPOD.fft',0)
 	for iblk in range(nBlks):
 		# Get time index for present block
 		i0 = iblk*(nDFT - nolap)
 		ix = np.arange(nDFT) + i0
-		for ip in range(M):
-			Xf = Y[ip, ix].copy()*window
-			qk[ip, :] = _fft(Xf, winWeight, nDFT, nf)
+		# FFT of the windowed block of all the mesh points at once
+		qk = _fft(Y[:, ix]*window, winWeight, nDFT, nf)
 		qk[:,1:-1] *= 2
-		Q[:, iblk] = qk.reshape((M*nf), order='F')
+		if spill_file is None:
+			Q[:, iblk] = qk.reshape((M*nf), order='F')
+		else:
+			Q.write(iblk, qk)
 	cr_stop('SPOD.fft',0)
 
 	cr_start('SPOD.SVD',0)
-	for ifreq, freq in enumerate(f):
-		qf         = Q[ifreq*M:(ifreq+1)*M, :].copy()/np.sqrt(nBlks)
-		U, S, V    = tsqr_svd(qf)
-		P[:,ifreq] = np.real(U.reshape((M*nBlks), order='F'))
-		L[ifreq,:] = np.abs(S*S)
+	if spill_file is None:
+		# Q is stored frequency major, Q(nf,M,nBlks)
+		L, U = svd_frequencies(np.swapaxes(Q.reshape((nf,M,nBlks)),0,1), nBlks, ngroups, method, comm)
+	else:
+		# Modes written to the file as they are solved, the result keeps it open
+		L, U = svd_frequencies(Q, nBlks, ngroups, method, comm)
+		cr_stop('SPOD.SVD',0)
+		return SPODResult(L, U, f, X_mean, rows=Q.rows, file=Q.file)
+	# Modes stored per frequency, U(nf,M,nBlks)
+	U    = np.ascontiguousarray(np.swapaxes(U,0,1))
 	cr_stop('SPOD.SVD',0)
 
-	cr_start('SPOD.sort',0)
-	order = np.argsort(L[:,0])[::-1]
-	P = P[:, order]
-	f = f[order]
-	L = L[order,:]
-	cr_stop('SPOD.sort',0)
-	  
-	return L, P, f
+	return SPODResult(L, U, f, X_mean)
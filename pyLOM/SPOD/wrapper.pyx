@@ -20,19 +20,29 @@ from libc.complex  cimport creal, cimag
 from mpi4py.libmpi cimport MPI_Comm
 from mpi4py        cimport MPI
 
+from .store         import FourierStore
+from .scheduler     import svd_frequencies
+from .result        import SPODResult
 from ..utils.cr     import cr, cr_start, cr_stop
-from ..utils.errors import raiseError
+from ..utils.errors import raiseError, raiseWarning
+from ..dataset      import shares_dataset_memory
 
-cdef extern from "vector_matrix.h" nogil:
-	# Double precision
-	cdef void   c_sort "sort"(double *v, int *index, int n)
 cdef extern from "averaging.h":
-	cdef void c_temporal_mean "temporal_mean"(double *out, double *X, const int m, const int n)
-	cdef void c_subtract_mean "subtract_mean"(double *out, double *X, double *X_mean, const int m, const int n)
+	cdef void c_temporal_mean  "temporal_mean"(double *out, double *X, const int m, const int n)
+	cdef void c_subtract_mean  "subtract_mean"(double *out, double *X, double *X_mean, const int m, const int n)
+	cdef void c_stemporal_mean "stemporal_mean"(float *out, float *X, const int m, const int n)
+	cdef void c_ssubtract_mean "ssubtract_mean"(float *out, float *X, float *X_mean, const int m, const int n)
 cdef extern from "svd.h":
 	cdef int c_ztsqr_svd "ztsqr_svd"(np.complex128_t *Ui, double *S, np.complex128_t *VT, np.complex128_t *Ai, const int m, const int n, MPI_Comm comm)
+	cdef int c_ctsqr_svd "ctsqr_svd"(np.complex64_t *Ui, float *S, np.complex64_t *VT, np.complex64_t *Ai, const int m, const int n, MPI_Comm comm)
 cdef extern from "fft.h":
-	cdef void c_fft1D "fft1D"(np.complex128_t *out, double *y, const int n)
+	cdef void c_fft1D_batched "fft1D_batched"(np.complex128_t *out, double *y, const int n, const int howmany)
+
+
+## Fused type between single and double precision
+ctypedef fused float_double:
+	float
+	double
 
 
 @cython.boundscheck(False) # turn off bounds-checking for entire function
@@ -50,107 +60,56 @@ cdef void _hammwin(double *out, int N):
 @cython.cdivision(True)    # turn off zero division check
 cdef double _mean(double *X, int n) noexcept:
 	cdef int i
-	cdef double out
+	cdef double out = 0.
 	for i in range(n):
 		out += X[i]
 	out /= <double>(n)
 	return out
 
-@cython.boundscheck(False) # turn off bounds-checking for entire function
-@cython.wraparound(False)  # turn off negative index wrapping for entire function
-@cython.nonecheck(False)
-@cython.cdivision(True)    # turn off zero division check
-cdef void _fft(np.complex128_t *out, double *Xf, double winWeight, int nDFT, int nf):
-	cdef int i
-	cdef double fact = winWeight/nDFT
-	cdef np.complex128_t *Yf
-	# Allocate memory
-	Yf = <np.complex128_t*>malloc(nDFT*sizeof(np.complex128_t))
-	# Compute FFT
-	c_fft1D(Yf,Xf,nDFT)
-	# Multiply by a factor
-	for i in range(nf):
-		out[i] = fact*Yf[i]
-	# Free memory
-	free(Yf)
-
-@cython.boundscheck(False) # turn off bounds-checking for entire function
-@cython.wraparound(False)  # turn off negative index wrapping for entire function
-@cython.nonecheck(False)
-@cython.cdivision(True)    # turn off zero division check
-cdef void _sort(double *L, double *P, double *f, int M, int nBlks, int nf):
-	cdef int ii, jj, index
-	cdef double tmp
-	cdef double *v
-	cdef int *idx
-	v   = <double*>malloc(nf*sizeof(double))
-	idx = <int*>malloc(nf*sizeof(int))
-	# Copy to v
-	for ii in range(nf):
-		v[ii] = L[nBlks*ii + 0]
-	# Obtain index array that sorts v
-	c_sort(v,idx,nf)
-	free(v)
-	# Reorder L, P and f arrays
-	for ii in range(nf):
-		index = nf-idx[ii]-1 # Reversed order
-		# Swap f
-		tmp      = f[index]
-		f[index] = f[ii]
-		f[ii]    = tmp
-		# Swap L
-		for jj in range(nBlks):
-			tmp                 = L[nBlks*index + jj]
-			L[nBlks*index + jj] = L[nBlks*ii + jj]
-			L[nBlks*ii + jj]    = tmp
-		# Swap P
-		for jj in range(M*nBlks):
-			tmp              = P[nf*jj + index]
-			P[nf*jj + index] = P[nf*jj + ii]
-			P[nf*jj + ii]    = tmp			
-	free(idx)
-
+def _window(int nDFT):
+	'''
+	Hamming window of nDFT points and its gain correction
+	'''
+	cdef np.ndarray[np.double_t,ndim=1] window = np.zeros((nDFT,),dtype=np.double)
+	_hammwin(&window[0],nDFT)
+	return window, 1.0/_mean(&window[0],nDFT)
 
 ## SPOD run method
-@cr('SPOD.run')
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def run(double[:,:] X, double[:] t, int nDFT=0, int nolap=0, int remove_mean=True):
+def _run(float_double[:,:] X, double[:] t, int nDFT, int nolap, int remove_mean, int overwrite_input, int ngroups, str method, object spill_file, MPI.Comm comm):
 	'''
-	Run SPOD analysis of a matrix X.
-
-	Inputs:
-		- X[ndims*nmesh,nt]: data matrix
-		- dt:                timestep between adjacent snapshots
-		- npwin:             number of points in each window (0 will set default value: ~10% nt)
-		- nolap:             number of overlap points between windows (0 will set default value: 50% nwin)
-		- remove_mean:       whether or not to remove the mean flow
-
-	Returns:
-		- L:  modal energy spectra.
-		- P:  SPOD modes, whose spatial dimensions are identical to those of X.
-		- f:  frequency vector.
-	''' 
-	cdef int i, iblk, ifreq, ip, i0, nBlks, nf, M = X.shape[0], N = X.shape[1]
-	cdef double winWeight, dt = t[1] - t[0]
-	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD
+	Run SPOD analysis of a matrix X in single or double precision.
+	The FFT of each window is computed in double precision while the
+	Fourier coefficients, the SVD and the modes use the precision of X.
+	The complex buffers are stored as interleaved real and imaginary parts.
+	'''
+	cdef int i, iblk, ifreq, ip, i0, iq, nq, nBlks, nf, M = X.shape[0], N = X.shape[1], retval
+	cdef double winWeight, fact, dt = t[1] - t[0]
+	cdef np.complex128_t qki
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
+	cdef object dtype = np.float32 if float_double is float else np.double
+	cdef object ctype = np.complex64 if float_double is float else np.complex128
+	cdef object store = None
 
 	cdef double *window
-	cdef double *X_mean
 	cdef double *Xf
-	cdef double *Y
+	cdef float_double *Y
 	cdef np.complex128_t *qk
-	cdef np.complex128_t *Q
-	cdef np.complex128_t *U
-	cdef double *S
-	cdef np.complex128_t *V
+	cdef float_double *Q
+	cdef float_double *qf
+	cdef float_double *U
+	cdef float_double *S
+	cdef float_double *V
 
 	# Output arrays
 	cdef np.ndarray[np.double_t,ndim=2] L
-	cdef np.ndarray[np.double_t,ndim=2] P
+	cdef object Uo
+	cdef float_double[:,:] Uv
 	cdef np.ndarray[np.double_t,ndim=1] f
+	cdef float_double[:] X_mean = np.zeros((M,),dtype=dtype)
 
 	# Deal with the window gain
 	if nDFT == 0: 
@@ -162,95 +121,148 @@ def run(double[:,:] X, double[:] t, int nDFT=0, int nolap=0, int remove_mean=Tru
 
 	#Correction for FFT window gain
 	winWeight = 1.0/_mean(window,nDFT)
+	fact      = winWeight/nDFT
 
 	if nolap == 0:
 		nolap = <int>(floor(nDFT/2))
 
 	nBlks = <int>(floor((N-nolap)/(nDFT-nolap)))
 
-	# Remove temporal mean
-	Y = <double*>malloc(M*N*sizeof(double))
+	# Remove temporal mean, X is used as buffer when overwriting the input
+	Y = &X[0,0] if overwrite_input else <float_double*>malloc(M*N*sizeof(float_double))
 	if remove_mean:
 		cr_start('SPOD.temporal_mean',0)
-		X_mean = <double*>malloc(M*sizeof(double))
-		# Compute temporal mean
-		c_temporal_mean(X_mean,&X[0,0],M,N)
-		# Compute substract temporal mean
-		c_subtract_mean(Y,&X[0,0],X_mean,M,N)
-		free(X_mean)
+		# Compute temporal mean and substract it
+		if float_double is float:
+			c_stemporal_mean(&X_mean[0],&X[0,0],M,N)
+			c_ssubtract_mean(Y,&X[0,0],&X_mean[0],M,N)
+		else:
+			c_temporal_mean(&X_mean[0],&X[0,0],M,N)
+			c_subtract_mean(Y,&X[0,0],&X_mean[0],M,N)
 		cr_stop('SPOD.temporal_mean',0)
-	else:
-		memcpy(Y,&X[0,0],M*N*sizeof(double))
+	elif not overwrite_input:
+		memcpy(Y,&X[0,0],M*N*sizeof(float_double))
 
 	# Set frequency axis
 	nf = <int>(ceil(nDFT/2)) + 1
 
 	f = np.zeros((nf,)       ,dtype=np.double)
 	L = np.zeros((nf,nBlks)  ,dtype=np.double)
-	P = np.zeros((M*nBlks,nf),dtype=np.double)
+	# Modes stored per frequency, U(nf,M,nBlks), seen as interleaved real and imaginary parts,
+	# they are written to the spill file instead when the coefficients are spilled
+	if spill_file is None:
+		Uo = np.zeros((nf,M,nBlks),dtype=ctype)
+		Uv = Uo.view(dtype).reshape((nf,2*M*nBlks))
 
 	# Set frequency axis
 	for i in range(nf):
 		f[i] = <double>(i)/dt/<double>(nDFT)
 
 	# Allocate memory
-	Xf = <double*>malloc(nDFT*sizeof(double))
+	Xf = <double*>malloc(M*nDFT*sizeof(double))
 	qk = <np.complex128_t*>malloc(M*nf*sizeof(np.complex128_t))
-	Q  = <np.complex128_t*>malloc(M*nf*nBlks*sizeof(np.complex128_t))
+	# Q only holds the present block when it is spilled to the store
+	if not spill_file is None: store = FourierStore(spill_file,M,nf,nBlks,ctype,comm=MPI_COMM)
+	nq = nBlks if store is None else 1
+	Q  = <float_double*>malloc(2*M*nf*nq*sizeof(float_double))
 	cr_start('SPOD.fft',0)
 	for iblk in range(nBlks):
+		iq = iblk if store is None else 0
 		i0 = iblk*(nDFT - nolap)
+		# Populate Xf with the windowed block of every mesh point
 		for ip in range(M):
-			# Populate Xf
 			for i in range(nDFT):
-				Xf[i] = Y[N*ip + (i + i0)] * window[i]
-			# FFT on Xf
-			_fft(&qk[nf*ip],Xf,winWeight,nDFT,nf)
-			# Multiply qk
-			for i in range(1,nf-1):
-				qk[nf*ip + i] *= 2.0
-		# Populate Q
+				Xf[nDFT*ip + i] = Y[N*ip + (i + i0)] * window[i]
+		# FFT of all the mesh points with a single plan
+		c_fft1D_batched(qk,Xf,nDFT,M)
+		# Populate Q, scaled by the window gain and doubled
+		# except for the first and last frequencies
 		for ip in range(M):
 			for i in range(nf):
-				Q[nf*nBlks*ip + nBlks*i + iblk] = qk[nf*ip + i]
+				qki = qk[nf*ip + i]*(fact if (i == 0 or i == nf-1) else 2.0*fact)
+				Q[2*(nf*nq*ip + nq*i + iq)]     = creal(qki)
+				Q[2*(nf*nq*ip + nq*i + iq) + 1] = cimag(qki)
+		if not store is None: store.write(iblk,np.asarray(<float_double[:2*M*nf]>Q).view(ctype).reshape((M,nf)))
 	cr_stop('SPOD.fft',0)
 
 	free(qk)
 	free(window)
 	free(Xf)
-
-	# Allocate memory
-	qf = <np.complex128_t*>malloc(M*nBlks*sizeof(np.complex128_t))
-	U  = <np.complex128_t*>malloc(M*nBlks*sizeof(np.complex128_t))
-	S  = <double*>malloc(M*nBlks*sizeof(double))
-	V  = <np.complex128_t*>malloc(M*nBlks*sizeof(np.complex128_t))
+	if not overwrite_input: free(Y)
 
 	cr_start('SPOD.SVD',0)
-	for ifreq in range(nf):
-		# Load block in qf
-		for i in range(M):
-			for iblk in range(nBlks):
-				qf[nBlks*i + iblk] = Q[nf*nBlks*i + nBlks*ifreq + iblk]/sqrt(nBlks)
-		# Run SVD
-		c_ztsqr_svd(U,S,V,qf,M,nBlks,MPI_COMM.ob_mpi)
-		# Store P
-		for i in range(M):
+	if store is None and ngroups == 1 and method == 'tsqr':
+		# Allocate memory
+		qf = <float_double*>malloc(2*M*nBlks*sizeof(float_double))
+		U  = <float_double*>malloc(2*M*nBlks*sizeof(float_double))
+		S  = <float_double*>malloc(M*nBlks*sizeof(float_double))
+		V  = <float_double*>malloc(2*M*nBlks*sizeof(float_double))
+		for ifreq in range(nf):
+			# Load block in qf
+			for i in range(M):
+				for iblk in range(nBlks):
+					qf[2*(nBlks*i + iblk)]     = Q[2*(nf*nBlks*i + nBlks*ifreq + iblk)]/sqrt(nBlks)
+					qf[2*(nBlks*i + iblk) + 1] = Q[2*(nf*nBlks*i + nBlks*ifreq + iblk) + 1]/sqrt(nBlks)
+			# Run SVD
+			if float_double is float:
+				retval = c_ctsqr_svd(<np.complex64_t*>U,S,<np.complex64_t*>V,<np.complex64_t*>qf,M,nBlks,MPI_COMM.ob_mpi)
+			else:
+				retval = c_ztsqr_svd(<np.complex128_t*>U,S,<np.complex128_t*>V,<np.complex128_t*>qf,M,nBlks,MPI_COMM.ob_mpi)
+			if not retval == 0: raiseError('Problems computing SVD!')
+			# Store the modes
+			memcpy(&Uv[ifreq,0],U,2*M*nBlks*sizeof(float_double))
+			# Store L
 			for iblk in range(nBlks):
-				P[i + M*iblk,ifreq] = creal(U[nBlks*i + iblk])
-		# Store L
-		for iblk in range(nBlks):
-			L[ifreq,iblk] = S[iblk]*S[iblk]
+				L[ifreq,iblk] = S[iblk]*S[iblk]
+		free(qf)
+		free(U)
+		free(S)
+		free(V)
+	else:
+		# Frequencies scheduled among groups of processors, Q is seen as Q(M,nf,nBlks)
+		Qc = store if not store is None else np.asarray(<float_double[:2*M*nf*nBlks]>Q).view(ctype).reshape((M,nf,nBlks))
+		Lc, Pc = svd_frequencies(Qc,nBlks,ngroups,method,MPI_COMM)
+		np.copyto(L,Lc)
+		if store is None: np.copyto(Uo,np.swapaxes(Pc,0,1))
 	cr_stop('SPOD.SVD',0)
-
-	free(qf)
 	free(Q)
-	free(U)
-	free(S)
-	free(V)
 
-	# Sort
-	cr_start('SPOD.sort',0)
-	_sort(&L[0,0],&P[0,0],&f[0],M,nBlks,nf)
-	cr_stop('SPOD.sort',0)
+	# Spilled modes are read from the file, that the result keeps open
+	if not store is None: return SPODResult(L,Pc,f,np.asarray(X_mean),rows=store.rows,file=store.file)
+	return SPODResult(L,Uo,f,np.asarray(X_mean))
 
-	return L, P, f
+@cr('SPOD.run')
+def run(X, double[:] t, int nDFT=0, int nolap=0, int remove_mean=True, int overwrite_input=False, object dtype=np.double, int ngroups=1, str method='tsqr', object spill_file=None, MPI.Comm comm=None):
+	'''
+	Run SPOD analysis of a matrix X.
+
+	Inputs:
+		- X[ndims*nmesh,nt]: data matrix
+		- dt:                timestep between adjacent snapshots
+		- npwin:             number of points in each window (0 will set default value: ~10% nt)
+		- nolap:             number of overlap points between windows (0 will set default value: 50% nwin)
+		- remove_mean:       whether or not to remove the mean flow
+		- overwrite_input:   use X as work buffer to remove the mean, X is left centered on exit (the mean is
+		                     in the X_mean of the result) and views of Dataset variables are copied instead
+		- dtype:             working precision, np.double (default) or np.float32
+		- ngroups:           number of groups of processors that solve the frequencies independently
+		- method:            SVD of each frequency, tsqr (default) or eigen (cross-spectral density matrix)
+		- spill_file:        HDF5 file where the Fourier coefficients are spilled to solve one frequency at a time and
+		                     then overwritten by the modes, which the result reads from it (None keeps them in memory)
+		- comm:              communicator of the processors that hold X (default MPI.COMM_WORLD)
+
+	Returns:
+		- SPODResult with the complex modes of each frequency, which unpacks as
+		- L:  modal energy spectra.
+		- P:  SPOD modes, whose spatial dimensions are identical to those of X.
+		- f:  frequency vector.
+	'''
+	if not np.dtype(dtype) in (np.float32,np.double): raiseError('Data type <%s> not supported!'%np.dtype(dtype).name)
+	if not method in ('tsqr','eigen'): raiseError('Method <%s> not implemented!'%method)
+	# X is only copied if it does not have the working precision
+	X = np.ascontiguousarray(X,dtype=dtype)
+	# Views of the variables of a Dataset are copied instead of overwritten
+	if overwrite_input and shares_dataset_memory(X):
+		raiseWarning('SPOD.run - X is a view of a Dataset variable, it is copied instead of overwritten!')
+		overwrite_input = False
+	return _run(X,t,nDFT,nolap,remove_mean,overwrite_input,ngroups,method,spill_file,comm)
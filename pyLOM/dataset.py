@@ -7,7 +7,7 @@
 # Last rev: 30/07/2021
 from __future__ import print_function, division
 
-import os, copy, mpi4py, numpy as np
+import os, copy, weakref, mpi4py, numpy as np
 mpi4py.rc.recv_mprobe = False
 from mpi4py import MPI
 
@@ -15,7 +15,18 @@ from .             import inp_out as io
 from .utils.cr     import cr
 from .utils.mem    import mem
 from .utils.errors import raiseError
-from .utils.parall import mpi_reduce
+from .utils.parall import NodeArray, mpi_reduce, mpi_alltoallv
+
+
+# Variables whose views have been returned by Dataset.X
+_VIEWED = weakref.WeakValueDictionary()
+
+def shares_dataset_memory(X):
+	'''
+	Whether X shares memory with a variable of a Dataset
+	of which Dataset.X has returned a view.
+	'''
+	return any(np.shares_memory(X,value) for value in list(_VIEWED.values()))
 
 
 class Dataset(object):
@@ -44,6 +55,12 @@ class Dataset(object):
 	def __len__(self):
 		return self._time.shape[0]
 
+	def __enter__(self):
+		return self
+
+	def __exit__(self,exc_type,exc_value,traceback):
+		self.close()
+
 	def __str__(self):
 		'''
 		String representation
@@ -120,8 +137,17 @@ class Dataset(object):
 		for v in varDict:
 			self[v] = np.concatenate((self[v],varDict[v]),axis=1)[:,idx]
 
+	def _time_slice(self,time_slice):
+		'''
+		Express a time slice as a slice when possible, so that
+		selecting it does not copy the data
+		'''
+		if not isinstance(time_slice,slice): return np.arange(len(self))[time_slice]
+		r = range(len(self))[time_slice]
+		return slice(r.start,r.stop if r.stop >= 0 else None,r.step)
+
 	@cr('Dataset.X')
-	def X(self,*args,time_slice=np.s_[:]):
+	def X(self,*args,time_slice=np.s_[:],out=None,shared=False):
 		'''
 		Return the X matrix for the selected variables
 
@@ -129,9 +155,26 @@ class Dataset(object):
 			X[:,:1000] -> X[:,np.s_[:1000]]
 		or
 			X[:,::5] -> X[:,np.s_[::5]]
+
+		A single double precision variable selected by a slice is returned
+		as a view of the variable, without copying it, hence writing on it
+		modifies the dataset (the overwrite_input option of the decompositions
+		warns and copies these views instead). Otherwise the matrix is written in out, if
+		given, or in a new array.
+
+		Lazy variables only read the selected instants.
+
+		With shared the matrix is returned as a NodeArray, in the shared
+		memory of the node of the processors of the partition table.
 		'''
 		# Select all variables if none is provided
 		variables = self.varnames if len(args) == 0 else args
+		time_slice = self._time_slice(time_slice)
+		# A single variable has the layout of X
+		value = self.var[variables[0]]['value']
+		if len(variables) == 1 and out is None and not shared and isinstance(value,np.ndarray) and value.dtype == np.double and isinstance(time_slice,slice):
+			_VIEWED[id(value)] = value
+			return value[:,time_slice]
 		# Compute the number of variables
 		nvars = 0
 		for var in variables:
@@ -139,20 +182,157 @@ class Dataset(object):
 		# Create output array
 		npoints = self.mesh.npoints if self.var[variables[0]]['point'] else self.mesh.ncells
 		ninst   = self._time[time_slice].shape[0]
-		X = np.zeros((nvars*npoints,ninst),np.double)
+		if out is None:
+			out = NodeArray((nvars*npoints,ninst),np.double,None if self._ptable is None else self._ptable.comm) if shared else np.zeros((nvars*npoints,ninst),np.double)
+		elif not out.shape == (nvars*npoints,ninst):
+			raiseError('Output buffer of shape %s does not match (%d,%d)!'%(str(out.shape),nvars*npoints,ninst))
+		X = out.local if isinstance(out,NodeArray) else out
 		# Populate output matrix
 		ivar = 0
 		for var in variables:
-			v = self.var[var]
+			v     = self.var[var]
+			value = v['value'][:,time_slice]
 			for idim in range(v['ndim']):
-				X[ivar:nvars*npoints:nvars,:] = v['value'][idim:v['ndim']*npoints:v['ndim'],time_slice]
+				X[ivar:nvars*npoints:nvars,:] = value[idim:v['ndim']*npoints:v['ndim'],:]
 				ivar += 1
-		return X
+		if isinstance(out,NodeArray): out.barrier()
+		return out
+
+	@cr('Dataset.probes')
+	def probes(self,xyz,*args,time_slice=np.s_[:]):
+		'''
+		Time series of the selected variables at a set of probes, taken
+		at the nearest point (or cell center for cell variables) of the
+		mesh among all the processors.
+
+		Returns a dictionary with the series of each variable as a
+		(ndim*nprobes,ninst) array, with the layout of the variables,
+		on all the processors.
+		'''
+		if self.mesh is None: raiseError('Probes need a mesh!')
+		# Select all variables if none is provided
+		variables  = self.varnames if len(args) == 0 else args
+		time_slice = self._time_slice(time_slice)
+		ninst = self._time[time_slice].shape[0]
+		comm  = None if self._ptable is None else self._ptable.comm
+		xyz   = np.atleast_2d(xyz)
+		iprb, out = {}, {}
+		for var in variables:
+			v = self.var[var]
+			if not v['point'] in iprb: iprb[v['point']] = self.mesh.nearest(xyz,cells=not v['point'],comm=comm)[1]
+			# Rows of the probes held by this processor
+			mine = np.nonzero(iprb[v['point']] >= 0)[0]
+			rows = (v['ndim']*iprb[v['point']][mine][:,np.newaxis] + np.arange(v['ndim'])).ravel()
+			orow = (v['ndim']*mine[:,np.newaxis] + np.arange(v['ndim'])).ravel()
+			series = np.zeros((v['ndim']*xyz.shape[0],ninst),v['value'].dtype)
+			if rows.shape[0] > 0:
+				sel = np.ix_(rows,time_slice) if isinstance(v['value'],np.ndarray) and not isinstance(time_slice,slice) else (rows,time_slice)
+				series[orow,:] = v['value'][sel]
+			out[var] = mpi_reduce(series,op='sum',all=True,comm=comm)
+		return out
+
+	def X_blocks(self,*args,time_slice=np.s_[:],block_size=100,axis=1):
+		'''
+		Iterate over blocks of the X matrix for the selected variables, so
+		that it can be streamed into the solvers without building it.
+
+		Inputs:
+			- time_slice: instants to select.
+			- block_size: number of instants (axis=1) or points (axis=0) per block.
+			- axis:       1 for blocks of columns and 0 for blocks of rows.
+
+		Yields the blocks of X, each of them a new array.
+		'''
+		variables  = self.varnames if len(args) == 0 else args
+		time_slice = self._time_slice(time_slice)
+		tidx       = np.arange(len(self))[time_slice]
+		if axis == 1:
+			for i0 in range(0,tidx.shape[0],block_size):
+				i1   = min(i0+block_size,tidx.shape[0])
+				tblk = tidx[i0:i1]
+				# Blocks of a slice are slices themselves
+				if isinstance(time_slice,slice):
+					stop = tidx[i1-1] + (1 if time_slice.step > 0 else -1)
+					tblk = slice(tidx[i0],stop if stop >= 0 else None,time_slice.step)
+				yield self.X(*variables,time_slice=tblk,out=np.zeros((self._X_rows(variables),i1-i0),np.double))
+		elif axis == 0:
+			nvars   = sum([self.var[var]['ndim'] for var in variables])
+			npoints = self._X_rows(variables)//nvars
+			for p0 in range(0,npoints,block_size):
+				p1   = min(p0+block_size,npoints)
+				out  = np.zeros(((p1-p0)*nvars,tidx.shape[0]),np.double)
+				ivar = 0
+				for var in variables:
+					v     = self.var[var]
+					value = v['value'][p0*v['ndim']:p1*v['ndim'],time_slice]
+					for idim in range(v['ndim']):
+						out[ivar::nvars,:] = value[idim::v['ndim'],:]
+						ivar += 1
+				yield out
+		else:
+			raiseError('Axis <%d> not valid!'%axis)
+
+	def _X_rows(self,variables):
+		'''
+		Number of rows of the X matrix for the selected variables
+		'''
+		npoints = self.mesh.npoints if self.var[variables[0]]['point'] else self.mesh.ncells
+		return npoints*sum([self.var[var]['ndim'] for var in variables])
+
+	@cr('Dataset.redistribute')
+	def redistribute(self,ptable):
+		'''
+		Redistribute the dataset among the processors according to a new
+		partition table, moving the rows in memory instead of going through
+		a file, e.g., to balance the load or to remove the idle master of a
+		dataset coming from Alya.
+
+		The cells are moved according to the bounds of the new table. With
+		a mesh, every processor then gets the points of its cells and the
+		points of the table are updated, otherwise the points are also moved
+		according to the bounds of the new table. Both tables must
+		be on the same communicator.
+		'''
+		old = self._ptable
+		if not ptable.check_split():
+			raiseError('Partition table of %d partitions not matching %d processors!'%(ptable.n_partitions,ptable.size))
+		if not MPI.Comm.Compare(ptable.comm,old.comm) in (MPI.IDENT,MPI.CONGRUENT):
+			raiseError('Partition tables on different communicators!')
+		if not np.sum(ptable.Elements) == np.sum(old.Elements) or (self._mesh is None and not np.sum(ptable.Points) == np.sum(old.Points)):
+			raiseError('Partition tables of different sizes!')
+		# The master does not hold any data
+		comm    = old.comm
+		active  = not (old.has_master and old.rank == 0)
+		ccounts = old.send_counts(ptable,old.rank,points=False)
+		if self._mesh is not None:
+			self._mesh, pplan = self._mesh.redistribute(ccounts,active,comm)
+			ptable.update_points(self._mesh.npoints)
+		else:
+			pplan = (np.s_[:],old.send_counts(ptable,old.rank,points=True),np.s_[:])
+		for var in self.varnames:
+			value = np.asarray(self[var])
+			ndim, ntime = self.var[var]['ndim'], value.shape[1]
+			# Move whole points or cells, with all their dimensions
+			rows  = value.reshape((-1,ndim*ntime)) if active else np.empty((0,ndim*ntime),value.dtype)
+			if self.var[var]['point']:
+				sidx, counts, perm = pplan
+				rows, _ = mpi_alltoallv(rows[sidx],counts,comm)
+				rows    = rows[perm]
+			else:
+				rows, _ = mpi_alltoallv(rows,ccounts,comm)
+			self[var] = rows.reshape((-1,ntime))
+		self._ptable = ptable
+		return self
 
 	@cr('Dataset.save')
 	def save(self,fname,**kwargs):
 		'''
 		Store the field in various formats.
+
+		For HDF5 files, chunks sets the chunk layout of the variables
+		('snapshot', 'point' or a tuple) and compression the filters
+		joined by + (shuffle, gzip[:level], lzf, truncate:bits).
+		append=True adds the instants at the end of the file.
 		'''
 		# Guess format from extension
 		fmt = os.path.splitext(fname)[1][1:] # skip the .
@@ -175,6 +355,13 @@ class Dataset(object):
 	def load(cls,fname,**kwargs):
 		'''
 		Load a field from various formats
+
+		For HDF5 files, vars selects the variables to load (default all)
+		and time_slice the instants, which are read only from the time
+		partitions that hold them. lazy=True keeps the variables in the
+		file and only reads the instants that are accessed, keeping up
+		to cache_size bytes of them in memory. comm sets the
+		processors that read the file (default MPI.COMM_WORLD).
 		'''
 		# Guess format from extension
 		fmt = os.path.splitext(fname)[1][1:] # skip the .
@@ -188,6 +375,14 @@ class Dataset(object):
 			return cls(ptable,mesh,time,**varDict)
 		raiseError('Cannot load file <%s>!'%fname)
 
+	def close(self):
+		'''
+		Close the HDF5 files kept open by the lazy variables,
+		which cannot be accessed afterwards.
+		'''
+		for var in self._vardict.values():
+			if isinstance(var['value'],io.H5Variable): var['value'].close()
+
 	@cr('Dataset.write')
 	def write(self,casestr,basedir='./',instants=[0],times=[0.],vars=[],fmt='vtk'):
 		'''
@@ -10,7 +10,8 @@ __VERSION__ = '1.0.0'
 
 # Pickle and HDF5 exchange format
 from .io_pkl  import pkl_load, pkl_save
-from .io_h5   import h5_load, h5_save, h5_append, h5_save_POD, h5_load_POD, h5_save_DMD, h5_load_DMD, h5_save_SPOD, h5_load_SPOD
+from .io_h5   import h5_load, h5_load_blocks, h5_save, h5_append, H5Appender, h5_save_POD, h5_load_POD, h5_save_DMD, h5_load_DMD, h5_save_SPOD, h5_load_SPOD, h5_save_SPOD_result, h5_load_SPOD_result
+from .io_h5lazy import H5Cache, H5Variable
 
 # VTK HDF5 3D format
 from .io_vtkh5 import vtkh5_save_mesh, vtkh5_save_field
@@ -18,4 +19,4 @@ from .io_vtkh5 import vtkh5_save_mesh, vtkh5_save_field
 # Ensight 3D format
 from .io_ensight import Ensight_readCase, Ensight_readCase2, Ensight_writeCase, Ensight_readGeo, Ensight_readGeo2, Ensight_writeGeo, Ensight_readField, Ensight_readField2, Ensight_writeField
 
-del io_pkl, io_h5, io_ensight
+del io_pkl, io_h5, io_h5lazy, io_ensight
@@ -11,33 +11,129 @@ import os, numpy as np, h5py
 
 from ..partition_table import PartitionTable
 from ..mesh            import MTYPE2ID, ID2MTYPE, Mesh
+from .io_h5lazy        import H5Cache, H5Variable, h5_read_columns, h5_read_rows
 from ..utils.cr        import cr
-from ..utils.parall    import MPI_COMM, MPI_RANK, MPI_SIZE, worksplit, writesplit, is_rank_or_serial, mpi_reduce, mpi_gather
+from ..utils.parall    import mpi_comm, worksplit, writesplit, is_rank_or_serial, mpi_reduce, mpi_gather
 from ..utils.errors    import raiseError
 
 
 PYLOM_H5_VERSION = (2,0)
+CHUNK_BYTES      = 1024*1024 # Target size of the HDF5 chunks
+
+
+def h5_chunks(shape,dtype,chunks):
+	'''
+	Chunk shape of a (rows,columns) dataset, where chunks is:
+		- None:       contiguous storage (chunked by h5py if compressed).
+		- 'snapshot': chunks of a single column, for snapshot or mode wise access.
+		- 'mode':     same as snapshot, the modes are the columns of U.
+		- 'point':    chunks of whole rows, for access to the time series of points.
+		- tuple:      explicit chunk shape.
+	'''
+	if chunks is None or isinstance(chunks,tuple): return chunks
+	nrows    = max(CHUNK_BYTES//np.dtype(dtype).itemsize,1)
+	if chunks in ('snapshot','mode'):
+		return (int(max(min(shape[0],nrows),1)),1)
+	if chunks == 'point':
+		return (int(max(min(shape[0],nrows//max(shape[1],1)),1)),int(max(shape[1],1)))
+	raiseError('Chunk layout <%s> not implemented!'%chunks)
+
+def h5_filters(compression):
+	'''
+	Parse the filters of a dataset, given as a string joined by +:
+		- shuffle:       byte shuffle, improves the compression of floats.
+		- gzip[:level]:  lossless deflate compression (level 4 by default).
+		- lzf:           fast lossless compression.
+		- truncate:bits: lossy, keep only bits of the mantissa of the floats.
+	e.g., 'truncate:16+shuffle+gzip:6'.
+
+	Returns the options of the dataset and the bits of the mantissa to keep (0 keeps all).
+	'''
+	opts, bits = {}, 0
+	if compression is None: return opts, bits
+	for filt in compression.split('+'):
+		name, _, arg = filt.partition(':')
+		if name == 'shuffle':
+			opts['shuffle'] = True
+		elif name == 'gzip':
+			opts['compression']      = 'gzip'
+			opts['compression_opts'] = int(arg) if len(arg) > 0 else 4
+		elif name == 'lzf':
+			opts['compression'] = 'lzf'
+		elif name == 'truncate':
+			bits = int(arg)
+		else:
+			raiseError('Filter <%s> not implemented!'%name)
+	return opts, bits
+
+def h5_create_dataset(group,name,shape,dtype,chunks=None,compression=None,resizable=False,comm=None):
+	'''
+	Create a (rows,columns) dataset with the given chunk layout and filters,
+	returns the dataset and the bits of the mantissa to keep when writing.
+	A resizable dataset can be extended along the columns and is chunked
+	by snapshots unless another layout is given. comm are the
+	processors that share the file (default MPI.COMM_WORLD).
+	'''
+	opts, bits = h5_filters(compression)
+	if resizable:
+		if chunks is None: chunks = 'snapshot'
+		opts['maxshape'] = (shape[0],None)
+	chunks     = h5_chunks(shape,dtype,chunks)
+	# Extensible dimensions are not limited by the current shape
+	if chunks is not None: opts['chunks'] = tuple(min(c,max(s,1)) if not resizable or i == 0 else max(c,1) for i,(c,s) in enumerate(zip(chunks,shape)))
+	if mpi_comm(comm)[2] > 1 and ('compression' in opts or 'shuffle' in opts) and not h5py.get_config().mpi:
+		raiseError('Compression in parallel requires h5py built with MPI!')
+	return group.create_dataset(name,shape,dtype=dtype,**opts), bits
+
+def h5_truncate(data,bits):
+	'''
+	Round the mantissa of floating point data to the given bits, so
+	that the trailing zeros are compressed by the lossless filters.
+	'''
+	data = np.asarray(data)
+	if bits <= 0 or not data.dtype.kind in 'fc': return data
+	real = np.ascontiguousarray(data).view(np.float32 if data.dtype in (np.float32,np.complex64) else np.float64)
+	nman = 23 if real.dtype == np.float32 else 52
+	if bits >= nman: return data
+	utyp = np.uint32 if real.dtype == np.float32 else np.uint64
+	drop = utyp(nman - bits)
+	u    = real.view(utyp)
+	# Round to nearest and clear the dropped bits
+	u    = (u + (utyp(1) << (drop - utyp(1)))) & ~((utyp(1) << drop) - utyp(1))
+	return u.view(real.dtype).view(data.dtype).reshape(data.shape)
+
+def h5_write(dset,sel,data,bits=0):
+	'''
+	Write data on a selection of a dataset, filtered datasets
+	need to be written collectively in parallel.
+	'''
+	data = h5_truncate(data,bits)
+	if dset.file.driver == 'mpio' and (dset.compression is not None or dset.shuffle):
+		with dset.collective:
+			dset[sel] = data
+	else:
+		dset[sel] = data
 
 
 @cr('h5IO.save')
-def h5_save(fname,time,varDict,mesh,ptable,mpio=True,nopartition=False):
+def h5_save(fname,time,varDict,mesh,ptable,mpio=True,nopartition=False,chunks=None,compression=None):
 	'''
-	Save a Dataset in HDF5
+	Save a Dataset in HDF5, see h5_chunks and h5_filters
+	for the chunk layouts and compression filters
 	'''
-	if mpio and not MPI_SIZE == 1:
-		h5_save_mpio(fname,time,varDict,mesh,ptable,nopartition)
+	if mpio and not ptable.size == 1:
+		h5_save_mpio(fname,time,varDict,mesh,ptable,nopartition,chunks,compression)
 	else:
-		h5_save_serial(fname,time,varDict,mesh,ptable)
+		h5_save_serial(fname,time,varDict,mesh,ptable,chunks,compression)
 
 @cr('h5IO.append')
-def h5_append(fname,time,varDict,mesh,ptable,mpio=True,nopartition=False):
+def h5_append(fname,time,varDict,mesh,ptable,mpio=True,nopartition=False,chunks=None,compression=None):
 	'''
-	Save a Dataset in HDF5
+	Append the instants of a Dataset at the end of an HDF5 file,
+	use an H5Appender to keep the file open between appends
 	'''
-	if mpio and not MPI_SIZE == 1:
-		h5_append_mpio(fname,time,varDict,mesh,ptable,nopartition)
-	else:
-		h5_append_serial(fname,time,varDict,mesh,ptable)
+	with H5Appender(fname,mesh,ptable,mpio,nopartition,chunks,compression) as appender:
+		appender.append(time,varDict)
 
 def h5_save_partition(file,ptable):
 	'''
@@ -62,7 +158,8 @@ def h5_save_mesh(file,mesh,ptable):
 		dset = group.create_dataset('type',(1,),dtype='i4',data=MTYPE2ID[mesh.type])
 		# Write the total number of cells and the total number of points
 		# Assume we might be dealing with a parallel mesh
-		npointG, ncellG = mesh.npointsG, mesh.ncellsG
+		npointG = mpi_reduce(mesh.npoints,op='sum',all=True,comm=ptable.comm)
+		ncellG  = mpi_reduce(mesh.ncells,op='sum',all=True,comm=ptable.comm)
 		if ptable.has_master: 
 			npointG -= 1
 			ncellG  -= 1
@@ -75,14 +172,14 @@ def h5_save_mesh(file,mesh,ptable):
 		dcellO = group.create_dataset('cellOrder',(ncellG,),dtype='i4')
 		dpoinO = group.create_dataset('pointOrder',(npointG,),dtype='i4')
 		# Skip master if needed
-		if ptable.has_master and MPI_RANK == 0: return None, None, None
+		if ptable.has_master and ptable.rank == 0: return None, None, None
 		# Point dataset
 		# Compute start and end of read, node data
-		istartp, iend = ptable.partition_bounds(MPI_RANK,points=True)
+		istartp, iend = ptable.partition_bounds(ptable.rank,points=True)
 		dxyz[istartp:iend,:]  = mesh.xyz
 		dpoinO[istartp:iend]  = mesh.pointOrder
 		# Compute start and end of read, cell data
-		istart, iend = ptable.partition_bounds(MPI_RANK,points=False)
+		istart, iend = ptable.partition_bounds(ptable.rank,points=False)
 		dconec[istart:iend,:] = mesh.connectivity + istartp
 		deltyp[istart:iend]   = mesh.eltype
 		dcellO[istart:iend]   = mesh.cellOrder
@@ -100,7 +197,8 @@ def h5_save_mesh_nopartition(file,mesh,ptable):
 		dset = group.create_dataset('type',(1,),dtype='i4',data=MTYPE2ID[mesh.type])
 		# Write the total number of cells and the total number of points
 		# Assume we might be dealing with a parallel mesh
-		npointG, ncellG = mesh.npointsG2, mesh.ncellsG2
+		npointG = mpi_reduce(mesh.pointOrder.max(),op='max',all=True,comm=ptable.comm) + 1
+		ncellG  = mpi_reduce(mesh.cellOrder.max(),op='max',all=True,comm=ptable.comm) + 1
 		group.create_dataset('npoints',(1,),dtype='i4',data=npointG)
 		group.create_dataset('ncells' ,(1,),dtype='i4',data=ncellG)
 		# Create the rest of the datasets for parallel storage
@@ -110,62 +208,69 @@ def h5_save_mesh_nopartition(file,mesh,ptable):
 		dcellO = group.create_dataset('cellOrder',(ncellG,),dtype='i4')
 		dpoinO = group.create_dataset('pointOrder',(npointG,),dtype='i4')
 		# Skip master if needed
-		if ptable.has_master and MPI_RANK == 0: return None, None, None
+		if ptable.has_master and ptable.rank == 0: return None, None, None
 		# Get the position where the points should be stored
 		inods,idx = np.unique(mesh.pointOrder,return_index=True)
 		# Write dataset - points
 		dxyz[inods,:] = mesh.xyz[idx,:]
 		dpoinO[inods] = mesh.pointOrder[idx]
                 # Compute start and end of read, cell data
-		istart, iend = ptable.partition_bounds(MPI_RANK,points=False)
+		istart, iend = ptable.partition_bounds(ptable.rank,points=False)
 		# Write dataset - cells
 		dconec[istart:iend,:] = mesh.pointOrder[mesh.connectivity]
 		deltyp[istart:iend]   = mesh.eltype
 		dcellO[istart:iend]   = mesh.cellOrder
 	return inods,idx,npointG
 
-def h5_create_variable_datasets(file,time,varDict,ptable,ipart=-1):
+def h5_create_variable_datasets(file,time,varDict,ptable,ipart=-1,chunks=None,compression=None,resizable=False):
 	'''
-	Create the variable datasets inside an HDF5 file
+	Create the variable datasets inside an HDF5 file,
+	resizable datasets can be extended in time
 	'''
 	# Store time array (common for all processes)
-	if not 'time' in file.keys(): file.create_dataset('time',time.shape,dtype=time.dtype,data=time)
+	if not 'time' in file.keys(): file.create_dataset('time',time.shape,dtype=time.dtype,data=time,maxshape=(None,) if resizable else None)
 	# Create group for variables
 	group = file.create_group('VARIABLES_%d'%ipart if ipart >= 0 else 'VARIABLES')
 	dsetDict = {}
 	for var in varDict.keys():
 		vargroup = group.create_group(var)
-		n     = mpi_reduce(varDict[var]['value'].shape[0],op='sum',all=True)
+		n     = mpi_reduce(varDict[var]['value'].shape[0],op='sum',all=True,comm=ptable.comm)
 		if ptable.has_master: n -= 1
 		npoin = int(file['MESH']['npoints'][0]) if varDict[var]['point'] else int(file['MESH']['ncells'][0])
 		ndim  = n//npoin
 		ntime = varDict[var]['value'].shape[1]
+		value, bits = h5_create_dataset(vargroup,'value',(ndim*npoin,ntime),varDict[var]['value'].dtype,chunks,compression,resizable,ptable.comm)
 		dsetDict[var] = {
 			'point' : vargroup.create_dataset('point',(1,),dtype='u1'),
 			'ndim'  : vargroup.create_dataset('ndim' ,(1,),dtype='i4'),
-			'value' : vargroup.create_dataset('value',(ndim*npoin,ntime),dtype=varDict[var]['value'].dtype),
+			'value' : value,
+			'bits'  : bits,
 		}
 	return dsetDict
 
-def h5_fill_variable_datasets(dsetDict,varDict,ptable,inods,idx):
+def h5_fill_variable_datasets(dsetDict,varDict,ptable,inods,idx,cols=np.s_[:]):
 	'''
-	Fill in the variable datasets inside an HDF5 file
+	Fill in the variable datasets inside an HDF5 file,
+	cols are the instants of the datasets that are written
 	'''
 	# Skip master if needed
-	if ptable.has_master and MPI_RANK == 0: return
+	if ptable.has_master and ptable.rank == 0:
+		if any([dsetDict[var]['bits'] > 0 or dsetDict[var]['value'].compression is not None for var in dsetDict.keys()]):
+			raiseError('Compression is not available for partitions with a master!')
+		return
 	for var in dsetDict.keys():
 		# Fill dataset
 		dsetDict[var]['point'][:] = varDict[var]['point']
 		dsetDict[var]['ndim'][:]  = varDict[var]['ndim']
 		if inods is None or not varDict[var]['point']:
 			# Compute start and end bounds for the variable
-			istart, iend = ptable.partition_bounds(MPI_RANK,ndim=varDict[var]['ndim'],points=varDict[var]['point'])
-			dsetDict[var]['value'][istart:iend,:]  = varDict[var]['value']
+			istart, iend = ptable.partition_bounds(ptable.rank,ndim=varDict[var]['ndim'],points=varDict[var]['point'])
+			h5_write(dsetDict[var]['value'],np.s_[istart:iend,cols],varDict[var]['value'],dsetDict[var]['bits'])
 		else:
 			if varDict[var]['ndim'] > 1: raiseError('Cannot deal with multi-dimensional arrays in no partition mode!')
-			dsetDict[var]['value'][inods,:] = varDict[var]['value'][idx,:]
+			h5_write(dsetDict[var]['value'],np.s_[inods,cols],np.asarray(varDict[var]['value'])[idx,:],dsetDict[var]['bits'])
 
-def h5_save_serial(fname,time,varDict,mesh,ptable):
+def h5_save_serial(fname,time,varDict,mesh,ptable,chunks=None,compression=None):
 	'''
 	Save a dataset in HDF5 in serial mode
 	'''
@@ -177,106 +282,140 @@ def h5_save_serial(fname,time,varDict,mesh,ptable):
 	# Store the mesh
 	inods,idx,npoints = h5_save_mesh(file,mesh,ptable)
 	# Store the variables
-	h5_fill_variable_datasets(h5_create_variable_datasets(file,time,varDict,ptable),varDict,ptable,inods,idx)
+	h5_fill_variable_datasets(h5_create_variable_datasets(file,time,varDict,ptable,chunks=chunks,compression=compression),varDict,ptable,inods,idx)
 	file.close()
 
-def h5_save_mpio(fname,time,varDict,mesh,ptable,nopartition):
+def h5_save_mpio(fname,time,varDict,mesh,ptable,nopartition,chunks=None,compression=None):
 	'''
 	Save a dataset in HDF5 in parallel mode
 	'''
 	# Open file
-	file = h5py.File(fname,'w',driver='mpio',comm=MPI_COMM)
+	file = h5py.File(fname,'w',driver='mpio',comm=ptable.comm)
 	file.attrs['Version'] = PYLOM_H5_VERSION
 	# Store partition table
-	h5_save_partition(file,PartitionTable.new(1,mesh.ncellsG2,mesh.npointsG2))
+	ncellG  = mpi_reduce(mesh.cellOrder.max(),op='max',all=True,comm=ptable.comm) + 1
+	npointG = mpi_reduce(mesh.pointOrder.max(),op='max',all=True,comm=ptable.comm) + 1
+	h5_save_partition(file,PartitionTable.new(1,ncellG,npointG))
 	# Store the mesh
 	inods,idx,npoints = h5_save_mesh(file,mesh,ptable) if not nopartition else h5_save_mesh_nopartition(file,mesh,ptable)
 	# Store the variables
-	h5_fill_variable_datasets(h5_create_variable_datasets(file,time,varDict,ptable),varDict,ptable,inods,idx)
+	h5_fill_variable_datasets(h5_create_variable_datasets(file,time,varDict,ptable,chunks=chunks,compression=compression),varDict,ptable,inods,idx)
 	file.close()
 
-def h5_append_serial(fname,time,varDict,mesh,ptable):
-	'''
-	Save a dataset in HDF5 in serial mode
-	'''
-	file = h5py.File(fname,'a')
-	if not hasattr(h5_append_serial,'ipart'):
-		# Input file does not exist, we create it with the whole structure
-		file.attrs['Version'] = PYLOM_H5_VERSION
-		# Store partition table
-		h5_save_partition(file,ptable)
-		# Store the mesh
-		inods,idx,npoints = h5_save_mesh(file,mesh,ptable)
-		# Start the partition counter
-		h5_append_serial.ipart   = 0
-		h5_append_serial.inods   = inods
-		h5_append_serial.idx     = idx
-		h5_append_serial.npoints = npoints
-	else:
-		# Check the file version
-		version = tuple(file.attrs['Version'])
-		if not version == PYLOM_H5_VERSION:
-			raiseError('File version <%s> not matching the tool version <%s>!'%(str(file.attrs['Version']),str(PYLOM_H5_VERSION)))
-		# Obtain from function
-		ipart   = h5_append_serial.ipart
-		inods   = h5_append_serial.inods
-		idx     = h5_append_serial.idx
-		npoints = h5_append_serial.npoints 
-		# Write the time partition on the file
-		h5_fill_variable_datasets(h5_create_variable_datasets(file,time,varDict,ptable,ipart=ipart),varDict,ptable,inods,idx)
-		# Update time
-		file['time'][:] = time
-		# Increase the partition counter
-		h5_append_serial.ipart += 1
-	file.close()
-
-def h5_append_mpio(fname,time,varDict,mesh,ptable,nopartition):
-	'''
-	Save a dataset in HDF5 in serial mode
-	'''
-	file = h5py.File(fname,'a',driver='mpio',comm=MPI_COMM)
-	if not hasattr(h5_append_mpio,'ipart'):
-		# Input file does not exist, we create it with the whole structure
-		file.attrs['Version'] = PYLOM_H5_VERSION
-		# Store partition table
-		h5_save_partition(file,ptable)
-		# Store the mesh
-		inods,idx,npoints = h5_save_mesh(file,mesh,ptable) if not nopartition else h5_save_mesh_nopartition(file,mesh,ptable)
-		# Start the partition counter
-		h5_append_mpio.ipart   = 0
-		h5_append_mpio.inods   = inods
-		h5_append_mpio.idx     = idx
-		h5_append_mpio.npoints = npoints
-	else:
-		# Check the file version
-		version = tuple(file.attrs['Version'])
-		if not version == PYLOM_H5_VERSION:
-			raiseError('File version <%s> not matching the tool version <%s>!'%(str(file.attrs['Version']),str(PYLOM_H5_VERSION)))
-		# Obtain from function
-		ipart   = h5_append_mpio.ipart
-		inods   = h5_append_mpio.inods
-		idx     = h5_append_mpio.idx
-		npoints = h5_append_mpio.npoints 
-		# Write the time partition on the file
-		h5_fill_variable_datasets(h5_create_variable_datasets(file,time,varDict,ptable,ipart=ipart),varDict,ptable,inods,idx)
-		# Update time
-		file['time'][:] = time
-		# Increase the partition counter
-		h5_append_mpio.ipart += 1
-	file.close()
+class H5Appender(object):
+	'''
+	Append time instants to a dataset stored in HDF5. The file is kept
+	open between appends and every variable is a single dataset that is
+	extended in time, so that each append only writes the new instants
+	and the file is read back as a dataset saved at once.
+
+	It is used as a context manager:
+		with H5Appender(fname,mesh,ptable) as app:
+			app.append(time,varDict)
+	An existing file is extended with the new instants.
+	'''
+	def __init__(self, fname, mesh, ptable, mpio=True, nopartition=False, chunks='snapshot', compression=None):
+		'''
+		Class constructor
+
+		Inputs:
+			> fname:       HDF5 file, created if it does not exist.
+			> mesh:        mesh of the dataset.
+			> ptable:      partition table of the dataset.
+			> mpio:        use parallel HDF5.
+			> nopartition: store the mesh and point data without the partition.
+			> chunks:      chunk layout of the variables (see h5_chunks).
+			> compression: filters of the variables (see h5_filters).
+		'''
+		self._file   = h5py.File(fname,'a',driver='mpio',comm=ptable.comm) if mpio and not ptable.size == 1 else h5py.File(fname,'a')
+		self._ptable = ptable
+		self._chunks = chunks
+		self._comp   = compression
+		_, self._bits = h5_filters(compression)
+		if not 'PARTITIONS' in self._file.keys():
+			# New file, we create it with the whole structure
+			self._file.attrs['Version'] = PYLOM_H5_VERSION
+			h5_save_partition(self._file,ptable)
+			self._inods,self._idx,_ = h5_save_mesh(self._file,mesh,ptable) if not nopartition else h5_save_mesh_nopartition(self._file,mesh,ptable)
+		else:
+			# Check the file version
+			version = tuple(self._file.attrs['Version'])
+			if not version == PYLOM_H5_VERSION:
+				raiseError('File version <%s> not matching the tool version <%s>!'%(str(self._file.attrs['Version']),str(PYLOM_H5_VERSION)))
+			if any(['VARIABLES_' in key for key in self._file.keys()]):
+				raiseError('Cannot append to a file with time partitions!')
+			# Position of the points when the mesh is not partitioned
+			self._inods, self._idx = None, None
+			if nopartition and not (ptable.has_master and ptable.rank == 0):
+				self._inods,self._idx = np.unique(mesh.pointOrder,return_index=True)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self,exc_type,exc_value,traceback):
+		self.close()
+
+	def __len__(self):
+		return self._file['time'].shape[0] if 'time' in self._file.keys() else 0
+
+	def __str__(self):
+		return 'H5Appender of %d instants in <%s>' % (len(self),self._file.filename)
+
+	@cr('H5Appender.append')
+	def append(self,time,varDict):
+		'''
+		Append a set of instants of the variables at the end of the file.
+
+		Inputs:
+			- time(nt):   instants to append.
+			- varDict:    variables as in a Dataset, with the values of the nt instants.
+		'''
+		if not 'VARIABLES' in self._file.keys():
+			# First append, create the datasets with the first instants
+			dsetDict = h5_create_variable_datasets(self._file,time,varDict,self._ptable,chunks=self._chunks,compression=self._comp,resizable=True)
+			h5_fill_variable_datasets(dsetDict,varDict,self._ptable,self._inods,self._idx)
+			return
+		if not set(varDict.keys()) == set(self._file['VARIABLES'].keys()):
+			raiseError('Variables <%s> not matching the ones in the file!'%','.join(varDict.keys()))
+		t0, t1 = len(self), len(self) + time.shape[0]
+		dsetDict = {}
+		for var in varDict.keys():
+			vargroup = self._file['VARIABLES'][var]
+			if vargroup['value'].maxshape[1] is not None: raiseError('Variable <%s> cannot be extended in time!'%var)
+			# Resizing is collective, all the processors take part
+			vargroup['value'].resize(t1,axis=1)
+			dsetDict[var] = {'point':vargroup['point'],'ndim':vargroup['ndim'],'value':vargroup['value'],'bits':self._bits}
+		self._file['time'].resize((t1,))
+		self._file['time'][t0:t1] = time
+		h5_fill_variable_datasets(dsetDict,varDict,self._ptable,self._inods,self._idx,cols=np.s_[t0:t1])
+
+	def close(self):
+		'''
+		Close the HDF5 file.
+		'''
+		if self._file is not None: self._file.close()
+		self._file = None
+
+	@property
+	def file(self):
+		return self._file
 
 
 @cr('h5IO.load')
-def h5_load(fname,mpio=True):
+def h5_load(fname,mpio=True,lazy=False,cache_size=512*1024*1024,vars=[],time_slice=np.s_[:],comm=None):
 	'''
-	Load a dataset in HDF5
+	Load a dataset in HDF5, in lazy mode the variables
+	are only read when they are accessed. Only the
+	variables in vars (default all) and the instants
+	in time_slice are loaded. The dataset is partitioned
+	among the processors of comm (default MPI.COMM_WORLD).
 	'''
-	if mpio and not MPI_SIZE == 1:
-		return h5_load_mpio(fname)
+	if mpio and not mpi_comm(comm)[2] == 1:
+		return h5_load_mpio(fname,lazy,cache_size,vars,time_slice,comm)
 	else:
-		return h5_load_serial(fname)
+		return h5_load_serial(fname,lazy,cache_size,vars,time_slice,comm)
 
-def h5_load_partition(file):
+def h5_load_partition(file,comm=None):
 	'''
 	Load a partition table inside an HDF5 file
 	'''
@@ -286,7 +425,7 @@ def h5_load_partition(file):
 	elements = np.array(file['PARTITIONS']['Elements'][:])
 	points   = np.array(file['PARTITIONS']['Points'][:])
 	# Return partition class
-	return PartitionTable(nparts,ids,elements,points)
+	return PartitionTable(nparts,ids,elements,points,comm=comm)
 
 def h5_load_size(file):
 	'''
@@ -308,7 +447,7 @@ def h5_load_mesh(file,ptable,repart):
 	# Read mesh type
 	mtype  = ID2MTYPE[int(file['MESH']['type'][0])]
 	# Read cell related variables
-	istart, iend = ptable.partition_bounds(MPI_RANK,points=False)
+	istart, iend = ptable.partition_bounds(ptable.rank,points=False)
 	conec  = np.array(file['MESH']['connectivity'][istart:iend,:],np.int32)
 	eltype = np.array(file['MESH']['eltype'][istart:iend],np.int32) 
 	cellO  = np.array(file['MESH']['cellOrder'][istart:iend],np.int32)
@@ -316,94 +455,89 @@ def h5_load_mesh(file,ptable,repart):
 	if repart:
 		# Warning! Repartition will only work if the input file is serial
 		# i.e., it does not have any repeated nodes, otherwise it wont work
-		inods  = ptable.partition_points(MPI_RANK,1,conec)
+		inods  = ptable.partition_points(ptable.rank,1,conec)
 		ptable.update_points(inods.shape[0])
 	else:
-		istart, iend = ptable.partition_bounds(MPI_RANK,points=True)
+		istart, iend = ptable.partition_bounds(ptable.rank,points=True)
 		inods = np.arange(istart,iend,dtype=np.int32)
-	xyz    = np.array(file['MESH']['xyz'][inods,:],np.double) 
-	pointO = np.array(file['MESH']['pointOrder'][inods],np.int32)
+	# Scattered points are read by runs of contiguous points
+	xyz    = np.array(h5_read_rows(file['MESH']['xyz'],inods),np.double) 
+	pointO = np.array(h5_read_rows(file['MESH']['pointOrder'],inods),np.int32)
 	# Fix the connectivity to start at zero
 	conec = np.searchsorted(pointO,conec.flatten()).reshape(conec.shape).astype(np.int32)
 	# Return
 	return Mesh(mtype,xyz,conec,eltype,cellO,pointO),inods
 
-def h5_load_variables_single(file,mesh,ptable,inods,repart):
+def h5_variable_rows(mesh,ptable,inods,repart,point,ndim):
+	'''
+	Rows of a variable in the HDF5 file that belong to this processor
+	'''
+	if mesh is None or not point or not repart:
+		# Just use the partition bounds to recover the array
+		return ptable.partition_bounds(ptable.rank,ndim=ndim,points=point)
+	# We are repartitioning, then use inods to read the array
+	return (ndim*inods[:,np.newaxis] + np.arange(ndim)[np.newaxis,:]).ravel()
+
+def h5_time_partitions(file,npart):
 	'''
-	Load the variables inside the HDF5 file
+	Groups of the time partitions of the variables and their first instant
+	'''
+	pnames = ['VARIABLES'] if npart == 1 else ['VARIABLES_%d'%ipart for ipart in range(npart)]
+	v      = list(file[pnames[0]].keys())[0]
+	starts = np.cumsum([0] + [file[pname][v]['value'].shape[1] for pname in pnames[:-1]])
+	return pnames, starts
+
+def h5_load_variables(file,mesh,ptable,inods,repart,npart,vars=[],time_slice=np.s_[:]):
+	'''
+	Load the variables inside the HDF5 file, only the requested
+	instants are read from the time partitions that hold them
 	'''
 	# Read time
-	time = np.array(file['time'][:])
+	time   = np.array(file['time'][:])
+	tidx   = np.atleast_1d(np.arange(len(time))[time_slice])
+	pnames, starts = h5_time_partitions(file,npart)
+	# Instants in increasing order, tpos recovers the requested order
+	ucols, tpos = np.unique(tidx,return_inverse=True)
+	ipart  = np.searchsorted(starts,ucols,side='right') - 1
 	# Read variables
 	varDict = {}
-	for v in file['VARIABLES'].keys():
+	for v in (file[pnames[0]].keys() if len(vars) == 0 else vars):
 		# Load point and ndim
-		point   = bool(file['VARIABLES'][v]['point'][0])
-		ndim    = int(file['VARIABLES'][v]['ndim'][0])
-		npoints = mesh.npoints if point else mesh.ncells
-		value   = np.zeros((ndim*npoints,len(time)),np.double) 
-		# Read the values
-		if mesh is None or not point:
-			istart, iend = ptable.partition_bounds(MPI_RANK,ndim=ndim,points=point)
-			value[:,:]   = np.array(file['VARIABLES'][v]['value'][istart:iend,:])
-		else:
-			if repart:
-				# We are repartitioning, then use inods to read the array
-				for idim in range(ndim):
-					value[idim:ndim*npoints:ndim,:] = np.array(file['VARIABLES'][v]['value'][inods+idim*npoints,:])
-			else:
-				# Just use the partition bounds to recover the array
-				istart, iend = ptable.partition_bounds(MPI_RANK,ndim=ndim,points=point)
-				value[:,:]   = np.array(file['VARIABLES'][v]['value'][istart:iend,:])
+		point = bool(file[pnames[0]][v]['point'][0])
+		ndim  = int(file[pnames[0]][v]['ndim'][0])
+		rows  = h5_variable_rows(mesh,ptable,inods,repart,point,ndim)
+		nrows = rows[1] - rows[0] if isinstance(rows,tuple) else rows.shape[0]
+		value = np.zeros((nrows,ucols.shape[0]),np.double)
+		# Read the values of every partition that holds some of the instants
+		for ip in np.unique(ipart):
+			mask = ipart == ip
+			value[:,mask] = h5_read_columns(file[pnames[ip]][v]['value'],rows,ucols[mask]-starts[ip])
 		# Generate dictionary
-		varDict[v] = {'point':point,'ndim':ndim,'value':value}
+		varDict[v] = {'point':point,'ndim':ndim,'value':value if np.array_equal(ucols,tidx) else value[:,tpos]}
 	# Return
-	return time, varDict
+	return time[tidx], varDict
 
-def h5_load_variables_multi(file,mesh,ptable,inods,repart,npart):
+def h5_load_variables_lazy(file,mesh,ptable,inods,repart,npart,cache_size,vars=[],time_slice=np.s_[:]):
 	'''
-	Load the variables inside the HDF5 file
+	Create lazy variables that read the HDF5 file when they are accessed
 	'''
 	# Read time
-	time = np.array(file['time'][:])
-	# Scan for variables in first partition and build variable dictionary
+	time  = np.array(file['time'][:])
+	tidx  = np.atleast_1d(np.arange(len(time))[time_slice])
+	cache = H5Cache(cache_size)
+	pnames, starts = h5_time_partitions(file,npart)
 	varDict = {}
-	for v in file['VARIABLES_0'].keys():
-		point   = bool(file['VARIABLES_0'][v]['point'][0])
-		ndim    = int(file['VARIABLES_0'][v]['ndim'][0])
-		npoints = mesh.npoints if point else mesh.ncells
-		value   = np.zeros((ndim*npoints,len(time)),np.double) 		
+	for v in (file[pnames[0]].keys() if len(vars) == 0 else vars):
+		point = bool(file[pnames[0]][v]['point'][0])
+		ndim  = int(file[pnames[0]][v]['ndim'][0])
+		rows  = h5_variable_rows(mesh,ptable,inods,repart,point,ndim)
+		parts = [(file[pname][v]['value'],start) for pname, start in zip(pnames,starts)]
 		# Generate dictionary
-		varDict[v] = {'point':point,'ndim':ndim,'value':value}
-	# Read variables per partition
-	psize  = len(time)//npart
-	for ipart in range(npart):
-		# Compute start and end of my partition in time
-		pstart = ipart*psize
-		pend   = (ipart+1)*psize
-		pname  = 'VARIABLES_%d'%ipart
-		# Read the partition
-		for v in file[pname].keys():
-			point   = bool(file[pname][v]['point'][0])
-			ndim    = int(file[pname][v]['ndim'][0])
-			npoints = mesh.npoints if point else mesh.ncells
-			# Read the values
-			if mesh is None or not point:
-				istart, iend = ptable.partition_bounds(MPI_RANK,ndim=ndim,points=point)
-				varDict[v]['value'][:,pstart:pend] = np.array(file[pname][v]['value'][istart:iend,:])
-			else:
-				if repart:
-					# We are repartitioning, then use inods to read the array
-					for idim in range(ndim):
-						varDict[v]['value'][idim:ndim*npoints:ndim,pstart:pend] = np.array(file[pname][v]['value'][inods+idim*npoints,:])
-				else:
-					# Just use the partition bounds to recover the array
-					istart, iend = ptable.partition_bounds(MPI_RANK,ndim=ndim,points=point)
-					varDict[v]['value'][:,pstart:pend] = np.array(file[pname][v]['value'][istart:iend,:])
+		varDict[v] = {'point':point,'ndim':ndim,'value':H5Variable(parts,rows,len(time),cache,tidx)}
 	# Return
-	return time, varDict
+	return time[tidx], varDict
 
-def h5_load_serial(fname):
+def h5_load_serial(fname,lazy=False,cache_size=512*1024*1024,vars=[],time_slice=np.s_[:],comm=None):
 	'''
 	Load a dataset in HDF5 in serial
 	'''
@@ -414,7 +548,7 @@ def h5_load_serial(fname):
 	if not version == PYLOM_H5_VERSION:
 		raiseError('File version <%s> not matching the tool version <%s>!'%(str(file.attrs['Version']),str(PYLOM_H5_VERSION)))
 	# Read partition table
-	ptable = h5_load_partition(file)
+	ptable = h5_load_partition(file,comm)
 	repart = False
 	# Are we reading for the same number of partitions?
 	if not ptable.check_split():
@@ -422,29 +556,32 @@ def h5_load_serial(fname):
 		# the new partition table
 		npoints, ncells = h5_load_size(file)
 		# Redo the partitions table
-		ptable = PartitionTable.new(MPI_SIZE,ncells,npoints)
+		ptable = PartitionTable.new(ptable.size,ncells,npoints,comm=comm)
 		repart = True
 	# Read the mesh
 	mesh, inods = h5_load_mesh(file,ptable,repart)
 	# Figure out how many partitions we have
 	npart = np.sum(['VAR' in key for key in file.keys()])
-	# Read the variables
-	time, varDict = h5_load_variables_single(file,mesh,ptable,inods,repart) if npart == 1 else h5_load_variables_multi(file,mesh,ptable,inods,repart,npart)
+	# Read the variables, the file is kept open by the lazy ones
+	if lazy:
+		time, varDict = h5_load_variables_lazy(file,mesh,ptable,inods,repart,npart,cache_size,vars,time_slice)
+		return ptable, mesh, time, varDict
+	time, varDict = h5_load_variables(file,mesh,ptable,inods,repart,npart,vars,time_slice)
 	file.close()
 	return ptable, mesh, time, varDict
 
-def h5_load_mpio(fname):
+def h5_load_mpio(fname,lazy=False,cache_size=512*1024*1024,vars=[],time_slice=np.s_[:],comm=None):
 	'''
 	Load a field in HDF5 in parallel
 	'''
 	# Open file for reading
-	file = h5py.File(fname,'r',driver='mpio',comm=MPI_COMM)
+	file = h5py.File(fname,'r',driver='mpio',comm=mpi_comm(comm)[0])
 	# Check the file version
 	version = tuple(file.attrs['Version'])
 	if not version == PYLOM_H5_VERSION:
 		raiseError('File version <%s> not matching the tool version <%s>!'%(str(file.attrs['Version']),str(PYLOM_H5_VERSION)))
 	# Read partition table
-	ptable = h5_load_partition(file)
+	ptable = h5_load_partition(file,comm)
 	repart = False
 	# Are we reading for the same number of partitions?
 	if not ptable.check_split():
@@ -452,26 +589,130 @@ def h5_load_mpio(fname):
 		# the new partition table
 		npoints, ncells = h5_load_size(file)
 		# Redo the partitions table
-		ptable = PartitionTable.new(MPI_SIZE,ncells,npoints)
+		ptable = PartitionTable.new(ptable.size,ncells,npoints,comm=comm)
 		repart = True
 	# Read the mesh
 	mesh, inods = h5_load_mesh(file,ptable,repart)
 	# Figure out how many partitions we have
 	npart = np.sum(['VAR' in key for key in file.keys()])
-	# Read the variables
-	time, varDict = h5_load_variables_single(file,mesh,ptable,inods,repart) if npart == 1 else h5_load_variables_multi(file,mesh,ptable,inods,repart,npart)
+	# Read the variables, the file is kept open by the lazy ones
+	if lazy:
+		time, varDict = h5_load_variables_lazy(file,mesh,ptable,inods,repart,npart,cache_size,vars,time_slice)
+		return ptable, mesh, time, varDict
+	time, varDict = h5_load_variables(file,mesh,ptable,inods,repart,npart,vars,time_slice)
 	file.close()
 	return ptable, mesh, time, varDict
 
 
+@cr('h5IO.load_blocks')
+def h5_load_blocks(fname,vars,time_slice=np.s_[:],block_size=100,axis=1,mpio=True,comm=None):
+	'''
+	Stream the data matrix X of a set of variables stored in an HDF5
+	dataset by blocks of snapshots. Each processor only reads its
+	slab of rows, which is interleaved as in Dataset.X.
+
+	Returns the partition table and a generator that yields
+	the X blocks (nvars*npoints,block_size). The rows are
+	partitioned among the processors of comm (default MPI.COMM_WORLD).
+
+	With axis=0 the slab of rows is streamed instead by blocks of
+	block_size points with all the instants, (nvars*block_size,ntime).
+	A processor without any row yields a single empty block.
+	'''
+	# Open file for reading
+	comm, _, size = mpi_comm(comm)
+	file = h5py.File(fname,'r',driver='mpio',comm=comm) if mpio and not size == 1 else h5py.File(fname,'r')
+	# Check the file version
+	version = tuple(file.attrs['Version'])
+	if not version == PYLOM_H5_VERSION:
+		raiseError('File version <%s> not matching the tool version <%s>!'%(str(file.attrs['Version']),str(PYLOM_H5_VERSION)))
+	# Read partition table
+	ptable = h5_load_partition(file,comm)
+	repart = False
+	mesh, inods = None, None
+	# Are we reading for the same number of partitions?
+	if not ptable.check_split():
+		npoints, ncells = h5_load_size(file)
+		ptable = PartitionTable.new(ptable.size,ncells,npoints,comm=comm)
+		repart = True
+		mesh, inods = h5_load_mesh(file,ptable,repart)
+	# Time partitions in the file
+	npart  = np.sum(['VAR' in key for key in file.keys()])
+	gnames, starts = h5_time_partitions(file,npart)
+	ntime  = file['time'].shape[0]
+	# Selected instants, their time partition and local index
+	itime  = np.arange(ntime)[time_slice]
+	ipart  = np.searchsorted(starts,itime,side='right') - 1
+	iloc   = itime - starts[ipart]
+	# Variable information
+	varinfo = []
+	for var in vars:
+		point = bool(file[gnames[0]][var]['point'][0])
+		ndim  = int(file[gnames[0]][var]['ndim'][0])
+		varinfo.append((var,point,ndim))
+	nvars = np.sum([v[2] for v in varinfo])
+	npts  = 0
+	if len(varinfo) > 0:
+		istart, iend = ptable.partition_bounds(ptable.rank,points=varinfo[0][1])
+		npts = inods.shape[0] if repart and varinfo[0][1] else iend - istart
+
+	def _read(dset,ndim,point,cols,p0=0,p1=None):
+		# Read the rows of the points p0 to p1 of this processor for a
+		# set of columns, scattered points are read by runs of contiguous points
+		rows = h5_variable_rows(mesh,ptable,inods,repart,point,ndim)
+		if p1 is not None:
+			rows = (rows[0]+ndim*p0,rows[0]+ndim*p1) if isinstance(rows,tuple) else rows[ndim*p0:ndim*p1]
+		ucols, cpos = np.unique(cols,return_inverse=True)
+		value = np.array(h5_read_columns(dset,rows,ucols))
+		return value if np.array_equal(ucols,cols) else value[:,cpos]
+
+	def _blocks_rows():
+		try:
+			for p0 in range(0,max(npts,1),block_size):
+				p1 = min(p0+block_size,npts)
+				X  = np.zeros((nvars*(p1-p0),itime.shape[0]),np.double)
+				ivar = 0
+				for var, point, ndim in (varinfo if p1 > p0 else []):
+					for p in np.unique(ipart):
+						mask  = ipart == p
+						value = _read(file[gnames[p]][var]['value'],ndim,point,iloc[mask],p0,p1)
+						for idim in range(ndim):
+							X[ivar+idim::nvars,mask] = value[idim::ndim,:]
+					ivar += ndim
+				yield X
+		finally:
+			file.close()
+
+	def _blocks():
+		try:
+			for ib in range(0,itime.shape[0],block_size):
+				bpart = ipart[ib:ib+block_size]
+				bloc  = iloc[ib:ib+block_size]
+				X     = np.zeros((nvars*npts,bpart.shape[0]),np.double)
+				ivar  = 0
+				for var, point, ndim in varinfo:
+					for p in np.unique(bpart):
+						mask  = bpart == p
+						value = _read(file[gnames[p]][var]['value'],ndim,point,bloc[mask])
+						for idim in range(ndim):
+							X[ivar+idim:nvars*npts:nvars,mask] = value[idim:ndim*npts:ndim,:]
+					ivar += ndim
+				yield X
+		finally:
+			# Also reached when the generator is closed early
+			file.close()
+
+	return ptable, _blocks() if axis == 1 else _blocks_rows()
+
+
 @cr('h5IO.save_POD')
-def h5_save_POD(fname,U,S,V,ptable,nvars=1,pointData=True,mode='w'):
+def h5_save_POD(fname,U,S,V,ptable,nvars=1,pointData=True,mode='w',chunks=None,compression=None):
 	'''
 	Store POD variables into an HDF5 file.
 	Can be appended to another HDF by setting the
 	mode to 'a'. Then no partition table will be saved.
 	'''
-	file = h5py.File(fname,mode,driver='mpio',comm=MPI_COMM) if not MPI_SIZE == 1 else h5py.File(fname,mode)
+	file = h5py.File(fname,mode,driver='mpio',comm=ptable.comm) if not ptable.size == 1 else h5py.File(fname,mode)
 	# Store attributes and partition table
 	if not mode == 'a':
 		file.attrs['Version'] = PYLOM_H5_VERSION
@@ -482,26 +723,28 @@ def h5_save_POD(fname,U,S,V,ptable,nvars=1,pointData=True,mode='w'):
 	# Create the datasets for U, S and V
 	group.create_dataset('pointData',(1,),dtype='u1',data=pointData)
 	group.create_dataset('n_variables',(1,),dtype='u1',data=nvars)
-	Usize = (mpi_reduce(U.shape[0],op='sum',all=True),U.shape[1])
-	dsetU = group.create_dataset('U',Usize,dtype='f8')
+	Usize = (mpi_reduce(U.shape[0],op='sum',all=True,comm=ptable.comm),U.shape[1])
+	dsetU, bits = h5_create_dataset(group,'U',Usize,'f8',chunks,compression,comm=ptable.comm)
 	dsetS = group.create_dataset('S',S.shape,dtype='f8')
 	dsetV = group.create_dataset('V',V.shape,dtype='f8')
 	# Store S and U that are repeated across the ranks
 	# So it is enough that one rank stores them
-	if is_rank_or_serial(0):
+	if is_rank_or_serial(0,ptable.comm):
 		dsetS[:] = S
 		dsetV[:] = V
 	# Store U in parallel
-	istart, iend = ptable.partition_bounds(MPI_RANK,ndim=nvars,points=pointData)
-	dsetU[istart:iend,:] = U
+	istart, iend = ptable.partition_bounds(ptable.rank,ndim=nvars,points=pointData)
+	h5_write(dsetU,np.s_[istart:iend,:],U,bits)
 	file.close()
 
 @cr('h5IO.load_POD')
-def h5_load_POD(fname,vars,nmod,ptable=None):
+def h5_load_POD(fname,vars,nmod,ptable=None,comm=None):
 	'''
-	Load POD variables from an HDF5 file.
+	Load POD variables from an HDF5 file, partitioned
+	as ptable or among the processors of comm.
 	'''
-	file = h5py.File(fname,'r',driver='mpio',comm=MPI_COMM) if not MPI_SIZE == 1 else h5py.File(fname,'r')
+	comm, _, size = mpi_comm(comm if ptable is None else ptable.comm)
+	file = h5py.File(fname,'r',driver='mpio',comm=comm) if not size == 1 else h5py.File(fname,'r')
 	# Check the file version
 	version = tuple(file.attrs['Version'])
 	if not version == PYLOM_H5_VERSION:
@@ -510,11 +753,11 @@ def h5_load_POD(fname,vars,nmod,ptable=None):
 	varList = []
 	if 'U' in vars:
 		# Check if we need to read the partition table
-		if ptable is None: ptable = h5_load_partition(file)
+		if ptable is None: ptable = h5_load_partition(file,comm)
 		# Read
 		nvars = int(file['POD']['n_variables'][0])
 		point = bool(file['POD']['pointData'][0])
-		istart, iend = ptable.partition_bounds(MPI_RANK,ndim=nvars,point=point)
+		istart, iend = ptable.partition_bounds(ptable.rank,ndim=nvars,points=point)
 		varList.append( np.array(file['POD']['U'][istart:iend,:nmod]) )
 	if 'S' in vars: varList.append( np.array(file['POD']['S'][:]) )
 	if 'V' in vars: varList.append( np.array(file['POD']['V'][:,:]) )
@@ -524,13 +767,13 @@ def h5_load_POD(fname,vars,nmod,ptable=None):
 
 
 @cr('h5IO.save_DMD')
-def h5_save_DMD(fname,muReal,muImag,Phi,bJov,ptable,nvars=1,pointData=True,mode='w'):
+def h5_save_DMD(fname,muReal,muImag,Phi,bJov,ptable,nvars=1,pointData=True,mode='w',chunks=None,compression=None):
 	'''
 	Store DMD variables into an HDF5 file.
 	Can be appended to another HDF by setting the
 	mode to 'a'. Then no partition table will be saved.
 	'''
-	file = h5py.File(fname,mode,driver='mpio',comm=MPI_COMM) if not MPI_SIZE == 1 else h5py.File(fname,mode)
+	file = h5py.File(fname,mode,driver='mpio',comm=ptable.comm) if not ptable.size == 1 else h5py.File(fname,mode)
 	# Store attributes and partition table
 	if not mode == 'a':
 		file.attrs['Version'] = PYLOM_H5_VERSION
@@ -541,27 +784,29 @@ def h5_save_DMD(fname,muReal,muImag,Phi,bJov,ptable,nvars=1,pointData=True,mode=
 	# Create the datasets for U, S and V
 	group.create_dataset('pointData',(1,),dtype='u1',data=pointData)
 	group.create_dataset('n_variables',(1,),dtype='u1',data=nvars)
-	Phisz = (mpi_reduce(Phi.shape[0],op='sum',all=True),Phi.shape[1])
-	dsPhi = group.create_dataset('Phi',Phisz,dtype=Phi.dtype)
+	Phisz = (mpi_reduce(Phi.shape[0],op='sum',all=True,comm=ptable.comm),Phi.shape[1])
+	dsPhi, bits = h5_create_dataset(group,'Phi',Phisz,Phi.dtype,chunks,compression,comm=ptable.comm)
 	dsMu  = group.create_dataset('Mu',(muReal.shape[0],2),dtype='f8')
 	dsJov = group.create_dataset('bJov',bJov.shape,dtype=bJov.dtype)
 	# Store S and U that are repeated across the ranks
 	# So it is enough that one rank stores them
-	if is_rank_or_serial(0):
+	if is_rank_or_serial(0,ptable.comm):
 		dsMu[:,0] = muReal
 		dsMu[:,1] = muImag
 		dsJov[:]  = bJov
 	# Store U in parallel
-	istart, iend = ptable.partition_bounds(MPI_RANK,ndim=nvars,points=pointData)
-	dsPhi[istart:iend,:] = Phi
+	istart, iend = ptable.partition_bounds(ptable.rank,ndim=nvars,points=pointData)
+	h5_write(dsPhi,np.s_[istart:iend,:],Phi,bits)
 	file.close()
 
 @cr('h5IO.load_DMD')
-def h5_load_DMD(fname,vars,nmod,ptable=None):
+def h5_load_DMD(fname,vars,nmod,ptable=None,comm=None):
 	'''
-	Load DMD variables from an HDF5 file.
+	Load DMD variables from an HDF5 file, partitioned
+	as ptable or among the processors of comm.
 	'''
-	file = h5py.File(fname,'r',driver='mpio',comm=MPI_COMM) if not MPI_SIZE == 1 else h5py.File(fname,'r')
+	comm, _, size = mpi_comm(comm if ptable is None else ptable.comm)
+	file = h5py.File(fname,'r',driver='mpio',comm=comm) if not size == 1 else h5py.File(fname,'r')
 	# Check the file version
 	version = tuple(file.attrs['Version'])
 	if not version == PYLOM_H5_VERSION:
@@ -570,11 +815,11 @@ def h5_load_DMD(fname,vars,nmod,ptable=None):
 	varList = []
 	if 'Phi' in vars:
 		# Check if we need to read the partition table
-		if ptable is None: ptable = h5_load_partition(file)
+		if ptable is None: ptable = h5_load_partition(file,comm)
 		# Read
 		nvars = int(file['DMD']['n_variables'][0])
 		point = bool(file['DMD']['pointData'][0])
-		istart, iend = ptable.partition_bounds(MPI_RANK,ndim=nvars,point=point)
+		istart, iend = ptable.partition_bounds(ptable.rank,ndim=nvars,points=point)
 		varList.append( np.array(file['DMD']['Phi'][istart:iend,:nmod]) )
 	if 'mu' in vars: 
 		varList.append( np.array(file['DMD']['Mu'][:,0]) ) # Real
@@ -585,13 +830,13 @@ def h5_load_DMD(fname,vars,nmod,ptable=None):
 	return varList
 
 
-def h5_save_SPOD(fname,L,P,f,ptable,nvars=1,pointData=True,mode='w'):
+def h5_save_SPOD(fname,L,P,f,ptable,nvars=1,pointData=True,mode='w',chunks=None,compression=None):
 	'''
 	Store SPOD variables into an HDF5 file.
 	Can be appended to another HDF by setting the
 	mode to 'a'. Then no partition table will be saved.
 	'''
-	file = h5py.File(fname,mode,driver='mpio',comm=MPI_COMM) if not MPI_SIZE == 1 else h5py.File(fname,mode)
+	file = h5py.File(fname,mode,driver='mpio',comm=ptable.comm) if not ptable.size == 1 else h5py.File(fname,mode)
 	# Store attributes and partition table
 	if not mode == 'a':
 		file.attrs['Version'] = PYLOM_H5_VERSION
@@ -605,25 +850,27 @@ def h5_save_SPOD(fname,L,P,f,ptable,nvars=1,pointData=True,mode='w'):
 	group.create_dataset('pointData',(1,),dtype='u1',data=pointData)
 	group.create_dataset('n_variables',(1,),dtype='u1',data=nvars)
 	group.create_dataset('n_blocks',(1,),dtype='u1',data=nblocks)
-	Psz = (mpi_reduce(P.shape[0],op='sum',all=True),P.shape[1])
-	dsP = group.create_dataset('P',Psz,dtype=P.dtype)
+	Psz = (mpi_reduce(P.shape[0],op='sum',all=True,comm=ptable.comm),P.shape[1])
+	dsP, bits = h5_create_dataset(group,'P',Psz,P.dtype,chunks,compression,comm=ptable.comm)
 	dsL = group.create_dataset('L',L.shape,dtype=L.dtype)
 	dsf = group.create_dataset('f',f.shape,dtype=f.dtype)
 	# Store L and f that are repeated across the ranks (nblocks,nfreq)
 	# So it is enough that one rank stores them
-	if is_rank_or_serial(0):
+	if is_rank_or_serial(0,ptable.comm):
 		dsL[:,:] = L
 		dsf[:]   = f
 	# Store P in parallel (nblocks*nvars*npoints,nfreq)
-	istart, iend = ptable.partition_bounds(MPI_RANK,ndim=nvars*nblocks,points=pointData)
-	dsP[istart:iend,:] = P
+	istart, iend = ptable.partition_bounds(ptable.rank,ndim=nvars*nblocks,points=pointData)
+	h5_write(dsP,np.s_[istart:iend,:],P,bits)
 	file.close()
 
-def h5_load_SPOD(fname,vars,nmod,ptable=None):
+def h5_load_SPOD(fname,vars,nmod,ptable=None,comm=None):
 	'''
-	Load SPOD variables from an HDF5 file.
+	Load SPOD variables from an HDF5 file, partitioned
+	as ptable or among the processors of comm.
 	'''
-	file = h5py.File(fname,'r',driver='mpio',comm=MPI_COMM) if not MPI_SIZE == 1 else h5py.File(fname,'r')
+	comm, _, size = mpi_comm(comm if ptable is None else ptable.comm)
+	file = h5py.File(fname,'r',driver='mpio',comm=comm) if not size == 1 else h5py.File(fname,'r')
 	# Check the file version
 	version = tuple(file.attrs['Version'])
 	if not version == PYLOM_H5_VERSION:
@@ -632,12 +879,12 @@ def h5_load_SPOD(fname,vars,nmod,ptable=None):
 	varList = []
 	if 'P' in vars:
 		# Check if we need to read the partition table
-		if ptable is None: ptable = h5_load_partition(file)
+		if ptable is None: ptable = h5_load_partition(file,comm)
 		# Read
 		nvars   = int(file['SPOD']['n_variables'][0])
 		nblocks = int(file['SPOD']['n_blocks'][0])
 		point   = bool(file['SPOD']['pointData'][0])
-		istart, iend = ptable.partition_bounds(MPI_RANK,ndim=nvars*nblocks,point=point)
+		istart, iend = ptable.partition_bounds(ptable.rank,ndim=nvars*nblocks,points=point)
 		varList.append( np.array(file['SPOD']['P'][istart:iend,:nmod]) )
 	if 'L' in vars: 
 		varList.append( np.array(file['SPOD']['L'][:,:]) )
@@ -645,4 +892,59 @@ def h5_load_SPOD(fname,vars,nmod,ptable=None):
 		varList.append( np.array(file['SPOD']['f'][:]) )
 	# Return
 	file.close()
-	return varList
\ No newline at end of file
+	return varList
+def h5_save_SPOD_result(fname,L,U,f,ptable,nvars=1,pointData=True,mode='w',compression=None):
+	'''
+	Store the complex SPOD modes U(nf,M,nBlks) into an HDF5 file,
+	chunked so that a single frequency and block can be read.
+	Can be appended to another HDF by setting the
+	mode to 'a'. Then no partition table will be saved.
+	'''
+	file = h5py.File(fname,mode,driver='mpio',comm=ptable.comm) if not ptable.size == 1 else h5py.File(fname,mode)
+	# Store attributes and partition table
+	if not mode == 'a':
+		file.attrs['Version'] = PYLOM_H5_VERSION
+		# Store partition table
+		h5_save_partition(file,ptable)
+	nfreq, nblocks = L.shape
+	# Now create a SPOD group
+	group = file.create_group('SPOD')
+	group.create_dataset('pointData',(1,),dtype='u1',data=pointData)
+	group.create_dataset('n_variables',(1,),dtype='u1',data=nvars)
+	group.create_dataset('n_blocks',(1,),dtype='i4',data=nblocks)
+	MG  = mpi_reduce(U.shape[1],op='sum',all=True,comm=ptable.comm)
+	opts, bits = h5_filters(compression)
+	dsU = group.create_dataset('U',(nfreq,MG,nblocks),dtype=U.dtype,chunks=(1,min(MG,CHUNK_BYTES//U.dtype.itemsize),1),**opts)
+	dsL = group.create_dataset('L',L.shape,dtype=L.dtype)
+	dsf = group.create_dataset('f',f.shape,dtype=f.dtype)
+	# Store L and f that are repeated across the ranks (nfreq,nblocks)
+	# So it is enough that one rank stores them
+	if is_rank_or_serial(0,ptable.comm):
+		dsL[:,:] = L
+		dsf[:]   = f
+	# Store U in parallel (nfreq,nvars*npoints,nblocks)
+	istart, iend = ptable.partition_bounds(ptable.rank,ndim=nvars,points=pointData)
+	h5_write(dsU,np.s_[:,istart:iend,:],U,bits)
+	file.close()
+
+def h5_load_SPOD_result(fname,ptable=None,comm=None):
+	'''
+	Open the complex SPOD modes from an HDF5 file without loading them.
+
+	The rows are partitioned as ptable or among the processors of comm.
+
+	Returns L, f, the U dataset, the rows of this processor and the open file.
+	'''
+	comm, _, size = mpi_comm(comm if ptable is None else ptable.comm)
+	file = h5py.File(fname,'r',driver='mpio',comm=comm) if not size == 1 else h5py.File(fname,'r')
+	# Check the file version
+	version = tuple(file.attrs['Version'])
+	if not version == PYLOM_H5_VERSION:
+		raiseError('File version <%s> not matching the tool version <%s>!'%(str(file.attrs['Version']),str(PYLOM_H5_VERSION)))
+	if not 'U' in file['SPOD']: raiseError('File <%s> does not contain the complex SPOD modes!'%fname)
+	# Check if we need to read the partition table
+	if ptable is None: ptable = h5_load_partition(file,comm)
+	nvars = int(file['SPOD']['n_variables'][0])
+	point = bool(file['SPOD']['pointData'][0])
+	rows  = ptable.partition_bounds(ptable.rank,ndim=nvars,points=point)
+	return np.array(file['SPOD']['L'][:,:]), np.array(file['SPOD']['f'][:]), file['SPOD']['U'], rows, file
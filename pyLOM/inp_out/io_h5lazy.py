@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+#
+# pyLOM, IO
+#
+# Lazy HDF5 variables
+#
+# Last rev: 17/10/2026
+from __future__ import print_function, division
+
+import numpy as np
+from itertools   import count
+from collections import OrderedDict
+
+from ..utils.cr     import cr
+from ..utils.errors import raiseError
+
+
+_H5VAR_IDS = count() # Unique key of every lazy variable in the cache
+GAP_BYTES  = 64*1024 # Rows skipped between two runs that are read as one
+
+
+def h5_row_runs(rows,gap=0):
+	'''
+	Split a set of increasing rows into runs that are read as single
+	hyperslabs, runs separated by up to gap rows are merged.
+
+	Returns the start and end rows of the runs.
+	'''
+	brk = np.nonzero(np.diff(rows) > gap + 1)[0] + 1
+	return rows[np.concatenate(([0],brk))], rows[np.concatenate((brk-1,[len(rows)-1]))] + 1
+
+def h5_read_rows(dset,rows,cols=np.s_[:]):
+	'''
+	Read a set of increasing rows of a dataset as one hyperslab per run of
+	contiguous rows instead of a point selection, which is much slower.
+	The rows in the gaps between close runs are read and discarded.
+	'''
+	rows   = np.asarray(rows)
+	if rows.shape[0] == 0: return dset[0:0] if dset.ndim == 1 else dset[0:0,cols]
+	ncols  = 1 if dset.ndim == 1 else max(len(range(*cols.indices(dset.shape[1]))) if isinstance(cols,slice) else len(cols),1)
+	gap    = GAP_BYTES//(ncols*dset.dtype.itemsize)
+	r0, r1 = h5_row_runs(rows,gap)
+	data   = [dset[i0:i1] if dset.ndim == 1 else dset[i0:i1,cols] for i0, i1 in zip(r0,r1)]
+	data   = data[0] if len(data) == 1 else np.concatenate(data,axis=0)
+	if data.shape[0] == rows.shape[0]: return data
+	# Drop the rows of the gaps
+	offst  = np.concatenate(([0],np.cumsum(r1-r0)[:-1]))
+	irun   = np.searchsorted(r0,rows,side='right') - 1
+	return data[offst[irun] + rows - r0[irun]]
+
+def h5_read_columns(dset,rows,cols):
+	'''
+	Read a set of increasing columns of a dataset for the given rows,
+	a (istart,iend) tuple or an increasing array. Equally spaced
+	columns are read as a single hyperslab.
+	'''
+	step = int(cols[1] - cols[0]) if len(cols) > 1 else 1
+	csel = np.s_[int(cols[0]):int(cols[-1])+1:step] if np.all(np.diff(cols) == step) else list(cols)
+	if isinstance(rows,tuple):
+		return dset[rows[0]:rows[1],csel]
+	return h5_read_rows(dset,rows,csel)
+
+
+class H5Cache(object):
+	'''
+	Least recently used cache of the columns read from
+	the HDF5 files, shared by all the lazy variables of
+	a dataset and limited to a maximum number of bytes.
+	'''
+	def __init__(self, max_bytes=512*1024*1024):
+		'''
+		Class constructor
+
+		Inputs:
+			> max_bytes: eviction limit of the cache in bytes.
+		'''
+		self._max   = max_bytes
+		self._bytes = 0
+		self._data  = OrderedDict()
+
+	def __len__(self):
+		return len(self._data)
+
+	def __contains__(self,key):
+		return key in self._data
+
+	def get(self,key):
+		'''
+		Recover an entry and mark it as the most recently used.
+		'''
+		self._data.move_to_end(key)
+		return self._data[key]
+
+	def put(self,key,value):
+		'''
+		Add an entry, evicting the least recently used ones
+		when the limit is exceeded.
+		'''
+		if key in self._data: self._bytes -= self._data.pop(key).nbytes
+		self._data[key] = value
+		self._bytes    += value.nbytes
+		while self._bytes > self._max and len(self._data) > 1:
+			_, old = self._data.popitem(last=False)
+			self._bytes -= old.nbytes
+
+	def clear(self):
+		self._data.clear()
+		self._bytes = 0
+
+	@property
+	def nbytes(self):
+		return self._bytes
+	@property
+	def max_bytes(self):
+		return self._max
+
+
+class H5Variable(object):
+	'''
+	Variable of a dataset that stays in the HDF5 file and only reads the
+	time instants that are accessed. It behaves as the (ndim*npoints,ntime)
+	array of the variable for indexing and numpy functions.
+
+	The columns that are read are kept in an H5Cache. The instants are read
+	as a single hyperslab when they are contiguous or equally spaced.
+	The variable can be restricted to a subset of the instants of the file.
+	When only some of the rows are requested (e.g., probes) the missing
+	columns are read for those rows only and are not cached.
+	'''
+	def __init__(self, parts, rows, ntime, cache, tidx=None):
+		'''
+		Class constructor
+
+		Inputs:
+			> parts: list of (dataset,tstart) of every time partition of the file.
+			> rows:  rows of this processor, as a (istart,iend) tuple or an array.
+			> ntime: number of time instants in the file.
+			> cache: H5Cache where the columns are kept.
+			> tidx:  instants of the file seen by the variable (default all).
+		'''
+		self._parts = parts
+		self._file  = parts[0][0].file
+		self._dtype = parts[0][0].dtype
+		self._tends = np.array([t0 for _, t0 in parts[1:]] + [ntime],np.int64)
+		self._tidx  = np.arange(ntime) if tidx is None else np.asarray(tidx)
+		self._ntime = self._tidx.shape[0]
+		self._cache = cache
+		self._id    = next(_H5VAR_IDS)
+		if isinstance(rows,tuple):
+			self._rows  = rows
+			self._nrows = rows[1] - rows[0]
+			self._perm  = None
+			self._frows = np.arange(rows[0],rows[1])
+		else:
+			# h5py needs increasing indices, the permutation recovers the order
+			self._perm  = np.argsort(rows)
+			self._rows  = np.asarray(rows)[self._perm]
+			self._nrows = len(rows)
+			self._frows = np.asarray(rows)
+
+	def __len__(self):
+		return self._nrows
+
+	def __str__(self):
+		return 'H5Variable of shape (%d,%d) in <%s>' % (self.shape[0],self.shape[1],self._file.filename if self._file.id.valid else 'closed file')
+
+	def __array__(self,dtype=None,copy=None):
+		out = self[:,:]
+		return out if dtype is None else out.astype(dtype,copy=False)
+
+	def __getitem__(self,key):
+		'''
+		Read the requested instants, only the columns that are
+		not in the cache are read from the file.
+		'''
+		rsel, tsel = key if isinstance(key,tuple) else (key,slice(None))
+		tidx = self._tidx[tsel]
+		cols = np.atleast_1d(tidx)
+		ridx = np.arange(self._nrows)[rsel]
+		if np.size(ridx) < self._nrows:
+			out = self._read_rows(np.atleast_1d(ridx),cols)
+			out = out[0] if np.ndim(ridx) == 0 else out
+			return out[...,0] if np.ndim(tidx) == 0 else out
+		out  = np.empty((self._nrows,cols.shape[0]),self.dtype)
+		# Read the missing columns, grouped by the time partition that holds them
+		ucols   = np.unique(cols)
+		read    = {c:self._cache.get((self._id,c)) for c in ucols if (self._id,c) in self._cache}
+		missing = np.array([c for c in ucols if not c in read],np.int64)
+		ipart   = np.searchsorted(self._tends,missing,side='right')
+		for ip in np.unique(ipart):
+			read.update(self._read(ip,missing[ipart == ip]))
+		for i, c in enumerate(cols):
+			out[:,i] = read[c]
+		return out[rsel,0] if np.ndim(tidx) == 0 else out[rsel,:]
+
+	@cr('H5Variable.read')
+	def _read(self,ipart,cols):
+		'''
+		Read a set of increasing columns of a time partition and cache them.
+		'''
+		dset, t0 = self._parts[ipart]
+		data = h5_read_columns(dset,self._rows,cols-t0)
+		if self._perm is not None:
+			aux = np.empty_like(data)
+			aux[self._perm,:] = data
+			data = aux
+		read = {}
+		for i, col in enumerate(cols):
+			read[col] = np.ascontiguousarray(data[:,i])
+			self._cache.put((self._id,col),read[col])
+		return read
+
+	@cr('H5Variable.read_rows')
+	def _read_rows(self,ridx,cols):
+		'''
+		Read a set of columns for some rows of this processor only, the cached
+		columns are reused and the ones that are missing are not cached.
+		'''
+		out = np.empty((ridx.shape[0],cols.shape[0]),self.dtype)
+		# h5py needs increasing indices, the inverse recovers the order and repeated rows
+		frows, inv = np.unique(self._frows[ridx],return_inverse=True)
+		ucols   = np.unique(cols)
+		read    = {c:self._cache.get((self._id,c))[ridx] for c in ucols if (self._id,c) in self._cache}
+		missing = np.array([c for c in ucols if not c in read],np.int64)
+		ipart   = np.searchsorted(self._tends,missing,side='right')
+		for ip in np.unique(ipart):
+			dset, t0 = self._parts[ip]
+			pcols = missing[ipart == ip]
+			data  = h5_read_columns(dset,frows,pcols-t0)[inv,:]
+			read.update({c:data[:,i] for i, c in enumerate(pcols)})
+		for i, c in enumerate(cols):
+			out[:,i] = read[c]
+		return out
+
+	def materialize(self,time_slice=np.s_[:]):
+		'''
+		Return the requested instants as a numpy array.
+		'''
+		return self[:,time_slice]
+
+	def close(self):
+		'''
+		Close the HDF5 file that holds the variable, which
+		is shared with the other variables of the dataset.
+		'''
+		self._file.close()
+
+	@property
+	def shape(self):
+		return (self._nrows,self._ntime)
+	@property
+	def dtype(self):
+		return self._dtype
+	@property
+	def ndim(self):
+		return 2
+	@property
+	def cache(self):
+		return self._cache
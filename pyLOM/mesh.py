@@ -8,12 +8,13 @@
 from __future__ import print_function, division
 
 import numpy as np
+from scipy.spatial import cKDTree
 
 from .vmmath       import cellCenters
 from .utils.cr     import cr
 from .utils.mem    import mem
 from .utils.errors import raiseError
-from .utils.parall import mpi_reduce
+from .utils.parall import mpi_comm, mpi_gather, mpi_reduce, mpi_alltoallv
 
 
 ALYA2ELTYP = {
@@ -79,6 +80,7 @@ class Mesh(object):
 		self._eltype = eltype
 		self._cellO  = cellOrder
 		self._pointO = pointOrder
+		self._kdtree = {} # Spatial index of the points and cell centers
 
 	def __str__(self):
 		'''
@@ -88,11 +90,90 @@ class Mesh(object):
 		s  += '  > xyz  - max = ' + str(np.nanmax(self._xyz,axis=0)) + ', min = ' + str(np.nanmin(self._xyz,axis=0)) + '\n'
 		return s
 
-	def find_point(self,xyz):
+	def find_point(self,xyz,tol=0.):
 		'''
-		Return all the points where self._xyz == xyz
+		Return all the points within a distance tol of xyz,
+		i.e., where self._xyz == xyz by default
 		'''
-		return np.where(np.all(self._xyz == xyz,axis=1))[0]
+		if self.npoints == 0: return np.zeros((0,),np.int64)
+		return np.array(self.kdtree().query_ball_point(np.asarray(xyz,np.double),tol,return_sorted=True),np.int64)
+
+	@cr('Mesh.kdtree')
+	def kdtree(self,cells=False):
+		'''
+		KD-tree of the points (or cell centers) of this processor,
+		built the first time it is needed and kept with the mesh.
+		'''
+		key = 'cells' if cells else 'points'
+		if not key in self._kdtree:
+			self._kdtree[key] = cKDTree(self.xyzc if cells else self._xyz)
+		return self._kdtree[key]
+
+	@cr('Mesh.nearest')
+	def nearest(self,xyz,cells=False,comm=None):
+		'''
+		Nearest point (or cell center) to each of the query points
+		among all the processors of comm (default MPI.COMM_WORLD).
+
+		Returns the distances and the local indices of the nearest
+		points, which are -1 on the processors that do not hold them.
+		A point held by several processors goes to the lowest one.
+		'''
+		comm, rank, size = mpi_comm(comm)
+		xyz  = np.atleast_2d(np.asarray(xyz,np.double))
+		dist = np.full((xyz.shape[0],),np.inf)
+		idx  = np.full((xyz.shape[0],),-1,np.int64)
+		if self.size(not cells) > 0: dist[:], idx[:] = self.kdtree(cells).query(xyz)
+		# The lowest processor at the minimum distance holds the point
+		dmin  = mpi_reduce(dist,op='min',all=True,comm=comm)
+		owner = mpi_reduce(np.where(dist == dmin,rank,size),op='min',all=True,comm=comm)
+		return dmin, np.where(owner == rank,idx,-1)
+
+	@cr('Mesh.radius')
+	def radius(self,xyz,r,cells=False,gather=False,comm=None):
+		'''
+		Points (or cell centers) of this processor within a distance r
+		of each of the query points, as a list of arrays of local indices.
+
+		With gather, the global ids of the points of all the processors
+		of comm (default MPI.COMM_WORLD) are returned instead.
+		'''
+		xyz = np.atleast_2d(np.asarray(xyz,np.double))
+		idx = self.kdtree(cells).query_ball_point(xyz,r,return_sorted=True) if self.size(not cells) > 0 else [[]]*xyz.shape[0]
+		idx = [np.array(i,np.int64) for i in idx]
+		return self._gather_ids(idx,cells,comm) if gather else idx
+
+	@cr('Mesh.box')
+	def box(self,xyzmin,xyzmax,cells=False,gather=False,comm=None):
+		'''
+		Points (or cell centers) of this processor inside the box
+		[xyzmin,xyzmax], as an array of local indices.
+
+		With gather, the global ids of the points of all the processors
+		of comm (default MPI.COMM_WORLD) are returned instead.
+		'''
+		center = 0.5*(np.asarray(xyzmax,np.double) + np.asarray(xyzmin,np.double))
+		half   = 0.5*(np.asarray(xyzmax,np.double) - np.asarray(xyzmin,np.double))
+		idx    = np.zeros((0,),np.int64)
+		if self.size(not cells) > 0:
+			# Candidates in the cube around the box, then the exact test
+			idx = np.array(self.kdtree(cells).query_ball_point(center,half.max(),p=np.inf,return_sorted=True),np.int64)
+			xyz = self.xyzc if cells else self._xyz
+			idx = idx[np.all(np.abs(xyz[idx] - center) <= half,axis=1)]
+		return self._gather_ids([idx],cells,comm)[0] if gather else idx
+
+	def _gather_ids(self,idx,cells,comm):
+		'''
+		Global ids of the local indices of each query, merged
+		among the processors and without repetitions.
+		'''
+		order = self._cellO if cells else self._pointO
+		query = np.repeat(np.arange(len(idx),dtype=np.int64),[i.shape[0] for i in idx])
+		ids   = order[np.concatenate(idx)].astype(np.int64)
+		query = mpi_gather(query,all=True,comm=comm)
+		ids   = mpi_gather(ids,all=True,comm=comm)
+		keys  = np.unique(np.vstack((query,ids)).T,axis=0)
+		return np.split(keys[:,1],np.searchsorted(keys[:,0],np.arange(1,len(idx))))
 
 	def find_cell(self,eltype):
 		'''
@@ -164,6 +245,52 @@ class Mesh(object):
 			out = np.hstack((out,np.zeros((npoints,1))))
 		return out
 
+	@cr('Mesh.redistribute')
+	def redistribute(self,counts,active=True,comm=None):
+		'''
+		Move the cells among the processors, sending counts[i] of the
+		cells of this processor to processor i in order, and bring the
+		points of the new cells from the processors that hold them.
+		An inactive processor (e.g., the master) does not hold any cell.
+		All the processors of comm (default MPI.COMM_WORLD) take part.
+
+		Returns the new mesh and the exchange of the points as a tuple of
+		(rows to send, send counts, order of the received rows) so that
+		the point data can be moved in the same way.
+		'''
+		comm, _, size = mpi_comm(comm)
+		ncells = self.ncells if active else 0
+		pointO = self._pointO if active else self._pointO[:0]
+		# Move the cells with the connectivity as global point ids
+		conec  = self._conec[:ncells]
+		conec, _  = mpi_alltoallv(np.where(conec >= 0,pointO[conec],-1),counts,comm)
+		eltype, _ = mpi_alltoallv(self._eltype[:ncells],counts,comm)
+		cellO, _  = mpi_alltoallv(self._cellO[:ncells],counts,comm)
+		newO   = np.unique(conec[conec >= 0]).astype(np.int64)
+		# Every point is served by the lowest processor that holds it, which is
+		# registered on a directory where point i is on processor i*size//npointsG
+		npointsG   = mpi_reduce(int(pointO.max()) + 1 if pointO.shape[0] > 0 else 0,op='max',all=True,comm=comm)
+		held, hidx = np.unique(pointO,return_index=True)
+		held       = held.astype(np.int64)
+		ids, cnts  = mpi_alltoallv(held,np.bincount(held*size//npointsG,minlength=size),comm)
+		src        = np.repeat(np.arange(size),cnts)
+		order      = np.lexsort((src,ids))
+		dirids, ifirst = np.unique(ids[order],return_index=True)
+		dirown     = src[order][ifirst]
+		# Ask the directory for the holders of the new points
+		req, cnts  = mpi_alltoallv(newO,np.bincount(newO*size//npointsG,minlength=size),comm)
+		owner, _   = mpi_alltoallv(dirown[np.searchsorted(dirids,req)],cnts,comm)
+		# Request the new points to their holders
+		iorder     = np.argsort(owner,kind='stable')
+		req, cnts  = mpi_alltoallv(newO[iorder],np.bincount(owner,minlength=size),comm)
+		sidx       = hidx[np.searchsorted(held,req)]
+		perm       = np.argsort(iorder)
+		xyz, _     = mpi_alltoallv(self._xyz[sidx],cnts,comm)
+		# Fix the connectivity to start at zero
+		conec  = np.where(conec >= 0,np.searchsorted(newO,conec),-1).astype(self._conec.dtype)
+		mesh   = Mesh(self._type,xyz[perm],conec,eltype,cellO,newO.astype(self._pointO.dtype))
+		return mesh, (sidx,cnts,perm)
+
 	@classmethod
 	@cr('Mesh.new_struct2D')
 	def new_struct2D(cls,nx,ny,x,y,dimsx,dimsy):
@@ -9,7 +9,7 @@ from __future__ import print_function, division
 
 import numpy as np
 
-from .utils.parall import MPI_SIZE, worksplit, mpi_gather
+from .utils.parall import mpi_comm, worksplit, mpi_gather
 from .utils.cr     import cr
 from .utils.mem    import mem
 
@@ -21,14 +21,16 @@ class PartitionTable(object):
 	a new partition
 	'''
 	@mem('PartTable')
-	def __init__(self,nparts,ids,elements,points,has_master=False):
+	def __init__(self,nparts,ids,elements,points,has_master=False,comm=None):
 		'''
-		Class constructor
+		Class constructor, the partitions are held by the
+		processors of comm (MPI.COMM_WORLD by default)
 		'''
+		self._comm, _, size = mpi_comm(comm)
 		self._nparts      = nparts
 		self._ids         = ids
 		self._elements    = elements
-		self._master      = has_master if MPI_SIZE > 1 else False
+		self._master      = has_master if size > 1 else False
 		self._points      = points
 
 	def __str__(self):
@@ -43,7 +45,7 @@ class PartitionTable(object):
 		'''
 		Compute the partition bounds for a given rank
 		'''
-		if self._master and rank == 0 and not MPI_SIZE == 1: 
+		if self._master and rank == 0 and not self.size == 1: 
 			return 0, 1
 		offst    = 1 if not self._master else 0
 		mask_idx = self.Ids < rank + offst
@@ -83,11 +85,32 @@ class PartitionTable(object):
 		# Return
 		return xyz_new
 
+	def rank_bounds(self,rank,ndim=1,points=True):
+		'''
+		Partition bounds for a given rank, where
+		the master does not hold any rows
+		'''
+		if self._master and rank == 0 and not self.size == 1: return 0, 0
+		return self.partition_bounds(rank,ndim=ndim,points=points)
+
+	@cr('PartTable.send_counts')
+	def send_counts(self,ptable,rank,points=True):
+		'''
+		Number of rows that a rank sends to every rank to go
+		from this partition to another partition table
+		'''
+		istart, iend = self.rank_bounds(rank,points=points)
+		counts = np.zeros((self.size,),np.int64)
+		for irank in range(self.size):
+			jstart, jend  = ptable.rank_bounds(irank,points=points)
+			counts[irank] = max(min(iend,jend) - max(istart,jstart),0)
+		return counts
+
 	def update_points(self,npoints_new):
 		'''
 		Update the number of points on the table
 		'''
-		p = mpi_gather(npoints_new,all=True)
+		p = mpi_gather(npoints_new,all=True,comm=self._comm)
 		self._points = p if isinstance(p,np.ndarray) else np.array([p],np.int32)
 
 	def check_split(self):
@@ -96,12 +119,12 @@ class PartitionTable(object):
 		than the number of mpi ranks
 		'''
 		# Deal with master and serial
-		offst = 1 if self._master and not MPI_SIZE == 1 else 0
-		return self._nparts + offst == MPI_SIZE
+		offst = 1 if self._master and not self.size == 1 else 0
+		return self._nparts + offst == self.size
 
 	@classmethod
 	@cr('PartTable.new')
-	def new(cls,nparts,nelems,npoints,has_master=False):
+	def new(cls,nparts,nelems,npoints,has_master=False,comm=None):
 		'''
 		Create a new partition table, in serial algorithm.
 		'''
@@ -118,11 +141,11 @@ class PartitionTable(object):
 			# How many nodes do I have
 			istart, iend  = worksplit(0,npoints,ipart,nWorkers=nparts)
 			points[ipart] = iend - istart
-		return cls(nparts,ids,elements,points,has_master=has_master)
+		return cls(nparts,ids,elements,points,has_master=has_master,comm=comm)
 
 	@classmethod
 	@cr('PartTable.from_pyAlya')
-	def from_pyAlya(cls,ptable,has_master=True):
+	def from_pyAlya(cls,ptable,has_master=True,comm=None):
 		'''
 		Create a partition table from a partition table coming
 		from Alya
@@ -131,7 +154,7 @@ class PartitionTable(object):
 		ids      = np.arange(1,nparts+1,dtype=np.int32)
 		points   = ptable.Points
 		elements = ptable.Elements
-		return cls(nparts,ids,elements,points,has_master=has_master)		
+		return cls(nparts,ids,elements,points,has_master=has_master,comm=comm)
 
 	@property
 	def n_partitions(self):
@@ -147,4 +170,13 @@ class PartitionTable(object):
 		return self._points
 	@property
 	def has_master(self):
-		return self._master
\ No newline at end of file
+		return self._master
+	@property
+	def comm(self):
+		return self._comm
+	@property
+	def rank(self):
+		return self._comm.Get_rank()
+	@property
+	def size(self):
+		return self._comm.Get_size()
\ No newline at end of file
@@ -11,7 +11,7 @@ __VERSION__ = '1.0.0'
 from .errors import raiseError, raiseWarning
 from .cr     import cr, cr_start, cr_stop, cr_info
 from .mem    import mem, mem_start, mem_stop, mem_info
-from .parall import MPI_RANK, MPI_SIZE, worksplit, is_rank_or_serial, pprint
-from .parall import mpi_barrier, mpi_send, mpi_recv, mpi_sendrecv, mpi_scatter, mpi_gather, mpi_reduce, mpi_bcast
+from .parall import MPI_RANK, MPI_SIZE, mpi_comm, mpi_node_comm, NodeArray, worksplit, is_rank_or_serial, pprint
+from .parall import mpi_barrier, mpi_send, mpi_recv, mpi_sendrecv, mpi_scatter, mpi_gather, mpi_reduce, mpi_alltoallv, mpi_bcast
 
 del errors, parall
@@ -29,10 +29,171 @@ mpi_nanmin = mpi_create_op(lambda v1,v2,dtype : np.nanmin([v1,v2]),commute=True)
 mpi_nanmax = mpi_create_op(lambda v1,v2,dtype : np.nanmax([v1,v2]),commute=True)
 mpi_nansum = mpi_create_op(lambda v1,v2,dtype : np.nansum([v1,v2]),commute=True)
 
+MPI_BUFFER_OPS = (MPI.SUM, MPI.PROD, MPI.MAX, MPI.MIN) # Reductions done on buffers
 
-def worksplit(istart,iend,whoAmI,nWorkers=MPI_SIZE):
+
+class _BufferInfo(object):
+	'''
+	Shape and type of an array that is communicated as a buffer,
+	sent with pickle so that the receivers can allocate it.
+	'''
+	def __init__(self, array):
+		self.shape = array.shape
+		self.dtype = array.dtype.str
+
+	def empty(self):
+		return np.empty(self.shape,self.dtype)
+
+
+def _as_buffer(sendbuff,scalars=True):
+	'''
+	Contiguous numeric array of a numpy array (or scalar), None
+	when the object has to be communicated with pickle.
+	'''
+	if isinstance(sendbuff,np.ndarray) or (scalars and isinstance(sendbuff,(np.generic,int,float,complex))):
+		buff = np.asarray(sendbuff)
+		if buff.dtype.kind in 'biufc': return buff if buff.flags.c_contiguous else buff.copy(order='C')
+	return None
+
+
+def _as_input(out,sendbuff):
 	'''
-	Divide the work between the processors
+	Return a result buffer with the type of the input, i.e.,
+	as an array, a numpy scalar or a python scalar.
+	'''
+	if isinstance(sendbuff,np.ndarray): return out
+	return out[()] if isinstance(sendbuff,np.generic) else out.item()
+
+
+def mpi_comm(comm=None):
+	'''
+	Communicator, rank and size of a communicator, the
+	processors of MPI_COMM are used by default.
+	'''
+	comm = MPI_COMM if comm is None else comm
+	return comm, comm.Get_rank(), comm.Get_size()
+
+def _free_node_comm(comm,keyval,node_comm):
+	'''
+	Free the node communicators cached on a communicator when it is freed.
+	'''
+	node, leaders = node_comm
+	if not leaders == MPI.COMM_NULL: leaders.Free()
+	node.Free()
+
+MPI_NODE_KEYVAL = MPI.Comm.Create_keyval(delete_fn=_free_node_comm)
+
+def mpi_node_comm(comm=None):
+	'''
+	Split a communicator by node (shared memory). Returns the communicator
+	of the processors of the node and the communicator of the node leaders,
+	the first processor of each node, which is MPI.COMM_NULL on the others.
+
+	The communicators are cached on the communicator, hence they are
+	only split once and must not be freed by the caller.
+	'''
+	comm, rank, _ = mpi_comm(comm)
+	node_comm = comm.Get_attr(MPI_NODE_KEYVAL)
+	if node_comm is None:
+		node      = comm.Split_type(MPI.COMM_TYPE_SHARED,key=rank)
+		leaders   = comm.Split(0 if node.Get_rank() == 0 else MPI.UNDEFINED,rank)
+		node_comm = (node,leaders)
+		comm.Set_attr(MPI_NODE_KEYVAL,node_comm)
+	return node_comm
+
+
+class NodeArray(object):
+	'''
+	Array of the processors of a node in an MPI-3 shared memory window.
+
+	Each processor holds some rows of the array, stored contiguously
+	in the order of the ranks, so that the node leader can work on
+	the rows of the whole node at once (e.g., with threaded BLAS) and
+	the matrices that are the same for all the processors are only
+	stored once per node.
+	'''
+	def __init__(self, shape, dtype=np.double, comm=None, node=None):
+		'''
+		Class constructor
+
+		Inputs:
+			> shape: shape of the rows of this processor.
+			> dtype: data type of the array.
+			> comm:  communicator of the processors (default MPI_COMM).
+			> node:  (node,leaders) communicators from mpi_node_comm to reuse.
+		'''
+		self._node, self._leaders = mpi_node_comm(comm) if node is None else node
+		shape = tuple(shape)
+		rows  = np.array(self._node.allgather(shape[0]),np.int64)
+		shape = (int(rows.sum()),) + shape[1:]
+		dtype = np.dtype(dtype)
+		# The leader allocates the window of the whole node
+		nbytes = int(np.prod(shape,dtype=np.int64))*dtype.itemsize if self.is_leader else 0
+		self._win = MPI.Win.Allocate_shared(nbytes,dtype.itemsize,comm=self._node)
+		buff, _ = self._win.Shared_query(0)
+		self._array = np.ndarray(shape,dtype,buffer=buff)
+		self._start = int(rows[:self._node.Get_rank()].sum())
+		self._end   = self._start + int(rows[self._node.Get_rank()])
+
+	def __len__(self):
+		return self._end - self._start
+
+	def __array__(self,dtype=None,copy=None):
+		return self.local if dtype is None else self.local.astype(dtype,copy=False)
+
+	def empty_like(self,shape=None,dtype=None,leader=False):
+		'''
+		New NodeArray on the same node, with the rows of this array (default)
+		or the given shape. With leader the rows are only held by the leader,
+		i.e., the array is shared by all the processors of the node.
+		'''
+		shape = self.shape if shape is None else tuple(shape)
+		if leader and not self.is_leader: shape = (0,) + shape[1:]
+		return NodeArray(shape,self.dtype if dtype is None else dtype,node=(self._node,self._leaders))
+
+	def barrier(self):
+		'''
+		Synchronize the processors of the node.
+		'''
+		self._win.Sync()
+		self._node.Barrier()
+
+	def free(self):
+		'''
+		Release the shared memory window, the communicators
+		are cached by mpi_node_comm and kept.
+		'''
+		self._array = None
+		self._win.Free()
+
+	@property
+	def local(self):
+		return self._array[self._start:self._end]
+	@property
+	def node(self):
+		return self._array
+	@property
+	def shape(self):
+		return (len(self),) + self._array.shape[1:]
+	@property
+	def dtype(self):
+		return self._array.dtype
+	@property
+	def node_comm(self):
+		return self._node
+	@property
+	def leaders(self):
+		return self._leaders
+	@property
+	def is_leader(self):
+		return self._node.Get_rank() == 0
+
+
+
+def worksplit(istart,iend,whoAmI,nWorkers):
+	'''
+	Divide the work between nWorkers processors, the size of
+	the communicator where they work, and return the range of whoAmI
 	'''
 	istart_l, iend_l = istart, iend
 	irange = iend - istart
@@ -57,103 +218,161 @@ def worksplit(istart,iend,whoAmI,nWorkers=MPI_SIZE):
 	return istart_l, iend_l
 
 
-def writesplit(npoints,write_master):
+def writesplit(npoints,write_master,comm=None):
 	'''
 	Divide the write array between the processors
 	'''
+	comm, rank, size = mpi_comm(comm)
 	rstart = 1 if not write_master else 0
 	istart, iend = 0, 0 
 	# Select in which order the processors will write
-	if MPI_RANK == rstart:
+	if rank == rstart:
 		# send to next where to start writing
 		istart, iend = 0, npoints
-		mpi_send(iend,dest=MPI_RANK+1)
-	elif MPI_RANK == MPI_SIZE-1:
+		mpi_send(iend,dest=rank+1,comm=comm)
+	elif rank == size-1:
 		# recive from the previous where to start writing
-		istart = mpi_recv(source=MPI_RANK-1) 
+		istart = mpi_recv(comm=comm,source=rank-1) 
 		iend   = istart + npoints
 	else:
 		# recive from the previous where to start writing
-		istart = mpi_recv(source=MPI_RANK-1) 
+		istart = mpi_recv(comm=comm,source=rank-1) 
 		iend   = istart + npoints
 		# send to next where to start writing
-		mpi_send(iend,dest=MPI_RANK+1) 
+		mpi_send(iend,dest=rank+1,comm=comm) 
 	return istart, iend
 
 
-def split(array,root=0):
+def split(array,root=0,comm=None):
 	'''
 	Split an array among the processors
 	'''
-	return np.vsplit(array,[worksplit(0,array.shape[0],i)[1] for i in range(MPI_SIZE-1)]) if MPI_RANK==root else None
+	comm, rank, size = mpi_comm(comm)
+	return np.vsplit(array,[worksplit(0,array.shape[0],i,size)[1] for i in range(size-1)]) if rank==root else None
 
 
-def is_rank_or_serial(root=0):
+def is_rank_or_serial(root=0,comm=None):
 	'''
 	Return whether the rank is active or True
 	in case of a serial run
 	'''
-	return MPI_RANK == root or MPI_SIZE == 1
+	comm, rank, size = mpi_comm(comm)
+	return rank == root or size == 1
 
 
-def mpi_barrier():
+def mpi_barrier(comm=None):
 	'''
 	Implements the barrier
 	'''
-	MPI_COMM.Barrier()
+	comm = mpi_comm(comm)[0]
+	comm.Barrier()
 
 
-def mpi_send(f,dest,tag=0):
+def mpi_send(f,dest,tag=0,comm=None):
 	'''
-	Implements the send operation
+	Implements the send operation, numpy arrays are
+	sent as buffers after their shape and type.
 	'''
-	MPI_COMM.send(f,dest,tag=tag)
+	comm = mpi_comm(comm)[0]
+	buff = _as_buffer(f,scalars=False)
+	if buff is None:
+		comm.send(f,dest,tag=tag)
+	else:
+		comm.send(_BufferInfo(buff),dest,tag=tag)
+		comm.Send(buff,dest,tag=tag)
 
 
-def mpi_recv(**kwargs):
+def mpi_recv(comm=None,**kwargs):
 	'''
 	Implements the recieve operation
 	'''
-	return MPI_COMM.recv(**kwargs)
-
-
-def mpi_sendrecv(buff,**kwargs):
+	comm = mpi_comm(comm)[0]
+	status = MPI.Status()
+	out    = comm.recv(status=status,**kwargs)
+	if isinstance(out,_BufferInfo):
+		# The array follows from the same source
+		buff = out.empty()
+		comm.Recv(buff,source=status.Get_source(),tag=status.Get_tag())
+		return buff
+	return out
+
+
+def mpi_sendrecv(buff,comm=None,**kwargs):
 	'''
 	Implements the sendrecv operation
 	'''
-	return MPI_COMM.sendrecv(buff,**kwargs)
+	comm = mpi_comm(comm)[0]
+	return comm.sendrecv(buff,**kwargs)
 
 
-def mpi_scatter(sendbuff,root=0,do_split=False):
+def mpi_scatter(sendbuff,root=0,do_split=False,comm=None):
 	'''
 	Send an array among the processors and split
 	if necessary.
 	'''
-	if MPI_SIZE > 1:
-		return MPI_COMM.scatter(split(sendbuff,root=root),root=root) if do_split else MPI_COMM.scatter(sendbuff,root=root)
+	comm, rank, size = mpi_comm(comm)
+	if size > 1:
+		if do_split:
+			# Arrays are split by rows with a Scatterv
+			buff = _as_buffer(sendbuff,scalars=False) if rank == root else None
+			info = comm.bcast(_BufferInfo(buff) if buff is not None else None,root=root)
+			if info is not None:
+				bounds = np.array([worksplit(0,info.shape[0],i,size) for i in range(size)],np.int64)
+				rowsz  = int(np.prod(info.shape[1:]))
+				out    = np.empty((bounds[rank,1]-bounds[rank,0],)+info.shape[1:],info.dtype)
+				comm.Scatterv([buff,((bounds[:,1]-bounds[:,0])*rowsz,bounds[:,0]*rowsz)] if rank == root else None,out,root=root)
+				return out
+		return comm.scatter(split(sendbuff,root=root,comm=comm),root=root) if do_split else comm.scatter(sendbuff,root=root)
 	return sendbuff
 
 
-def mpi_gather(sendbuff,root=0,all=False):
+def mpi_gather(sendbuff,root=0,all=False,comm=None):
 	'''
 	Gather an array from all the processors.
+
+	Numpy arrays and scalars are gathered by rows as buffers
+	when all the processors agree on their type and row size,
+	any other object is gathered with pickle.
 	'''
-	if MPI_SIZE > 1:
+	comm, rank, size = mpi_comm(comm)
+	if size > 1:
+		buff = _as_buffer(sendbuff)
+		# Rows, row size, dimensions and type of every processor
+		info = np.array([-1,-1,-1,-1] if buff is None else [buff.size if buff.ndim == 0 else buff.shape[0],int(np.prod(buff.shape[1:])),max(buff.ndim,1),buff.dtype.num],np.int64)
+		allinfo = np.empty((size,4),np.int64)
+		comm.Allgather(info,allinfo)
+		if np.all(allinfo[:,0] >= 0) and np.all(allinfo[:,1:] == allinfo[0,1:]):
+			buff   = buff.reshape((1,)) if buff.ndim == 0 else buff
+			counts = allinfo[:,0]*allinfo[0,1]
+			displs = np.concatenate(([0],np.cumsum(counts)[:-1]))
+			out    = np.empty((int(allinfo[:,0].sum()),)+buff.shape[1:],buff.dtype) if all or rank == root else None
+			if all:
+				comm.Allgatherv(buff,[out,(counts,displs)])
+			else:
+				comm.Gatherv(buff,[out,(counts,displs)] if rank == root else None,root=root)
+			return out
 		if not isinstance(sendbuff,np.ndarray) and not isinstance(sendbuff,list): sendbuff = [sendbuff]
 		if all:
-			out = np.array(MPI_COMM.allgather(sendbuff))
+			out = np.array(comm.allgather(sendbuff))
 			return np.concatenate(out,axis=0)
 		else:
-			out = np.array(MPI_COMM.gather(sendbuff,root=root))
-			return np.concatenate(out,axis=0) if MPI_RANK == root else None
+			out = np.array(comm.gather(sendbuff,root=root))
+			return np.concatenate(out,axis=0) if rank == root else None
 	return sendbuff
 
 
-def mpi_reduce(sendbuff,root=0,op='sum',all=False):
+def mpi_reduce(sendbuff,root=0,op='sum',all=False,comm=None,check=False):
 	'''
 	Reduce an array from all the processors.
+
+	The predefined reductions of numpy arrays and scalars are done
+	on buffers, which requires the same shape and type on all the
+	processors, any other object or reduction is done with pickle.
+	With check the shape and type are first compared among the
+	processors and the reduction falls back to pickle when they differ.
 	'''
-	if MPI_SIZE > 1:
+	comm, rank, size = mpi_comm(comm)
+	if size > 1:
 		if isinstance(op,str):
 			if 'sum'    in op: opf = MPI.SUM
 			if 'max'    in op: opf = MPI.MAX
@@ -163,20 +382,68 @@ def mpi_reduce(sendbuff,root=0,op='sum',all=False):
 			if 'nansum' in op: opf = mpi_nansum
 		else:
 			opf = op
+		# Predefined reductions of numeric arrays and scalars are done on buffers
+		buff = _as_buffer(sendbuff) if opf in MPI_BUFFER_OPS else None
+		if buff is not None and not buff.dtype.kind in 'iufc': buff = None
+		if check and opf in MPI_BUFFER_OPS:
+			info    = np.array([-1,-1,-1] if buff is None else [buff.dtype.num,buff.ndim,hash(buff.shape)],np.int64)
+			allinfo = np.empty((size,3),np.int64)
+			comm.Allgather(info,allinfo)
+			if not (allinfo[0,0] >= 0 and np.all(allinfo == allinfo[0,:])): buff = None
+		if buff is not None:
+			out = np.empty_like(buff)
+			if all:
+				comm.Allreduce(buff,out,op=opf)
+				return _as_input(out,sendbuff)
+			comm.Reduce(buff,out,op=opf,root=root)
+			return _as_input(out,sendbuff) if root == rank else sendbuff
 		if all:
-			return MPI_COMM.allreduce(sendbuff,op=opf)
+			return comm.allreduce(sendbuff,op=opf)
 		else:
-			out = MPI_COMM.reduce(sendbuff,op=opf,root=root)
-			return out if root == MPI_RANK else sendbuff
+			out = comm.reduce(sendbuff,op=opf,root=root)
+			return out if root == rank else sendbuff
 	else:
 		return sendbuff
 
 
-def mpi_bcast(sendbuff,root=0):
+def mpi_alltoallv(sendbuff,sendcounts,comm=None):
+	'''
+	Exchange the rows of an array among the processors with a buffer
+	based all to all. The rows of sendbuff are sorted by destination
+	and sendcounts has the number of rows for each processor.
+
+	Returns the received rows, sorted by source, and the number
+	of rows received from each processor.
+	'''
+	comm, rank, size = mpi_comm(comm)
+	sendcounts = np.asarray(sendcounts,np.int64)
+	if size == 1: return np.ascontiguousarray(sendbuff), sendcounts
+	recvcounts = np.empty_like(sendcounts)
+	comm.Alltoall(sendcounts,recvcounts)
+	sendbuff = np.ascontiguousarray(sendbuff)
+	recvbuff = np.empty((int(recvcounts.sum()),)+sendbuff.shape[1:],sendbuff.dtype)
+	# Counts and displacements are given in elements of the buffer
+	rowsz = int(np.prod(sendbuff.shape[1:]))
+	scnts, rcnts = sendcounts*rowsz, recvcounts*rowsz
+	sdisp = np.concatenate(([0],np.cumsum(scnts)[:-1]))
+	rdisp = np.concatenate(([0],np.cumsum(rcnts)[:-1]))
+	comm.Alltoallv([sendbuff,(scnts,sdisp)],[recvbuff,(rcnts,rdisp)])
+	return recvbuff, recvcounts
+
+
+def mpi_bcast(sendbuff,root=0,comm=None):
 	'''
-	Implements the broadcast operation
+	Implements the broadcast operation, numpy arrays
+	are broadcasted as buffers after their shape and type.
 	'''
-	return MPI_COMM.bcast(sendbuff,root=root)
+	comm, rank, size = mpi_comm(comm)
+	if size == 1: return sendbuff
+	buff = _as_buffer(sendbuff,scalars=False) if rank == root else None
+	info = comm.bcast(_BufferInfo(buff) if buff is not None else sendbuff,root=root)
+	if not isinstance(info,_BufferInfo): return info
+	buff = buff if rank == root else info.empty()
+	comm.Bcast(buff,root=root)
+	return sendbuff if rank == root else buff
 
 
 def pprint(rank,*args,**kwargs):
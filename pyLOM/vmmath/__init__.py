@@ -13,9 +13,9 @@ from .wrapper import transpose, vector_norm, matmul, matmulp, vecmat, argsort, e
 # Averaging routines
 from .wrapper import temporal_mean, subtract_mean, RMSE
 # SVD routines
-from .wrapper import qr, svd, tsqr, tsqr_svd
+from .wrapper import qr, svd, tsqr, tsqr_svd, tsqr_shared, tsqr_svd_shared, randomized_svd, TSQR_TREES
 # FFT routines
-from .wrapper import fft
+from .wrapper import fft, batched_fft
 # Cell center routines
 from .wrapper import cellCenters
 
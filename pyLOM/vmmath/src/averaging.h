@@ -2,4 +2,7 @@
 	Averaging routines
 */
 void temporal_mean(double *out, double *X, const int m, const int n);
-void subtract_mean(double *out, double *X, double *X_mean, const int m, const int n);
\ No newline at end of file
+void subtract_mean(double *out, double *X, double *X_mean, const int m, const int n);
+// Single precision version
+void stemporal_mean(float *out, float *X, const int m, const int n);
+void ssubtract_mean(float *out, float *X, float *X_mean, const int m, const int n);
@@ -20,6 +20,19 @@
 
 #include "fft.h"
 
+#ifdef USE_OMP
+#include <omp.h>
+#endif
+
+// Plans cached between calls to the batched FFT, they are
+// only created again when the size of the transforms changes
+static int fft_n = 0, fft_howmany = 0;
+#ifdef USE_FFTW3
+static fftw_plan      fft_plan = NULL;
+#else
+static kiss_fftr_cfg *fft_cfg  = NULL;
+#endif
+
 
 void fft1D(double complex *out, double *y, const int n) {
 	/*
@@ -64,6 +77,71 @@ void fft1D(double complex *out, double *y, const int n) {
 }
 
 
+void fft1D_batched(complex_t *out, double *y, const int n, const int howmany) {
+	/*
+		Compute the FFT of each row of a matrix y.
+		A single plan is used for all the rows and it is cached
+		so that successive calls with the same sizes reuse it.
+		Uses FFTW or KISSFFT libraries depending on compilation settings.
+
+		y(howmany,n)        are the rows where to compute the FFT.
+
+		out(howmany,n/2+1)  are the non negative frequencies of the FFT
+		                    of each row and must come preallocated.
+	*/
+	int ii, nf = n/2 + 1, nplans = 1;
+	#ifdef USE_OMP
+	nplans = omp_get_max_threads();
+	#endif
+	#ifdef USE_FFTW3
+		// With OpenMP every thread executes the plan of a single row on its
+		// own rows, otherwise one plan transforms all the rows at once
+		int nrows = (nplans > 1) ? 1 : howmany;
+		if (fft_plan == NULL || fft_n != n || fft_howmany != nrows) {
+			if (fft_plan != NULL) fftw_destroy_plan(fft_plan);
+			// FFTW_ESTIMATE does not overwrite y while planning and
+			// FFTW_UNALIGNED allows executing the plan on other arrays
+			fft_plan    = fftw_plan_many_dft_r2c(1,&n,nrows,y,NULL,1,n,out,NULL,1,nf,FFTW_ESTIMATE|FFTW_UNALIGNED);
+			fft_n       = n;
+			fft_howmany = nrows;
+		}
+		if (nrows == 1) {
+			#ifdef USE_OMP
+			#pragma omp parallel for private(ii) shared(out,y) firstprivate(n,nf,howmany)
+			#endif
+			for (ii=0; ii<howmany; ++ii)
+				fftw_execute_dft_r2c(fft_plan,y+n*ii,out+nf*ii);
+		} else {
+			fftw_execute_dft_r2c(fft_plan,y,out);
+		}
+	#else
+		// KISSFFT configurations hold a scratch buffer, hence one per thread
+		if (fft_cfg == NULL || fft_n != n || fft_howmany != nplans) {
+			if (fft_cfg != NULL) {
+				for (ii=0; ii<fft_howmany; ++ii)
+					kiss_fftr_free(fft_cfg[ii]);
+				free(fft_cfg);
+			}
+			fft_cfg = (kiss_fftr_cfg*)malloc(nplans*sizeof(kiss_fftr_cfg));
+			for (ii=0; ii<nplans; ++ii)
+				fft_cfg[ii] = kiss_fftr_alloc(n,0,NULL,NULL);
+			fft_n       = n;
+			fft_howmany = nplans;
+		}
+		#ifdef USE_OMP
+		#pragma omp parallel for private(ii) shared(out,y,fft_cfg) firstprivate(n,nf,howmany)
+		#endif
+		for (ii=0; ii<howmany; ++ii) {
+			#ifdef USE_OMP
+			kiss_fftr(fft_cfg[omp_get_thread_num()],y+n*ii,(kiss_fft_cpx*)(out+nf*ii));
+			#else
+			kiss_fftr(fft_cfg[0],y+n*ii,(kiss_fft_cpx*)(out+nf*ii));
+			#endif
+		}
+	#endif
+}
+
+
 void fft(double *psd, double *y, const double dt, const int n) {
 	/*
 		Compute FFT and power spectral density (PSD) of an array y of size n.
@@ -8,6 +8,7 @@ typedef double _Complex complex_t;
 #include "mkl.h"
 #endif
 void fft1D(complex_t *out, double *y, const int n);
+void fft1D_batched(complex_t *out, double *y, const int n, const int howmany);
 void fft(double *psd, double *y, const double dt, const int n);
 void nfft(double *psd, double *t, double* y, const int n);
 
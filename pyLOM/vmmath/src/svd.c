@@ -6,11 +6,15 @@
 #include <math.h>
 #include <complex.h>
 #include <stdio.h>
+#include <time.h>
+#include <float.h>
 #include "mpi.h"
 typedef double _Complex complex_t;
+typedef float  _Complex scomplex_t;
 
 #ifdef USE_MKL
 #define MKL_Complex16 complex_t
+#define MKL_Complex8  scomplex_t
 #include "mkl.h"
 #include "mkl_lapacke.h"
 #else
@@ -307,7 +311,7 @@ int tsqr_svd2(double *Ui, double *S, double *VT, double *Ai, const int m, const
 	double *Ur;
 	Ur = (double*)malloc(n*n*sizeof(double));
 	// Call SVD routine
-	info = svd(Ur,S,VT,R,n,n); if (!(info==0)) return info;
+	info = svd(Ur,S,VT,R,n,n); if (!(info==0)) {free(Ur); free(R); free(Qi); return info;}
 	// Compute Ui = Qi x Ur
 	matmul(Ui,Qi,Ur,m,n,n);
 	// Free memory
@@ -316,127 +320,401 @@ int tsqr_svd2(double *Ui, double *S, double *VT, double *Ai, const int m, const
 }
 
 
-int nextPowerOf2(int n) {
-	int p = 1;
-	if (n && !(n & (n - 1))) return n;
-	while (p < n) p <<= 1;
-	return p;
+/*
+	Reduction trees of the TSQR algorithm
+
+	All the trees start from the local QR factorization Ai = Q1i Ri and
+	return the global R on every processor together with the n x n factor
+	QW of the processor, so that Qi = Q1i x QW. They are written once for
+	all the precisions through the tsqr_ops table of the element type.
+*/
+typedef struct {
+	size_t       size;  // Bytes of an element
+	MPI_Datatype dtype; // MPI datatype of an element
+	const void  *one;   // Unit element
+	double       eps;   // Machine epsilon
+	int  (*qr)(void *Q, void *R, void *A, const int m, const int n);
+	void (*matmul)(void *C, void *A, void *B, const int m, const int n, const int k);
+	void (*gram)(void *G, void *A, const int m, const int n);
+	int  (*chol)(void *G, const int n);
+	int  (*trinv)(void *R, const int n);
+	int  (*trcon)(void *R, const int n, double *rcond);
+} tsqr_ops;
+
+#define TSQR_ELEM(A,ops,i) ((char*)(A) + (size_t)(i)*(ops)->size)
+
+static const double     ONE_D = 1.;
+static const complex_t  ONE_Z = 1.;
+static const float      ONE_S = 1.;
+static const scomplex_t ONE_C = 1.;
+
+static int  dqr_op(void *Q, void *R, void *A, const int m, const int n) {return qr((double*)Q,(double*)R,(double*)A,m,n);}
+static void dmatmul_op(void *C, void *A, void *B, const int m, const int n, const int k) {matmul((double*)C,(double*)A,(double*)B,m,n,k);}
+static void dgram_op(void *G, void *A, const int m, const int n) {matmult((double*)G,(double*)A,(double*)A,n,n,m,"T","N");}
+static int  dchol_op(void *G, const int n) {return LAPACKE_dpotrf(LAPACK_ROW_MAJOR,'U',n,(double*)G,n);}
+static int  dtrinv_op(void *R, const int n) {return LAPACKE_dtrtri(LAPACK_ROW_MAJOR,'U','N',n,(double*)R,n);}
+static int  dtrcon_op(void *R, const int n, double *rcond) {return LAPACKE_dtrcon(LAPACK_ROW_MAJOR,'1','U','N',n,(double*)R,n,rcond);}
+static int  zqr_op(void *Q, void *R, void *A, const int m, const int n) {return zqr((complex_t*)Q,(complex_t*)R,(complex_t*)A,m,n);}
+static void zmatmul_op(void *C, void *A, void *B, const int m, const int n, const int k) {zmatmul((complex_t*)C,(complex_t*)A,(complex_t*)B,m,n,k);}
+static void zgram_op(void *G, void *A, const int m, const int n) {zmatmult((complex_t*)G,(complex_t*)A,(complex_t*)A,n,n,m,"C","N");}
+static int  zchol_op(void *G, const int n) {return LAPACKE_zpotrf(LAPACK_ROW_MAJOR,'U',n,(complex_t*)G,n);}
+static int  ztrinv_op(void *R, const int n) {return LAPACKE_ztrtri(LAPACK_ROW_MAJOR,'U','N',n,(complex_t*)R,n);}
+static int  ztrcon_op(void *R, const int n, double *rcond) {return LAPACKE_ztrcon(LAPACK_ROW_MAJOR,'1','U','N',n,(complex_t*)R,n,rcond);}
+static int  sqr_op(void *Q, void *R, void *A, const int m, const int n) {return sqr((float*)Q,(float*)R,(float*)A,m,n);}
+static void smatmul_op(void *C, void *A, void *B, const int m, const int n, const int k) {smatmul((float*)C,(float*)A,(float*)B,m,n,k);}
+static void sgram_op(void *G, void *A, const int m, const int n) {smatmult((float*)G,(float*)A,(float*)A,n,n,m,"T","N");}
+static int  schol_op(void *G, const int n) {return LAPACKE_spotrf(LAPACK_ROW_MAJOR,'U',n,(float*)G,n);}
+static int  strinv_op(void *R, const int n) {return LAPACKE_strtri(LAPACK_ROW_MAJOR,'U','N',n,(float*)R,n);}
+static int  strcon_op(void *R, const int n, double *rcond) {float rc; int info = LAPACKE_strcon(LAPACK_ROW_MAJOR,'1','U','N',n,(float*)R,n,&rc); *rcond = rc; return info;}
+static int  cqr_op(void *Q, void *R, void *A, const int m, const int n) {return cqr((scomplex_t*)Q,(scomplex_t*)R,(scomplex_t*)A,m,n);}
+static void cmatmul_op(void *C, void *A, void *B, const int m, const int n, const int k) {cmatmul((scomplex_t*)C,(scomplex_t*)A,(scomplex_t*)B,m,n,k);}
+static void cgram_op(void *G, void *A, const int m, const int n) {cmatmult((scomplex_t*)G,(scomplex_t*)A,(scomplex_t*)A,n,n,m,"C","N");}
+static int  cchol_op(void *G, const int n) {return LAPACKE_cpotrf(LAPACK_ROW_MAJOR,'U',n,(scomplex_t*)G,n);}
+static int  ctrinv_op(void *R, const int n) {return LAPACKE_ctrtri(LAPACK_ROW_MAJOR,'U','N',n,(scomplex_t*)R,n);}
+static int  ctrcon_op(void *R, const int n, double *rcond) {float rc; int info = LAPACKE_ctrcon(LAPACK_ROW_MAJOR,'1','U','N',n,(scomplex_t*)R,n,&rc); *rcond = rc; return info;}
+
+static void tsqr_eye(void *A, const int n, const tsqr_ops *ops) {
+	/*
+		Set an n x n matrix to the identity.
+	*/
+	int ii;
+	memset(A,0,n*n*ops->size);
+	for (ii=0; ii<n; ++ii)
+		memcpy(TSQR_ELEM(A,ops,ii*n+ii),ops->one,ops->size);
 }
 
-int tsqr(double *Qi, double *R, double *Ai, const int m, const int n, MPI_Comm comm) {
+static void tsqr_triu(void *A, const int n, const tsqr_ops *ops) {
 	/*
-		Single value decomposition (SVD) using TSQR algorithm from
-		J. Demmel, L. Grigori, M. Hoemmen, and J. Langou, ‘Communication-optimal Parallel
-		and Sequential QR and LU Factorizations’, SIAM J. Sci. Comput.,
-		vol. 34, no. 1, pp. A206–A239, Jan. 2012,
+		Zero the strictly lower part of an n x n matrix.
+	*/
+	int ii;
+	for (ii=1; ii<n; ++ii)
+		memset(TSQR_ELEM(A,ops,ii*n),0,ii*ops->size);
+}
 
-		doi: 10.1137/080731992.
+static int tsqr_qr2(void *Q2, void *R, void *Rt, void *Rb, const int n, const tsqr_ops *ops) {
+	/*
+		QR factorization of the stacked [Rt; Rb] matrix, R can be Rt.
+	*/
+	int info;
+	size_t nn = n*n*ops->size;
+	char *C = (char*)malloc(2*nn);
+	memcpy(C,Rt,nn); memcpy(C+nn,Rb,nn);
+	info = ops->qr(Q2,R,C,2*n,n);
+	free(C);
+	return info;
+}
 
-		Ai(m,n)  data matrix dispersed on each processor.
+static int tsqr_binary(void *QW, void *R, const int n, const tsqr_ops *ops, MPI_Comm comm) {
+	/*
+		Binary tree of Demmel et al (2012) for any number of processors.
 
-		Qi(m,n)  Q matrix per processor.
-		R(n,n)   R matrix.
+		At each level the processors with the level bit set send their R
+		to their partner and leave the reduction, the partners stack both
+		and factorize them. On the way down a parent sends [R; Q2b x F] to
+		each of its children without waiting, so that it computes the
+		block of the next child while the previous message is in flight.
 	*/
-	int info = 0, ii, jj, n2 = n*2, ilevel, blevel, mask;
+	int info = 0, ilevel, blevel, prank, top, nlevels = 0, nreq = 0;
 	int mpi_rank, mpi_size;
-	double *Q1i, *Q2i, *Q2l, *QW, *C;
+	size_t nn = n*n*ops->size;
+	char *Q2l, *G, *buf;
+	MPI_Request *reqs;
 	// Recover rank and size
 	MPI_Comm_rank(comm,&mpi_rank);
 	MPI_Comm_size(comm,&mpi_size);
-	// Memory allocation
-	Q1i = (double*)malloc(m*n*sizeof(double));
-	Q2i = (double*)malloc(n2*n*sizeof(double));
-	QW  = (double*)malloc(n*n*sizeof(double));
-	C   = (double*)malloc(n2*n*sizeof(double));
-	// Preallocate QW to identity
-	memset(QW,0.,n*n*sizeof(double));
-	for (ii=0; ii<n; ++ii)
-		AC_MAT(QW,n,ii,ii) = 1.;
-	// Algorithm 1 from Demmel et al (2012)
-	// 1: QR Factorization on Ai to obtain Q1i and Ri
-	info = qr(Q1i,R,Ai,m,n); if (!(info==0)) return info;
-	// Reduction, every processor sends R and computes V2i
-	int next_power = nextPowerOf2(mpi_size);
-	int nlevels    = (int)(log2(next_power));
-	int prank;
-	Q2l = (double*)malloc(nlevels*n2*n*sizeof(double));
-	for (blevel=1,ilevel=0; blevel < next_power; blevel<<=1,++ilevel) {
-		// Store R in the upper part of the C matrix
-		for (ii=0; ii<n; ++ii)
-			for (jj=0; jj<n; ++jj)
-				AC_MAT(C,n,ii,jj) = AC_MAT(R,n,ii,jj);
-		// Decide who sends and who recieves, use R as buffer
+	for (blevel=1; blevel<mpi_size; blevel<<=1) ++nlevels;
+	// Memory allocation, one Q2 and one outgoing message per level
+	Q2l  = (char*)malloc(nlevels*2*nn+1);
+	buf  = (char*)malloc(nlevels*2*nn+1);
+	G    = (char*)malloc(2*nn);
+	reqs = (MPI_Request*)malloc((nlevels+1)*sizeof(MPI_Request));
+	// Reduction, top is the level where this processor hands over its R
+	for (blevel=1,ilevel=0,top=nlevels; blevel<mpi_size; blevel<<=1,++ilevel) {
 		prank = mpi_rank^blevel;
 		if (mpi_rank&blevel) {
-			if (prank < mpi_size) MPI_Send(R,n*n,MPI_DOUBLE,prank,0,comm);
-		} else {
-			// Receive R
-			if (prank < mpi_size) {
-				MPI_Recv(R,n*n,MPI_DOUBLE,prank,0,comm,MPI_STATUS_IGNORE);
-				// Store R in the lower part of the C matrix
-				for (ii=0; ii<n; ++ii)
-					for (jj=0; jj<n; ++jj)
-						AC_MAT(C,n,ii+n,jj) = AC_MAT(R,n,ii,jj);
-				// 2: QR from the C matrix, reuse C and R
-				info = qr(Q2i,R,C,n2,n); if (!(info==0)) return info;
-				// Store Q2i from this level
-//				matmul(Q2i,C,QW,n2,n,n);
-				for (ii=0; ii<n2; ++ii)
-					for (jj=0; jj<n; ++jj)
-						AC_MAT(Q2l,n,ii+ilevel*n2,jj) = AC_MAT(Q2i,n,ii,jj);
-			}
+			MPI_Send(R,n*n,ops->dtype,prank,0,comm);
+			top = ilevel;
+			break;
+		}
+		if (prank < mpi_size) {
+			MPI_Recv(G,n*n,ops->dtype,prank,0,comm,MPI_STATUS_IGNORE);
+			info = tsqr_qr2(Q2l+ilevel*2*nn,R,R,G,n,ops); if (!(info==0)) break;
 		}
 	}
-	// At this point R is correct on processor 0
-	// Broadcast R and its part of the Q matrix
-	if (mpi_size > 1) {
-		for (blevel = 1 << (nlevels-1),mask=blevel-1,ilevel=nlevels-1; blevel >= 1; blevel>>=1,mask>>=1,--ilevel) {
-			if ( ((mpi_rank^0)&mask) == 0 ) {
-				// Obtain Q2i for this level - use C as buffer
-				for (ii=0; ii<n2; ++ii)
-					for (jj=0; jj<n; ++jj)
-						AC_MAT(C,n,ii,jj) = AC_MAT(Q2l,n,ii+ilevel*n2,jj);
-				// Multiply by QW either set to identity or allocated to a value
-				// Store into Q2i
-				matmul(Q2i,C,QW,n2,n,n);
-				// Communications scheme
-				prank = mpi_rank^blevel;
-				if ( ((mpi_rank^0)&blevel)) {
-					if (prank < mpi_size) { // Recieve
-						MPI_Recv(C,n2*n,MPI_DOUBLE,prank,0,comm,MPI_STATUS_IGNORE);
-						// Recover R from the upper part of C and QW from the lower part
-						for (ii=0; ii<n; ++ii)
-							for (jj=0; jj<n; ++jj) {
-								AC_MAT(R,n,ii,jj)  = AC_MAT(C,n,ii,jj);
-								AC_MAT(QW,n,ii,jj) = AC_MAT(C,n,ii+n,jj);
-							}
-					}
-				} else {
-					if (prank < mpi_size) { // Send C
-						// Set up C matrix for sending
-						// Store R in the upper part and Q2i on the lower part
-						// Store Q2i of this rank to QW
-						for(ii=0;ii<n;++ii)
-							for(jj=ii;jj<n;++jj) {
-								AC_MAT(C,n,ii,jj)   = AC_MAT(R,n,ii,jj);
-								AC_MAT(C,n,ii+n,jj) = AC_MAT(Q2i,n,ii+n,jj);
-								AC_MAT(QW,n,ii,jj)  = AC_MAT(Q2i,n,ii,jj);
-							}
-						MPI_Send(C,n2*n,MPI_DOUBLE,prank,0,comm);
-					}
-				}
-			}
+	// Obtain R and QW from the parent, the root starts with the identity
+	if (top < nlevels) {
+		MPI_Recv(G,2*n*n,ops->dtype,mpi_rank^(1<<top),0,comm,MPI_STATUS_IGNORE);
+		memcpy(R,G,nn); memcpy(QW,G+nn,nn);
+	} else
+		tsqr_eye(QW,n,ops);
+	// Broadcast R and the part of Q of each child
+	for (ilevel=top-1,blevel=(1<<top)>>1; ilevel>=0; --ilevel,blevel>>=1) {
+		prank = mpi_rank^blevel;
+		if (prank >= mpi_size) continue;
+		// [Q2t; Q2b] x QW, the lower block goes to the child
+		ops->matmul(G,Q2l+ilevel*2*nn,QW,2*n,n,n);
+		memcpy(buf+ilevel*2*nn,R,nn); memcpy(buf+ilevel*2*nn+nn,G+nn,nn);
+		MPI_Isend(buf+ilevel*2*nn,2*n*n,ops->dtype,prank,0,comm,&reqs[nreq++]);
+		memcpy(QW,G,nn);
+	}
+	MPI_Waitall(nreq,reqs,MPI_STATUSES_IGNORE);
+	free(Q2l); free(buf); free(G); free(reqs);
+	return info;
+}
+
+static int tsqr_reduce(void *QW, void *R, const int n, const int tree, const tsqr_ops *ops, MPI_Comm comm);
+
+static int tsqr_flat(void *QW, void *R, const int n, const tsqr_ops *ops, MPI_Comm comm, MPI_Comm leaders, const int tree) {
+	/*
+		Flat tree, the root gathers all the R, factorizes them at once and
+		scatters the blocks of Q. When a communicator of leaders is given
+		the root further reduces its R among them with the given tree.
+	*/
+	int info = 0, mpi_rank, mpi_size;
+	size_t nn = n*n*ops->size;
+	char *Rs = NULL, *Qs = NULL, *Q2 = NULL, *F;
+	// Recover rank and size
+	MPI_Comm_rank(comm,&mpi_rank);
+	MPI_Comm_size(comm,&mpi_size);
+	if (mpi_rank == 0) {
+		Rs = (char*)malloc(mpi_size*nn);
+		Qs = (char*)malloc(mpi_size*nn);
+	}
+	MPI_Gather(R,n*n,ops->dtype,Rs,n*n,ops->dtype,0,comm);
+	if (mpi_rank == 0) {
+		info = ops->qr(Qs,R,Rs,mpi_size*n,n);
+		if (info == 0 && !(leaders == MPI_COMM_NULL)) {
+			F    = (char*)malloc(nn);
+			info = tsqr_reduce(F,R,n,tree,ops,leaders);
+			ops->matmul(Rs,Qs,F,mpi_size*n,n,n);
+			Q2 = Qs; Qs = Rs; Rs = Q2;
+			free(F);
 		}
 	}
-	// Free memory
-	free(Q2i); free(Q2l); free(C);
-	// Multiply Q1i and QW to obtain Qi
-	matmul(Qi,Q1i,QW,m,n,n);
+	MPI_Bcast(&info,1,MPI_INT,0,comm);
+	if (info == 0) {
+		MPI_Scatter(Qs,n*n,ops->dtype,QW,n*n,ops->dtype,0,comm);
+		MPI_Bcast(R,n*n,ops->dtype,0,comm);
+	}
+	if (mpi_rank == 0) {free(Rs); free(Qs);}
+	return info;
+}
+
+static int tsqr_butterfly(void *QW, void *R, const int n, const tsqr_ops *ops, MPI_Comm comm) {
+	/*
+		Butterfly (allreduce) tree, at each level the partners exchange
+		their R and both factorize the stacked matrix, so that R ends up
+		on every processor without a broadcast and each one accumulates
+		its own QW. The processors beyond the largest power of two fold
+		their R into a partner first and recover R and QW at the end.
+	*/
+	int info = 0, blevel, prank, p2, extra;
+	int mpi_rank, mpi_size;
+	size_t nn = n*n*ops->size;
+	char *Rp, *Q2, *E, *F;
+	// Recover rank and size
+	MPI_Comm_rank(comm,&mpi_rank);
+	MPI_Comm_size(comm,&mpi_size);
+	for (p2=1; 2*p2<=mpi_size; p2<<=1);
+	Rp = (char*)malloc(2*nn);
+	if (mpi_rank >= p2) {
+		MPI_Send(R,n*n,ops->dtype,mpi_rank-p2,0,comm);
+		MPI_Recv(Rp,2*n*n,ops->dtype,mpi_rank-p2,0,comm,MPI_STATUS_IGNORE);
+		memcpy(R,Rp,nn); memcpy(QW,Rp+nn,nn);
+		free(Rp);
+		return info;
+	}
+	Q2 = (char*)malloc(2*nn);
+	E  = (char*)malloc(nn);
+	F  = (char*)malloc(nn);
+	tsqr_eye(QW,n,ops);
+	// Fold the extra processor, E is its factor
+	extra = mpi_rank + p2 < mpi_size;
+	if (extra) {
+		MPI_Recv(Rp,n*n,ops->dtype,mpi_rank+p2,0,comm,MPI_STATUS_IGNORE);
+		info = tsqr_qr2(Q2,R,R,Rp,n,ops);
+		memcpy(QW,Q2,nn); memcpy(E,Q2+nn,nn);
+	}
+	// Recursive doubling
+	for (blevel=1; blevel<p2 && info==0; blevel<<=1) {
+		prank = mpi_rank^blevel;
+		MPI_Sendrecv(R,n*n,ops->dtype,prank,0,Rp,n*n,ops->dtype,prank,0,comm,MPI_STATUS_IGNORE);
+		// Both partners factorize the same matrix, the lower rank on top
+		info = (mpi_rank < prank) ? tsqr_qr2(Q2,R,R,Rp,n,ops) : tsqr_qr2(Q2,R,Rp,R,n,ops);
+		ops->matmul(F,QW,Q2+((mpi_rank < prank) ? 0 : nn),n,n,n); memcpy(QW,F,nn);
+		if (extra) {ops->matmul(F,E,Q2+((mpi_rank < prank) ? 0 : nn),n,n,n); memcpy(E,F,nn);}
+	}
+	// Return R and its factor to the extra processor
+	if (extra) {
+		memcpy(Rp,R,nn); memcpy(Rp+nn,E,nn);
+		MPI_Send(Rp,2*n*n,ops->dtype,mpi_rank+p2,0,comm);
+	}
+	free(Rp); free(Q2); free(E); free(F);
+	return info;
+}
+
+typedef struct {
+	MPI_Comm node, leaders;
+} tsqr_node_comm;
+
+static int tsqr_node_keyval = MPI_KEYVAL_INVALID;
+
+static int tsqr_node_free(MPI_Comm comm, int keyval, void *attr, void *extra) {
+	/*
+		Free the node communicators cached on a communicator when it is freed.
+	*/
+	tsqr_node_comm *nc = (tsqr_node_comm*)attr;
+	if (!(nc->leaders == MPI_COMM_NULL)) MPI_Comm_free(&nc->leaders);
+	MPI_Comm_free(&nc->node);
+	free(nc);
+	return MPI_SUCCESS;
+}
+
+static int tsqr_node(void *QW, void *R, const int n, const tsqr_ops *ops, MPI_Comm comm) {
+	/*
+		Node aware two level tree, the R of the processors of a node are
+		reduced with a flat tree on the node leader and only the leaders
+		take part in the butterfly tree across the nodes.
+
+		The node and leader communicators are split once and cached
+		on the communicator.
+	*/
+	int mpi_rank, node_rank, found;
+	tsqr_node_comm *nc;
+	if (tsqr_node_keyval == MPI_KEYVAL_INVALID)
+		MPI_Comm_create_keyval(MPI_COMM_NULL_COPY_FN,tsqr_node_free,&tsqr_node_keyval,NULL);
+	MPI_Comm_get_attr(comm,tsqr_node_keyval,&nc,&found);
+	if (!found) {
+		nc = (tsqr_node_comm*)malloc(sizeof(tsqr_node_comm));
+		MPI_Comm_rank(comm,&mpi_rank);
+		MPI_Comm_split_type(comm,MPI_COMM_TYPE_SHARED,mpi_rank,MPI_INFO_NULL,&nc->node);
+		MPI_Comm_rank(nc->node,&node_rank);
+		MPI_Comm_split(comm,(node_rank == 0) ? 0 : MPI_UNDEFINED,mpi_rank,&nc->leaders);
+		MPI_Comm_set_attr(comm,tsqr_node_keyval,nc);
+	}
+	return tsqr_flat(QW,R,n,ops,nc->node,nc->leaders,TSQR_BUTTERFLY);
+}
+
+static int tsqr_reduce(void *QW, void *R, const int n, const int tree, const tsqr_ops *ops, MPI_Comm comm) {
+	/*
+		Reduce the R of the processors with the requested tree.
+	*/
+	int mpi_size;
+	MPI_Comm_size(comm,&mpi_size);
+	if (mpi_size == 1) {tsqr_eye(QW,n,ops); return 0;}
+	switch (tree) {
+		case TSQR_BINARY:    return tsqr_binary(QW,R,n,ops,comm);
+		case TSQR_FLAT:      return tsqr_flat(QW,R,n,ops,comm,MPI_COMM_NULL,TSQR_BINARY);
+		case TSQR_BUTTERFLY: return tsqr_butterfly(QW,R,n,ops,comm);
+		case TSQR_NODE:      return tsqr_node(QW,R,n,ops,comm);
+		default:             return -1;
+	}
+}
+
+static int tsqr_cholqr2(void *Qi, void *R, void *Ai, const int m, const int n, const tsqr_ops *ops, MPI_Comm comm) {
+	/*
+		CholeskyQR2 from
+		T. Fukaya, Y. Nakatsukasa, Y. Yanagisawa and Y. Yamamoto, ‘CholeskyQR2:
+		A Simple and Communication-Avoiding Algorithm for Computing a Tall-Skinny
+		QR Factorization on a Large-Scale Parallel System’, ScalA, pp. 31–38, 2014
+
+		Two passes of Qi = Ai x R^-1 with R the Cholesky factor of the
+		Gram matrix, a single allreduce per pass. Returns a positive value
+		when the Gram matrix is not positive definite, when the condition
+		of Ai is above 1/sqrt(eps), or when the Qi of the first pass is far
+		from orthogonal, i.e., the factor of the second pass is ill conditioned
+		as its Gram matrix is Qi^H x Qi.
+	*/
+	int info = 0, it;
+	double rcond;
+	size_t nn = n*n*ops->size;
+	char *Gi, *G, *T, *Qt;
+	Gi = (char*)malloc(nn);
+	G  = (char*)malloc(nn);
+	T  = (char*)malloc(nn);
+	Qt = (char*)malloc(m*n*ops->size);
+	for (it=0; it<2 && info==0; ++it) {
+		// Gram matrix and its Cholesky factor
+		ops->gram(Gi,(it == 0) ? Ai : Qi,m,n);
+		MPI_Allreduce(Gi,G,n*n,ops->dtype,MPI_SUM,comm);
+		info = ops->chol(G,n); if (!(info==0)) break;
+		tsqr_triu(G,n,ops);
+		info = ops->trcon(G,n,&rcond); if (!(info==0)) break;
+		if (rcond < ((it == 0) ? sqrt(ops->eps) : 0.5)) {info = 1; break;}
+		// Accumulate R = R2 x R1
+		if (it == 0) memcpy(R,G,nn);
+		else {ops->matmul(T,G,R,n,n,n); memcpy(R,T,nn);}
+		// Qi = Ai x R^-1
+		info = ops->trinv(G,n); if (!(info==0)) break;
+		ops->matmul(Qt,(it == 0) ? Ai : Qi,G,m,n,n);
+		memcpy(Qi,Qt,m*n*ops->size);
+	}
+	free(Gi); free(G); free(T); free(Qt);
+	return info;
+}
+
+static int tsqr_generic(void *Qi, void *R, void *Ai, const int m, const int n, int tree, const tsqr_ops *ops, MPI_Comm comm) {
+	/*
+		TSQR algorithm with the requested reduction tree. Returns -1 on
+		all the processors when any of them holds fewer rows than columns.
+	*/
+	int info = 0, nshort = (m < n) ? 1 : 0;
+	char *Q1i, *QW;
+	// CholeskyQR2 falls back to the binary tree when Ai is ill conditioned
+	if (tree == TSQR_CHOLQR2) {
+		info = tsqr_cholqr2(Qi,R,Ai,m,n,ops,comm);
+		if (info <= 0) return info;
+		tree = TSQR_BINARY;
+	}
+	// The local QR needs at least as many rows as columns on every processor,
+	// otherwise the reduction would deadlock
+	MPI_Allreduce(MPI_IN_PLACE,&nshort,1,MPI_INT,MPI_MAX,comm);
+	if (nshort) return -1;
+	Q1i = (char*)malloc(m*n*ops->size);
+	QW  = (char*)malloc(n*n*ops->size);
+	// 1: QR Factorization on Ai to obtain Q1i and Ri
+	info = ops->qr(Q1i,R,Ai,m,n);
+	// 2: Reduce the Ri to R, obtaining the factor of this processor
+	if (info == 0) info = tsqr_reduce(QW,R,n,tree,ops,comm);
+	// 3: Multiply Q1i and QW to obtain Qi
+	if (info == 0) ops->matmul(Qi,Q1i,QW,m,n,n);
 	free(Q1i); free(QW);
 	return info;
 }
 
-int tsqr_svd(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, MPI_Comm comm) {
+static const tsqr_ops TSQR_D = {sizeof(double),    MPI_DOUBLE,         &ONE_D,DBL_EPSILON,dqr_op,dmatmul_op,dgram_op,dchol_op,dtrinv_op,dtrcon_op};
+static const tsqr_ops TSQR_Z = {sizeof(complex_t), MPI_C_DOUBLE_COMPLEX,&ONE_Z,DBL_EPSILON,zqr_op,zmatmul_op,zgram_op,zchol_op,ztrinv_op,ztrcon_op};
+static const tsqr_ops TSQR_S = {sizeof(float),     MPI_FLOAT,          &ONE_S,FLT_EPSILON,sqr_op,smatmul_op,sgram_op,schol_op,strinv_op,strcon_op};
+static const tsqr_ops TSQR_C = {sizeof(scomplex_t),MPI_C_FLOAT_COMPLEX,&ONE_C,FLT_EPSILON,cqr_op,cmatmul_op,cgram_op,cchol_op,ctrinv_op,ctrcon_op};
+
+int tsqr_tree(double *Qi, double *R, double *Ai, const int m, const int n, const int tree, MPI_Comm comm) {
+	/*
+		QR factorization using TSQR algorithm from
+		J. Demmel, L. Grigori, M. Hoemmen, and J. Langou, ‘Communication-optimal Parallel
+		and Sequential QR and LU Factorizations’, SIAM J. Sci. Comput.,
+		vol. 34, no. 1, pp. A206–A239, Jan. 2012,
+
+		doi: 10.1137/080731992.
+
+		Ai(m,n)  data matrix dispersed on each processor.
+		tree     reduction tree (TSQR_BINARY, TSQR_FLAT, TSQR_BUTTERFLY,
+		         TSQR_NODE or TSQR_CHOLQR2).
+
+		Qi(m,n)  Q matrix per processor.
+		R(n,n)   R matrix.
+	*/
+	return tsqr_generic(Qi,R,Ai,m,n,tree,&TSQR_D,comm);
+}
+
+int tsqr(double *Qi, double *R, double *Ai, const int m, const int n, MPI_Comm comm) {
+	/*
+		TSQR algorithm with the binary reduction tree.
+	*/
+	return tsqr_tree(Qi,R,Ai,m,n,TSQR_BINARY,comm);
+}
+
+int tsqr_svd_tree(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, const int tree, MPI_Comm comm) {
 	/*
 		Single value decomposition (SVD) using TSQR algorithm from
 		J. Demmel, L. Grigori, M. Hoemmen, and J. Langou, ‘Communication-optimal Parallel
@@ -446,6 +724,7 @@ int tsqr_svd(double *Ui, double *S, double *VT, double *Ai, const int m, const i
 		doi: 10.1137/080731992.
 
 		Ai(m,n)  data matrix dispersed on each processor.
+		tree     reduction tree of the TSQR.
 
 		Ui(m,n)  POD modes dispersed on each processor (must come preallocated).
 		S(n)     singular values.
@@ -457,14 +736,14 @@ int tsqr_svd(double *Ui, double *S, double *VT, double *Ai, const int m, const i
 	R    = (double*)malloc(n*n*sizeof(double));
 	Qi   = (double*)malloc(m*n*sizeof(double));
 	// Call TSQR routine
-	info = tsqr(Qi,R,Ai,m,n,comm);
+	info = tsqr_tree(Qi,R,Ai,m,n,tree,comm); if (!(info==0)) {free(R); free(Qi); return info;}
 
 	// Algorithm 2 from Sayadi and Schmid (2016) - Ui, S and VT
 	// At this point we have R and Qi scattered on the processors
 	double *Ur;
 	Ur = (double*)malloc(n*n*sizeof(double));
 	// Call SVD routine
-	info = svd(Ur,S,VT,R,n,n); if (!(info==0)) return info;
+	info = svd(Ur,S,VT,R,n,n); if (!(info==0)) {free(Ur); free(R); free(Qi); return info;}
 	// Compute Ui = Qi x Ur
 	matmul(Ui,Qi,Ur,m,n,n);
 	// Free memory
@@ -472,7 +751,203 @@ int tsqr_svd(double *Ui, double *S, double *VT, double *Ai, const int m, const i
 	return info;
 }
 
+int tsqr_svd(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, MPI_Comm comm) {
+	/*
+		TSQR SVD with the binary reduction tree.
+	*/
+	return tsqr_svd_tree(Ui,S,VT,Ai,m,n,TSQR_BINARY,comm);
+}
+
+int gram_svd(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, const double cond_max, MPI_Comm comm) {
+	/*
+		Single value decomposition (SVD) using the method of snapshots from
+		L. Sirovich, ‘Turbulence and the dynamics of coherent structures.
+		I. Coherent structures’, Q. Appl. Math., vol. 45, no. 3, pp. 561–571, 1987.
+
+		The Gram matrix G = A^T x A (n,n) is reduced across the processors
+		and its eigendecomposition G = V x S^2 x V^T gives the right singular
+		vectors and the singular values. The POD modes are recovered as
+		Ui = Ai x V x S^-1. Directions whose eigenvalue is zero within the
+		machine precision are treated as null and their modes are set to zero.
+
+		Forming G squares the condition number of A, hence when the ratio
+		between the first and the last nonzero singular values is above
+		cond_max the decomposition is recomputed with the TSQR algorithm.
+
+		Ai(m,n)  data matrix dispersed on each processor.
+		cond_max maximum condition number allowed.
+
+		Ui(m,n)  POD modes dispersed on each processor (must come preallocated).
+		S(n)     singular values.
+		VT(n,n)  right singular vectors (transposed).
+	*/
+	int info = 0, ii, jj, nr;
+	double *G, *Gi, *w, tol;
+	// Memory allocation
+	G  = (double*)malloc(n*n*sizeof(double));
+	Gi = (double*)malloc(n*n*sizeof(double));
+	w  = (double*)malloc(n*sizeof(double));
+	// Gram matrix reduced across the processors, G = A^T x A
+	matmult(Gi,Ai,Ai,n,n,m,"T","N");
+	MPI_Allreduce(Gi,G,n*n,MPI_DOUBLE,MPI_SUM,comm);
+	free(Gi);
+	// Eigendecomposition of the symmetric Gram matrix
+	// eigenvalues are returned in ascending order
+	info = LAPACKE_dsyevd(
+		LAPACK_ROW_MAJOR, // int  		matrix_layout
+					 'V', // char  		jobz
+					 'U', // char  		uplo
+					   n, // int  		n
+					   G, // double*  	a
+					   n, // int  		lda
+					   w  // double*  	w
+	);
+	if (!(info==0)) goto cleanup;
+	// Singular values and right singular vectors in descending order
+	tol = (double)(n)*DBL_EPSILON*w[n-1];
+	for (ii=0,nr=0; ii<n; ++ii) {
+		S[ii] = (w[n-1-ii] > tol) ? sqrt(w[n-1-ii]) : 0.;
+		if (S[ii] > 0.) nr = ii + 1;
+		for (jj=0; jj<n; ++jj)
+			AC_MAT(VT,n,ii,jj) = AC_MAT(G,n,jj,n-1-ii);
+	}
+	// Accuracy guard, fall back to TSQR for ill-conditioned matrices
+	if (nr == 0 || S[0]/S[nr-1] > cond_max) {
+		info = tsqr_svd(Ui,S,VT,Ai,m,n,comm);
+		goto cleanup;
+	}
+	// Compute Ui = Ai x V x S^-1
+	matmult(Ui,Ai,VT,m,n,n,"N","T");
+	for (ii=0; ii<m; ++ii)
+		for (jj=0; jj<n; ++jj)
+			AC_MAT(Ui,n,ii,jj) = (jj < nr) ? AC_MAT(Ui,n,ii,jj)/S[jj] : 0.;
+cleanup:
+	// Free memory
+	free(G); free(w);
+	return info;
+}
+
+void random_matrix(double *A, const int m, const int n, unsigned int seed) {
+	/*
+		Fill A(m,n) with normally distributed random numbers
+		using the Box-Muller transform. The same seed produces
+		the same matrix on every processor.
+	*/
+	int ii;
+	double u1, u2, rad;
+	srand(seed);
+	for (ii=0; ii<m*n; ii+=2) {
+		u1  = ((double)(rand()) + 1.)/((double)(RAND_MAX) + 2.);
+		u2  = ((double)(rand()) + 1.)/((double)(RAND_MAX) + 2.);
+		rad = sqrt(-2.*log(u1));
+		A[ii] = rad*cos(2.*M_PI*u2);
+		if (ii+1 < m*n) A[ii+1] = rad*sin(2.*M_PI*u2);
+	}
+}
+
+int randomized_svd(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, const int r, const int p, const int q, int seed, MPI_Comm comm) {
+	/*
+		Randomized single value decomposition (SVD) with a distributed
+		range finder, from
+		N. Halko, P. G. Martinsson, and J. A. Tropp, ‘Finding Structure with
+		Randomness: Probabilistic Algorithms for Constructing Approximate
+		Matrix Decompositions’, SIAM Rev., vol. 53, no. 2, pp. 217–288, Jan. 2011,
+
+		doi: 10.1137/090771806.
+
+		The orthonormalization of the sketch is done with the TSQR algorithm
+		so that the method works on matrices partitioned by rows.
+
+		Ai(m,n)  data matrix dispersed on each processor.
+		r        target rank.
+		p        oversampling.
+		q        number of power iterations.
+		seed     seed for the random matrix (if < 0 it is taken from the clock).
+
+		Ui(m,r)  POD modes dispersed on each processor (must come preallocated).
+		S(r)     singular values.
+		VT(r,n)  right singular vectors (transposed).
+	*/
+	int info = 0, ii, jj, iter, k = MIN(r+p,n);
+	double *Omega = NULL, *Yi = NULL, *Qi = NULL, *R = NULL, *Z = NULL, *Qz = NULL, *B = NULL, *Ub = NULL, *Sb = NULL, *VTb = NULL;
+	// Make sure that all the processors use the same random matrix
+	if (seed < 0) seed = (int)(time(NULL));
+	MPI_Bcast(&seed,1,MPI_INT,0,comm);
+	// Memory allocation
+	Omega = (double*)malloc(n*k*sizeof(double));
+	Yi    = (double*)malloc(m*k*sizeof(double));
+	Qi    = (double*)malloc(m*k*sizeof(double));
+	R     = (double*)malloc(k*k*sizeof(double));
+	Z     = (double*)malloc(n*k*sizeof(double));
+	Qz    = (double*)malloc(n*k*sizeof(double));
+	B     = (double*)malloc(k*n*sizeof(double));
+	VTb   = (double*)malloc(k*n*sizeof(double));
+	Ub    = (double*)malloc(k*k*sizeof(double));
+	Sb    = (double*)malloc(k*sizeof(double));
+	// Sketch the range of A, Yi = Ai x Omega
+	random_matrix(Omega,n,k,(unsigned int)(seed));
+	matmul(Yi,Ai,Omega,m,k,n);
+	// Power iterations to sharpen the decay of the singular values
+	for (iter=0; iter<q; ++iter) {
+		// Orthonormalize the sketch
+		info = tsqr(Qi,R,Yi,m,k,comm); if (!(info==0)) goto cleanup;
+		// Z = A^T x Q reduced across the processors
+		matmult(Qz,Ai,Qi,n,k,m,"T","N");
+		MPI_Allreduce(Qz,Z,n*k,MPI_DOUBLE,MPI_SUM,comm);
+		// Orthonormalize Z, which is the same on all the processors
+		info = qr(Qz,R,Z,n,k); if (!(info==0)) goto cleanup;
+		// Yi = Ai x Qz
+		matmul(Yi,Ai,Qz,m,k,n);
+	}
+	// Orthonormal basis of the range
+	info = tsqr(Qi,R,Yi,m,k,comm); if (!(info==0)) goto cleanup;
+	// Project A onto the basis, B = Q^T x A
+	matmult(VTb,Qi,Ai,k,n,m,"T","N");
+	MPI_Allreduce(VTb,B,k*n,MPI_DOUBLE,MPI_SUM,comm);
+	// SVD of the small matrix B
+	info = svd(Ub,Sb,VTb,B,k,n); if (!(info==0)) goto cleanup;
+	// Keep the first r singular triplets
+	memcpy(S,Sb,r*sizeof(double));
+	memcpy(VT,VTb,r*n*sizeof(double));
+	for (ii=0; ii<k; ++ii)
+		for (jj=0; jj<r; ++jj)
+			AC_MAT(Ub,r,ii,jj) = AC_MAT(Ub,k,ii,jj);
+	// Compute Ui = Qi x Ub
+	matmul(Ui,Qi,Ub,m,r,k);
+cleanup:
+	// Free memory
+	free(Omega); free(Yi); free(Qi); free(R); free(Z); free(Qz);
+	free(B); free(VTb); free(Ub); free(Sb);
+	return info;
+}
+
+int ztsqr_tree(complex_t *Qi, complex_t *R, complex_t *Ai, const int m, const int n, const int tree, MPI_Comm comm) {
+	/*
+		QR factorization using TSQR algorithm from
+		J. Demmel, L. Grigori, M. Hoemmen, and J. Langou, ‘Communication-optimal Parallel
+		and Sequential QR and LU Factorizations’, SIAM J. Sci. Comput.,
+		vol. 34, no. 1, pp. A206–A239, Jan. 2012,
+
+		doi: 10.1137/080731992.
+
+		Ai(m,n)  data matrix dispersed on each processor.
+		tree     reduction tree (TSQR_BINARY, TSQR_FLAT, TSQR_BUTTERFLY,
+		         TSQR_NODE or TSQR_CHOLQR2).
+
+		Qi(m,n)  Q matrix per processor.
+		R(n,n)   R matrix.
+	*/
+	return tsqr_generic(Qi,R,Ai,m,n,tree,&TSQR_Z,comm);
+}
+
 int ztsqr(complex_t *Qi, complex_t *R, complex_t *Ai, const int m, const int n, MPI_Comm comm) {
+	/*
+		TSQR algorithm with the binary reduction tree.
+	*/
+	return ztsqr_tree(Qi,R,Ai,m,n,TSQR_BINARY,comm);
+}
+
+int ztsqr_svd_tree(complex_t *Ui, double *S, complex_t *VT, complex_t *Ai, const int m, const int n, const int tree, MPI_Comm comm) {
 	/*
 		Single value decomposition (SVD) using TSQR algorithm from
 		J. Demmel, L. Grigori, M. Hoemmen, and J. Langou, ‘Communication-optimal Parallel
@@ -482,110 +957,575 @@ int ztsqr(complex_t *Qi, complex_t *R, complex_t *Ai, const int m, const int n,
 		doi: 10.1137/080731992.
 
 		Ai(m,n)  data matrix dispersed on each processor.
+		tree     reduction tree of the TSQR.
+
+		Ui(m,n)  POD modes dispersed on each processor (must come preallocated).
+		S(n)     singular values.
+		VT(n,n)  right singular vectors (transposed).
+	*/
+	int info = 0;
+	// Algorithm 1 parallel QR decomposition
+	complex_t *Qi, *R;
+	R    = (complex_t*)malloc(n*n*sizeof(complex_t));
+	Qi   = (complex_t*)malloc(m*n*sizeof(complex_t));
+	// Call TSQR routine
+	info = ztsqr_tree(Qi,R,Ai,m,n,tree,comm); if (!(info==0)) {free(R); free(Qi); return info;}
+
+	// Algorithm 2 from Sayadi and Schmid (2016) - Ui, S and VT
+	// At this point we have R and Qi scattered on the processors
+	complex_t *Ur;
+	Ur = (complex_t*)malloc(n*n*sizeof(complex_t));
+	// Call SVD routine
+	info = zsvd(Ur,S,VT,R,n,n); if (!(info==0)) {free(Ur); free(R); free(Qi); return info;}
+	// Compute Ui = Qi x Ur
+	zmatmul(Ui,Qi,Ur,m,n,n);
+	// Free memory
+	free(Ur); free(R); free(Qi);
+	return info;
+}
+
+int ztsqr_svd(complex_t *Ui, double *S, complex_t *VT, complex_t *Ai, const int m, const int n, MPI_Comm comm) {
+	/*
+		TSQR SVD with the binary reduction tree.
+	*/
+	return ztsqr_svd_tree(Ui,S,VT,Ai,m,n,TSQR_BINARY,comm);
+}
+
+int zgram_svd(complex_t *Ui, double *S, complex_t *VT, complex_t *Ai, const int m, const int n, const double cond_max, MPI_Comm comm) {
+	/*
+		Single value decomposition (SVD) using the method of snapshots from
+		L. Sirovich, ‘Turbulence and the dynamics of coherent structures.
+		I. Coherent structures’, Q. Appl. Math., vol. 45, no. 3, pp. 561–571, 1987.
+
+		The Gram matrix G = A^H x A (n,n) is reduced across the processors
+		and its eigendecomposition G = V x S^2 x V^H gives the right singular
+		vectors and the singular values. The POD modes are recovered as
+		Ui = Ai x V x S^-1. Directions whose eigenvalue is zero within the
+		machine precision are treated as null and their modes are set to zero.
+
+		Forming G squares the condition number of A, hence when the ratio
+		between the first and the last nonzero singular values is above
+		cond_max the decomposition is recomputed with the TSQR algorithm.
+
+		Ai(m,n)  data matrix dispersed on each processor.
+		cond_max maximum condition number allowed.
+
+		Ui(m,n)  POD modes dispersed on each processor (must come preallocated).
+		S(n)     singular values.
+		VT(n,n)  right singular vectors (transposed).
+	*/
+	int info = 0, ii, jj, nr;
+	double *w, tol;
+	complex_t *G, *Gi;
+	// Memory allocation
+	G  = (complex_t*)malloc(n*n*sizeof(complex_t));
+	Gi = (complex_t*)malloc(n*n*sizeof(complex_t));
+	w  = (double*)malloc(n*sizeof(double));
+	// Gram matrix reduced across the processors, G = A^H x A
+	zmatmult(Gi,Ai,Ai,n,n,m,"C","N");
+	MPI_Allreduce(Gi,G,n*n,MPI_C_DOUBLE_COMPLEX,MPI_SUM,comm);
+	free(Gi);
+	// Eigendecomposition of the hermitian Gram matrix
+	// eigenvalues are returned in ascending order
+	info = LAPACKE_zheevd(
+		LAPACK_ROW_MAJOR, // int  		matrix_layout
+					 'V', // char  		jobz
+					 'U', // char  		uplo
+					   n, // int  		n
+					   G, // complex_t* a
+					   n, // int  		lda
+					   w  // double*  	w
+	);
+	if (!(info==0)) goto cleanup;
+	// Singular values and right singular vectors in descending order
+	tol = (double)(n)*DBL_EPSILON*w[n-1];
+	for (ii=0,nr=0; ii<n; ++ii) {
+		S[ii] = (w[n-1-ii] > tol) ? sqrt(w[n-1-ii]) : 0.;
+		if (S[ii] > 0.) nr = ii + 1;
+		for (jj=0; jj<n; ++jj)
+			AC_MAT(VT,n,ii,jj) = conj(AC_MAT(G,n,jj,n-1-ii));
+	}
+	// Accuracy guard, fall back to TSQR for ill-conditioned matrices
+	if (nr == 0 || S[0]/S[nr-1] > cond_max) {
+		info = ztsqr_svd(Ui,S,VT,Ai,m,n,comm);
+		goto cleanup;
+	}
+	// Compute Ui = Ai x V x S^-1
+	zmatmult(Ui,Ai,VT,m,n,n,"N","C");
+	for (ii=0; ii<m; ++ii)
+		for (jj=0; jj<n; ++jj)
+			AC_MAT(Ui,n,ii,jj) = (jj < nr) ? AC_MAT(Ui,n,ii,jj)/S[jj] : 0.;
+cleanup:
+	// Free memory
+	free(G); free(w);
+	return info;
+}
+
+
+// Single precision version
+int ssvd(float *U, float *S, float *VT, float *Y, const int m, const int n) {
+	/*
+		Single value decomposition (SVD) using Lapack.
+
+		U(m,n)   are the POD modes and must come preallocated.
+		S(n)     are the singular values.
+		VT(n,n)  are the right singular vectors (transposed).
+
+		Lapack dgesvd:
+			http://www.netlib.org/lapack/explore-html/d1/d7e/group__float_g_esing_ga84fdf22a62b12ff364621e4713ce02f2.html
+			https://www.netlib.org/lapack/explore-html/d0/dee/lapacke__dgesvd_8c_af31b3cb47f7cc3b9f6541303a2968c9f.html
+		Lapack dgesdd (more optimized):
+			http://www.netlib.org/lapack/explore-html/d1/d7e/group__float_g_esing_gad8e0f1c83a78d3d4858eaaa88a1c5ab1.html
+			http://www.netlib.org/lapack//explore-html/d3/d23/lapacke__dgesdd_8c_aaf227f107a19ae6021f591c4de5fdbd5.html
+		On ROW/COL major:
+			https://stackoverflow.com/questions/34698550/understanding-lapack-row-major-and-lapack-col-major-with-lda
+			https://software.intel.com/sites/products/documentation/doclib/mkl_sa/11/mkl_lapack_examples/lapacke_dgesvd_row.c.htm
+	*/
+	int retval = 0, mn = MIN(m,n);
+	#ifdef USE_LAPACK_GESVD
+	// Run LAPACKE DGESVD for the single value decomposition
+	float *superb;
+	superb = (float*)malloc((mn-1)*sizeof(float));
+	retval = LAPACKE_sgesvd(
+		LAPACK_ROW_MAJOR, // int  		matrix_layout
+					 'S', // char  		jobu
+					 'S', // char  		jobvt
+					   m, // int  		m
+					   n, // int  		n
+					   Y, // float*  	a
+					   n, // int  		lda
+					   S, // float *  	s
+					   U, // float *  	u
+					  mn, // int  		ldu
+					  VT, // float *  	vt
+					   n, // int  		ldvt
+				  superb  // float *  	superb
+	);
+	free(superb);
+	#else
+	// Run LAPACKE DGESDD for the single value decomposition
+	retval = LAPACKE_sgesdd(
+		LAPACK_ROW_MAJOR, // int  		matrix_layout
+					 'S', // char  		jobz
+					   m, // int  		m
+					   n, // int  		n
+					   Y, // float*  	a
+					   n, // int  		lda
+					   S, // float *  	s
+					   U, // float *  	u
+					  mn, // int  		ldu
+					  VT, // float *  	vt
+					   n  // int  		ldvt
+	);
+	#endif
+	return retval;
+}
+
+int sqr(float *Q, float *R, float *A, const int m, const int n) {
+	/*
+		QR factorization using LAPACK.
+
+		Q(m,n) is the Q matrix and must come preallocated
+		R(n,n) is the R matrix and must come preallocated
+	*/
+	int info = 0, ii, jj;
+	float *tau;
+	// Allocate
+	tau = (float*)malloc(n*n*sizeof(float));
+	// Copy A to Q
+	memcpy(Q,A,m*n*sizeof(float));
+	// Run LAPACK dgerqf - QR factorization on A
+	info = LAPACKE_sgeqrf(
+		LAPACK_ROW_MAJOR, // int  		matrix_layout
+					   m, // int  		m
+					   n, // int  		n
+					   Q, // float*  	a
+					   n, // int  		lda
+					 tau  // float * 	tau
+	);
+	if (!(info==0)) {free(tau); return info;}
+	// Copy Ri matrix
+	memset(R,0,n*n*sizeof(float));
+	for(ii=0;ii<n;++ii)
+		for(jj=ii;jj<n;++jj)
+			AC_MAT(R,n,ii,jj) = AC_MAT(Q,n,ii,jj);
+	// Run LAPACK dorgqr - Generate Q matrix
+	info = LAPACKE_sorgqr(
+		LAPACK_ROW_MAJOR, // int  		matrix_layout
+					   m, // int  		m
+					   n, // int  		n
+					   n, // int  		k
+					   Q, // float*  	a
+					   n, // int  		lda
+					 tau  // float * 	tau
+	);
+	if (!(info==0)) {free(tau); return info;}
+	free(tau);
+	return info;
+}
+
+int stsqr_tree(float *Qi, float *R, float *Ai, const int m, const int n, const int tree, MPI_Comm comm) {
+	/*
+		QR factorization using TSQR algorithm from
+		J. Demmel, L. Grigori, M. Hoemmen, and J. Langou, ‘Communication-optimal Parallel
+		and Sequential QR and LU Factorizations’, SIAM J. Sci. Comput.,
+		vol. 34, no. 1, pp. A206–A239, Jan. 2012,
+
+		doi: 10.1137/080731992.
+
+		Ai(m,n)  data matrix dispersed on each processor.
+		tree     reduction tree (TSQR_BINARY, TSQR_FLAT, TSQR_BUTTERFLY,
+		         TSQR_NODE or TSQR_CHOLQR2).
 
 		Qi(m,n)  Q matrix per processor.
 		R(n,n)   R matrix.
 	*/
-	int info = 0, ii, jj, n2 = n*2, ilevel, blevel, mask;
-	int mpi_rank, mpi_size;
-	complex_t *Q1i, *Q2i, *Q2l, *QW, *C;
-	// Recover rank and size
-	MPI_Comm_rank(comm,&mpi_rank);
-	MPI_Comm_size(comm,&mpi_size);
+	return tsqr_generic(Qi,R,Ai,m,n,tree,&TSQR_S,comm);
+}
+
+int stsqr(float *Qi, float *R, float *Ai, const int m, const int n, MPI_Comm comm) {
+	/*
+		TSQR algorithm with the binary reduction tree.
+	*/
+	return stsqr_tree(Qi,R,Ai,m,n,TSQR_BINARY,comm);
+}
+
+int stsqr_svd_tree(float *Ui, float *S, float *VT, float *Ai, const int m, const int n, const int tree, MPI_Comm comm) {
+	/*
+		Single value decomposition (SVD) using TSQR algorithm from
+		J. Demmel, L. Grigori, M. Hoemmen, and J. Langou, ‘Communication-optimal Parallel
+		and Sequential QR and LU Factorizations’, SIAM J. Sci. Comput.,
+		vol. 34, no. 1, pp. A206–A239, Jan. 2012,
+
+		doi: 10.1137/080731992.
+
+		Ai(m,n)  data matrix dispersed on each processor.
+		tree     reduction tree of the TSQR.
+
+		Ui(m,n)  POD modes dispersed on each processor (must come preallocated).
+		S(n)     singular values.
+		VT(n,n)  right singular vectors (transposed).
+	*/
+	int info = 0;
+	// Algorithm 1 parallel QR decomposition
+	float *Qi, *R;
+	R    = (float*)malloc(n*n*sizeof(float));
+	Qi   = (float*)malloc(m*n*sizeof(float));
+	// Call TSQR routine
+	info = stsqr_tree(Qi,R,Ai,m,n,tree,comm); if (!(info==0)) {free(R); free(Qi); return info;}
+
+	// Algorithm 2 from Sayadi and Schmid (2016) - Ui, S and VT
+	// At this point we have R and Qi scattered on the processors
+	float *Ur;
+	Ur = (float*)malloc(n*n*sizeof(float));
+	// Call SVD routine
+	info = ssvd(Ur,S,VT,R,n,n); if (!(info==0)) {free(Ur); free(R); free(Qi); return info;}
+	// Compute Ui = Qi x Ur
+	smatmul(Ui,Qi,Ur,m,n,n);
+	// Free memory
+	free(Ur); free(R); free(Qi);
+	return info;
+}
+
+int stsqr_svd(float *Ui, float *S, float *VT, float *Ai, const int m, const int n, MPI_Comm comm) {
+	/*
+		TSQR SVD with the binary reduction tree.
+	*/
+	return stsqr_svd_tree(Ui,S,VT,Ai,m,n,TSQR_BINARY,comm);
+}
+
+int sgram_svd(float *Ui, float *S, float *VT, float *Ai, const int m, const int n, const float cond_max, MPI_Comm comm) {
+	/*
+		Single value decomposition (SVD) using the method of snapshots from
+		L. Sirovich, ‘Turbulence and the dynamics of coherent structures.
+		I. Coherent structures’, Q. Appl. Math., vol. 45, no. 3, pp. 561–571, 1987.
+
+		The Gram matrix G = A^T x A (n,n) is reduced across the processors
+		and its eigendecomposition G = V x S^2 x V^T gives the right singular
+		vectors and the singular values. The POD modes are recovered as
+		Ui = Ai x V x S^-1. Directions whose eigenvalue is zero within the
+		machine precision are treated as null and their modes are set to zero.
+
+		Forming G squares the condition number of A, hence when the ratio
+		between the first and the last nonzero singular values is above
+		cond_max the decomposition is recomputed with the TSQR algorithm.
+
+		Ai(m,n)  data matrix dispersed on each processor.
+		cond_max maximum condition number allowed.
+
+		Ui(m,n)  POD modes dispersed on each processor (must come preallocated).
+		S(n)     singular values.
+		VT(n,n)  right singular vectors (transposed).
+	*/
+	int info = 0, ii, jj, nr;
+	float *G, *Gi, *w, tol;
 	// Memory allocation
-	Q1i = (complex_t*)malloc(m*n*sizeof(complex_t));
-	Q2i = (complex_t*)malloc(n2*n*sizeof(complex_t));
-	QW  = (complex_t*)malloc(n*n*sizeof(complex_t));
-	C   = (complex_t*)malloc(n2*n*sizeof(complex_t));
-	// Preallocate QW to identity
-	memset(QW,0.,n*n*sizeof(complex_t));
-	for (ii=0; ii<n; ++ii)
-		AC_MAT(QW,n,ii,ii) = 1. + 0.*I;
-	// Algorithm 1 from Demmel et al (2012)
-	// 1: QR Factorization on Ai to obtain Q1i and Ri
-	info = zqr(Q1i,R,Ai,m,n); if (!(info==0)) return info;
-	// Reduction, every processor sends R and computes V2i
-	int next_power = nextPowerOf2(mpi_size);
-	int nlevels    = (int)(log2(next_power));
-	int prank;
-	Q2l = (complex_t*)malloc(nlevels*n2*n*sizeof(complex_t));
-	for (blevel=1,ilevel=0; blevel < next_power; blevel<<=1,++ilevel) {
-		// Store R in the upper part of the C matrix
-		for (ii=0; ii<n; ++ii)
-			for (jj=0; jj<n; ++jj)
-				AC_MAT(C,n,ii,jj) = AC_MAT(R,n,ii,jj);
-		// Decide who sends and who recieves, use R as buffer
-		prank = mpi_rank^blevel;
-		if (mpi_rank&blevel) {
-			if (prank < mpi_size) MPI_Send(R,n*n,MPI_C_DOUBLE_COMPLEX,prank,0,comm);
-		} else {
-			// Receive R
-			if (prank < mpi_size) {
-				MPI_Recv(R,n*n,MPI_C_DOUBLE_COMPLEX,prank,0,comm,MPI_STATUS_IGNORE);
-				// Store R in the lower part of the C matrix
-				for (ii=0; ii<n; ++ii)
-					for (jj=0; jj<n; ++jj)
-						AC_MAT(C,n,ii+n,jj) = AC_MAT(R,n,ii,jj);
-				// 2: QR from the C matrix, reuse C and R
-				info = zqr(Q2i,R,C,n2,n); if (!(info==0)) return info;
-				// Store Q2i from this level
-//				matmul(Q2i,C,QW,n2,n,n);
-				for (ii=0; ii<n2; ++ii)
-					for (jj=0; jj<n; ++jj)
-						AC_MAT(Q2l,n,ii+ilevel*n2,jj) = AC_MAT(Q2i,n,ii,jj);
-			}
-		}
+	G  = (float*)malloc(n*n*sizeof(float));
+	Gi = (float*)malloc(n*n*sizeof(float));
+	w  = (float*)malloc(n*sizeof(float));
+	// Gram matrix reduced across the processors, G = A^T x A
+	smatmult(Gi,Ai,Ai,n,n,m,"T","N");
+	MPI_Allreduce(Gi,G,n*n,MPI_FLOAT,MPI_SUM,comm);
+	free(Gi);
+	// Eigendecomposition of the symmetric Gram matrix
+	// eigenvalues are returned in ascending order
+	info = LAPACKE_ssyevd(
+		LAPACK_ROW_MAJOR, // int  		matrix_layout
+					 'V', // char  		jobz
+					 'U', // char  		uplo
+					   n, // int  		n
+					   G, // float*  	a
+					   n, // int  		lda
+					   w  // float*  	w
+	);
+	if (!(info==0)) goto cleanup;
+	// Singular values and right singular vectors in descending order
+	tol = (float)(n)*FLT_EPSILON*w[n-1];
+	for (ii=0,nr=0; ii<n; ++ii) {
+		S[ii] = (w[n-1-ii] > tol) ? sqrt(w[n-1-ii]) : 0.;
+		if (S[ii] > 0.) nr = ii + 1;
+		for (jj=0; jj<n; ++jj)
+			AC_MAT(VT,n,ii,jj) = AC_MAT(G,n,jj,n-1-ii);
 	}
-	// At this point R is correct on processor 0
-	// Broadcast R and its part of the Q matrix
-	if (mpi_size > 1) {
-		for (blevel = 1 << (nlevels-1),mask=blevel-1,ilevel=nlevels-1; blevel >= 1; blevel>>=1,mask>>=1,--ilevel) {
-			if ( ((mpi_rank^0)&mask) == 0 ) {
-				// Obtain Q2i for this level - use C as buffer
-				for (ii=0; ii<n2; ++ii)
-					for (jj=0; jj<n; ++jj)
-						AC_MAT(C,n,ii,jj) = AC_MAT(Q2l,n,ii+ilevel*n2,jj);
-				// Multiply by QW either set to identity or allocated to a value
-				// Store into Q2i
-				zmatmul(Q2i,C,QW,n2,n,n);
-				// Communications scheme
-				prank = mpi_rank^blevel;
-				if ( ((mpi_rank^0)&blevel)) {
-					if (prank < mpi_size) { // Recieve
-						MPI_Recv(C,n2*n,MPI_C_DOUBLE_COMPLEX,prank,0,comm,MPI_STATUS_IGNORE);
-						// Recover R from the upper part of C and QW from the lower part
-						for (ii=0; ii<n; ++ii)
-							for (jj=0; jj<n; ++jj) {
-								AC_MAT(R,n,ii,jj)  = AC_MAT(C,n,ii,jj);
-								AC_MAT(QW,n,ii,jj) = AC_MAT(C,n,ii+n,jj);
-							}
-					}
-				} else {
-					if (prank < mpi_size) { // Send C
-						// Set up C matrix for sending
-						// Store R in the upper part and Q2i on the lower part
-						// Store Q2i of this rank to QW
-						for(ii=0;ii<n;++ii)
-							for(jj=ii;jj<n;++jj) {
-								AC_MAT(C,n,ii,jj)   = AC_MAT(R,n,ii,jj);
-								AC_MAT(C,n,ii+n,jj) = AC_MAT(Q2i,n,ii+n,jj);
-								AC_MAT(QW,n,ii,jj)  = AC_MAT(Q2i,n,ii,jj);
-							}
-						MPI_Send(C,n2*n,MPI_C_DOUBLE_COMPLEX,prank,0,comm);
-					}
-				}
-			}
-		}
+	// Accuracy guard, fall back to TSQR for ill-conditioned matrices
+	if (nr == 0 || S[0]/S[nr-1] > cond_max) {
+		info = stsqr_svd(Ui,S,VT,Ai,m,n,comm);
+		goto cleanup;
 	}
+	// Compute Ui = Ai x V x S^-1
+	smatmult(Ui,Ai,VT,m,n,n,"N","T");
+	for (ii=0; ii<m; ++ii)
+		for (jj=0; jj<n; ++jj)
+			AC_MAT(Ui,n,ii,jj) = (jj < nr) ? AC_MAT(Ui,n,ii,jj)/S[jj] : 0.;
+cleanup:
 	// Free memory
-	free(Q2i); free(Q2l); free(C);
-	// Multiply Q1i and QW to obtain Qi
-	zmatmul(Qi,Q1i,QW,m,n,n);
-	free(Q1i); free(QW);
+	free(G); free(w);
 	return info;
 }
 
-int ztsqr_svd(complex_t *Ui, double *S, complex_t *VT, complex_t *Ai, const int m, const int n, MPI_Comm comm) {
+void srandom_matrix(float *A, const int m, const int n, unsigned int seed) {
+	/*
+		Fill A(m,n) with normally distributed random numbers
+		using the Box-Muller transform. The same seed produces
+		the same matrix on every processor.
+	*/
+	int ii;
+	float u1, u2, rad;
+	srand(seed);
+	for (ii=0; ii<m*n; ii+=2) {
+		u1  = ((float)(rand()) + 1.)/((float)(RAND_MAX) + 2.);
+		u2  = ((float)(rand()) + 1.)/((float)(RAND_MAX) + 2.);
+		rad = sqrt(-2.*log(u1));
+		A[ii] = rad*cos(2.*M_PI*u2);
+		if (ii+1 < m*n) A[ii+1] = rad*sin(2.*M_PI*u2);
+	}
+}
+
+int srandomized_svd(float *Ui, float *S, float *VT, float *Ai, const int m, const int n, const int r, const int p, const int q, int seed, MPI_Comm comm) {
+	/*
+		Randomized single value decomposition (SVD) with a distributed
+		range finder, from
+		N. Halko, P. G. Martinsson, and J. A. Tropp, ‘Finding Structure with
+		Randomness: Probabilistic Algorithms for Constructing Approximate
+		Matrix Decompositions’, SIAM Rev., vol. 53, no. 2, pp. 217–288, Jan. 2011,
+
+		doi: 10.1137/090771806.
+
+		The orthonormalization of the sketch is done with the TSQR algorithm
+		so that the method works on matrices partitioned by rows.
+
+		Ai(m,n)  data matrix dispersed on each processor.
+		r        target rank.
+		p        oversampling.
+		q        number of power iterations.
+		seed     seed for the random matrix (if < 0 it is taken from the clock).
+
+		Ui(m,r)  POD modes dispersed on each processor (must come preallocated).
+		S(r)     singular values.
+		VT(r,n)  right singular vectors (transposed).
+	*/
+	int info = 0, ii, jj, iter, k = MIN(r+p,n);
+	float *Omega = NULL, *Yi = NULL, *Qi = NULL, *R = NULL, *Z = NULL, *Qz = NULL, *B = NULL, *Ub = NULL, *Sb = NULL, *VTb = NULL;
+	// Make sure that all the processors use the same random matrix
+	if (seed < 0) seed = (int)(time(NULL));
+	MPI_Bcast(&seed,1,MPI_INT,0,comm);
+	// Memory allocation
+	Omega = (float*)malloc(n*k*sizeof(float));
+	Yi    = (float*)malloc(m*k*sizeof(float));
+	Qi    = (float*)malloc(m*k*sizeof(float));
+	R     = (float*)malloc(k*k*sizeof(float));
+	Z     = (float*)malloc(n*k*sizeof(float));
+	Qz    = (float*)malloc(n*k*sizeof(float));
+	B     = (float*)malloc(k*n*sizeof(float));
+	VTb   = (float*)malloc(k*n*sizeof(float));
+	Ub    = (float*)malloc(k*k*sizeof(float));
+	Sb    = (float*)malloc(k*sizeof(float));
+	// Sketch the range of A, Yi = Ai x Omega
+	srandom_matrix(Omega,n,k,(unsigned int)(seed));
+	smatmul(Yi,Ai,Omega,m,k,n);
+	// Power iterations to sharpen the decay of the singular values
+	for (iter=0; iter<q; ++iter) {
+		// Orthonormalize the sketch
+		info = stsqr(Qi,R,Yi,m,k,comm); if (!(info==0)) goto cleanup;
+		// Z = A^T x Q reduced across the processors
+		smatmult(Qz,Ai,Qi,n,k,m,"T","N");
+		MPI_Allreduce(Qz,Z,n*k,MPI_FLOAT,MPI_SUM,comm);
+		// Orthonormalize Z, which is the same on all the processors
+		info = sqr(Qz,R,Z,n,k); if (!(info==0)) goto cleanup;
+		// Yi = Ai x Qz
+		smatmul(Yi,Ai,Qz,m,k,n);
+	}
+	// Orthonormal basis of the range
+	info = stsqr(Qi,R,Yi,m,k,comm); if (!(info==0)) goto cleanup;
+	// Project A onto the basis, B = Q^T x A
+	smatmult(VTb,Qi,Ai,k,n,m,"T","N");
+	MPI_Allreduce(VTb,B,k*n,MPI_FLOAT,MPI_SUM,comm);
+	// SVD of the small matrix B
+	info = ssvd(Ub,Sb,VTb,B,k,n); if (!(info==0)) goto cleanup;
+	// Keep the first r singular triplets
+	memcpy(S,Sb,r*sizeof(float));
+	memcpy(VT,VTb,r*n*sizeof(float));
+	for (ii=0; ii<k; ++ii)
+		for (jj=0; jj<r; ++jj)
+			AC_MAT(Ub,r,ii,jj) = AC_MAT(Ub,k,ii,jj);
+	// Compute Ui = Qi x Ub
+	smatmul(Ui,Qi,Ub,m,r,k);
+cleanup:
+	// Free memory
+	free(Omega); free(Yi); free(Qi); free(R); free(Z); free(Qz);
+	free(B); free(VTb); free(Ub); free(Sb);
+	return info;
+}
+
+// Single complex version
+int csvd(scomplex_t *U, float *S, scomplex_t *VT, scomplex_t *Y, const int m, const int n) {
+	/*
+		Single value decomposition (SVD) using Lapack.
+
+		U(m,n)   are the POD modes and must come preallocated.
+		S(n)     are the singular values.
+		VT(n,n)  are the right singular vectors (transposed).
+
+		Lapack dgesvd:
+			http://www.netlib.org/lapack/explore-html/d1/d7e/group__float_g_esing_ga84fdf22a62b12ff364621e4713ce02f2.html
+			https://www.netlib.org/lapack/explore-html/d0/dee/lapacke__dgesvd_8c_af31b3cb47f7cc3b9f6541303a2968c9f.html
+		Lapack dgesdd (more optimized):
+			http://www.netlib.org/lapack/explore-html/d1/d7e/group__float_g_esing_gad8e0f1c83a78d3d4858eaaa88a1c5ab1.html
+			http://www.netlib.org/lapack//explore-html/d3/d23/lapacke__dgesdd_8c_aaf227f107a19ae6021f591c4de5fdbd5.html
+		On ROW/COL major:
+			https://stackoverflow.com/questions/34698550/understanding-lapack-row-major-and-lapack-col-major-with-lda
+			https://software.intel.com/sites/products/documentation/doclib/mkl_sa/11/mkl_lapack_examples/lapacke_dgesvd_row.c.htm
+	*/
+	int retval, mn = MIN(m,n);
+	#ifdef USE_LAPACK_GESVD
+	// Run LAPACKE ZGESVD for the single value decomposition
+	float *superb;
+	superb = (float*)malloc((mn-1)*sizeof(float));
+	retval = LAPACKE_cgesvd(
+		LAPACK_ROW_MAJOR, // int  		matrix_layout
+					 'S', // char  		jobu
+					 'S', // char  		jobvt
+					   m, // int  		m
+					   n, // int  		n
+					   Y, // scomplex_t* a
+					   n, // int  		lda
+					   S, // scomplex_t* s
+					   U, // scomplex_t* u
+					  mn, // int  		ldu
+					  VT, // scomplex_t* vt
+					   n, // int  		ldvt
+				  superb  // float* superb
+	);
+	free(superb);
+	#else
+	// Run LAPACKE DGESDD for the single value decomposition
+	retval = LAPACKE_cgesdd(
+		LAPACK_ROW_MAJOR, // int  		matrix_layout
+					 'S', // char  		jobz
+					   m, // int  		m
+					   n, // int  		n
+					   Y, // scomplex_t*  	a
+					   n, // int  		lda
+					   S, // scomplex_t *  	s
+					   U, // scomplex_t *  	u
+					  mn, // int  		ldu
+					  VT, // scomplex_t *  	vt
+					   n  // int  		ldvt
+	);
+	#endif
+	return retval;
+}
+
+int cqr(scomplex_t *Q, scomplex_t *R, scomplex_t *A, const int m, const int n) {
+	/*
+		QR factorization using LAPACK.
+
+		Q(m,n) is the Q matrix and must come preallocated
+		R(n,n) is the R matrix and must come preallocated
+	*/
+	int info = 0, ii, jj;
+	scomplex_t *tau;
+	// Allocate
+	tau = (scomplex_t*)malloc(n*n*sizeof(scomplex_t));
+	// Copy A to Q
+	memcpy(Q,A,m*n*sizeof(scomplex_t));
+	// Run LAPACK dgerqf - QR factorization on A
+	info = LAPACKE_cgeqrf(
+		LAPACK_ROW_MAJOR, // int  		matrix_layout
+					   m, // int  		m
+					   n, // int  		n
+					   Q, // scomplex_t* a
+					   n, // int  		lda
+					 tau  // scomplex_t* tau
+	);
+	if (!(info==0)) {free(tau); return info;}
+	// Copy Ri matrix
+	memset(R,0,n*n*sizeof(scomplex_t));
+	for(ii=0;ii<n;++ii)
+		for(jj=ii;jj<n;++jj)
+			AC_MAT(R,n,ii,jj) = AC_MAT(Q,n,ii,jj);
+	// Run LAPACK dorgqr - Generate Q matrix
+	info = LAPACKE_cungqr(
+		LAPACK_ROW_MAJOR, // int  		matrix_layout
+					   m, // int  		m
+					   n, // int  		n
+					   n, // int  		k
+					   Q, // scomplex_t* a
+					   n, // int  		lda
+					 tau  // scomplex_t* tau
+	);
+	if (!(info==0)) {free(tau); return info;}
+	free(tau);
+	return info;
+}
+
+int ctsqr_tree(scomplex_t *Qi, scomplex_t *R, scomplex_t *Ai, const int m, const int n, const int tree, MPI_Comm comm) {
+	/*
+		QR factorization using TSQR algorithm from
+		J. Demmel, L. Grigori, M. Hoemmen, and J. Langou, ‘Communication-optimal Parallel
+		and Sequential QR and LU Factorizations’, SIAM J. Sci. Comput.,
+		vol. 34, no. 1, pp. A206–A239, Jan. 2012,
+
+		doi: 10.1137/080731992.
+
+		Ai(m,n)  data matrix dispersed on each processor.
+		tree     reduction tree (TSQR_BINARY, TSQR_FLAT, TSQR_BUTTERFLY,
+		         TSQR_NODE or TSQR_CHOLQR2).
+
+		Qi(m,n)  Q matrix per processor.
+		R(n,n)   R matrix.
+	*/
+	return tsqr_generic(Qi,R,Ai,m,n,tree,&TSQR_C,comm);
+}
+
+int ctsqr(scomplex_t *Qi, scomplex_t *R, scomplex_t *Ai, const int m, const int n, MPI_Comm comm) {
+	/*
+		TSQR algorithm with the binary reduction tree.
+	*/
+	return ctsqr_tree(Qi,R,Ai,m,n,TSQR_BINARY,comm);
+}
+
+int ctsqr_svd_tree(scomplex_t *Ui, float *S, scomplex_t *VT, scomplex_t *Ai, const int m, const int n, const int tree, MPI_Comm comm) {
 	/*
 		Single value decomposition (SVD) using TSQR algorithm from
 		J. Demmel, L. Grigori, M. Hoemmen, and J. Langou, ‘Communication-optimal Parallel
@@ -595,6 +1535,7 @@ int ztsqr_svd(complex_t *Ui, double *S, complex_t *VT, complex_t *Ai, const int
 		doi: 10.1137/080731992.
 
 		Ai(m,n)  data matrix dispersed on each processor.
+		tree     reduction tree of the TSQR.
 
 		Ui(m,n)  POD modes dispersed on each processor (must come preallocated).
 		S(n)     singular values.
@@ -602,21 +1543,98 @@ int ztsqr_svd(complex_t *Ui, double *S, complex_t *VT, complex_t *Ai, const int
 	*/
 	int info = 0;
 	// Algorithm 1 parallel QR decomposition
-	complex_t *Qi, *R;
-	R    = (complex_t*)malloc(n*n*sizeof(complex_t));
-	Qi   = (complex_t*)malloc(m*n*sizeof(complex_t));
+	scomplex_t *Qi, *R;
+	R    = (scomplex_t*)malloc(n*n*sizeof(scomplex_t));
+	Qi   = (scomplex_t*)malloc(m*n*sizeof(scomplex_t));
 	// Call TSQR routine
-	info = ztsqr(Qi,R,Ai,m,n,comm);
+	info = ctsqr_tree(Qi,R,Ai,m,n,tree,comm); if (!(info==0)) {free(R); free(Qi); return info;}
 
 	// Algorithm 2 from Sayadi and Schmid (2016) - Ui, S and VT
 	// At this point we have R and Qi scattered on the processors
-	complex_t *Ur;
-	Ur = (complex_t*)malloc(n*n*sizeof(complex_t));
+	scomplex_t *Ur;
+	Ur = (scomplex_t*)malloc(n*n*sizeof(scomplex_t));
 	// Call SVD routine
-	info = zsvd(Ur,S,VT,R,n,n); if (!(info==0)) return info;
+	info = csvd(Ur,S,VT,R,n,n); if (!(info==0)) {free(Ur); free(R); free(Qi); return info;}
 	// Compute Ui = Qi x Ur
-	zmatmul(Ui,Qi,Ur,m,n,n);
+	cmatmul(Ui,Qi,Ur,m,n,n);
 	// Free memory
 	free(Ur); free(R); free(Qi);
 	return info;
 }
+
+int ctsqr_svd(scomplex_t *Ui, float *S, scomplex_t *VT, scomplex_t *Ai, const int m, const int n, MPI_Comm comm) {
+	/*
+		TSQR SVD with the binary reduction tree.
+	*/
+	return ctsqr_svd_tree(Ui,S,VT,Ai,m,n,TSQR_BINARY,comm);
+}
+
+int cgram_svd(scomplex_t *Ui, float *S, scomplex_t *VT, scomplex_t *Ai, const int m, const int n, const float cond_max, MPI_Comm comm) {
+	/*
+		Single value decomposition (SVD) using the method of snapshots from
+		L. Sirovich, ‘Turbulence and the dynamics of coherent structures.
+		I. Coherent structures’, Q. Appl. Math., vol. 45, no. 3, pp. 561–571, 1987.
+
+		The Gram matrix G = A^H x A (n,n) is reduced across the processors
+		and its eigendecomposition G = V x S^2 x V^H gives the right singular
+		vectors and the singular values. The POD modes are recovered as
+		Ui = Ai x V x S^-1. Directions whose eigenvalue is zero within the
+		machine precision are treated as null and their modes are set to zero.
+
+		Forming G squares the condition number of A, hence when the ratio
+		between the first and the last nonzero singular values is above
+		cond_max the decomposition is recomputed with the TSQR algorithm.
+
+		Ai(m,n)  data matrix dispersed on each processor.
+		cond_max maximum condition number allowed.
+
+		Ui(m,n)  POD modes dispersed on each processor (must come preallocated).
+		S(n)     singular values.
+		VT(n,n)  right singular vectors (transposed).
+	*/
+	int info = 0, ii, jj, nr;
+	float *w, tol;
+	scomplex_t *G, *Gi;
+	// Memory allocation
+	G  = (scomplex_t*)malloc(n*n*sizeof(scomplex_t));
+	Gi = (scomplex_t*)malloc(n*n*sizeof(scomplex_t));
+	w  = (float*)malloc(n*sizeof(float));
+	// Gram matrix reduced across the processors, G = A^H x A
+	cmatmult(Gi,Ai,Ai,n,n,m,"C","N");
+	MPI_Allreduce(Gi,G,n*n,MPI_C_FLOAT_COMPLEX,MPI_SUM,comm);
+	free(Gi);
+	// Eigendecomposition of the hermitian Gram matrix
+	// eigenvalues are returned in ascending order
+	info = LAPACKE_cheevd(
+		LAPACK_ROW_MAJOR, // int  		matrix_layout
+					 'V', // char  		jobz
+					 'U', // char  		uplo
+					   n, // int  		n
+					   G, // scomplex_t* a
+					   n, // int  		lda
+					   w  // float*  	w
+	);
+	if (!(info==0)) goto cleanup;
+	// Singular values and right singular vectors in descending order
+	tol = (float)(n)*FLT_EPSILON*w[n-1];
+	for (ii=0,nr=0; ii<n; ++ii) {
+		S[ii] = (w[n-1-ii] > tol) ? sqrt(w[n-1-ii]) : 0.;
+		if (S[ii] > 0.) nr = ii + 1;
+		for (jj=0; jj<n; ++jj)
+			AC_MAT(VT,n,ii,jj) = conj(AC_MAT(G,n,jj,n-1-ii));
+	}
+	// Accuracy guard, fall back to TSQR for ill-conditioned matrices
+	if (nr == 0 || S[0]/S[nr-1] > cond_max) {
+		info = ctsqr_svd(Ui,S,VT,Ai,m,n,comm);
+		goto cleanup;
+	}
+	// Compute Ui = Ai x V x S^-1
+	cmatmult(Ui,Ai,VT,m,n,n,"N","C");
+	for (ii=0; ii<m; ++ii)
+		for (jj=0; jj<n; ++jj)
+			AC_MAT(Ui,n,ii,jj) = (jj < nr) ? AC_MAT(Ui,n,ii,jj)/S[jj] : 0.;
+cleanup:
+	// Free memory
+	free(G); free(w);
+	return info;
+}
@@ -3,17 +3,49 @@
 */
 #include <complex.h>
 typedef double _Complex complex_t;
+typedef float  _Complex scomplex_t;
 #ifdef USE_MKL
 #define MKL_Complex16 complex_t
+#define MKL_Complex8  scomplex_t
 #include "mkl.h"
 #endif
+// Reduction trees of the TSQR
+#define TSQR_BINARY    0
+#define TSQR_FLAT      1
+#define TSQR_BUTTERFLY 2
+#define TSQR_NODE      3
+#define TSQR_CHOLQR2   4
 // Double precision version
 int qr(double *Q, double *R, double *A, const int m, const int n);
 int svd(double *U, double *S, double *VT, double *Y, const int m, const int n);
 int tsqr(double *Qi, double *R, double *Ai, const int m, const int n, MPI_Comm comm);
+int tsqr_tree(double *Qi, double *R, double *Ai, const int m, const int n, const int tree, MPI_Comm comm);
 int tsqr_svd(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, MPI_Comm comm);
+int tsqr_svd_tree(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, const int tree, MPI_Comm comm);
+int gram_svd(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, const double cond_max, MPI_Comm comm);
+int randomized_svd(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, const int r, const int p, const int q, int seed, MPI_Comm comm);
 // Double complex version
 int zqr(complex_t *Q, complex_t *R, complex_t *A, const int m, const int n);
 int zsvd(complex_t *U, double *S, complex_t *VT, complex_t *Y, const int m, const int n);
 int ztsqr(complex_t *Qi, complex_t *R, complex_t *Ai, const int m, const int n, MPI_Comm comm);
+int ztsqr_tree(complex_t *Qi, complex_t *R, complex_t *Ai, const int m, const int n, const int tree, MPI_Comm comm);
 int ztsqr_svd(complex_t *Ui, double *S, complex_t *VT, complex_t *Ai, const int m, const int n, MPI_Comm comm);
+int ztsqr_svd_tree(complex_t *Ui, double *S, complex_t *VT, complex_t *Ai, const int m, const int n, const int tree, MPI_Comm comm);
+int zgram_svd(complex_t *Ui, double *S, complex_t *VT, complex_t *Ai, const int m, const int n, const double cond_max, MPI_Comm comm);
+// Single precision version
+int sqr(float *Q, float *R, float *A, const int m, const int n);
+int ssvd(float *U, float *S, float *VT, float *Y, const int m, const int n);
+int stsqr(float *Qi, float *R, float *Ai, const int m, const int n, MPI_Comm comm);
+int stsqr_tree(float *Qi, float *R, float *Ai, const int m, const int n, const int tree, MPI_Comm comm);
+int stsqr_svd(float *Ui, float *S, float *VT, float *Ai, const int m, const int n, MPI_Comm comm);
+int stsqr_svd_tree(float *Ui, float *S, float *VT, float *Ai, const int m, const int n, const int tree, MPI_Comm comm);
+int sgram_svd(float *Ui, float *S, float *VT, float *Ai, const int m, const int n, const float cond_max, MPI_Comm comm);
+int srandomized_svd(float *Ui, float *S, float *VT, float *Ai, const int m, const int n, const int r, const int p, const int q, int seed, MPI_Comm comm);
+// Single complex version
+int cqr(scomplex_t *Q, scomplex_t *R, scomplex_t *A, const int m, const int n);
+int csvd(scomplex_t *U, float *S, scomplex_t *VT, scomplex_t *Y, const int m, const int n);
+int ctsqr(scomplex_t *Qi, scomplex_t *R, scomplex_t *Ai, const int m, const int n, MPI_Comm comm);
+int ctsqr_tree(scomplex_t *Qi, scomplex_t *R, scomplex_t *Ai, const int m, const int n, const int tree, MPI_Comm comm);
+int ctsqr_svd(scomplex_t *Ui, float *S, scomplex_t *VT, scomplex_t *Ai, const int m, const int n, MPI_Comm comm);
+int ctsqr_svd_tree(scomplex_t *Ui, float *S, scomplex_t *VT, scomplex_t *Ai, const int m, const int n, const int tree, MPI_Comm comm);
+int cgram_svd(scomplex_t *Ui, float *S, scomplex_t *VT, scomplex_t *Ai, const int m, const int n, const float cond_max, MPI_Comm comm);
@@ -4,3 +4,6 @@
 
 int  compute_truncation_residual(double *S, double res, const int n);
 void compute_truncation(double *Ur, double *Sr, double *VTr, double *U,	double *S, double *VT, const int m, const int n, const int N);
+// Single precision version
+int  scompute_truncation_residual(float *S, float res, const int n);
+void scompute_truncation(float *Ur, float *Sr, float *VTr, float *U, float *S, float *VT, const int m, const int n, const int N);
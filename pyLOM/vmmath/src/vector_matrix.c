@@ -7,9 +7,11 @@
 #include <string.h>
 #include "mpi.h"
 typedef double _Complex complex_t;
+typedef float  _Complex scomplex_t;
 
 #ifdef USE_MKL
 #define MKL_Complex16 complex_t
+#define MKL_Complex8  scomplex_t
 #include "mkl.h"
 #include "mkl_lapacke.h"
 #else
@@ -152,7 +154,36 @@ void zmatmul(complex_t *C, complex_t *A, complex_t *B, const int m, const int n,
 	zmatmult(C,A,B,m,n,k,"N","N");
 }
 
-void matmulp(double *C, double *A, double *B, const int m, const int n, const int k) {
+void dzmatmul(complex_t *C, double *A, complex_t *B, const int m, const int n, const int k) {
+	/*
+		Matrix multiplication C = A x B where A is real and B complex
+		using cblas routines.
+
+		B and C are seen as real matrices of (k,2n) and (m,2n) with
+		interleaved real and imaginary parts, hence the product is a
+		single real GEMM and A is never promoted to complex.
+
+		C(m,n), A(m,k), B(k,n)
+	*/
+	cblas_dgemm(
+		CblasRowMajor, // const CBLAS_LAYOUT 	  layout
+		 CblasNoTrans, // const CBLAS_TRANSPOSE   TransA
+		 CblasNoTrans, // const CBLAS_TRANSPOSE   TransB
+		            m, // const CBLAS_INDEX 	  M
+		          2*n, // const CBLAS_INDEX 	  N
+		            k, // const CBLAS_INDEX 	  K
+		          1.0, // const double 	          alpha
+		            A, // const double * 	      A
+		            k, // const CBLAS_INDEX 	  lda
+		   (double*)B, // const double * 	      B
+		          2*n, // const CBLAS_INDEX 	  ldb
+		          0.0, // const double 	          beta
+		   (double*)C, // double * 	              C
+		          2*n  // const CBLAS_INDEX 	  ldc
+	);
+}
+
+void matmulp(double *C, double *A, double *B, const int m, const int n, const int k, MPI_Comm comm) {
 	/*
 		Matrix multiplication C = A x B
 		using cblas routines.
@@ -162,11 +193,11 @@ void matmulp(double *C, double *A, double *B, const int m, const int n, const in
 	double *Cmine;
 	Cmine = (double*)malloc(m*n*sizeof(double));
 	matmul(Cmine,A,B,m,n,k);
-	MPI_Allreduce(Cmine, C, m*n, MPI_DOUBLE, MPI_SUM, MPI_COMM_WORLD);
+	MPI_Allreduce(Cmine, C, m*n, MPI_DOUBLE, MPI_SUM, comm);
 	free(Cmine);
 }
 
-void zmatmulp(complex_t *C, complex_t *A, complex_t *B, const int m, const int n, const int k) {
+void zmatmulp(complex_t *C, complex_t *A, complex_t *B, const int m, const int n, const int k, MPI_Comm comm) {
 	/*
 		Matrix multiplication C = A x B
 		using cblas routines.
@@ -176,7 +207,7 @@ void zmatmulp(complex_t *C, complex_t *A, complex_t *B, const int m, const int n
 	complex_t *Cmine;
 	Cmine = (complex_t*)malloc(m*n*sizeof(complex_t));
 	zmatmul(Cmine,A,B,m,n,k);
-	MPI_Allreduce(Cmine, C, m*n, MPI_C_DOUBLE_COMPLEX, MPI_SUM, MPI_COMM_WORLD);
+	MPI_Allreduce(Cmine, C, m*n, MPI_C_DOUBLE_COMPLEX, MPI_SUM, comm);
 	free(Cmine);
 }
 
@@ -437,3 +468,205 @@ void zsort(complex_t *v, int *index, int n){
 	}
 	free(w);
 }
+
+
+// Single precision version
+void stranspose(float *A, float *B, const int m, const int n) {
+	/*
+		Naive approximation to matrix transpose.
+	*/
+	int ii, jj;
+	for (ii=0; ii<m; ++ii) {
+		for (jj=0; jj<n; ++jj) {
+			AC_MAT(B,m,jj,ii) = AC_MAT(A,n,ii,jj);
+		}
+	}
+}
+
+float svector_norm(float *v, int start, int n) {
+	/*
+		Compute the norm of the n-dim vector v from the position start
+	*/
+	int ii;
+	float norm = 0;
+	#ifdef USE_OMP
+	#pragma omp parallel for reduction(+:norm) private(ii) shared(v) firstprivate(start,n)
+	#endif
+	for(ii = start; ii < n; ++ii)
+		norm += POW2(v[ii]);
+	return sqrt(norm);
+}
+
+void smatmult(float *C, float *A, float *B, const int m, const int n, const int k, const char *TA, const char *TB) {
+	/*
+		Matrix multiplication C = A x B
+		using cblas routines.
+
+		Transposable version
+
+		C(m,n), A(m,k), B(k,n)
+	*/
+	float alpha = 1.0, beta = 0.0;
+	CBLAS_TRANSPOSE TransA = CblasNoTrans, TransB = CblasNoTrans;
+	CBLAS_INDEX     lda = k, ldb = n, ldc = n;
+	// Transpose options
+	if (*TA == 'T') {TransA = CblasTrans; lda = m;}
+	if (*TB == 'T') {TransB = CblasTrans; ldb = k;}
+	cblas_sgemm(
+		CblasRowMajor, // const CBLAS_LAYOUT 	  layout
+		       TransA, // const CBLAS_TRANSPOSE   TransA
+		       TransB, // const CBLAS_TRANSPOSE   TransB
+		            m, // const CBLAS_INDEX 	  M
+		            n, // const CBLAS_INDEX 	  N
+		            k, // const CBLAS_INDEX 	  K
+		        alpha, // const float 	          alpha
+		            A, // const float * 	      A
+		          lda, // const CBLAS_INDEX 	  lda
+		            B, // const float * 	      B
+		          ldb, // const CBLAS_INDEX 	  ldb
+		         beta, // const float 	          beta
+		            C, // float * 	              C
+		          ldc  // const CBLAS_INDEX 	  ldc
+	);
+}
+
+void smatmul(float *C, float *A, float *B, const int m, const int n, const int k) {
+	/*
+		Matrix multiplication C = A x B
+		using cblas routines.
+
+		C(m,n), A(m,k), B(k,n)
+	*/
+	smatmult(C,A,B,m,n,k,"N","N");
+}
+
+void smatmulp(float *C, float *A, float *B, const int m, const int n, const int k, MPI_Comm comm) {
+	/*
+		Matrix multiplication C = A x B
+		using cblas routines.
+
+		C(m,n), A(m,k), B(k,n)
+	*/
+	float *Cmine;
+	Cmine = (float*)malloc(m*n*sizeof(float));
+	smatmul(Cmine,A,B,m,n,k);
+	MPI_Allreduce(Cmine, C, m*n, MPI_FLOAT, MPI_SUM, comm);
+	free(Cmine);
+}
+
+void svecmat(float *v, float *A, const int m, const int n) {
+	/*
+		Computes the product of b x A
+		using cblas routines.
+
+		A(m,n), b(m)
+	*/
+	int ii;
+	#ifdef USE_OMP
+	#pragma omp parallel for private(ii) shared(b,A) firstprivate(m,n)
+	#endif
+	for(ii=0; ii<m; ++ii)
+		cblas_sscal(n,v[ii],A+n*ii,1);
+}
+
+// Single complex version
+void cmatmult(scomplex_t *C, scomplex_t *A, scomplex_t *B, const int m, const int n, const int k, const char *TA, const char *TB) {
+	/*
+		Matrix multiplication C = A x B
+		using cblas routines.
+
+		C(m,n), A(m,k), B(k,n)
+	*/
+	scomplex_t alpha = 1.0 + 0.0*I, beta = 0.0 + 0.0*I;
+	CBLAS_TRANSPOSE TransA = CblasNoTrans, TransB = CblasNoTrans;
+	CBLAS_INDEX     lda = k, ldb = n, ldc = n;
+	// Transpose options
+	if (*TA == 'T'){ TransA = CblasTrans;     lda = m; }
+	if (*TA == 'C'){ TransA = CblasConjTrans; lda = m; }
+	if (*TB == 'T'){ TransB = CblasTrans;     ldb = k; }
+	if (*TB == 'C'){ TransB = CblasConjTrans; ldb = k; }
+	cblas_cgemm(
+		CblasRowMajor, // const CBLAS_LAYOUT 	  layout
+		       TransA, // const CBLAS_TRANSPOSE   TransA
+		       TransB, // const CBLAS_TRANSPOSE   TransB
+		            m, // const CBLAS_INDEX 	  M
+		            n, // const CBLAS_INDEX 	  N
+		            k, // const CBLAS_INDEX 	  K
+		       &alpha, // const scomplex_t 	      alpha
+		            A, // const scomplex_t * 	  A
+		          lda, // const CBLAS_INDEX 	  lda
+		            B, // const scomplex_t * 	  B
+		          ldb, // const CBLAS_INDEX 	  ldb
+		        &beta, // const scomplex_t 	      beta
+		            C, // scomplex_t * 	          C
+		          ldc  // const CBLAS_INDEX 	  ldc
+	);
+}
+
+void cmatmul(scomplex_t *C, scomplex_t *A, scomplex_t *B, const int m, const int n, const int k) {
+	/*
+		Matrix multiplication C = A x B
+		using cblas routines.
+
+		C(m,n), A(m,k), B(k,n)
+	*/
+	cmatmult(C,A,B,m,n,k,"N","N");
+}
+
+void scmatmul(scomplex_t *C, float *A, scomplex_t *B, const int m, const int n, const int k) {
+	/*
+		Matrix multiplication C = A x B where A is real and B complex
+		using cblas routines.
+
+		B and C are seen as real matrices of (k,2n) and (m,2n) with
+		interleaved real and imaginary parts, hence the product is a
+		single real GEMM and A is never promoted to complex.
+
+		C(m,n), A(m,k), B(k,n)
+	*/
+	cblas_sgemm(
+		CblasRowMajor, // const CBLAS_LAYOUT 	  layout
+		 CblasNoTrans, // const CBLAS_TRANSPOSE   TransA
+		 CblasNoTrans, // const CBLAS_TRANSPOSE   TransB
+		            m, // const CBLAS_INDEX 	  M
+		          2*n, // const CBLAS_INDEX 	  N
+		            k, // const CBLAS_INDEX 	  K
+		          1.0, // const float 	          alpha
+		            A, // const float * 	      A
+		            k, // const CBLAS_INDEX 	  lda
+		    (float*)B, // const float * 	      B
+		          2*n, // const CBLAS_INDEX 	  ldb
+		          0.0, // const float 	          beta
+		    (float*)C, // float * 	              C
+		          2*n  // const CBLAS_INDEX 	  ldc
+	);
+}
+
+void cmatmulp(scomplex_t *C, scomplex_t *A, scomplex_t *B, const int m, const int n, const int k, MPI_Comm comm) {
+	/*
+		Matrix multiplication C = A x B
+		using cblas routines.
+
+		C(m,n), A(m,k), B(k,n)
+	*/
+	scomplex_t *Cmine;
+	Cmine = (scomplex_t*)malloc(m*n*sizeof(scomplex_t));
+	cmatmul(Cmine,A,B,m,n,k);
+	MPI_Allreduce(Cmine, C, m*n, MPI_C_FLOAT_COMPLEX, MPI_SUM, comm);
+	free(Cmine);
+}
+
+void cvecmat(scomplex_t *v, scomplex_t *A, const int m, const int n) {
+	/*
+		Computes the product of b x A
+		using cblas routines.
+
+		A(m,n), b(m)
+	*/
+	int ii;
+	#ifdef USE_OMP
+	#pragma omp parallel for private(ii) shared(b,A) firstprivate(m,n)
+	#endif
+	for(ii=0; ii<m; ++ii)
+		cblas_cscal(n,&v[ii],A+n*ii,1);
+}
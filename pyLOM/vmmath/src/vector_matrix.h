@@ -3,8 +3,10 @@
 */
 #include <complex.h>
 typedef double _Complex complex_t;
+typedef float  _Complex scomplex_t;
 #ifdef USE_MKL
 #define MKL_Complex16 complex_t
+#define MKL_Complex8  scomplex_t
 #include "mkl.h"
 #endif
 // Double version
@@ -13,7 +15,7 @@ double vector_norm(double *v, int start, int n);
 void   reorder(double *A, int m, int n, int N);
 void   matmult(double *C, double *A, double *B, const int m, const int n, const int k, const char *TA, const char *TB);
 void   matmul(double *C, double *A, double *B, const int m, const int n, const int k);
-void   matmulp(double *C, double *A, double *B, const int m, const int n, const int k);
+void   matmulp(double *C, double *A, double *B, const int m, const int n, const int k, MPI_Comm comm);
 void   vecmat(double *v, double *A, const int m, const int n);
 int    inverse(double *A, int N, char *UoL);
 double RMSE(double *A, double *B, const int m, const int n, MPI_Comm comm);
@@ -21,7 +23,8 @@ void   sort(double *v, int *index, int n);
 // Double complex version
 void   zmatmult(complex_t *C, complex_t *A, complex_t *B, const int m, const int n, const int k, const char *TA, const char *TB);
 void   zmatmul(complex_t *C, complex_t *A, complex_t *B, const int m, const int n, const int k);
-void   zmatmulp(complex_t *C, complex_t *A, complex_t *B, const int m, const int n, const int k);
+void   dzmatmul(complex_t *C, double *A, complex_t *B, const int m, const int n, const int k);
+void   zmatmulp(complex_t *C, complex_t *A, complex_t *B, const int m, const int n, const int k, MPI_Comm comm);
 void   zvecmat(complex_t *v, complex_t *A, const int m, const int n);
 int    zinverse(complex_t *A, int N, char *UoL);
 int    eigen(double *real, double *imag, complex_t *vecs, double *A, const int m, const int n);
@@ -29,3 +32,16 @@ int    cholesky(complex_t *A, int N);
 void   vandermonde(complex_t *Vand, double *real, double *imag, int m, int n);
 void   vandermondeTime(complex_t *Vand, double *real, double *imag, int m, int n, double *t);
 void   zsort(complex_t *v, int *index, int n);
+// Single precision version
+void   stranspose(float *A, float *B, const int m, const int n);
+float  svector_norm(float *v, int start, int n);
+void   smatmult(float *C, float *A, float *B, const int m, const int n, const int k, const char *TA, const char *TB);
+void   smatmul(float *C, float *A, float *B, const int m, const int n, const int k);
+void   smatmulp(float *C, float *A, float *B, const int m, const int n, const int k, MPI_Comm comm);
+void   svecmat(float *v, float *A, const int m, const int n);
+// Single complex version
+void   cmatmult(scomplex_t *C, scomplex_t *A, scomplex_t *B, const int m, const int n, const int k, const char *TA, const char *TB);
+void   cmatmul(scomplex_t *C, scomplex_t *A, scomplex_t *B, const int m, const int n, const int k);
+void   scmatmul(scomplex_t *C, float *A, scomplex_t *B, const int m, const int n, const int k);
+void   cmatmulp(scomplex_t *C, scomplex_t *A, scomplex_t *B, const int m, const int n, const int k, MPI_Comm comm);
+void   cvecmat(scomplex_t *v, scomplex_t *A, const int m, const int n);
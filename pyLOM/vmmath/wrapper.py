@@ -11,11 +11,15 @@ import numpy as np, scipy, nfft
 from mpi4py import MPI
 
 from ..utils.cr     import cr
-from ..utils.parall import mpi_gather, mpi_reduce, pprint, mpi_send, mpi_recv, is_rank_or_serial
+from ..utils.parall import NodeArray, mpi_comm, mpi_node_comm, mpi_gather, mpi_reduce, mpi_bcast, pprint, is_rank_or_serial
 from ..utils.errors import raiseError
 import h5py
 
 
+## Reduction trees of the TSQR
+TSQR_TREES = {'binary':0,'flat':1,'butterfly':2,'node':3,'cholqr2':4}
+
+
 ## Python functions
 @cr('math.transpose')
 def transpose(A):
@@ -39,12 +43,12 @@ def matmul(A,B):
 	return np.matmul(A,B)
 
 @cr('math.matmulp')
-def matmulp(A,B):
+def matmulp(A,B,comm=None):
 	'''
-	Matrix multiplication C = A x B where A and B are distributed along the processors and C is the same for all of them
+	Matrix multiplication C = A x B where A and B are distributed along the processors of comm and C is the same for all of them
 	'''
 	aux = np.matmul(A,B)
-	return mpi_reduce(aux, root = 0, op = 'sum', all = True)
+	return mpi_reduce(aux, root = 0, op = 'sum', all = True, comm = comm)
 
 @cr('math.vecmat')
 def vecmat(v,A):
@@ -130,25 +134,26 @@ def svd(A,method='gesdd'):
 	return np.linalg.svd(A,full_matrices=False)
 
 @cr('math.tsqr2')
-def tsqr2(A):
+def tsqr2(A,comm=None):
 	'''
 	Parallel QR factorization using Lapack
 		Q(m,n) is the Q matrix
 		R(n,n) is the R matrix
 	'''
+	comm, rank, _ = mpi_comm(comm)
 	# Algorithm 1 from Sayadi and Schmid (2016) - Q and R matrices
 	# QR factorization on A
 	Q1i, R = qr(A)
 	# Gather all Rs into Rp
-	Rp = mpi_gather(R,all=True)
+	Rp = mpi_gather(R,all=True,comm=comm)
 	# QR factorization on Rp
 	Q2i, R = qr(Rp)
 	# Compute Q = Q1 x Q2
-	Q = matmul(Q1i,Q2i[A.shape[1]*MPI_RANK:A.shape[1]*(MPI_RANK+1),:])
+	Q = matmul(Q1i,Q2i[A.shape[1]*rank:A.shape[1]*(rank+1),:])
 	return Q,R
 
 @cr('math.tsqr_svd2')
-def tsqr_svd2(A):
+def tsqr_svd2(A,comm=None):
 	'''
 	Single value decomposition (SVD) using Lapack.
 		U(m,n)   are the POD modes.
@@ -157,7 +162,7 @@ def tsqr_svd2(A):
 	'''
 	# Algorithm 1 from Sayadi and Schmid (2016) - Q and R matrices
 	# QR factorization on A
-	Q,R = tsqr2(A)
+	Q,R = tsqr2(A,comm)
 
 	# Algorithm 2 from Sayadi and Schmid (2016) - Ui, S and VT
 	# At this point we have R and Qi scattered on the processors
@@ -167,92 +172,229 @@ def tsqr_svd2(A):
 	U = matmul(Q,Ur)
 	return U,S,V
 
-def next_power_of_2(n):
+def _tsqr_qr2(Rt,Rb):
+	'''
+	QR factorization of the stacked [Rt; Rb] matrix
+	'''
+	return qr(np.vstack((Rt,Rb)))
+
+def _tsqr_binary(R,comm):
+	'''
+	Binary tree of Demmel et al (2012) for any number of processors.
+
+	At each level the processors with the level bit set send their R to
+	their partner and leave the reduction, the partners stack both and
+	factorize them. On the way down a parent sends [R; Q2b x QW] to each
+	of its children without waiting for the previous message.
+	'''
+	comm, rank, size = mpi_comm(comm)
+	n = R.shape[0]
+	# Reduction, top is the level where this processor hands over its R
+	Q2l, top, ilevel, blevel = {}, None, 0, 1
+	while blevel < size:
+		prank = rank ^ blevel
+		if rank & blevel:
+			comm.Send(np.ascontiguousarray(R),dest=prank)
+			top = ilevel
+			break
+		if prank < size:
+			Rp = np.empty_like(R)
+			comm.Recv(Rp,source=prank)
+			Q2l[ilevel], R = _tsqr_qr2(R,Rp)
+		ilevel += 1
+		blevel <<= 1
+	# Obtain R and QW from the parent, the root starts with the identity
+	if top is None:
+		top, QW = ilevel, np.eye(n,dtype=R.dtype)
+	else:
+		C = np.empty((2*n,n),R.dtype)
+		comm.Recv(C,source=rank^(1<<top))
+		R, QW = C[:n], C[n:]
+	# Broadcast R and the part of Q of each child
+	reqs, bufs = [], []
+	for ilevel in reversed(range(top)):
+		if not ilevel in Q2l: continue
+		G = matmul(Q2l[ilevel],QW)
+		bufs.append(np.ascontiguousarray(np.vstack((R,G[n:]))))
+		reqs.append(comm.Isend(bufs[-1],dest=rank^(1<<ilevel)))
+		QW = G[:n]
+	MPI.Request.Waitall(reqs)
+	return QW, R
+
+def _tsqr_flat(R,comm,leaders=None,tree='butterfly'):
+	'''
+	Flat tree, the root gathers all the R, factorizes them at once and
+	scatters the blocks of Q. When a communicator of leaders is given
+	the root further reduces its R among them with the given tree.
+	'''
+	comm, rank, size = mpi_comm(comm)
+	n  = R.shape[0]
+	Rs = np.empty((size*n,n),R.dtype) if rank == 0 else None
+	comm.Gather(np.ascontiguousarray(R),Rs,root=0)
+	if rank == 0:
+		Qs, R = qr(Rs)
+		if leaders is not None and not leaders == MPI.COMM_NULL:
+			F, R = _tsqr_reduce(R,tree,leaders)
+			Qs   = matmul(Qs,F)
+		Qs = np.ascontiguousarray(Qs)
+	QW = np.empty((n,n),R.dtype)
+	comm.Scatter(Qs if rank == 0 else None,QW,root=0)
+	R  = np.ascontiguousarray(R)
+	comm.Bcast(R,root=0)
+	return QW, R
+
+def _tsqr_butterfly(R,comm):
+	'''
+	Butterfly (allreduce) tree, at each level the partners exchange their
+	R and both factorize the stacked matrix, so that R ends up on every
+	processor without a broadcast and each one accumulates its own QW.
+	The processors beyond the largest power of two fold their R into a
+	partner first and recover R and QW at the end.
+	'''
+	comm, rank, size = mpi_comm(comm)
+	n  = R.shape[0]
+	p2 = 1 << (size.bit_length() - 1)
+	if rank >= p2:
+		C = np.empty((2*n,n),R.dtype)
+		comm.Send(np.ascontiguousarray(R),dest=rank-p2)
+		comm.Recv(C,source=rank-p2)
+		return C[n:], C[:n]
+	QW, E, Rp = np.eye(n,dtype=R.dtype), None, np.empty_like(R)
+	# Fold the extra processor, E is its factor
+	if rank + p2 < size:
+		comm.Recv(Rp,source=rank+p2)
+		Q2, R = _tsqr_qr2(R,Rp)
+		QW, E = Q2[:n], Q2[n:]
+	# Recursive doubling, the lower rank goes on top
+	blevel = 1
+	while blevel < p2:
+		prank = rank ^ blevel
+		comm.Sendrecv(np.ascontiguousarray(R),dest=prank,recvbuf=Rp,source=prank)
+		Q2, R = _tsqr_qr2(R,Rp) if rank < prank else _tsqr_qr2(Rp,R)
+		Q2h   = Q2[:n] if rank < prank else Q2[n:]
+		QW    = matmul(QW,Q2h)
+		if E is not None: E = matmul(E,Q2h)
+		blevel <<= 1
+	# Return R and its factor to the extra processor
+	if E is not None:
+		comm.Send(np.ascontiguousarray(np.vstack((R,E))),dest=rank+p2)
+	return QW, R
+
+def _tsqr_node(R,comm):
+	'''
+	Node aware two level tree, the R of the processors of a node are
+	reduced with a flat tree on the node leader and only the leaders
+	take part in the butterfly tree across the nodes.
+	'''
+	node, leaders = mpi_node_comm(comm)
+	return _tsqr_flat(R,node,leaders,'butterfly')
+
+def _tsqr_reduce(R,tree,comm):
+	'''
+	Reduce the R of the processors with the requested tree,
+	returns the factor QW of this processor and the global R.
+	'''
+	if comm.Get_size() == 1: return np.eye(R.shape[0],dtype=R.dtype), R
+	if tree == 'flat':      return _tsqr_flat(R,comm)
+	if tree == 'butterfly': return _tsqr_butterfly(R,comm)
+	if tree == 'node':      return _tsqr_node(R,comm)
+	return _tsqr_binary(R,comm)
+
+def _cholqr2(Ai,comm):
+	'''
+	CholeskyQR2 from
+	T. Fukaya, Y. Nakatsukasa, Y. Yanagisawa and Y. Yamamoto, ‘CholeskyQR2:
+	A Simple and Communication-Avoiding Algorithm for Computing a Tall-Skinny
+	QR Factorization on a Large-Scale Parallel System’, ScalA, pp. 31–38, 2014
+
+	Two passes of Qi = Ai x R^-1 with R the Cholesky factor of the Gram
+	matrix, a single allreduce per pass. Returns None when the Gram
+	matrix is not positive definite, when the condition of Ai is above
+	1/sqrt(eps), or when the Qi of the first pass is far from orthogonal,
+	i.e., the factor of the second pass is ill conditioned as its Gram
+	matrix is Qi^H x Qi.
+	'''
+	Qi, R = Ai, None
+	eps   = np.finfo(Ai.dtype).eps
+	for it in range(2):
+		G = matmulp(np.conj(transpose(Qi)),Qi,comm)
+		try:
+			Rk = np.ascontiguousarray(np.conj(transpose(np.linalg.cholesky(G))))
+		except np.linalg.LinAlgError:
+			return None
+		if np.linalg.cond(Rk,1) > (1./np.sqrt(eps) if it == 0 else 2.): return None
+		R  = Rk if R is None else matmul(Rk,R)
+		Qi = matmul(Qi,inv(Rk))
+	return Qi, R
+
+def _tsqr_check(m,n,comm):
 	'''
-	Find the next power of 2 of n
+	The TSQR needs at least as many rows as columns on every processor,
+	checked on all of them so that no processor is left in the reduction.
 	'''
-	p = 1
-	if (n and not(n & (n - 1))):
-		return n
-	while (p < n): p <<= 1
-	return p
+	if mpi_reduce(int(m < n),op='max',all=True,comm=comm): raiseError('TSQR needs at least as many rows as columns on every processor!')
 
 @cr('math.tsqr')
-def tsqr(Ai):
+def tsqr(Ai,comm=None,tree='binary'):
 	'''
 	Parallel QR factorization of a real array using Lapack
 		Q(m,n) is the Q matrix
 		R(n,n) is the R matrix
-	'''
-	#Recover rank and size
-	MPI_COMM = MPI.COMM_WORLD      # Communications macro
-	MPI_RANK = MPI_COMM.Get_rank() # Who are you? who? who?
-	MPI_SIZE = MPI_COMM.Get_size() # Total number of processors used (workers)
-	m, n = Ai.shape
+	The processors that hold Ai are those of comm (MPI.COMM_WORLD by default).
+
+	tree is the reduction of the R factors: 'binary', 'flat', 'butterfly'
+	(allreduce, no broadcast), 'node' (flat inside each node and butterfly
+	among the nodes) or 'cholqr2' (CholeskyQR2, falls back to 'binary'
+	when Ai is too ill conditioned).
+	'''
+	if not tree in TSQR_TREES: raiseError('TSQR tree <%s> not implemented!'%tree)
+	MPI_COMM = mpi_comm(comm)[0]
+	if tree == 'cholqr2':
+		out = _cholqr2(Ai,MPI_COMM)
+		if out is not None: return out
+		tree = 'binary'
+	_tsqr_check(Ai.shape[0],Ai.shape[1],MPI_COMM)
 	# Algorithm 1 from Demmel et al (2012)
 	# 1: QR Factorization on Ai to obtain Q1i and Ri
-	Q1i, R    = qr(Ai)
-	nextPower = next_power_of_2(MPI_SIZE)
-	nlevels   = int(np.log2(nextPower))
-	QW        = np.eye(n, dtype = Ai.dtype)
-	C         = np.zeros((2*n, n), Ai.dtype)
-	Q2l       = np.zeros((2*n*nlevels, n), Ai.dtype)
-	blevel    = 1
-	for ilevel in range(nlevels):
-		# Store R in the upper part of the C matrix
-		C[:n, :] = R
-		# Decide who sends and who recieves, use R as buffer
-		prank = MPI_RANK ^ blevel
-		if MPI_RANK & blevel:
-			if prank < MPI_SIZE:
-				mpi_send(R, prank)
-		else:
-			if prank < MPI_SIZE:
-				R = mpi_recv(source = prank)
-				# Store R in the lower part of the C matrix
-				C[n:, :] = R
-				# 2: QR from the C matrix, reuse C and R
-				Q2i, R = qr(C)
-				# Store Q2i from this level
-				Q2l[2*n*ilevel:2*n*ilevel+2*n, :] = Q2i
-		blevel <<= 1
-	# At this point R is correct on processor 0
-	# Broadcast R and its part of the Q matrix
-	if MPI_SIZE > 1:
-		blevel = 1 << (nlevels - 1)
-		mask   = blevel - 1
-	for ilevel in reversed(range(nlevels)):
-		if MPI_RANK & mask == 0:
-			# Obtain Q2i for this level - use C as buffer
-			C = Q2l[2*n*ilevel:2*n*ilevel+2*n, :]
-			# Multiply by QW either set to identity or allocated to a value
-			# Store into Q2i
-			Q2i = matmul(C, QW)
-			# Communications scheme
-			prank = MPI_RANK^blevel
-			if MPI_RANK & blevel:
-				if prank < MPI_SIZE:
-					C = mpi_recv(source = prank)
-					# Recover R from the upper part of C and QW from the lower part
-					R  = C[:n, :]
-					QW = C[n:, :]
-			else:
-				if prank < MPI_SIZE:
-					# Set up C matrix for sending
-					# Store R in the upper part and Q2i on the lower part
-					# Store Q2i of this rank to QW
-					C[:n, :] = R
-					C[n:, :] = Q2i[n:, :]
-					QW       = Q2i[:n, :]
-					mpi_send(C, prank)
-		blevel >>= 1
-		mask   >>= 1
-	# Multiply Q1i and QW to obtain Qi
-	Qi = matmul(Q1i, QW)
+	Q1i, R = qr(Ai)
+	# 2: Reduce the Ri to R, obtaining the factor QW of this processor
+	QW, R  = _tsqr_reduce(R,tree,MPI_COMM)
+	# 3: Multiply Q1i and QW to obtain Qi
+	Qi = matmul(Q1i,QW)
 	return Qi,R
 
+def _gram_svd(Ai,cond_max,comm=None):
+	'''
+	Single value decomposition (SVD) using the method of snapshots from
+	L. Sirovich, ‘Turbulence and the dynamics of coherent structures.
+	I. Coherent structures’, Q. Appl. Math., vol. 45, no. 3, pp. 561–571, 1987.
+
+	The Gram matrix G = A^H x A is reduced across the processors and its
+	eigendecomposition gives the right singular vectors and the singular
+	values. Directions whose eigenvalue is zero within the machine precision
+	are treated as null and their modes are set to zero. Returns None when
+	the condition number is above cond_max.
+	'''
+	n = Ai.shape[1]
+	# Gram matrix reduced across the processors
+	G = matmulp(np.conj(transpose(Ai)),Ai,comm)
+	# Eigendecomposition of the hermitian Gram matrix (ascending order)
+	w, Vg = np.linalg.eigh(G)
+	w, Vg = w[::-1], Vg[:,::-1]
+	# Singular values and right singular vectors in descending order
+	tol = n*np.finfo(w.dtype).eps*w[0]
+	S   = np.where(w > tol, np.sqrt(np.abs(w)), 0.)
+	nr  = np.count_nonzero(S)
+	# Accuracy guard
+	if nr == 0 or S[0]/S[nr-1] > cond_max: return None
+	# Compute Ui = Ai x V x S^-1
+	Ui = matmul(Ai,Vg)
+	Ui[:,:nr] /= S[:nr]
+	Ui[:,nr:]  = 0.
+	return Ui, S, np.ascontiguousarray(np.conj(transpose(Vg)))
+
 @cr('math.tsqr_svd')
-def tsqr_svd(Ai):
+def tsqr_svd(Ai,method='tsqr',cond_max=1e6,comm=None,tree='binary'):
 	'''
 	Single value decomposition (SVD) using TSQR algorithm from
 	J. Demmel, L. Grigori, M. Hoemmen, and J. Langou, ‘Communication-optimal Parallel
@@ -266,9 +408,22 @@ def tsqr_svd(Ai):
 	Ui(m,n)  POD modes dispersed on each processor (must come preallocated).
 	S(n)     singular values.
 	VT(n,n)  right singular vectors (transposed).
-	'''
+
+	method   'tsqr' for the TSQR algorithm or 'gram' for the
+	         method of snapshots on the Gram matrix.
+	cond_max maximum condition number for the 'gram' method,
+	         above it the TSQR algorithm is used instead.
+	comm     communicator of the processors that hold Ai
+	         (MPI.COMM_WORLD by default).
+	tree     reduction tree of the TSQR (see tsqr).
+	'''
+	if method == 'gram':
+		out = _gram_svd(Ai,cond_max,comm)
+		if out is not None: return out
+	elif not method == 'tsqr':
+		raiseError('Method <%s> not implemented!'%method)
 	# QR factorization on A
-	Qi,R = tsqr(Ai)
+	Qi,R = tsqr(Ai,comm,tree)
 
 	# Algorithm 2 from Sayadi and Schmid (2016) - Ui, S and VT
 	# At this point we have R and Qi scattered on the processors
@@ -278,6 +433,91 @@ def tsqr_svd(Ai):
 	Ui = matmul(Qi, Ur)
 	return Ui, S, V
 
+@cr('math.tsqr_shared')
+def tsqr_shared(A,tree='binary'):
+	'''
+	Parallel QR factorization of a matrix in node shared memory
+		Q(m,n) is the Q matrix, a NodeArray with the rows of A
+		R(n,n) is the R matrix, a NodeArray shared by the node
+
+	The node leaders factorize the matrix of their whole node at
+	once and only they take part in the TSQR among the nodes.
+	'''
+	if not isinstance(A,NodeArray): raiseError('The matrix must be a NodeArray!')
+	n = A.shape[1]
+	Q = A.empty_like()
+	R = A.empty_like((n,n),leader=True)
+	if A.is_leader:
+		Q.node[:,:], R.node[:,:] = tsqr(A.node,comm=A.leaders,tree=tree)
+	Q.barrier()
+	return Q,R
+
+@cr('math.tsqr_svd_shared')
+def tsqr_svd_shared(A,tree='binary'):
+	'''
+	Parallel Single value decomposition (SVD) of a matrix in node shared memory
+		U(m,n)   are the POD modes, a NodeArray with the rows of A.
+		S(n)     are the singular values, a NodeArray shared by the node.
+		V(n,n)   are the right singular vectors, a NodeArray shared by the node.
+
+	The node leaders factorize the matrix of their whole node at
+	once and only they take part in the TSQR among the nodes.
+	'''
+	if not isinstance(A,NodeArray): raiseError('The matrix must be a NodeArray!')
+	mn = min(A.node.shape[0],A.shape[1])
+	U  = A.empty_like((len(A),mn))
+	S  = A.empty_like((mn,),dtype=np.float32 if A.dtype in (np.float32,np.complex64) else np.double,leader=True)
+	V  = A.empty_like((mn,A.shape[1]),leader=True)
+	if A.is_leader:
+		U.node[:,:], S.node[:], V.node[:,:] = tsqr_svd(A.node,comm=A.leaders,tree=tree)
+	U.barrier()
+	return U,S,V
+
+@cr('math.randomized_svd')
+def randomized_svd(Ai,r,p=10,q=1,seed=-1,comm=None):
+	'''
+	Parallel randomized Single value decomposition (SVD) from
+	N. Halko, P. G. Martinsson, and J. A. Tropp, ‘Finding Structure with
+	Randomness: Probabilistic Algorithms for Constructing Approximate
+	Matrix Decompositions’, SIAM Rev., vol. 53, no. 2, pp. 217–288, Jan. 2011,
+
+	doi: 10.1137/090771806.
+
+	Ai(m,n)  data matrix dispersed on each processor.
+	r        target rank.
+	p        oversampling.
+	q        number of power iterations.
+	seed     seed for the random matrix (< 0 for a random seed).
+	comm     communicator of the processors that hold Ai
+	         (MPI.COMM_WORLD by default).
+
+	Ui(m,r)  POD modes dispersed on each processor.
+	S(r)     singular values.
+	VT(r,n)  right singular vectors (transposed).
+	'''
+	n = Ai.shape[1]
+	if r <= 0 or r > n: r = n
+	k = min(r+p,n)
+	# All the processors must use the same random matrix
+	if seed < 0: seed = np.random.randint(0,2**31-1)
+	seed  = mpi_bcast(seed,root=0,comm=comm)
+	Omega = np.random.default_rng(seed).standard_normal((n,k)).astype(Ai.dtype)
+	# Sketch the range of A
+	Yi = matmul(Ai,Omega)
+	# Power iterations
+	for _ in range(q):
+		Qi, _ = tsqr(Yi,comm)
+		Qz, _ = qr(matmulp(transpose(Ai),Qi,comm))
+		Yi    = matmul(Ai,Qz)
+	# Orthonormal basis of the range and projection
+	Qi, _ = tsqr(Yi,comm)
+	B     = matmulp(transpose(Qi),Ai,comm)
+	# SVD of the small matrix B
+	Ub, S, V = svd(B)
+	# Compute Ui = Qi x Ub
+	Ui = matmul(Qi,Ub[:,:r])
+	return Ui, S[:r], V[:r,:]
+
 @cr('math.fft')
 def fft(t,y,equispaced=True):
 	'''
@@ -299,14 +539,23 @@ def fft(t,y,equispaced=True):
 	ps = np.real(yf*conj(yf))/y.shape[0] # np.abs(yf)/y.shape[0]
 	return f, ps
 
+@cr('math.batched_fft')
+def batched_fft(X):
+	'''
+	Compute the fft of every row of X in a single call.
+	Return the non negative frequencies.
+	'''
+	return scipy.fft.rfft(X,axis=1)
+
 @cr('math.RMSE')
-def RMSE(A,B):
+def RMSE(A,B,comm=None):
 	'''
-	Compute RMSE between X_POD and X
+	Compute RMSE between X_POD and X, distributed
+	along the processors of comm
 	'''
 	diff  = (A-B)
-	sum1g = mpi_reduce(np.sum(diff*diff),op='sum',all=True)
-	sum2g = mpi_reduce(np.sum(A*A),op='sum',all=True)
+	sum1g = mpi_reduce(np.sum(diff*diff),op='sum',all=True,comm=comm)
+	sum2g = mpi_reduce(np.sum(A*A),op='sum',all=True,comm=comm)
 	rmse  = np.sqrt(sum1g/sum2g)
 	return rmse
 
@@ -21,6 +21,7 @@ from mpi4py.libmpi cimport MPI_Comm
 
 from ..utils.cr     import cr
 from ..utils.errors import raiseError
+from ..utils.parall import NodeArray, mpi_reduce
 
 
 ## Expose C functions
@@ -30,7 +31,7 @@ cdef extern from "vector_matrix.h" nogil:
 	cdef double c_vector_norm      "vector_norm"(double *v, int start, int n)
 	cdef void   c_matmult          "matmult"(double *C, double *A, double *B, const int m, const int n, const int k, const char *TA, const char *TB)
 	cdef void   c_matmul           "matmul"(double *C, double *A, double *B, const int m, const int n, const int k)
-	cdef void   c_matmulp          "matmulp"(double *C, double *A, double *B, const int m, const int n, const int k)
+	cdef void   c_matmulp          "matmulp"(double *C, double *A, double *B, const int m, const int n, const int k, MPI_Comm comm)
 	cdef void   c_vecmat           "vecmat"(double *v, double *A, const int m, const int n)
 	cdef int    c_inverse          "inverse"(double *A, int N, char *UoL)
 	cdef double c_RMSE             "RMSE"(double *A, double *B, const int m, const int n, MPI_Comm comm)
@@ -38,7 +39,7 @@ cdef extern from "vector_matrix.h" nogil:
 	# Double complex precision
 	cdef void   c_zmatmult         "zmatmult"(np.complex128_t *C, np.complex128_t *A, np.complex128_t *B, const int m, const int n, const int k, const char *TA, const char *TB)
 	cdef void   c_zmatmul          "zmatmul"(np.complex128_t *C, np.complex128_t *A, np.complex128_t *B, const int m, const int n, const int k)
-	cdef void 	c_zmatmulp         "zmatmulp"(np.complex128_t *C, np.complex128_t *A, np.complex128_t *B, const int m, const int n, const int k)
+	cdef void 	c_zmatmulp         "zmatmulp"(np.complex128_t *C, np.complex128_t *A, np.complex128_t *B, const int m, const int n, const int k, MPI_Comm comm)
 	cdef void   c_zvecmat          "zvecmat"(np.complex128_t *v, np.complex128_t *A, const int m, const int n)
 	cdef int    c_zinverse         "zinverse"(np.complex128_t *A, int N, char *UoL)
 	cdef int    c_eigen            "eigen"(double *real, double *imag, np.complex128_t *vecs, double *A, const int m, const int n)
@@ -46,23 +47,52 @@ cdef extern from "vector_matrix.h" nogil:
 	cdef void   c_vandermonde      "vandermonde"(np.complex128_t *Vand, double *real, double *imag, int m, int n)
 	cdef void   c_vandermonde_time "vandermondeTime"(np.complex128_t *Vand, double *real, double *imag, int m, int n, double* t)
 	cdef void   c_zsort            "zsort"(np.complex128_t *v, int *index, int n)
+	# Single precision
+	cdef void   c_stranspose       "stranspose"(float *A, float *B, const int m, const int n)
+	cdef float  c_svector_norm     "svector_norm"(float *v, int start, int n)
+	cdef void   c_smatmul          "smatmul"(float *C, float *A, float *B, const int m, const int n, const int k)
+	cdef void   c_smatmulp         "smatmulp"(float *C, float *A, float *B, const int m, const int n, const int k, MPI_Comm comm)
+	cdef void   c_svecmat          "svecmat"(float *v, float *A, const int m, const int n)
+	# Single complex precision
+	cdef void   c_cmatmul          "cmatmul"(np.complex64_t *C, np.complex64_t *A, np.complex64_t *B, const int m, const int n, const int k)
+	cdef void   c_cmatmulp         "cmatmulp"(np.complex64_t *C, np.complex64_t *A, np.complex64_t *B, const int m, const int n, const int k, MPI_Comm comm)
+	cdef void   c_cvecmat          "cvecmat"(np.complex64_t *v, np.complex64_t *A, const int m, const int n)
 cdef extern from "averaging.h":
 	cdef void c_temporal_mean "temporal_mean"(double *out, double *X, const int m, const int n)
 	cdef void c_subtract_mean "subtract_mean"(double *out, double *X, double *X_mean, const int m, const int n)
+	cdef void c_stemporal_mean "stemporal_mean"(float *out, float *X, const int m, const int n)
+	cdef void c_ssubtract_mean "ssubtract_mean"(float *out, float *X, float *X_mean, const int m, const int n)
 cdef extern from "svd.h":
 	# Double precision
 	cdef int c_qr        "qr"      (double *Q, double *R, double *A, const int m, const int n)
 	cdef int c_svd       "svd"     (double *U, double *S, double *V, double *Y, const int m, const int n)
-	cdef int c_tsqr      "tsqr"    (double *Qi, double *R, double *Ai, const int m, const int n, MPI_Comm comm)
-	cdef int c_tsqr_svd  "tsqr_svd"(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, MPI_Comm comm)
+	cdef int c_tsqr_tree     "tsqr_tree"    (double *Qi, double *R, double *Ai, const int m, const int n, const int tree, MPI_Comm comm)
+	cdef int c_tsqr_svd_tree "tsqr_svd_tree"(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, const int tree, MPI_Comm comm)
+	cdef int c_gram_svd  "gram_svd"(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, const double cond_max, MPI_Comm comm)
+	cdef int c_randomized_svd "randomized_svd"(double *Ui, double *S, double *VT, double *Ai, const int m, const int n, const int r, const int p, const int q, int seed, MPI_Comm comm)
 	# Double complex precision
 	cdef int c_zqr       "zqr"      (np.complex128_t *Q, np.complex128_t *R, np.complex128_t *A, const int m, const int n)
 	cdef int c_zsvd      "zsvd"     (np.complex128_t *U, np.double_t *S, np.complex128_t *V, np.complex128_t *Y, const int m, const int n)
-	cdef int c_ztsqr     "ztsqr"    (np.complex128_t *Qi, np.complex128_t *R, np.complex128_t *Ai, const int m, const int n, MPI_Comm comm)
-	cdef int c_ztsqr_svd "ztsqr_svd"(np.complex128_t *Ui, np.double_t *S, np.complex128_t *VT, np.complex128_t *Ai, const int m, const int n, MPI_Comm comm)
+	cdef int c_ztsqr_tree     "ztsqr_tree"    (np.complex128_t *Qi, np.complex128_t *R, np.complex128_t *Ai, const int m, const int n, const int tree, MPI_Comm comm)
+	cdef int c_ztsqr_svd_tree "ztsqr_svd_tree"(np.complex128_t *Ui, np.double_t *S, np.complex128_t *VT, np.complex128_t *Ai, const int m, const int n, const int tree, MPI_Comm comm)
+	cdef int c_zgram_svd "zgram_svd"(np.complex128_t *Ui, np.double_t *S, np.complex128_t *VT, np.complex128_t *Ai, const int m, const int n, const double cond_max, MPI_Comm comm)
+	# Single precision
+	cdef int c_sqr       "sqr"      (float *Q, float *R, float *A, const int m, const int n)
+	cdef int c_ssvd      "ssvd"     (float *U, float *S, float *V, float *Y, const int m, const int n)
+	cdef int c_stsqr_tree     "stsqr_tree"    (float *Qi, float *R, float *Ai, const int m, const int n, const int tree, MPI_Comm comm)
+	cdef int c_stsqr_svd_tree "stsqr_svd_tree"(float *Ui, float *S, float *VT, float *Ai, const int m, const int n, const int tree, MPI_Comm comm)
+	cdef int c_sgram_svd "sgram_svd"(float *Ui, float *S, float *VT, float *Ai, const int m, const int n, const float cond_max, MPI_Comm comm)
+	cdef int c_srandomized_svd "srandomized_svd"(float *Ui, float *S, float *VT, float *Ai, const int m, const int n, const int r, const int p, const int q, int seed, MPI_Comm comm)
+	# Single complex precision
+	cdef int c_cqr       "cqr"      (np.complex64_t *Q, np.complex64_t *R, np.complex64_t *A, const int m, const int n)
+	cdef int c_csvd      "csvd"     (np.complex64_t *U, np.float32_t *S, np.complex64_t *V, np.complex64_t *Y, const int m, const int n)
+	cdef int c_ctsqr_tree     "ctsqr_tree"    (np.complex64_t *Qi, np.complex64_t *R, np.complex64_t *Ai, const int m, const int n, const int tree, MPI_Comm comm)
+	cdef int c_ctsqr_svd_tree "ctsqr_svd_tree"(np.complex64_t *Ui, np.float32_t *S, np.complex64_t *VT, np.complex64_t *Ai, const int m, const int n, const int tree, MPI_Comm comm)
+	cdef int c_cgram_svd "cgram_svd"(np.complex64_t *Ui, np.float32_t *S, np.complex64_t *VT, np.complex64_t *Ai, const int m, const int n, const float cond_max, MPI_Comm comm)
 cdef extern from "fft.h":
 	cdef int USE_FFTW3 "_USE_FFTW3"
 	cdef void c_fft "fft"(double *psd, double *y, const double dt, const int n)
+	cdef void c_fft1D_batched "fft1D_batched"(np.complex128_t *out, double *y, const int n, const int howmany)
 	cdef void c_nfft "nfft"(double *psd, double *t, double* y, const int n)
 
 
@@ -71,14 +101,33 @@ ctypedef fused double_complex:
 	double
 	np.complex128_t
 
+## Fused type between single and double precision
+ctypedef fused float_double:
+	float
+	double
+
+## Fused type between single and double precision, real and complex
+ctypedef fused real_complex:
+	float
+	double
+	np.complex64_t
+	np.complex128_t
+
+
+## Reduction trees of the TSQR, as defined in svd.h
+TSQR_TREES = {'binary':0,'flat':1,'butterfly':2,'node':3,'cholqr2':4}
+
+def _tsqr_tree(str tree):
+	if not tree in TSQR_TREES: raiseError('TSQR tree <%s> not implemented!'%tree)
+	return TSQR_TREES[tree]
+
 
 ## Cython functions
-@cr('math.transpose')
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def transpose(double[:,:] A):
+cdef np.ndarray[np.double_t,ndim=2] _dtranspose(double[:,:] A):
 	'''
 	Transposed of matrix A
 	'''
@@ -87,18 +136,48 @@ def transpose(double[:,:] A):
 	c_transpose(&A[0,0], &At[0,0], m,n)
 	return At
 
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+cdef np.ndarray[np.float32_t,ndim=2] _stranspose(float[:,:] A):
+	'''
+	Transposed of matrix A
+	'''
+	cdef int m = A.shape[0], n = A.shape[1]
+	cdef np.ndarray[np.float32_t,ndim=2] At = np.zeros((n,m),dtype=np.float32)
+	c_stranspose(&A[0,0], &At[0,0], m,n)
+	return At
+
+@cr('math.transpose')
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+def transpose(float_double[:,:] A):
+	'''
+	Transposed of matrix A
+	'''
+	if float_double is float:
+		return _stranspose(A)
+	else:
+		return _dtranspose(A)
+
 @cr('math.vector_norm')
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def vector_norm(double[:] v, int start=0):
+def vector_norm(float_double[:] v, int start=0):
 	'''
 	L2 norm of a vector
 	'''
 	cdef int n = v.shape[0]
 	cdef double norm = 0.
-	norm = c_vector_norm(&v[0],start,n)
+	if float_double is float:
+		norm = c_svector_norm(&v[0],start,n)
+	else:
+		norm = c_vector_norm(&v[0],start,n)
 	return norm
 
 @cython.boundscheck(False) # turn off bounds-checking for entire function
@@ -127,17 +206,47 @@ cdef np.ndarray[np.complex128_t,ndim=2] _zmatmul(np.complex128_t[:,:] A, np.comp
 	c_zmatmul(&C[0,0],&A[0,0],&B[0,0],m,n,k)
 	return C
 
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+cdef np.ndarray[np.float32_t,ndim=2] _smatmul(float[:,:] A, float[:,:] B):
+	'''
+	Matrix multiplication C = A x B
+	'''
+	cdef int m = A.shape[0], k = A.shape[1], n = B.shape[1]
+	cdef np.ndarray[np.float32_t,ndim=2] C = np.zeros((m,n),dtype=np.float32)
+	c_smatmul(&C[0,0],&A[0,0],&B[0,0],m,n,k)
+	return C
+
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+cdef np.ndarray[np.complex64_t,ndim=2] _cmatmul(np.complex64_t[:,:] A, np.complex64_t[:,:] B):
+	'''
+	Matrix multiplication C = A x B
+	'''
+	cdef int m = A.shape[0], k = A.shape[1], n = B.shape[1]
+	cdef np.ndarray[np.complex64_t,ndim=2] C = np.zeros((m,n),dtype=np.complex64)
+	c_cmatmul(&C[0,0],&A[0,0],&B[0,0],m,n,k)
+	return C
+
 @cr('math.matmul')
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def matmul(double_complex[:,:] A, double_complex[:,:] B):
+def matmul(real_complex[:,:] A, real_complex[:,:] B):
 	'''
 	Matrix multiplication C = A x B
 	'''
-	if double_complex is np.complex128_t:
+	if real_complex is np.complex128_t:
 		return _zmatmul(A,B)
+	elif real_complex is np.complex64_t:
+		return _cmatmul(A,B)
+	elif real_complex is float:
+		return _smatmul(A,B)
 	else:
 		return _dmatmul(A,B)
 
@@ -145,41 +254,76 @@ def matmul(double_complex[:,:] A, double_complex[:,:] B):
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-cdef np.ndarray[np.double_t,ndim=2] _dmatmulp(double[:,:] A, double[:,:] B):
+cdef np.ndarray[np.double_t,ndim=2] _dmatmulp(double[:,:] A, double[:,:] B, MPI.Comm comm=None):
 	'''
 	Matrix multiplication C = A x B
 	'''
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
 	cdef int m = A.shape[0], k = A.shape[1], n = B.shape[1]
 	cdef np.ndarray[np.double_t,ndim=2] C = np.zeros((m,n),dtype=np.double)
-	c_matmulp(&C[0,0],&A[0,0],&B[0,0],m,n,k)
+	c_matmulp(&C[0,0],&A[0,0],&B[0,0],m,n,k,MPI_COMM.ob_mpi)
 	return C
 
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-cdef np.ndarray[np.complex128_t,ndim=2] _zmatmulp(np.complex128_t[:,:] A, np.complex128_t[:,:] B):
+cdef np.ndarray[np.complex128_t,ndim=2] _zmatmulp(np.complex128_t[:,:] A, np.complex128_t[:,:] B, MPI.Comm comm=None):
 	'''
 	Matrix multiplication C = A x B
 	'''
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
 	cdef int m = A.shape[0], k = A.shape[1], n = B.shape[1]
 	cdef np.ndarray[np.complex128_t,ndim=2] C = np.zeros((m,n),dtype=np.complex128)
-	c_zmatmulp(&C[0,0],&A[0,0],&B[0,0],m,n,k)
+	c_zmatmulp(&C[0,0],&A[0,0],&B[0,0],m,n,k,MPI_COMM.ob_mpi)
 	return C
 
-@cr('math.matmulp')
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def matmulp(double_complex[:,:] A, double_complex[:,:] B):
+cdef np.ndarray[np.float32_t,ndim=2] _smatmulp(float[:,:] A, float[:,:] B, MPI.Comm comm=None):
 	'''
 	Matrix multiplication C = A x B
 	'''
-	if double_complex is np.complex128_t:
-		return _zmatmulp(A,B)
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
+	cdef int m = A.shape[0], k = A.shape[1], n = B.shape[1]
+	cdef np.ndarray[np.float32_t,ndim=2] C = np.zeros((m,n),dtype=np.float32)
+	c_smatmulp(&C[0,0],&A[0,0],&B[0,0],m,n,k,MPI_COMM.ob_mpi)
+	return C
+
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+cdef np.ndarray[np.complex64_t,ndim=2] _cmatmulp(np.complex64_t[:,:] A, np.complex64_t[:,:] B, MPI.Comm comm=None):
+	'''
+	Matrix multiplication C = A x B
+	'''
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
+	cdef int m = A.shape[0], k = A.shape[1], n = B.shape[1]
+	cdef np.ndarray[np.complex64_t,ndim=2] C = np.zeros((m,n),dtype=np.complex64)
+	c_cmatmulp(&C[0,0],&A[0,0],&B[0,0],m,n,k,MPI_COMM.ob_mpi)
+	return C
+
+@cr('math.matmulp')
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+def matmulp(real_complex[:,:] A, real_complex[:,:] B, MPI.Comm comm=None):
+	'''
+	Matrix multiplication C = A x B, reduced
+	along the processors of comm
+	'''
+	if real_complex is np.complex128_t:
+		return _zmatmulp(A,B,comm)
+	elif real_complex is np.complex64_t:
+		return _cmatmulp(A,B,comm)
+	elif real_complex is float:
+		return _smatmulp(A,B,comm)
 	else:
-		return _dmatmulp(A,B)
+		return _dmatmulp(A,B,comm)
 
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
@@ -209,17 +353,49 @@ cdef np.ndarray[np.complex128_t,ndim=2] _zvecmat(np.complex128_t[:] v, np.comple
 	c_zvecmat(&v[0],&C[0,0],m,n)
 	return C
 
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+cdef np.ndarray[np.float32_t,ndim=2] _svecmat(float[:] v, float[:,:] A):
+	'''
+	Vector times a matrix C = v x A
+	'''
+	cdef int m = A.shape[0], n = A.shape[1]
+	cdef np.ndarray[np.float32_t,ndim=2] C = np.zeros((m,n),dtype=np.float32)
+	memcpy(&C[0,0],&A[0,0],m*n*sizeof(float))
+	c_svecmat(&v[0],&C[0,0],m,n)
+	return C
+
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+cdef np.ndarray[np.complex64_t,ndim=2] _cvecmat(np.complex64_t[:] v, np.complex64_t[:,:] A):
+	'''
+	Vector times a matrix C = v x A
+	'''
+	cdef int m = A.shape[0], n = A.shape[1]
+	cdef np.ndarray[np.complex64_t,ndim=2] C = np.zeros((m,n),dtype=np.complex64)
+	memcpy(&C[0,0],&A[0,0],m*n*sizeof(np.complex64_t))
+	c_cvecmat(&v[0],&C[0,0],m,n)
+	return C
+
 @cr('math.vecmat')
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def vecmat(double_complex[:] v, double_complex[:,:] A):
+def vecmat(real_complex[:] v, real_complex[:,:] A):
 	'''
 	Vector times a matrix C = v x A
 	'''
-	if double_complex is np.complex128_t:
+	if real_complex is np.complex128_t:
 		return _zvecmat(v,A)
+	elif real_complex is np.complex64_t:
+		return _cvecmat(v,A)
+	elif real_complex is float:
+		return _svecmat(v,A)
 	else:
 		return _dvecmat(v,A)
 
@@ -287,17 +463,22 @@ def eigen(double[:,:] A):
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def temporal_mean(double[:,:] X):
+def temporal_mean(float_double[:,:] X):
 	'''
 	Temporal mean of matrix X(m,n) where m is the spatial coordinates
 	and n is the number of snapshots.
 	'''
 	cdef int m = X.shape[0], n = X.shape[1]
-	cdef np.ndarray[np.double_t,ndim=1] out = np.zeros((m,),dtype=np.double)
+	cdef float_double[:] out
 	# Compute temporal mean
-	c_temporal_mean(&out[0],&X[0,0],m,n)
+	if float_double is float:
+		out = np.zeros((m,),dtype=np.float32)
+		c_stemporal_mean(&out[0],&X[0,0],m,n)
+	else:
+		out = np.zeros((m,),dtype=np.double)
+		c_temporal_mean(&out[0],&X[0,0],m,n)
 	# Return
-	return out
+	return np.asarray(out)
 
 @cr('math.polar')
 @cython.boundscheck(False) # turn off bounds-checking for entire function
@@ -321,17 +502,22 @@ def polar(double[:] real, double[:] imag):
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def subtract_mean(double[:,:] X, double[:] X_mean):
+def subtract_mean(float_double[:,:] X, float_double[:] X_mean):
 	'''
 	Computes out(m,n) = X(m,n) - X_mean(m) where m is the spatial coordinates
 	and n is the number of snapshots.
 	'''
 	cdef int m = X.shape[0], n = X.shape[1]
-	cdef np.ndarray[np.double_t,ndim=2] out = np.zeros((m,n),dtype=np.double)
+	cdef float_double[:,:] out
 	# Compute substract temporal mean
-	c_subtract_mean(&out[0,0],&X[0,0],&X_mean[0],m,n)
+	if float_double is float:
+		out = np.zeros((m,n),dtype=np.float32)
+		c_ssubtract_mean(&out[0,0],&X[0,0],&X_mean[0],m,n)
+	else:
+		out = np.zeros((m,n),dtype=np.double)
+		c_subtract_mean(&out[0,0],&X[0,0],&X_mean[0],m,n)
 	# Return
-	return out
+	return np.asarray(out)
 
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
@@ -367,19 +553,57 @@ def _zqr(np.complex128_t[:,:] A):
 	if not retval == 0: raiseError('Problems computing QR factorization!')
 	return Q,R
 
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+def _sqr(float[:,:] A):
+	'''
+	QR factorization using Lapack
+		Q(m,n) is the Q matrix
+		R(n,n) is the R matrix
+	'''
+	cdef int retval, m = A.shape[0], n = A.shape[1]
+	cdef np.ndarray[np.float32_t,ndim=2] Q = np.zeros((m,n),dtype=np.float32)
+	cdef np.ndarray[np.float32_t,ndim=2] R = np.zeros((n,n),dtype=np.float32)
+	retval = c_sqr(&Q[0,0],&R[0,0],&A[0,0],m,n)
+	if not retval == 0: raiseError('Problems computing QR factorization!')
+	return Q,R
+
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+def _cqr(np.complex64_t[:,:] A):
+	'''
+	QR factorization using Lapack
+		Q(m,n) is the Q matrix
+		R(n,n) is the R matrix
+	'''
+	cdef int retval, m = A.shape[0], n = A.shape[1]
+	cdef np.ndarray[np.complex64_t,ndim=2] Q = np.zeros((m,n),dtype=np.complex64)
+	cdef np.ndarray[np.complex64_t,ndim=2] R = np.zeros((n,n),dtype=np.complex64)
+	retval = c_cqr(&Q[0,0],&R[0,0],&A[0,0],m,n)
+	if not retval == 0: raiseError('Problems computing QR factorization!')
+	return Q,R
+
 @cr('math.qr')
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def qr(double_complex[:,:] A):
+def qr(real_complex[:,:] A):
 	'''
 	QR factorization using Lapack
 		Q(m,n) is the Q matrix
 		R(n,n) is the R matrix
 	'''
-	if double_complex is np.complex128_t:
+	if real_complex is np.complex128_t:
 		return _zqr(A)
+	elif real_complex is np.complex64_t:
+		return _cqr(A)
+	elif real_complex is float:
+		return _sqr(A)
 	else:
 		return _dqr(A)
 
@@ -439,28 +663,95 @@ def _zsvd(np.complex128_t[:,:] A, int do_copy=True):
 	if not retval == 0: raiseError('Problems computing SVD!')
 	return U,S,V
 
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+def _ssvd(float[:,:] A, int do_copy=True):
+	'''
+	Single value decomposition (SVD) using Lapack.
+		U(m,n)   are the POD modes.
+		S(n)     are the singular values.
+		V(n,n)   are the right singular vectors.
+	'''
+	cdef int retval
+	cdef int m = A.shape[0], n = A.shape[1], mn = min(m,n)
+	cdef float *Y_copy
+	cdef np.ndarray[np.float32_t,ndim=2] U = np.zeros((m,mn),dtype=np.float32)
+	cdef np.ndarray[np.float32_t,ndim=1] S = np.zeros((mn,) ,dtype=np.float32)
+	cdef np.ndarray[np.float32_t,ndim=2] V = np.zeros((n,mn),dtype=np.float32)
+	# Compute SVD
+	if do_copy:
+		Y_copy = <float*>malloc(m*n*sizeof(float))
+		memcpy(Y_copy,&A[0,0],m*n*sizeof(float))
+		retval = c_ssvd(&U[0,0],&S[0],&V[0,0],Y_copy,m,n)
+		free(Y_copy)
+	else:
+		retval = c_ssvd(&U[0,0],&S[0],&V[0,0],&A[0,0],m,n)
+	if not retval == 0: raiseError('Problems computing SVD!')
+	return U,S,V
+
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+def _csvd(np.complex64_t[:,:] A, int do_copy=True):
+	'''
+	Single value decomposition (SVD) using Lapack.
+		U(m,n)   are the POD modes.
+		S(n)     are the singular values.
+		V(n,n)   are the right singular vectors.
+	'''
+	cdef int retval
+	cdef int m = A.shape[0], n = A.shape[1], mn = min(m,n)
+	cdef np.complex64_t *Y_copy
+	cdef np.ndarray[np.complex64_t,ndim=2] U = np.zeros((m,mn),dtype=np.complex64)
+	cdef np.ndarray[np.float32_t,ndim=1] S = np.zeros((mn,) ,dtype=np.float32)
+	cdef np.ndarray[np.complex64_t,ndim=2] V = np.zeros((n,mn),dtype=np.complex64)
+	# Compute SVD
+	if do_copy:
+		Y_copy = <np.complex64_t*>malloc(m*n*sizeof(np.complex64_t))
+		memcpy(Y_copy,&A[0,0],m*n*sizeof(np.complex64_t))
+		retval = c_csvd(&U[0,0],&S[0],&V[0,0],Y_copy,m,n)
+		free(Y_copy)
+	else:
+		retval = c_csvd(&U[0,0],&S[0],&V[0,0],&A[0,0],m,n)
+	if not retval == 0: raiseError('Problems computing SVD!')
+	return U,S,V
+
 @cr('math.svd')
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def svd(double_complex[:,:] A, int do_copy=True):
+def svd(real_complex[:,:] A, int do_copy=True):
 	'''
 	Single value decomposition (SVD) using Lapack.
 		U(m,n)   are the POD modes.
 		S(n)     are the singular values.
 		V(n,n)   are the right singular vectors.
 	'''
-	if double_complex is np.complex128_t:
+	if real_complex is np.complex128_t:
 		return _zsvd(A,do_copy)
+	elif real_complex is np.complex64_t:
+		return _csvd(A,do_copy)
+	elif real_complex is float:
+		return _ssvd(A,do_copy)
 	else:
 		return _dsvd(A,do_copy)
 
+def _tsqr_check(int m, int n, MPI.Comm comm):
+	'''
+	The TSQR needs at least as many rows as columns on every processor,
+	checked on all of them so that no processor is left in the reduction.
+	'''
+	if mpi_reduce(int(m < n),op='max',all=True,comm=comm): raiseError('TSQR needs at least as many rows as columns on every processor!')
+
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def _dtsqr(double[:,:] A):
+def _dtsqr(double[:,:] A, MPI.Comm comm=None, str tree='binary'):
 	'''
 	Parallel QR factorization using Lapack
 		Q(m,n) is the Q matrix
@@ -468,11 +759,11 @@ def _dtsqr(double[:,:] A):
 	'''
 	cdef int retval
 	cdef int m = A.shape[0], n = A.shape[1]
-	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
 	cdef np.ndarray[np.double_t,ndim=2] Qi = np.zeros((m,n),dtype=np.double)
 	cdef np.ndarray[np.double_t,ndim=2] R  = np.zeros((n,n),dtype=np.double)
 	# Compute SVD using TSQR algorithm
-	retval = c_tsqr(&Qi[0,0],&R[0,0],&A[0,0],m,n,MPI_COMM.ob_mpi)
+	retval = c_tsqr_tree(&Qi[0,0],&R[0,0],&A[0,0],m,n,_tsqr_tree(tree),MPI_COMM.ob_mpi)
 	if not retval == 0: raiseError('Problems computing TSQR!')
 	return Qi,R
 
@@ -480,7 +771,7 @@ def _dtsqr(double[:,:] A):
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def _ztsqr(np.complex128_t[:,:] A):
+def _ztsqr(np.complex128_t[:,:] A, MPI.Comm comm=None, str tree='binary'):
 	'''
 	Parallel QR factorization using Lapack
 		Q(m,n) is the Q matrix
@@ -488,29 +779,82 @@ def _ztsqr(np.complex128_t[:,:] A):
 	'''
 	cdef int retval
 	cdef int m = A.shape[0], n = A.shape[1]
-	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
 	cdef np.ndarray[np.complex128_t,ndim=2] Qi = np.zeros((m,n),dtype=np.complex128)
 	cdef np.ndarray[np.complex128_t,ndim=2] R  = np.zeros((n,n),dtype=np.complex128)
 	# Compute SVD using TSQR algorithm
-	retval = c_ztsqr(&Qi[0,0],&R[0,0],&A[0,0],m,n,MPI_COMM.ob_mpi)
+	retval = c_ztsqr_tree(&Qi[0,0],&R[0,0],&A[0,0],m,n,_tsqr_tree(tree),MPI_COMM.ob_mpi)
 	if not retval == 0: raiseError('Problems computing TSQR!')
 	return Qi,R
 
-@cr('math.tsqr')
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def tsqr(double_complex[:,:] A):
+def _stsqr(float[:,:] A, MPI.Comm comm=None, str tree='binary'):
 	'''
 	Parallel QR factorization using Lapack
 		Q(m,n) is the Q matrix
 		R(n,n) is the R matrix
 	'''
-	if double_complex is np.complex128_t:
-		return _ztsqr(A)
+	cdef int retval
+	cdef int m = A.shape[0], n = A.shape[1]
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
+	cdef np.ndarray[np.float32_t,ndim=2] Qi = np.zeros((m,n),dtype=np.float32)
+	cdef np.ndarray[np.float32_t,ndim=2] R  = np.zeros((n,n),dtype=np.float32)
+	# Compute SVD using TSQR algorithm
+	retval = c_stsqr_tree(&Qi[0,0],&R[0,0],&A[0,0],m,n,_tsqr_tree(tree),MPI_COMM.ob_mpi)
+	if not retval == 0: raiseError('Problems computing TSQR!')
+	return Qi,R
+
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+def _ctsqr(np.complex64_t[:,:] A, MPI.Comm comm=None, str tree='binary'):
+	'''
+	Parallel QR factorization using Lapack
+		Q(m,n) is the Q matrix
+		R(n,n) is the R matrix
+	'''
+	cdef int retval
+	cdef int m = A.shape[0], n = A.shape[1]
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
+	cdef np.ndarray[np.complex64_t,ndim=2] Qi = np.zeros((m,n),dtype=np.complex64)
+	cdef np.ndarray[np.complex64_t,ndim=2] R  = np.zeros((n,n),dtype=np.complex64)
+	# Compute SVD using TSQR algorithm
+	retval = c_ctsqr_tree(&Qi[0,0],&R[0,0],&A[0,0],m,n,_tsqr_tree(tree),MPI_COMM.ob_mpi)
+	if not retval == 0: raiseError('Problems computing TSQR!')
+	return Qi,R
+
+@cr('math.tsqr')
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+def tsqr(real_complex[:,:] A, MPI.Comm comm=None, str tree='binary'):
+	'''
+	Parallel QR factorization using Lapack
+		Q(m,n) is the Q matrix
+		R(n,n) is the R matrix
+
+		comm     communicator of the processors that hold A
+		         (MPI.COMM_WORLD by default).
+		tree     reduction tree of the R factors: 'binary', 'flat',
+		         'butterfly' (allreduce, no broadcast), 'node' (flat
+		         inside each node and butterfly among the nodes) or
+		         'cholqr2' (CholeskyQR2, falls back to 'binary' when
+		         A is too ill conditioned).
+	'''
+	if not tree == 'cholqr2': _tsqr_check(A.shape[0],A.shape[1],comm)
+	if real_complex is np.complex128_t:
+		return _ztsqr(A,comm,tree)
+	elif real_complex is np.complex64_t:
+		return _ctsqr(A,comm,tree)
+	elif real_complex is float:
+		return _stsqr(A,comm,tree)
 	else:
-		return _dtsqr(A)
+		return _dtsqr(A,comm,tree)
 
 ### FIX
 
@@ -518,7 +862,7 @@ def tsqr(double_complex[:,:] A):
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def _dtsqr_svd(double[:,:] A):
+def _dtsqr_svd(double[:,:] A, str method='tsqr', double cond_max=1e6, MPI.Comm comm=None, str tree='binary'):
 	'''
 	Parallel Single value decomposition (SVD) using Lapack.
 		U(m,n)   are the POD modes.
@@ -527,12 +871,18 @@ def _dtsqr_svd(double[:,:] A):
 	'''
 	cdef int retval
 	cdef int m = A.shape[0], n = A.shape[1], mn = min(m,n)
-	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
 	cdef np.ndarray[np.double_t,ndim=2] U = np.zeros((m,mn),dtype=np.double)
 	cdef np.ndarray[np.double_t,ndim=1] S = np.zeros((mn,) ,dtype=np.double)
 	cdef np.ndarray[np.double_t,ndim=2] V = np.zeros((n,mn),dtype=np.double)
-	# Compute SVD using TSQR algorithm
-	retval = c_tsqr_svd(&U[0,0],&S[0],&V[0,0],&A[0,0],m,n,MPI_COMM.ob_mpi)
+	if method == 'tsqr':
+		# Compute SVD using TSQR algorithm
+		retval = c_tsqr_svd_tree(&U[0,0],&S[0],&V[0,0],&A[0,0],m,n,_tsqr_tree(tree),MPI_COMM.ob_mpi)
+	elif method == 'gram':
+		# Compute SVD using the method of snapshots
+		retval = c_gram_svd(&U[0,0],&S[0],&V[0,0],&A[0,0],m,n,cond_max,MPI_COMM.ob_mpi)
+	else:
+		raiseError('Method <%s> not implemented!'%method)
 	if not retval == 0: raiseError('Problems computing TSQR SVD!')
 	return U,S,V
 
@@ -540,7 +890,7 @@ def _dtsqr_svd(double[:,:] A):
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def _ztsqr_svd(np.complex128_t[:,:] A):
+def _ztsqr_svd(np.complex128_t[:,:] A, str method='tsqr', double cond_max=1e6, MPI.Comm comm=None, str tree='binary'):
 	'''
 	Parallel Single value decomposition (SVD) using Lapack.
 		U(m,n)   are the POD modes.
@@ -549,12 +899,74 @@ def _ztsqr_svd(np.complex128_t[:,:] A):
 	'''
 	cdef int retval
 	cdef int m = A.shape[0], n = A.shape[1], mn = min(m,n)
-	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
 	cdef np.ndarray[np.complex128_t,ndim=2] U = np.zeros((m,mn),dtype=np.complex128)
 	cdef np.ndarray[np.double_t,ndim=1] S = np.zeros((mn,) ,dtype=np.double)
 	cdef np.ndarray[np.complex128_t,ndim=2] V = np.zeros((n,mn),dtype=np.complex128)
-	# Compute SVD using TSQR algorithm
-	retval = c_ztsqr_svd(&U[0,0],&S[0],&V[0,0],&A[0,0],m,n,MPI_COMM.ob_mpi)
+	if method == 'tsqr':
+		# Compute SVD using TSQR algorithm
+		retval = c_ztsqr_svd_tree(&U[0,0],&S[0],&V[0,0],&A[0,0],m,n,_tsqr_tree(tree),MPI_COMM.ob_mpi)
+	elif method == 'gram':
+		# Compute SVD using the method of snapshots
+		retval = c_zgram_svd(&U[0,0],&S[0],&V[0,0],&A[0,0],m,n,cond_max,MPI_COMM.ob_mpi)
+	else:
+		raiseError('Method <%s> not implemented!'%method)
+	if not retval == 0: raiseError('Problems computing TSQR SVD!')
+	return U,S,V
+
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+def _stsqr_svd(float[:,:] A, str method='tsqr', double cond_max=1e6, MPI.Comm comm=None, str tree='binary'):
+	'''
+	Parallel Single value decomposition (SVD) using Lapack.
+		U(m,n)   are the POD modes.
+		S(n)     are the singular values.
+		V(n,n)   are the right singular vectors.
+	'''
+	cdef int retval
+	cdef int m = A.shape[0], n = A.shape[1], mn = min(m,n)
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
+	cdef np.ndarray[np.float32_t,ndim=2] U = np.zeros((m,mn),dtype=np.float32)
+	cdef np.ndarray[np.float32_t,ndim=1] S = np.zeros((mn,) ,dtype=np.float32)
+	cdef np.ndarray[np.float32_t,ndim=2] V = np.zeros((n,mn),dtype=np.float32)
+	if method == 'tsqr':
+		# Compute SVD using TSQR algorithm
+		retval = c_stsqr_svd_tree(&U[0,0],&S[0],&V[0,0],&A[0,0],m,n,_tsqr_tree(tree),MPI_COMM.ob_mpi)
+	elif method == 'gram':
+		# Compute SVD using the method of snapshots
+		retval = c_sgram_svd(&U[0,0],&S[0],&V[0,0],&A[0,0],m,n,cond_max,MPI_COMM.ob_mpi)
+	else:
+		raiseError('Method <%s> not implemented!'%method)
+	if not retval == 0: raiseError('Problems computing TSQR SVD!')
+	return U,S,V
+
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+def _ctsqr_svd(np.complex64_t[:,:] A, str method='tsqr', double cond_max=1e6, MPI.Comm comm=None, str tree='binary'):
+	'''
+	Parallel Single value decomposition (SVD) using Lapack.
+		U(m,n)   are the POD modes.
+		S(n)     are the singular values.
+		V(n,n)   are the right singular vectors.
+	'''
+	cdef int retval
+	cdef int m = A.shape[0], n = A.shape[1], mn = min(m,n)
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
+	cdef np.ndarray[np.complex64_t,ndim=2] U = np.zeros((m,mn),dtype=np.complex64)
+	cdef np.ndarray[np.float32_t,ndim=1] S = np.zeros((mn,) ,dtype=np.float32)
+	cdef np.ndarray[np.complex64_t,ndim=2] V = np.zeros((n,mn),dtype=np.complex64)
+	if method == 'tsqr':
+		# Compute SVD using TSQR algorithm
+		retval = c_ctsqr_svd_tree(&U[0,0],&S[0],&V[0,0],&A[0,0],m,n,_tsqr_tree(tree),MPI_COMM.ob_mpi)
+	elif method == 'gram':
+		# Compute SVD using the method of snapshots
+		retval = c_cgram_svd(&U[0,0],&S[0],&V[0,0],&A[0,0],m,n,cond_max,MPI_COMM.ob_mpi)
+	else:
+		raiseError('Method <%s> not implemented!'%method)
 	if not retval == 0: raiseError('Problems computing TSQR SVD!')
 	return U,S,V
 
@@ -563,17 +975,106 @@ def _ztsqr_svd(np.complex128_t[:,:] A):
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def tsqr_svd(double_complex[:,:] A):
+def tsqr_svd(real_complex[:,:] A, str method='tsqr', double cond_max=1e6, MPI.Comm comm=None, str tree='binary'):
 	'''
 	Parallel Single value decomposition (SVD) using Lapack.
 		U(m,n)   are the POD modes.
 		S(n)     are the singular values.
 		V(n,n)   are the right singular vectors.
+
+		method   'tsqr' for the TSQR algorithm or 'gram' for the
+		         method of snapshots on the Gram matrix.
+		cond_max maximum condition number for the 'gram' method,
+		         above it the TSQR algorithm is used instead.
+		comm     communicator of the processors that hold A
+		         (MPI.COMM_WORLD by default).
+		tree     reduction tree of the TSQR (see tsqr).
+	'''
+	if method == 'tsqr' and not tree == 'cholqr2': _tsqr_check(A.shape[0],A.shape[1],comm)
+	if real_complex is np.complex128_t:
+		return _ztsqr_svd(A,method,cond_max,comm,tree)
+	elif real_complex is np.complex64_t:
+		return _ctsqr_svd(A,method,cond_max,comm,tree)
+	elif real_complex is float:
+		return _stsqr_svd(A,method,cond_max,comm,tree)
+	else:
+		return _dtsqr_svd(A,method,cond_max,comm,tree)
+
+@cr('math.tsqr_shared')
+def tsqr_shared(A,tree='binary'):
 	'''
-	if double_complex is np.complex128_t:
-		return _ztsqr_svd(A)
+	Parallel QR factorization of a matrix in node shared memory
+		Q(m,n) is the Q matrix, a NodeArray with the rows of A
+		R(n,n) is the R matrix, a NodeArray shared by the node
+
+	The node leaders factorize the matrix of their whole node at
+	once and only they take part in the TSQR among the nodes.
+	'''
+	if not isinstance(A,NodeArray): raiseError('The matrix must be a NodeArray!')
+	n = A.shape[1]
+	Q = A.empty_like()
+	R = A.empty_like((n,n),leader=True)
+	if A.is_leader:
+		Q.node[:,:], R.node[:,:] = tsqr(A.node,comm=A.leaders,tree=tree)
+	Q.barrier()
+	return Q,R
+
+@cr('math.tsqr_svd_shared')
+def tsqr_svd_shared(A,tree='binary'):
+	'''
+	Parallel Single value decomposition (SVD) of a matrix in node shared memory
+		U(m,n)   are the POD modes, a NodeArray with the rows of A.
+		S(n)     are the singular values, a NodeArray shared by the node.
+		V(n,n)   are the right singular vectors, a NodeArray shared by the node.
+
+	The node leaders factorize the matrix of their whole node at
+	once and only they take part in the TSQR among the nodes.
+	'''
+	if not isinstance(A,NodeArray): raiseError('The matrix must be a NodeArray!')
+	mn = min(A.node.shape[0],A.shape[1])
+	U  = A.empty_like((len(A),mn))
+	S  = A.empty_like((mn,),dtype=np.float32 if A.dtype in (np.float32,np.complex64) else np.double,leader=True)
+	V  = A.empty_like((mn,A.shape[1]),leader=True)
+	if A.is_leader:
+		U.node[:,:], S.node[:], V.node[:,:] = tsqr_svd(A.node,comm=A.leaders,tree=tree)
+	U.barrier()
+	return U,S,V
+
+@cr('math.randomized_svd')
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+def randomized_svd(float_double[:,:] A, int r, int p=10, int q=1, int seed=-1, MPI.Comm comm=None):
+	'''
+	Parallel randomized Single value decomposition (SVD) using
+	a TSQR range finder.
+		U(m,r)   are the POD modes.
+		S(r)     are the singular values.
+		V(r,n)   are the right singular vectors.
+
+		r        target rank.
+		p        oversampling.
+		q        number of power iterations.
+		seed     seed for the random matrix (< 0 for a random seed).
+		comm     communicator of the processors that hold A
+		         (MPI.COMM_WORLD by default).
+	'''
+	cdef int retval
+	cdef int m = A.shape[0], n = A.shape[1]
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
+	if r <= 0 or r > n: r = n
+	cdef object dtype = np.float32 if float_double is float else np.double
+	cdef float_double[:,:] U = np.zeros((m,r),dtype=dtype)
+	cdef float_double[:]   S = np.zeros((r,) ,dtype=dtype)
+	cdef float_double[:,:] V = np.zeros((r,n),dtype=dtype)
+	# Compute SVD using the randomized algorithm
+	if float_double is float:
+		retval = c_srandomized_svd(&U[0,0],&S[0],&V[0,0],&A[0,0],m,n,r,p,q,seed,MPI_COMM.ob_mpi)
 	else:
-		return _dtsqr_svd(A)
+		retval = c_randomized_svd(&U[0,0],&S[0],&V[0,0],&A[0,0],m,n,r,p,q,seed,MPI_COMM.ob_mpi)
+	if not retval == 0: raiseError('Problems computing randomized SVD!')
+	return np.asarray(U),np.asarray(S),np.asarray(V)
 
 @cr('math.fft')
 @cython.boundscheck(False) # turn off bounds-checking for entire function
@@ -608,16 +1109,32 @@ def fft(double [:] t, double[:] y, int equispaced=True):
 			PSD = np.real(yf*np.conj(yf))/y.shape[0]
 	return f, PSD
 
+@cr('math.batched_fft')
+@cython.boundscheck(False) # turn off bounds-checking for entire function
+@cython.wraparound(False)  # turn off negative index wrapping for entire function
+@cython.nonecheck(False)
+@cython.cdivision(True)    # turn off zero division check
+def batched_fft(double[:,:] X):
+	'''
+	Compute the fft of every row of X in a single call
+	using one plan. Return the non negative frequencies.
+	'''
+	cdef int m = X.shape[0], n = X.shape[1]
+	cdef np.ndarray[np.complex128_t,ndim=2] out = np.zeros((m,n//2+1),dtype=np.complex128)
+	c_fft1D_batched(&out[0,0],&X[0,0],n,m)
+	return out
+
 @cr('math.RMSE')
 @cython.boundscheck(False) # turn off bounds-checking for entire function
 @cython.wraparound(False)  # turn off negative index wrapping for entire function
 @cython.nonecheck(False)
 @cython.cdivision(True)    # turn off zero division check
-def RMSE(double[:,:] A, double[:,:] B):
+def RMSE(double[:,:] A, double[:,:] B, MPI.Comm comm=None):
 	'''
-	Compute RMSE between X_POD and X
+	Compute RMSE between X_POD and X, distributed
+	along the processors of comm
 	'''
-	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD
+	cdef MPI.Comm MPI_COMM = MPI.COMM_WORLD if comm is None else comm
 	cdef int m = A.shape[0], n = B.shape[1]
 	cdef double rmse = 0.
 	rmse = c_RMSE(&A[0,0],&B[0,0],m,n,MPI_COMM.ob_mpi)